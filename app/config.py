@@ -11,6 +11,7 @@ class Settings(BaseSettings):
     generated_dir: Path = Path(__file__).resolve().parent.parent / "data" / "generated"
     backup_dir: Path = Path(__file__).resolve().parent.parent / "data" / "backups"
     temp_dir: Path = Path(__file__).resolve().parent.parent / "data" / "temp"
+    archive_dir: Path = Path(__file__).resolve().parent.parent / "data" / "archive"
 
     smtp_host: str = "smtp.example.com"
     smtp_port: int = 587
@@ -26,6 +27,14 @@ class Settings(BaseSettings):
     imap_password: str = ""
     imap_use_ssl: bool = True
 
+    # Měření requestů a SQL dotazů (/sprava/vykon) — zapnout REQUEST_PROFILING=true;
+    # ?_profile=1 (cProfile report) funguje jen navíc s DEBUG=true
+    request_profiling: bool = False
+
+    # Úlohy na pozadí: celkový počet workerů a souběh v poolu "heavy" (PDF, sync, zálohy — CPU + zápisy do SQLite)
+    job_workers: int = 4
+    job_heavy_workers: int = 2
+
     libreoffice_path: str = "/Applications/LibreOffice.app/Contents/MacOS/soffice"
 
     model_config = {"env_file": ".env", "extra": "ignore"}
@@ -25,6 +25,22 @@ class Base(DeclarativeBase):
     pass
 
 
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_index(target, connection, **kw):
+    """FTS5 search index + triggers (virtual table není součástí metadata)."""
+    from app.services.search_index import ensure_search_index
+
+    ensure_search_index(connection)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_activity_feed(target, connection, **kw):
+    """Triggery plnící activity_feed z email_logs + activity_logs."""
+    from app.services.activity_feed import ensure_activity_feed
+
+    ensure_activity_feed(connection)
+
+
 def get_db():
     db = SessionLocal()
     try:
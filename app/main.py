@@ -4,7 +4,6 @@ from pathlib import Path
 
 from fastapi import FastAPI, Request
 from fastapi.responses import RedirectResponse
-from fastapi.staticfiles import StaticFiles
 from sqlalchemy import text
 
 from app.config import settings
@@ -381,6 +380,11 @@ def _ensure_indexes():
     # Složené indexy: (název, tabulka, "sloupec1, sloupec2")
     _COMPOUND_INDEXES = [
         ("ix_email_logs_module_reference", "email_logs", "module, reference_id"),
+        # activity_feed triggery přepočítávají skupiny přes (module, created_at)
+        ("ix_email_logs_module_created", "email_logs", "module, created_at"),
+        ("ix_activity_logs_module_created", "activity_logs", "module, created_at"),
+        # vlastnictví ke dni / v období (app/services/ownership.py)
+        ("ix_owner_units_unit_period", "owner_units", "unit_id, valid_from, valid_to"),
     ]
     import re
     _SAFE_IDENT = re.compile(r'^"?[a-z_][a-z0-9_]*"?$')
@@ -648,6 +652,16 @@ def _migrate_bank_statement_locked():
             logger.info("Added locked_at column to bank_statements")
 
 
+def _migrate_bank_statement_revision():
+    """Přidat sloupec revision do bank_statements (klíč cache detailu výpisu)."""
+    with engine.connect() as conn:
+        cols = [r[1] for r in conn.execute(text("PRAGMA table_info('bank_statements')")).fetchall()]
+        if "revision" not in cols:
+            conn.execute(text("ALTER TABLE bank_statements ADD COLUMN revision INTEGER NOT NULL DEFAULT 0"))
+            conn.commit()
+            logger.info("Added revision column to bank_statements")
+
+
 def _migrate_unit_balances_owner():
     """Přidat sloupce owner_id a owner_name do unit_balances + balance_import_mapping do svj_info."""
     with engine.connect() as conn:
@@ -1192,6 +1206,59 @@ def _migrate_water_meter_notified_at():
         conn.commit()
 
 
+def _migrate_water_meter_stats():
+    """Naplnit water_meter_stats pro existující vodoměry (tabulka vzniká prázdná)."""
+    from app.models import WaterMeter, WaterMeterStats
+    from app.services.water_meter_stats import refresh_water_meter_stats
+
+    db = SessionLocal()
+    try:
+        has_meters = db.query(WaterMeter.id).first() is not None
+        has_stats = db.query(WaterMeterStats.meter_id).first() is not None
+        if has_meters and not has_stats:
+            count = refresh_water_meter_stats(db)
+            db.commit()
+            logger.info("Populated water_meter_stats for %d meters", count)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _migrate_water_readings_unique():
+    """Odstranit duplicitní odečty (meter_id, reading_date) a vytvořit unikátní index.
+
+    Import odečtů dělá upsert přes ON CONFLICT — potřebuje unikátní index.
+    Z duplicit se ponechává nejnovější záznam (nejvyšší id).
+    """
+    with engine.connect() as conn:
+        tables = [r[0] for r in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='water_readings'"
+        )).fetchall()]
+        if not tables:
+            return
+        deleted = conn.execute(text(
+            "DELETE FROM water_readings WHERE id NOT IN ("
+            "SELECT MAX(id) FROM water_readings GROUP BY meter_id, reading_date)"
+        )).rowcount
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_water_readings_meter_date "
+            "ON water_readings (meter_id, reading_date)"
+        ))
+        conn.commit()
+    if deleted:
+        logger.info("Removed %d duplicate water readings", deleted)
+        from app.services.water_meter_stats import refresh_water_meter_stats
+
+        db = SessionLocal()
+        try:
+            refresh_water_meter_stats(db)
+            db.commit()
+        finally:
+            db.close()
+
+
 def _migrate_smtp_password_encryption():
     """Re-encrypt SMTP passwords from base64 to Fernet."""
     import base64 as _b64
@@ -1239,6 +1306,7 @@ _ALL_MIGRATIONS = [
     ("owners email_invalid", _migrate_owners_email_invalid),
     ("payment_allocations migration", _migrate_payment_allocations),
     ("bank_statement locked_at", _migrate_bank_statement_locked),
+    ("bank_statement revision", _migrate_bank_statement_revision),
     ("unit_balances owner columns", _migrate_unit_balances_owner),
     ("spaces tables migration", _migrate_spaces_tables),
     ("svj send settings", _migrate_svj_send_settings),
@@ -1251,6 +1319,8 @@ _ALL_MIGRATIONS = [
     ("fix water meter unit links", _migrate_fix_water_meter_unit_links),
     ("water meter unit_suffix", _migrate_water_meter_unit_suffix),
     ("water meter notified_at", _migrate_water_meter_notified_at),
+    ("water meter stats", _migrate_water_meter_stats),
+    ("water readings unique", _migrate_water_readings_unique),
     ("water email template v2", _migrate_water_email_template_v2),
     ("water email template v3", _migrate_water_email_template_v3),
     ("water email template v4", _migrate_water_email_template_v4),
@@ -1293,6 +1363,18 @@ def run_post_restore_migrations() -> list[str]:
         logger.warning(msg)
         warnings.append(msg)
 
+    # Obnovená DB — zneplatnit všechny cache odvozené z dat (reference_data, detail výpisu)
+    from app.services import change_tracking
+    change_tracking.invalidate()
+
+    try:
+        from app.services.jobs import recover_interrupted_jobs
+        recover_interrupted_jobs()
+    except Exception:
+        msg = "post-restore: background job recovery skipped"
+        logger.warning(msg)
+        warnings.append(msg)
+
     return warnings
 
 
@@ -1320,6 +1402,20 @@ async def lifespan(app: FastAPI):
     except Exception:
         logger.warning("sending session recovery skipped")
 
+    # Úlohy na pozadí přerušené restartem → FAILED
+    try:
+        from app.services.jobs import recover_interrupted_jobs
+        recover_interrupted_jobs()
+    except Exception:
+        logger.warning("background job recovery skipped")
+
+    # Obsahové hashe + gzip/brotli varianty statických souborů
+    try:
+        from app.services.static_assets import build as build_static_assets
+        build_static_assets()
+    except Exception:
+        logger.warning("static asset build skipped")
+
     # Ensure data directories exist
     for d in [settings.upload_dir, settings.generated_dir, settings.temp_dir]:
         d.mkdir(parents=True, exist_ok=True)
@@ -1337,7 +1433,9 @@ app = FastAPI(title=settings.app_name, lifespan=lifespan)
 # Custom error pages
 from fastapi.templating import Jinja2Templates
 
-_error_templates = Jinja2Templates(directory="app/templates")
+from app.utils import setup_jinja_filters  # noqa: E402
+
+_error_templates = setup_jinja_filters(Jinja2Templates(directory="app/templates"))
 
 
 from sqlalchemy.exc import IntegrityError, OperationalError  # noqa: E402
@@ -1398,8 +1496,9 @@ async def inject_debtor_count(request, call_next):
         request.headers.get("hx-request") == "true"
         and request.headers.get("hx-boosted") != "true"
     )
-    # Skip static files, HTMX partials, and non-page requests (exports, API)
-    if path.startswith("/static") or is_htmx_partial:
+    # Skip static files, HTMX partials, SSE streams, and non-page requests (exports, API)
+    is_event_stream = "text/event-stream" in request.headers.get("accept", "")
+    if path.startswith("/static") or is_htmx_partial or is_event_stream:
         return await call_next(request)
     # Compute debtor count
     try:
@@ -1415,6 +1514,17 @@ async def inject_debtor_count(request, call_next):
         request.state.nav_debtor_count = 0
     return await call_next(request)
 
+
+# Request profiling (čas + SQL dotazy) — registrovaný poslední = vnější, měří i middleware výše
+from app.services.profiling import profiling_middleware  # noqa: E402
+
+app.middleware("http")(profiling_middleware)
+
+# Gzip textových odpovědí (HTML tabulky, CSV) — nejvnější, komprimuje až hotovou odpověď
+from app.services.static_assets import AssetStaticFiles, CompressionMiddleware  # noqa: E402
+
+app.add_middleware(CompressionMiddleware, minimum_size=1024, compresslevel=6)
+
 # Raise default Starlette multipart limits (default max_files=1000 is too low
 # for large PDF directories uploaded via webkitdirectory)
 try:
@@ -1425,10 +1535,10 @@ except (AttributeError, KeyError, TypeError):
     logging.getLogger(__name__).warning("Cannot override Starlette max_files limit")
 
 # Static files
-app.mount("/static", StaticFiles(directory=Path(__file__).parent / "static"), name="static")
+app.mount("/static", AssetStaticFiles(directory=Path(__file__).parent / "static"), name="static")
 
 # Register routers
-from app.routers import dashboard, owners, units, voting, tax, sync, share_check, settings_page, administration, payments, spaces, tenants, bounces, water_meters  # noqa: E402
+from app.routers import dashboard, owners, units, voting, tax, sync, share_check, settings_page, administration, payments, spaces, tenants, bounces, water_meters, jobs  # noqa: E402
 
 app.include_router(dashboard.router)
 app.include_router(owners.router, prefix="/vlastnici", tags=["Vlastníci"])
@@ -1457,3 +1567,4 @@ app.include_router(payments.router, prefix="/platby", tags=["Platby"])
 app.include_router(spaces.router, prefix="/prostory", tags=["Prostory"])
 app.include_router(tenants.router, prefix="/najemci", tags=["Nájemci"])
 app.include_router(water_meters.router, prefix="/vodometry", tags=["Vodoměry"])
+app.include_router(jobs.router, prefix="/ulohy", tags=["Úlohy na pozadí"])
@@ -6,10 +6,12 @@ from app.models.voting import (
 from app.models.tax import TaxSession, TaxDocument, TaxDistribution, MatchStatus, SendStatus, EmailDeliveryStatus
 from app.models.sync import SyncSession, SyncRecord, SyncStatus, SyncResolution
 from app.models.common import (
-    EmailLog, ImportLog, EmailStatus, ActivityLog, ActivityAction, log_activity,
+    EmailLog, ImportLog, EmailStatus, ActivityLog, ActivityAction, ActivityFeedItem, log_activity,
     EmailBounce, BounceType,
 )
-from app.models.administration import SvjInfo, SvjAddress, BoardMember, CodeListItem, EmailTemplate
+from app.models.administration import (
+    SvjInfo, SvjAddress, BoardMember, CodeListItem, EmailTemplate, LogRetentionPolicy,
+)
 from app.models.share_check import (
     ShareCheckSession, ShareCheckRecord, ShareCheckColumnMapping,
     ShareCheckStatus, ShareCheckResolution,
@@ -25,7 +27,8 @@ from app.models.payment import (
 )
 from app.models.space import Space, Tenant, SpaceTenant, SpaceStatus
 from app.models.smtp_profile import SmtpProfile
-from app.models.water_meter import WaterMeter, WaterReading, MeterType
+from app.models.water_meter import WaterMeter, WaterReading, WaterMeterStats, MeterType
+from app.models.job import BackgroundJob, JobStatus
 
 __all__ = [
     "Owner", "Unit", "OwnerUnit", "OwnerType", "Proxy",
@@ -36,8 +39,8 @@ __all__ = [
     "SyncSession", "SyncRecord", "SyncStatus", "SyncResolution",
     "EmailLog", "ImportLog", "EmailStatus",
     "EmailBounce", "BounceType",
-    "ActivityLog", "ActivityAction", "log_activity",
-    "SvjInfo", "SvjAddress", "BoardMember", "CodeListItem", "EmailTemplate",
+    "ActivityLog", "ActivityAction", "ActivityFeedItem", "log_activity",
+    "SvjInfo", "SvjAddress", "BoardMember", "CodeListItem", "EmailTemplate", "LogRetentionPolicy",
     "ShareCheckSession", "ShareCheckRecord", "ShareCheckColumnMapping",
     "ShareCheckStatus", "ShareCheckResolution",
     "VariableSymbolMapping", "UnitBalance",
@@ -49,5 +52,6 @@ __all__ = [
     "ImportStatus", "PaymentDirection", "PaymentMatchStatus", "SettlementStatus",
     "Space", "Tenant", "SpaceTenant", "SpaceStatus",
     "SmtpProfile",
-    "WaterMeter", "WaterReading", "MeterType",
+    "WaterMeter", "WaterReading", "WaterMeterStats", "MeterType",
+    "BackgroundJob", "JobStatus",
 ]
@@ -84,3 +84,18 @@ class EmailTemplate(Base):
     body_template = Column(Text, nullable=False)
     order = Column(Integer, default=0)
     created_at = Column(DateTime, default=utcnow)
+
+
+class LogRetentionPolicy(Base):
+    """Jak dlouho držet logy v hlavní DB — starší řádky přesune retence do archivu."""
+    __tablename__ = "log_retention_policies"
+    __table_args__ = (
+        Index("ix_log_retention_type_module", "log_type", "module", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    log_type = Column(String(50), nullable=False)  # "email_logs" | "activity_logs" | "email_bounces"
+    module = Column(String(50), nullable=False, default="")  # "" = výchozí pravidlo typu logu
+    keep_days = Column(Integer, nullable=True)  # None = držet navždy
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
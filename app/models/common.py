@@ -3,7 +3,7 @@ from datetime import datetime
 
 from app.utils import utcnow
 
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Session, relationship
 
 from app.database import Base
@@ -99,6 +99,35 @@ class ActivityLog(Base):
     created_at = Column(DateTime, default=utcnow)
 
 
+class ActivityFeedItem(Base):
+    """Řádek sjednocené aktivity na přehledu (EmailLog + ActivityLog).
+
+    Tabulku plní SQLite triggery nad ``email_logs`` a ``activity_logs``
+    (``app/services/activity_feed.py``) — z aplikace se jen čte.
+    Hromadná platební upozornění jsou už při zápisu sloučena do jednoho
+    řádku za den + předmět (``group_key``).
+    """
+    __tablename__ = "activity_feed"
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String(20), nullable=False)  # "email" | "activity"
+    source_id = Column(Integer, nullable=True)  # None u sloučených řádků
+    group_key = Column(String(600), nullable=True, unique=True)
+    module = Column(String(50), nullable=False)  # kanonický klíč modulu
+    created_at = Column(DateTime, nullable=True)
+    description = Column(String(600), nullable=False, default="")
+    detail = Column(String(500), nullable=False, default="")
+    status = Column(String(30), nullable=False, default="")
+    url = Column(String(200), nullable=False, default="")
+    grouped_count = Column(Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        Index("ix_activity_feed_module_created", "module", "created_at", "id"),
+        Index("ix_activity_feed_created", "created_at", "id"),
+        Index("ix_activity_feed_source", "source", "source_id"),
+    )
+
+
 def log_activity(db: Session, action: ActivityAction, entity_type: str,
                  module: str, entity_id: int = None, entity_name: str = None,
                  description: str = None):
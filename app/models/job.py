@@ -0,0 +1,41 @@
+"""Úlohy na pozadí — perzistentní záznam běhů (viz app/services/jobs.py)."""
+
+import enum
+
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, String, Text
+
+from app.database import Base
+from app.utils import utcnow
+
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    PAUSED = "paused"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        Index("ix_background_jobs_kind_key", "kind", "key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)  # "tax_processing", "tax_sending", "backup", …
+    key = Column(String(100), nullable=True)  # entita, ke které úloha patří (např. id session)
+    label = Column(String(200), nullable=False, default="")
+    pool = Column(String(20), nullable=False, default="heavy")
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.QUEUED, index=True)
+    current = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    message = Column(String(500), nullable=True)
+    error = Column(Text, nullable=True)
+    fields_json = Column(Text, nullable=True)  # doplňkový průběh (odesláno/chyby, dávka, …)
+    result_json = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
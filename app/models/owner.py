@@ -150,6 +150,8 @@ class OwnerUnit(Base):
 
     __table_args__ = (
         Index("ix_owner_unit_composite", "owner_id", "unit_id"),
+        # Dotazy „vlastník ke dni / v období“ (app/services/ownership.py)
+        Index("ix_owner_units_unit_period", "unit_id", "valid_from", "valid_to"),
     )
 
 
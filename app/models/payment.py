@@ -181,6 +181,9 @@ class BankStatement(Base):
     matched_count = Column(Integer, default=0)
     import_status = Column(Enum(ImportStatus), default=ImportStatus.IMPORTED, index=True)
     locked_at = Column(DateTime, nullable=True)
+    # Zvyšuje se při každé změně párování (přiřazení, potvrzení, odmítnutí,
+    # přepárování, zamčení) — klíč cache view modelu detailu výpisu
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
     discrepancy_test_passed = Column(Boolean, default=False)  # test email pro nesrovnalosti odeslán
     # Per-statement nastavení odesílání (dědí se z SvjInfo při prvním přístupu)
     send_batch_size = Column(Integer, nullable=True)
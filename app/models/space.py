@@ -7,12 +7,13 @@ from app.utils import utcnow
 
 from sqlalchemy import (
     Boolean, Column, Date, DateTime, Enum, Float,
-    ForeignKey, Index, Integer, String, Text,
+    ForeignKey, Index, Integer, String, Text, func, select,
 )
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 
 from app.database import Base
-from app.models.owner import OwnerType
+from app.models.owner import Owner, OwnerType
 
 
 # ── Enumy ──────────────────────────────────────────────────────────────
@@ -56,6 +57,26 @@ class Space(Base):
 # ── Nájemce ────────────────────────────────────────────────────────────
 
 
+def _sql_display_name(model):
+    """SQL obdoba ``display_name``: "titul příjmení jméno", jinak name_with_titles."""
+    joined = (
+        func.coalesce(model.title + " ", "")
+        + func.coalesce(model.last_name + " ", "")
+        + func.coalesce(model.first_name, "")
+    )
+    return func.coalesce(func.nullif(func.trim(joined), ""), model.name_with_titles, "")
+
+
+def _resolved(owner_expr, own_expr):
+    """SQL hodnota z navázaného vlastníka (i prázdná), jinak z vlastních polí nájemce.
+
+    Korelovaný poddotaz vrací NULL jen když vlastník neexistuje — stejně jako
+    ``if self.owner_id and self.owner`` v Python properties.
+    """
+    from_owner = select(owner_expr).where(Owner.id == Tenant.owner_id).scalar_subquery()
+    return func.coalesce(from_owner, own_expr)
+
+
 class Tenant(Base):
     __tablename__ = "tenants"
 
@@ -109,8 +130,9 @@ class Tenant(Base):
     spaces = relationship("SpaceTenant", back_populates="tenant", cascade="all, delete-orphan")
 
     # ── Properties that resolve from Owner when linked ──
+    # (hybridy — na třídě SQL výraz pro filtrování/řazení v DB)
 
-    @property
+    @hybrid_property
     def display_name(self) -> str:
         if self.owner_id and self.owner:
             return self.owner.display_name
@@ -123,24 +145,44 @@ class Tenant(Base):
             parts.append(self.first_name)
         return " ".join(parts) if parts else (self.name_with_titles or "")
 
-    @property
+    @display_name.inplace.expression
+    @classmethod
+    def _display_name_expression(cls):
+        return _resolved(_sql_display_name(Owner), _sql_display_name(cls))
+
+    @hybrid_property
     def resolved_phone(self) -> str:
         if self.owner_id and self.owner:
             return self.owner.phone or ""
         return self.phone or ""
 
-    @property
+    @resolved_phone.inplace.expression
+    @classmethod
+    def _resolved_phone_expression(cls):
+        return _resolved(func.coalesce(Owner.phone, ""), func.coalesce(cls.phone, ""))
+
+    @hybrid_property
     def resolved_email(self) -> str:
         if self.owner_id and self.owner:
             return self.owner.email or ""
         return self.email or ""
 
-    @property
+    @resolved_email.inplace.expression
+    @classmethod
+    def _resolved_email_expression(cls):
+        return _resolved(func.coalesce(Owner.email, ""), func.coalesce(cls.email, ""))
+
+    @hybrid_property
     def resolved_type(self):
         if self.owner_id and self.owner:
             return self.owner.owner_type
         return self.tenant_type
 
+    @resolved_type.inplace.expression
+    @classmethod
+    def _resolved_type_expression(cls):
+        return _resolved(Owner.owner_type, cls.tenant_type)
+
     @property
     def resolved_birth_number(self) -> str:
         if self.owner_id and self.owner:
@@ -153,12 +195,17 @@ class Tenant(Base):
             return self.owner.company_id or ""
         return self.company_id or ""
 
-    @property
+    @hybrid_property
     def resolved_name_normalized(self) -> str:
         if self.owner_id and self.owner:
             return self.owner.name_normalized or ""
         return self.name_normalized or ""
 
+    @resolved_name_normalized.inplace.expression
+    @classmethod
+    def _resolved_name_normalized_expression(cls):
+        return _resolved(func.coalesce(Owner.name_normalized, ""), func.coalesce(cls.name_normalized, ""))
+
     @property
     def is_linked(self) -> bool:
         return self.owner_id is not None
@@ -1,7 +1,8 @@
 import enum
+import json
 from datetime import datetime
 
-from sqlalchemy import Column, Date, DateTime, Enum, Float, ForeignKey, Integer, String
+from sqlalchemy import Column, Date, DateTime, Enum, Float, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -30,10 +31,17 @@ class WaterMeter(Base):
 
     unit = relationship("Unit", back_populates="water_meters")
     readings = relationship("WaterReading", back_populates="meter", cascade="all, delete-orphan")
+    stats = relationship(
+        "WaterMeterStats", back_populates="meter", uselist=False, cascade="all, delete-orphan",
+    )
 
 
 class WaterReading(Base):
     __tablename__ = "water_readings"
+    __table_args__ = (
+        # Jeden odečet na vodoměr a datum — import dělá upsert přes ON CONFLICT
+        Index("uq_water_readings_meter_date", "meter_id", "reading_date", unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     meter_id = Column(Integer, ForeignKey("water_meters.id"), nullable=False, index=True)
@@ -43,3 +51,36 @@ class WaterReading(Base):
     created_at = Column(DateTime, default=utcnow)
 
     meter = relationship("WaterMeter", back_populates="readings")
+
+
+class WaterMeterStats(Base):
+    """Materializované statistiky vodoměru (1:1 s WaterMeter).
+
+    Přepočítává je ``refresh_water_meter_stats()`` po importu odečtů — přehled,
+    filtry, export i rozesílka čtou hodnoty odsud místo řazení všech odečtů.
+    """
+    __tablename__ = "water_meter_stats"
+
+    meter_id = Column(Integer, ForeignKey("water_meters.id"), primary_key=True)
+    reading_count = Column(Integer, default=0)
+    last_value = Column(Float, nullable=True)
+    last_date = Column(Date, nullable=True, index=True)
+    prev_value = Column(Float, nullable=True)
+    prev_date = Column(Date, nullable=True)
+    consumption = Column(Float, nullable=True)
+    type_avg = Column(Float, nullable=True)
+    deviation_pct = Column(Float, nullable=True, index=True)
+    history_json = Column(Text, nullable=True)  # JSON: poslední 3 období [{date, consumption}]
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+
+    meter = relationship("WaterMeter", back_populates="stats")
+
+    @property
+    def history(self) -> list:
+        """Spotřeba za poslední 3 období, nejnovější první."""
+        if not self.history_json:
+            return []
+        try:
+            return json.loads(self.history_json)
+        except (ValueError, TypeError):
+            return []
@@ -5,6 +5,8 @@ from .board import router as board_router
 from .code_lists import router as code_lists_router
 from .backups import router as backups_router
 from .bulk import router as bulk_router
+from .retention import router as retention_router
+from .performance import router as performance_router
 
 router = APIRouter()
 
@@ -13,3 +15,5 @@ router.include_router(board_router)
 router.include_router(code_lists_router)
 router.include_router(backups_router)
 router.include_router(bulk_router)
+router.include_router(retention_router)
+router.include_router(performance_router)
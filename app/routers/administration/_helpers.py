@@ -18,9 +18,9 @@ from app.models import (
     VariableSymbolMapping, BankStatement, Payment, PaymentAllocation,
     BankStatementColumnMapping,
     UnitBalance, Settlement, SettlementItem,
-    WaterMeter, WaterReading,
+    WaterMeter, WaterMeterStats, WaterReading,
     EmailTemplate, EmailLog, EmailBounce, ImportLog, ActivityLog,
-    SmtpProfile,
+    LogRetentionPolicy, SmtpProfile, BackgroundJob,
 )
 from app.services.backup_service import read_restore_log
 from app.services.code_list_service import CODE_LIST_CATEGORIES
@@ -94,7 +94,7 @@ _PURGE_CATEGORIES = {
     "water_meters": {
         "label": "Vodoměry",
         "description": "Vodoměry a odečty",
-        "models": [WaterReading, WaterMeter],
+        "models": [WaterMeterStats, WaterReading, WaterMeter],
     },
     "payments": {
         "label": "Evidence plateb",
@@ -119,14 +119,14 @@ _PURGE_CATEGORIES = {
     },
     "activity_logs": {
         "label": "Aktivita",
-        "description": "Logy aktivit uživatelů",
-        "models": [ActivityLog],
+        "description": "Logy aktivit uživatelů a historie úloh na pozadí",
+        "models": [ActivityLog, BackgroundJob],
     },
     # Administrace — rozpad na 4 podkategorie
     "svj_info": {
         "label": "SVJ info a adresy",
-        "description": "Informace o SVJ a adresy",
-        "models": [SvjAddress, SvjInfo],
+        "description": "Informace o SVJ, adresy a pravidla retence logů",
+        "models": [SvjAddress, SvjInfo, LogRetentionPolicy],
     },
     "board": {
         "label": "Výbor",
@@ -160,6 +160,9 @@ _PURGE_CATEGORIES = {
     },
 }
 
+# Tabulky plněné triggery ze zdrojových tabulek — mažou se spolu s nimi
+_DERIVED_TABLES = {"activity_feed"}
+
 _PURGE_ORDER = [
     "owners", "spaces", "water_meters", "votings", "tax", "sync", "share_check", "payments",
     "email_logs", "import_logs", "activity_logs",
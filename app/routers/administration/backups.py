@@ -21,6 +21,7 @@ from app.models import (
     EmailLog, ImportLog, BoardMember,
     ActivityAction, log_activity,
 )
+from app.services import jobs
 from app.services.backup_service import (
     _rollback_from_safety,
     create_backup, restore_backup, restore_from_directory,
@@ -101,7 +102,20 @@ async def backup_create(filename: str = Form(""), db: Session = Depends(get_db))
         return RedirectResponse("/sprava/zalohy?chyba=prazdna", status_code=302)
 
     name = filename.strip() or None
-    _, wal_warning = create_backup(str(DB_PATH), str(UPLOADS_DIR), str(GENERATED_DIR), str(BACKUP_DIR), custom_name=name)
+    job = jobs.submit(
+        "backup", _create_backup_job, name,
+        label=f"Záloha — {name}" if name else "Záloha databáze a souborů", pool="heavy",
+        fields={"redirect_url": "/sprava/zalohy?zprava=vytvoreno"},
+    )
+    return RedirectResponse(f"/ulohy/{job.id}", status_code=302)
+
+
+def _create_backup_job(job: jobs.Job, name: str | None):
+    """Úloha na pozadí: vytvoření zálohy (ZIP databáze + souborů)."""
+    job.update(message="Vytvářím zálohu…")
+    backup_path, wal_warning = create_backup(
+        str(DB_PATH), str(UPLOADS_DIR), str(GENERATED_DIR), str(BACKUP_DIR), custom_name=name,
+    )
 
     # Log activity — backup is file-based, use separate session
     _db = SessionLocal()
@@ -113,8 +127,9 @@ async def backup_create(filename: str = Form(""), db: Session = Depends(get_db))
         _db.close()
 
     if wal_warning:
-        return RedirectResponse(f"/sprava/zalohy?zprava=vytvoreno&wal_warning=1", status_code=302)
-    return RedirectResponse("/sprava/zalohy?zprava=vytvoreno", status_code=302)
+        job.update(redirect_url="/sprava/zalohy?zprava=vytvoreno&wal_warning=1")
+    job.update(message=Path(backup_path).name)
+    return {"path": str(backup_path), "wal_warning": bool(wal_warning)}
 
 
 @router.get("/zaloha/{filename}/stahnout")
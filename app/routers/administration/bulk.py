@@ -1,13 +1,13 @@
 """Export, purge, hromadné úpravy, duplicity/slučování vlastníků."""
 
-import io
 import logging
 import shutil
+import tempfile
 import zipfile
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, Query, Request
-from fastapi.responses import RedirectResponse, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
 from sqlalchemy import func as sa_func
 from sqlalchemy.orm import Session, joinedload
 
@@ -19,10 +19,11 @@ from app.models import (
 from app.services.code_list_service import CODE_LIST_CATEGORIES
 from app.services.data_export import (
     EXPORT_ORDER, _EXPORTS as EXPORT_CATEGORIES,
-    export_category_xlsx, export_category_csv,
+    export_category_response, write_category,
 )
 from app.services.owner_exchange import recalculate_unit_votes
 from app.services.owner_service import find_duplicate_groups, merge_owners
+from app.services.streaming_export import CHUNK_SIZE
 from app.utils import templates
 
 from ._helpers import (
@@ -156,20 +157,7 @@ async def export_data(category: str, fmt: str, db: Session = Depends(get_db)):
         return RedirectResponse("/sprava/export", status_code=302)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{category}_{timestamp}.{fmt}"
-
-    if fmt == "xlsx":
-        content = export_category_xlsx(db, category)
-        media = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    else:
-        content = export_category_csv(db, category)
-        media = "text/csv; charset=utf-8"
-
-    return Response(
-        content=content,
-        media_type=media,
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+    return export_category_response(db, category, fmt, f"{category}_{timestamp}")
 
 
 @router.post("/export/hromadny")
@@ -185,35 +173,26 @@ async def export_bulk(request: Request, db: Session = Depends(get_db)):
     if not categories:
         return RedirectResponse("/sprava/export", status_code=302)
 
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
     # Single category — download directly
     if len(categories) == 1:
         cat = categories[0]
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{cat}_{timestamp}.{fmt}"
-        if fmt == "xlsx":
-            content = export_category_xlsx(db, cat)
-            media = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        else:
-            content = export_category_csv(db, cat)
-            media = "text/csv; charset=utf-8"
-        return Response(
-            content=content, media_type=media,
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-        )
-
-    # Multiple categories — pack into ZIP
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-        for cat in categories:
-            if fmt == "xlsx":
-                data = export_category_xlsx(db, cat)
-            else:
-                data = export_category_csv(db, cat)
-            zf.writestr(f"{cat}.{fmt}", data)
-
-    return Response(
-        content=buf.getvalue(),
+        return export_category_response(db, cat, fmt, f"{cat}_{timestamp}")
+
+    # Multiple categories — pack into ZIP (spooled temp file, streamed out)
+    def _zip_chunks():
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as tmp:
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zf:
+                for cat in categories:
+                    with zf.open(f"{cat}.{fmt}", "w", force_zip64=True) as member:
+                        write_category(db, cat, fmt, member)
+            tmp.seek(0)
+            while chunk := tmp.read(CHUNK_SIZE):
+                yield chunk
+
+    return StreamingResponse(
+        _zip_chunks(),
         media_type="application/zip",
         headers={"Content-Disposition": f'attachment; filename="export_{timestamp}.zip"'},
     )
@@ -430,6 +409,7 @@ async def duplicates_page(
         "active_nav": "administration",
         "groups": groups,
         "total_groups": len(groups),
+        "certain_groups": sum(1 for g in groups if g["certain"]),
         "total_extra": sum(len(g["owners"]) - 1 for g in groups),
         "back_url": back_url,
     })
@@ -473,27 +453,21 @@ async def merge_all_duplicates(
     request: Request,
     db: Session = Depends(get_db),
 ):
-    """Merge ALL duplicate groups at once using recommended targets."""
+    """Merge ALL certain duplicate groups at once using recommended targets.
+
+    Skupiny jen s podobným jménem (``certain=False``) se slučují ručně po jedné.
+    """
 
     groups = find_duplicate_groups(db)
     merged_count = 0
 
     for group in groups:
-        rec_id = group["recommended_id"]
-        target = db.query(Owner).options(
-            joinedload(Owner.units).joinedload(OwnerUnit.unit)
-        ).get(rec_id)
-        if not target:
+        if not group["certain"]:
             continue
-
-        duplicates = []
-        for o in group["owners"]:
-            if o.id != rec_id:
-                dup = db.query(Owner).options(
-                    joinedload(Owner.units).joinedload(OwnerUnit.unit)
-                ).get(o.id)
-                if dup:
-                    duplicates.append(dup)
+        rec_id = group["recommended_id"]
+        # Členové skupiny jsou načtení i s jednotkami (find_duplicate_groups)
+        target = next(o for o in group["owners"] if o.id == rec_id)
+        duplicates = [o for o in group["owners"] if o.id != rec_id]
 
         if duplicates:
             merge_owners(target, duplicates, db)
@@ -0,0 +1,55 @@
+"""Výkon — měření requestů a SQL dotazů (stránka, JSON metriky, reset)."""
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse, RedirectResponse
+
+from app.config import settings
+from app.services.profiling import (
+    N_PLUS_ONE_MIN,
+    metrics,
+    recent_requests,
+    reset,
+    route_stats,
+    statement_stats,
+)
+from app.utils import templates
+
+router = APIRouter()
+
+
+@router.get("/vykon")
+async def performance_page(
+    request: Request,
+    razeni: str = Query("total"),
+    jen_n1: str = Query(""),
+):
+    """Poslední requesty, agregace per route, nejdražší SQL a N+1 podezření."""
+    requests = recent_requests(limit=100)
+    if jen_n1:
+        requests = [r for r in requests if r["n_plus_one"]]
+    data = metrics()
+    return templates.TemplateResponse(request, "administration/performance.html", {
+        "active_nav": "administration",
+        "enabled": settings.request_profiling,
+        "since": data["since"],
+        "totals": data,
+        "routes": route_stats()[:50],
+        "statements": statement_stats(limit=30, order=razeni),
+        "requests": requests,
+        "razeni": razeni,
+        "jen_n1": jen_n1,
+        "n_plus_one_min": N_PLUS_ONE_MIN,
+    })
+
+
+@router.get("/vykon/metriky")
+async def performance_metrics():
+    """Metriky ve formátu JSON (pro monitoring / skripty)."""
+    return JSONResponse(metrics())
+
+
+@router.post("/vykon/reset")
+async def performance_reset():
+    """Vymazat nasbíraná měření."""
+    reset()
+    return RedirectResponse("/sprava/vykon", status_code=302)
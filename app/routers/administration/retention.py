@@ -0,0 +1,175 @@
+"""Retence logů — pravidla, spuštění archivace + zhutnění DB, prohlížení archivu."""
+
+import logging
+
+from fastapi import APIRouter, Depends, Form, Query, Request
+from fastapi.responses import RedirectResponse
+from sqlalchemy import func as sa_func
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models import ActivityAction, LogRetentionPolicy, log_activity
+from app.services.log_retention import (
+    LOG_TYPES,
+    archive_stats,
+    get_policies,
+    preview_retention,
+    query_archive,
+    read_retention_log,
+    run_retention,
+)
+from app.utils import templates
+
+from ._helpers import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _parse_keep_days(value: str) -> int | None:
+    """Form value → days; empty = keep forever. Raises ValueError on garbage."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    days = int(value)
+    if days < 1:
+        raise ValueError(days)
+    return days
+
+
+@router.get("/retence")
+async def retention_page(
+    request: Request,
+    zprava: str = Query(""),
+    chyba: str = Query(""),
+    db: Session = Depends(get_db),
+):
+    """Pravidla retence logů, náhled k archivaci, velikost DB a historie běhů."""
+    policies = get_policies(db)
+    db.commit()
+
+    # Moduly, které se v logu vyskytují — nabídka pro nové pravidlo
+    modules = {}
+    for log_type, meta in LOG_TYPES.items():
+        model = meta["model"]
+        modules[log_type] = [
+            m for (m,) in db.query(model.module).filter(model.module.isnot(None))
+            .group_by(model.module).order_by(model.module).all()
+        ]
+    live_counts = {
+        log_type: db.query(sa_func.count(meta["model"].id)).scalar() or 0
+        for log_type, meta in LOG_TYPES.items()
+    }
+
+    history = read_retention_log()
+    flash_message = ""
+    flash_type = ""
+    if zprava == "hotovo" and history:
+        last = history[0]
+        flash_message = (
+            f"Archivováno {last['archived_total']} záznamů, "
+            f"uvolněno {last['reclaimed'] // 1024} kB."
+        )
+    elif zprava == "ulozeno":
+        flash_message = "Pravidla retence uložena."
+    elif chyba == "dny":
+        flash_message = "Počet dní musí být kladné celé číslo (prázdné = držet navždy)."
+        flash_type = "error"
+    elif chyba == "duplicita":
+        flash_message = "Pravidlo pro tento modul už existuje."
+        flash_type = "error"
+
+    return templates.TemplateResponse(request, "administration/retention.html", {
+        "active_nav": "administration",
+        "log_types": LOG_TYPES,
+        "policies": policies,
+        "modules": modules,
+        "live_counts": live_counts,
+        "preview": {(r["log_type"], r["module"]): r["count"] for r in preview_retention(db)},
+        "archive": archive_stats(),
+        "history": history,
+        "db_size": DB_PATH.stat().st_size if DB_PATH.is_file() else 0,
+        "flash_message": flash_message,
+        "flash_type": flash_type,
+    })
+
+
+@router.post("/retence/pravidla")
+async def retention_policies_save(request: Request, db: Session = Depends(get_db)):
+    """Uložit počty dní existujících pravidel (pole ``keep_days_<id>``)."""
+    form = await request.form()
+    policies = get_policies(db)
+    try:
+        for policy in policies:
+            key = f"keep_days_{policy.id}"
+            if key in form:
+                policy.keep_days = _parse_keep_days(form[key])
+    except ValueError:
+        db.rollback()
+        return RedirectResponse("/sprava/retence?chyba=dny", status_code=302)
+    log_activity(db, ActivityAction.UPDATED, "retention", "sprava",
+                 entity_name="Retence logů", description="Upravena pravidla retence")
+    db.commit()
+    return RedirectResponse("/sprava/retence?zprava=ulozeno", status_code=302)
+
+
+@router.post("/retence/pravidlo/pridat")
+async def retention_policy_add(
+    log_type: str = Form(...),
+    module: str = Form(...),
+    keep_days: str = Form(""),
+    db: Session = Depends(get_db),
+):
+    """Přidat pravidlo pro konkrétní modul jednoho typu logu."""
+    module = module.strip()
+    if log_type not in LOG_TYPES or not module:
+        return RedirectResponse("/sprava/retence", status_code=302)
+    try:
+        days = _parse_keep_days(keep_days)
+    except ValueError:
+        return RedirectResponse("/sprava/retence?chyba=dny", status_code=302)
+    if db.query(LogRetentionPolicy).filter_by(log_type=log_type, module=module).first():
+        return RedirectResponse("/sprava/retence?chyba=duplicita", status_code=302)
+    db.add(LogRetentionPolicy(log_type=log_type, module=module, keep_days=days))
+    db.commit()
+    return RedirectResponse("/sprava/retence?zprava=ulozeno", status_code=302)
+
+
+@router.post("/retence/pravidlo/{policy_id}/smazat")
+async def retention_policy_delete(policy_id: int, db: Session = Depends(get_db)):
+    """Smazat modulové pravidlo (výchozí pravidla typu logu smazat nelze)."""
+    policy = db.query(LogRetentionPolicy).get(policy_id)
+    if policy and policy.module:
+        db.delete(policy)
+        db.commit()
+    return RedirectResponse("/sprava/retence?zprava=ulozeno", status_code=302)
+
+
+@router.post("/retence/spustit")
+async def retention_run(db: Session = Depends(get_db)):
+    """Archivovat logy po retenci a zhutnit hlavní DB."""
+    report = run_retention(db, str(DB_PATH))
+    log_activity(db, ActivityAction.UPDATED, "retention", "sprava",
+                 entity_name="Retence logů",
+                 description=f"Archivováno {report['archived_total']} záznamů, "
+                             f"uvolněno {report['reclaimed'] // 1024} kB")
+    db.commit()
+    return RedirectResponse("/sprava/retence?zprava=hotovo", status_code=302)
+
+
+@router.get("/retence/archiv")
+async def retention_archive(
+    request: Request,
+    typ: str = Query(""),
+    q: str = Query(""),
+):
+    """Prohlížení archivu logů (na vyžádání — čte archivní DB)."""
+    rows = query_archive(typ if typ in LOG_TYPES else "", q.strip())
+    return templates.TemplateResponse(request, "administration/retention_archive.html", {
+        "active_nav": "administration",
+        "log_types": LOG_TYPES,
+        "rows": rows,
+        "typ": typ,
+        "q": q,
+    })
@@ -1,62 +1,83 @@
-import csv
-import io
 import logging
 from datetime import datetime
-from io import BytesIO
+from urllib.parse import urlencode
 
 from fastapi import APIRouter, Depends, Query, Request
-from fastapi.responses import RedirectResponse, Response
-from openpyxl import Workbook
-from openpyxl.styles import Font
-from sqlalchemy import case, func
+from fastapi.responses import RedirectResponse
+from sqlalchemy import String, case, func, type_coerce
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models import (
-    ActivityLog, Ballot, BallotStatus, BallotVote, BankStatement,
-    EmailDeliveryStatus, EmailLog, Owner, OwnerUnit, Payment,
+    ActivityFeedItem, Ballot, BallotStatus, BallotVote, BankStatement,
+    EmailDeliveryStatus, Owner, OwnerUnit, Payment,
     PaymentDirection, PaymentMatchStatus, PrescriptionYear,
-    Space, SpaceStatus, SpaceTenant, SvjInfo,
+    Space, SpaceStatus, SpaceTenant,
     TaxDistribution, TaxDocument, TaxSession,
     Tenant, Unit, Voting,
 )
-from app.utils import excel_auto_width, strip_diacritics, templates, utcnow
+from app.services import reference_data
+from app.services.activity_feed import norm_module, search_condition
+from app.services.search_index import KIND_LABELS, global_search
+from app.services.streaming_export import export_response
+from app.utils import is_htmx_partial, keyset_page, templates, utcnow
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Normalizace raw module stringů na kanonické klíče — sjednocuje EmailLog vs ActivityLog,
-# aby `tax` a `dane` splynuly v jednu bublinu "Rozesílání".
-_MODULE_CANONICAL = {
-    "tax": "dane",
-    "voting": "hlasovani",
-    "tenants": "najemci",
-    "water_meter": "vodometry",
-    "water_notice": "vodometry",
-    "water_meters": "vodometry",
-}
-
-
-_KNOWN_MODULES = {
+# Fixní pořadí bublin shodné se sidebarem (skryje se položka s 0 záznamy)
+_MODULE_ORDER = [
     "vlastnici", "jednotky", "najemci", "prostory",
     "hlasovani", "dane", "sync", "platby", "payment_notice",
-    "sprava", "nastaveni", "water_meters", "vodometry",
+    "sprava", "nastaveni",
+]
+
+ACTIVITY_PAGE_SIZE = 100
+
+# Řazení aktivity — datum je v SQLite text, type_coerce drží hodnotu pro kurzor jako str
+_ACTIVITY_SORT = {
+    "date": type_coerce(ActivityFeedItem.created_at, String),
+    "module": ActivityFeedItem.module,
+    "description": func.lower(ActivityFeedItem.description),
+    "detail": func.lower(ActivityFeedItem.detail),
+    "status": ActivityFeedItem.status,
 }
 
 
-def _norm_module(m: str) -> str:
-    canonical = _MODULE_CANONICAL.get(m or "", m or "")
-    # Neznámé moduly (test, None, číselné) → spadnou do "sprava"
-    if canonical not in _KNOWN_MODULES:
-        return "sprava"
-    return canonical
+def _activity_query(db: Session, q: str, modul: str):
+    """Filtered activity feed query (modul accepts legacy raw keys like ``tax``)."""
+    query = db.query(ActivityFeedItem)
+    if modul:
+        query = query.filter(ActivityFeedItem.module == norm_module(modul))
+    if q:
+        query = query.filter(search_condition(q))
+    return query
+
+
+@router.get("/hledat")
+async def search_all(
+    request: Request,
+    q: str = Query(""),
+    db: Session = Depends(get_db),
+):
+    """Globální hledání (HTMX při psaní) — vlastníci, nájemci, jednotky, prostory."""
+    hits = global_search(db, q.strip(), limit=20) if len(q.strip()) >= 2 else []
+    # Seskupit podle druhu, v rámci druhu pořadí dle relevance
+    groups = [
+        {"kind": kind, "label": label, "hits": [h for h in hits if h["kind"] == kind]}
+        for kind, label in KIND_LABELS.items()
+    ]
+    return templates.TemplateResponse(request, "partials/global_search_results.html", {
+        "q": q.strip(),
+        "groups": [g for g in groups if g["hits"]],
+        "has_hits": bool(hits),
+    })
 
 
 @router.get("/prehled/rozdil-podilu")
 async def shares_breakdown(request: Request, vse: int = 0, db: Session = Depends(get_db)):
     """Porovnání podílů dle prohlášení vs. evidence vlastníků."""
-    svj_info = db.query(SvjInfo).first()
-    declared_shares = svj_info.total_shares if svj_info and svj_info.total_shares else 0
+    declared_shares = reference_data.declared_shares(db)
 
     # Per-unit: sum of active owner votes
     owner_votes_subq = (
@@ -121,14 +142,18 @@ async def home(
     modul: str = Query(""),
     sort: str = Query("date"),
     order: str = Query("desc"),
+    cursor: str = Query(""),
     db: Session = Depends(get_db),
 ):
-    """Hlavní přehledová stránka se statistikami a poslední aktivitou."""
+    """Hlavní přehledová stránka se statistikami a poslední aktivitou.
+
+    Aktivita se stránkuje přes keyset (``cursor``) — další řádky si tabulka
+    dotahuje HTMX požadavkem při doscrollování na konec.
+    """
     owners_count = db.query(Owner).filter_by(is_active=True).count()
     units_count = db.query(Unit).count()
     # Voting stats: count per status (lightweight)
-    svj_info = db.query(SvjInfo).first()
-    declared_shares = svj_info.total_shares if svj_info and svj_info.total_shares else 0
+    declared_shares = reference_data.declared_shares(db)
 
     voting_counts = (
         db.query(Voting.status, func.count(Voting.id))
@@ -261,123 +286,38 @@ async def home(
             tax_by_status[s]["total_dists"] = total
             tax_by_status[s]["sent"] = sent or 0
 
-    # Unified activity: EmailLog + ActivityLog (limit 200 pro výkon)
-    recent_emails = db.query(EmailLog).order_by(EmailLog.created_at.desc()).limit(200).all()
-    recent_activity = db.query(ActivityLog).order_by(ActivityLog.created_at.desc()).limit(200).all()
-
-    unified = []
-    # URL mapování pro entity_type → detail stránka
-    _entity_urls = {
-        "voting": "/hlasovani/{id}",
-        "tax_session": "/rozesilani/{id}",
-        "owner": "/vlastnici/{id}",
-    }
-
-    # Seskupení payment_notice emailů (a jiných hromadných emailů) dle den+modul+subject
-    from collections import defaultdict
-    grouped_emails = defaultdict(list)
-    for e in recent_emails:
-        if e.module == "payment_notice":
-            day = e.created_at.strftime("%Y-%m-%d") if e.created_at else "?"
-            key = (day, e.module, e.subject or "")
-            grouped_emails[key].append(e)
-        else:
-            url = f"/rozesilani/{e.reference_id}" if e.reference_id else ""
-            unified.append({
-                "type": "email",
-                "created_at": e.created_at,
-                "module": _norm_module(e.module),
-                "description": e.subject or "",
-                "detail": e.recipient_name or e.recipient_email or "",
-                "status": e.status.value if e.status else "",
-                "url": url,
-                "entity": e,
-            })
-
-    # Seskupené payment_notice → jeden řádek za den+subject
-    for (day, mod, subject), emails in grouped_emails.items():
-        latest = max(emails, key=lambda e: e.created_at or datetime.min)
-        sent_count = sum(1 for e in emails if e.status and e.status.value == "sent")
-        failed_count = sum(1 for e in emails if e.status and e.status.value == "failed")
-        count = len(emails)
-        detail = f"{count}× odesláno"
-        if failed_count:
-            detail = f"{sent_count}× odesláno, {failed_count}× chyba"
-        ref_id = latest.reference_id
-        url = f"/platby/vypisy/{ref_id}" if ref_id else ""
-        unified.append({
-            "type": "email",
-            "created_at": latest.created_at,
-            "module": _norm_module(mod),
-            "description": f"{subject}" if count == 1 else f"{subject} ({count}×)",
-            "detail": detail,
-            "status": "sent" if failed_count == 0 else "failed",
-            "url": url,
-            "entity": latest,
-            "grouped_count": count,
-        })
-
-    for a in recent_activity:
-        url_tpl = _entity_urls.get(a.entity_type, "")
-        url = url_tpl.format(id=a.entity_id) if url_tpl and a.entity_id else ""
-        unified.append({
-            "type": "activity",
-            "created_at": a.created_at,
-            "module": _norm_module(a.module),
-            "description": a.entity_name or "",
-            "detail": a.description or "",
-            "status": a.action.value if a.action else "",
-            "url": url,
-            "entity": a,
+    # Sjednocená aktivita — tabulka activity_feed (triggery), filtr/řazení/stránky v SQL
+    if sort not in _ACTIVITY_SORT:
+        sort = "date"
+    activity_query = _activity_query(db, q, modul)
+    recent_activity, next_cursor = keyset_page(
+        activity_query, _ACTIVITY_SORT[sort], ActivityFeedItem.id, cursor,
+        descending=(order == "desc"), page_size=ACTIVITY_PAGE_SIZE,
+    )
+    params = [(k, v) for k, v in request.query_params.multi_items() if k != "cursor"]
+    next_page_url = "/?" + urlencode(params + [("cursor", next_cursor)]) if next_cursor else ""
+
+    if cursor and is_htmx_partial(request):
+        # Další stránka při doscrollování — jen řádky, bez statistik
+        return templates.TemplateResponse(request, "partials/dashboard_activity_body.html", {
+            "recent_activity": recent_activity,
+            "next_page_url": next_page_url,
+            "q": q,
         })
 
-    # Sort combined
-    unified.sort(key=lambda x: x["created_at"] or datetime.min, reverse=True)
-
-    # Počty per modul (pro bubliny) — před filtrováním
-    module_counts = defaultdict(int)
-    for item in unified:
-        module_counts[item["module"]] += 1
-
-    # Fixní pořadí bublin shodné se sidebarem (skryje se položka s 0 záznamy)
-    _MODULE_ORDER = [
-        "vlastnici", "jednotky", "najemci", "prostory",
-        "hlasovani", "dane", "sync", "platby", "payment_notice",
-        "sprava", "nastaveni",
-    ]
+    # Počty per modul (pro bubliny) — přes celou historii, před filtrováním
+    module_counts = dict(
+        db.query(ActivityFeedItem.module, func.count(ActivityFeedItem.id))
+        .group_by(ActivityFeedItem.module)
+        .all()
+    )
     module_counts_ordered = [
         (key, module_counts[key]) for key in _MODULE_ORDER if module_counts.get(key, 0) > 0
     ]
-    # Neznámé moduly přemapovány na "sprava" v _norm_module()
-
-    # Filtr dle modulu (akceptuje i legacy raw klíče jako `tax`, `voting`)
-    if modul:
-        modul_canonical = _norm_module(modul)
-        unified = [item for item in unified if item["module"] == modul_canonical]
-
-    # Search filtering
-    if q:
-        q_lower = q.lower()
-        q_ascii = strip_diacritics(q)
-        unified = [
-            item for item in unified
-            if q_lower in item["description"].lower()
-            or q_ascii in strip_diacritics(item["description"])
-            or q_lower in item["detail"].lower()
-            or q_ascii in strip_diacritics(item["detail"])
-            or q_lower in item["module"].lower()
-        ]
-
-    # Sorting
-    SORT_KEYS = {
-        "date": lambda x: x["created_at"],
-        "module": lambda x: x["module"].lower(),
-        "description": lambda x: strip_diacritics(x["description"]),
-        "detail": lambda x: strip_diacritics(x["detail"]),
-        "status": lambda x: x["status"],
-    }
-    sort_fn = SORT_KEYS.get(sort, SORT_KEYS["date"])
-    unified.sort(key=sort_fn, reverse=(order == "desc"))
+    activity_total = (
+        activity_query.order_by(None).count()
+        if next_cursor else len(recent_activity)
+    )
 
     # Share statistics (svj_info + declared_shares already loaded above)
     owners_scd = db.query(func.sum(OwnerUnit.votes)).filter(OwnerUnit.valid_to.is_(None)).scalar() or 0
@@ -453,9 +393,11 @@ async def home(
         "voting_by_status": voting_by_status,
         "active_tax_count": sum(c for _, c in tax_status_counts),
         "tax_by_status": tax_by_status,
-        "recent_activity": unified,
+        "recent_activity": recent_activity,
+        "next_page_url": next_page_url,
+        "activity_total": activity_total,
         "modul": modul,
-        "module_counts": dict(module_counts),
+        "module_counts": module_counts,
         "module_counts_ordered": module_counts_ordered,
         "declared_shares": declared_shares,
         "owners_scd": owners_scd,
@@ -478,7 +420,7 @@ async def home(
         "expiring_contracts": expiring_contracts,
     }
 
-    if request.headers.get("HX-Request") and not request.headers.get("HX-Boosted"):
+    if is_htmx_partial(request):
         return templates.TemplateResponse(request, "partials/dashboard_activity_body.html", ctx)
 
     return templates.TemplateResponse(request, "dashboard.html", ctx)
@@ -507,102 +449,36 @@ _STATUS_LABELS = {
 async def dashboard_export(
     fmt: str,
     q: str = Query(""),
+    modul: str = Query(""),
     sort: str = Query("date"),
     order: str = Query("desc"),
     db: Session = Depends(get_db),
 ):
-    """Export přehledu aktivity do Excelu nebo CSV."""
+    """Export přehledu aktivity do Excelu nebo CSV (streamovaně, stejné filtry jako přehled)."""
     if fmt not in ("xlsx", "csv"):
         return RedirectResponse("/", status_code=302)
 
-    # Build unified activity (same as dashboard view)
-    recent_emails = db.query(EmailLog).order_by(EmailLog.created_at.desc()).all()
-    recent_acts = db.query(ActivityLog).order_by(ActivityLog.created_at.desc()).all()
-
-    unified = []
-    for e in recent_emails:
-        unified.append({
-            "created_at": e.created_at,
-            "module": _norm_module(e.module),
-            "description": e.subject or "",
-            "detail": e.recipient_name or e.recipient_email or "",
-            "status": e.status.value if e.status else "",
-        })
-    for a in recent_acts:
-        unified.append({
-            "created_at": a.created_at,
-            "module": _norm_module(a.module),
-            "description": a.entity_name or "",
-            "detail": a.description or "",
-            "status": a.action.value if a.action else "",
-        })
-
-    unified.sort(key=lambda x: x["created_at"] or datetime.min, reverse=True)
+    sort_expr = _ACTIVITY_SORT.get(sort, _ACTIVITY_SORT["date"])
+    direction = (lambda c: c.desc()) if order == "desc" else (lambda c: c.asc())
+    query = (
+        _activity_query(db, q, modul)
+        .order_by(direction(sort_expr), direction(ActivityFeedItem.id))
+    )
 
-    if q:
-        q_lower = q.lower()
-        q_ascii = strip_diacritics(q)
-        unified = [
-            item for item in unified
-            if q_lower in item["description"].lower()
-            or q_ascii in strip_diacritics(item["description"])
-            or q_lower in item["detail"].lower()
-            or q_ascii in strip_diacritics(item["detail"])
-            or q_lower in item["module"].lower()
-        ]
-
-    SORT_KEYS = {
-        "date": lambda x: x["created_at"],
-        "module": lambda x: x["module"].lower(),
-        "description": lambda x: strip_diacritics(x["description"]),
-        "detail": lambda x: strip_diacritics(x["detail"]),
-        "status": lambda x: x["status"],
-    }
-    sort_fn = SORT_KEYS.get(sort, SORT_KEYS["date"])
-    unified.sort(key=sort_fn, reverse=(order == "desc"))
-
-    headers = ["Datum", "Modul", "Popis", "Detail", "Stav"]
-    rows = []
-    for item in unified:
-        rows.append([
-            item["created_at"].strftime("%d.%m.%Y %H:%M") if item["created_at"] else "",
-            _MODULE_LABELS.get(item["module"], item["module"]),
-            item["description"],
-            item["detail"],
-            _STATUS_LABELS.get(item["status"], item["status"]),
-        ])
+    def _rows():
+        for item in query.yield_per(500):
+            yield [
+                item.created_at.strftime("%d.%m.%Y %H:%M") if item.created_at else "",
+                _MODULE_LABELS.get(item.module, item.module),
+                item.description,
+                item.detail,
+                _STATUS_LABELS.get(item.status, item.status),
+            ]
 
     timestamp = datetime.now().strftime("%Y%m%d")
     suffix = "_hledani" if q else "_vse"
-    filename = f"aktivita{suffix}_{timestamp}.{fmt}"
-
-    if fmt == "csv":
-        buf = io.StringIO()
-        buf.write("\ufeff")
-        writer = csv.writer(buf, delimiter=";")
-        writer.writerow(headers)
-        writer.writerows(rows)
-        return Response(
-            content=buf.getvalue().encode("utf-8"),
-            media_type="text/csv; charset=utf-8",
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-        )
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Aktivita"
-    bold = Font(bold=True)
-    for c, h in enumerate(headers, 1):
-        ws.cell(row=1, column=c, value=h).font = bold
-    for ri, row in enumerate(rows, 2):
-        for ci, val in enumerate(row, 1):
-            ws.cell(row=ri, column=ci, value=val)
-    excel_auto_width(ws)
-
-    buf = BytesIO()
-    wb.save(buf)
-    return Response(
-        content=buf.getvalue(),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    return export_response(
+        fmt, f"aktivita{suffix}_{timestamp}",
+        ["Datum", "Modul", "Popis", "Detail", "Stav"], _rows(),
+        sheet_title="Aktivita",
     )
@@ -0,0 +1,160 @@
+"""Úlohy na pozadí — přehled, společný průběh/ETA (SSE, fallback HTMX polling), pauza a zrušení."""
+
+import asyncio
+import json
+import time
+
+from fastapi import APIRouter, Form, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+
+from app.services import jobs
+from app.utils import templates
+
+router = APIRouter()
+
+_DEFAULT_TEMPLATE = "partials/job_progress.html"
+# HTMX: odpověď 286 zastaví hx-trigger="every …" polling
+_STOP_POLLING = 286
+
+# SSE: jak často se kontroluje stav úlohy v paměti (s) — posílá se jen při změně
+STREAM_TICK = 0.25
+# Uplynulý čas / ETA se obnoví nejpozději po tolika sekundách i bez změny průběhu
+STREAM_REFRESH = 1.0
+# Po tolika sekundách se proud ukončí, EventSource se sám znovu připojí
+STREAM_MAX_AGE = 600
+# Pole průběhu posílaná jako delta (jen ta, která se od minulé zprávy změnila)
+STREAM_FIELDS = (
+    "status", "current", "total", "pct", "elapsed", "eta", "message",
+    "current_recipient", "sent", "failed", "error", "paused", "waiting_batch_confirm",
+    "queue_position", "done",
+)
+
+
+def _back(zpet: str, job_id: int) -> str:
+    # Jen relativní cesty v aplikaci (žádný open redirect)
+    if zpet.startswith("/") and not zpet.startswith("//"):
+        return zpet
+    return f"/ulohy/{job_id}"
+
+
+def _hx_redirect(url: str) -> HTMLResponse:
+    response = HTMLResponse("")
+    response.headers["HX-Redirect"] = url
+    return response
+
+
+@router.get("/")
+async def jobs_list(request: Request):
+    """Posledních 100 úloh na pozadí."""
+    return templates.TemplateResponse(request, "jobs/index.html", {
+        "active_nav": "administration",
+        "jobs": [jobs.progress_context(s) for s in jobs.recent(100)],
+    })
+
+
+@router.get("/{job_id}")
+async def job_detail(job_id: int, request: Request):
+    """Obecná stránka průběhu (úlohy bez vlastní stránky, např. záloha)."""
+    snapshot = jobs.get(job_id)
+    if snapshot is None:
+        return RedirectResponse("/ulohy", status_code=302)
+    ctx = jobs.progress_context(snapshot)
+    return templates.TemplateResponse(request, "jobs/detail.html", {
+        **ctx,
+        "active_nav": "administration",
+        "job": ctx,
+        "template": snapshot.get("template") or _DEFAULT_TEMPLATE,
+    })
+
+
+@router.get("/{job_id}/stav")
+async def job_status(job_id: int, request: Request):
+    """HTMX polling — partial průběhu úlohy, po dokončení HX-Redirect na ``redirect_url``.
+
+    Partial určuje pole ``template`` úlohy (výchozí ``partials/job_progress.html``).
+    Dokončená úloha bez přesměrování (nebo neúspěšná) vrátí HTTP 286 — HTMX
+    tím polling ukončí a partial s výsledkem / chybou zůstane zobrazený.
+    """
+    snapshot = jobs.get(job_id)
+    if snapshot is None:
+        return _hx_redirect("/ulohy")
+    redirect_url = snapshot.get("redirect_url")
+    if snapshot["done"] and snapshot["status"] != "failed" and redirect_url:
+        finished_at = snapshot.get("finished_at")
+        delay = snapshot.get("redirect_delay", 0)
+        if finished_at is None or time.monotonic() - finished_at >= delay:
+            return _hx_redirect(redirect_url)
+    return templates.TemplateResponse(
+        request, snapshot.get("template") or _DEFAULT_TEMPLATE, jobs.progress_context(snapshot),
+        status_code=_STOP_POLLING if snapshot["done"] and (snapshot["status"] == "failed" or not redirect_url) else 200,
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+@router.get("/{job_id}/proud")
+async def job_stream(job_id: int, request: Request):
+    """Server-Sent Events — průběh úlohy posílaný při změně (náhrada pollingu ``/stav``).
+
+    Událost ``progress`` nese ``delta`` (změněná pole z ``STREAM_FIELDS``)
+    a ``html`` (stejný partial jako ``/stav``). Po dokončení přijde ``done``
+    a proud se zavře — klient pak jednou zavolá ``/stav``, který vyřeší
+    přesměrování / zastavení pollingu. Stav se čte z paměti, DB ani šablona
+    se bez změny nedotknou.
+    """
+
+    async def events():
+        yield "retry: 2000\n\n"
+        sent: dict = {}
+        last_render = 0.0
+        opened = time.monotonic()
+        while time.monotonic() - opened < STREAM_MAX_AGE:
+            snapshot = jobs.get(job_id)
+            if snapshot is None:
+                yield _sse("done", {"missing": True})
+                return
+            ctx = jobs.progress_context(snapshot)
+            delta = {k: ctx.get(k) for k in STREAM_FIELDS if sent.get(k) != ctx.get(k)}
+            now = time.monotonic()
+            if delta and (set(delta) - {"elapsed", "eta"} or now - last_render >= STREAM_REFRESH):
+                html = templates.env.get_template(
+                    snapshot.get("template") or _DEFAULT_TEMPLATE
+                ).render({"request": request, **ctx})
+                sent.update(delta)
+                last_render = now
+                yield _sse("progress", {"delta": delta, "html": html})
+            if snapshot["done"]:
+                yield _sse("done", {"status": snapshot["status"]})
+                return
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(STREAM_TICK)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+@router.post("/{job_id}/zrusit")
+async def job_cancel(job_id: int, zpet: str = Form("")):
+    """Zrušit úlohu (čekající hned, běžící na nejbližším kroku)."""
+    jobs.cancel(job_id)
+    return RedirectResponse(_back(zpet, job_id), status_code=302)
+
+
+@router.post("/{job_id}/pozastavit")
+async def job_pause(job_id: int, zpet: str = Form("")):
+    """Pozastavit běžící úlohu."""
+    jobs.pause(job_id)
+    return RedirectResponse(_back(zpet, job_id), status_code=302)
+
+
+@router.post("/{job_id}/pokracovat")
+async def job_resume(job_id: int, zpet: str = Form("")):
+    """Pokračovat v pozastavené úloze / potvrdit další dávku."""
+    jobs.resume(job_id)
+    return RedirectResponse(_back(zpet, job_id), status_code=302)
@@ -8,7 +8,9 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 
 from app.models import Owner, OwnerType, OwnerUnit, SvjInfo, Unit, WaterMeter
+from app.services import reference_data
 from app.services.code_list_service import get_all_code_lists
+from app.services.search_index import search_filter
 from app.utils import strip_diacritics, templates
 
 logger = logging.getLogger(__name__)
@@ -28,25 +30,22 @@ SORT_COLUMNS = {
 
 def _filter_owners(db: Session, q="", owner_type="", vlastnictvi="", kontakt="", stav="", sekce="", sort="name", order="asc"):
     """Filter and sort owners. Returns list[Owner] with eager-loaded units."""
-    from sqlalchemy import cast, or_, String
+    query = _filter_owners_query(db, q, owner_type, vlastnictvi, kontakt, stav, sekce, sort, order)
+    return query.options(joinedload(Owner.units).joinedload(OwnerUnit.unit)).all()
 
-    query = db.query(Owner).filter_by(is_active=True).options(
-        joinedload(Owner.units).joinedload(OwnerUnit.unit)
-    )
+
+def _filter_owners_query(db: Session, q="", owner_type="", vlastnictvi="", kontakt="", stav="", sekce="", sort="name", order="asc"):
+    """Filtered and sorted Owner query without loader options.
+
+    Export streams it with ``selectinload`` + ``yield_per``; the list page
+    loads it whole with ``joinedload`` (see ``_filter_owners``).
+    """
+    from sqlalchemy import or_
+
+    query = db.query(Owner).filter_by(is_active=True)
     if q:
-        search = f"%{q}%"
-        search_ascii = f"%{strip_diacritics(q)}%"
-        query = query.filter(
-            Owner.name_normalized.like(search_ascii)
-            | Owner.name_with_titles.ilike(search)
-            | Owner.first_name.ilike(search)
-            | Owner.last_name.ilike(search)
-            | Owner.email.ilike(search)
-            | Owner.phone.ilike(search)
-            | Owner.birth_number.ilike(search)
-            | Owner.company_id.ilike(search)
-            | Owner.units.any((OwnerUnit.valid_to.is_(None)) & OwnerUnit.unit.has(cast(Unit.unit_number, String).ilike(search)))
-        )
+        # FTS5 index (bez FTS5 LIKE): jména, e-maily, telefony, RČ, IČ, čísla jednotek
+        query = query.filter(search_filter(Owner, "owner", q))
     if owner_type:
         query = query.filter(Owner.owner_type == owner_type)
     if vlastnictvi == "_empty":
@@ -93,7 +92,6 @@ def _filter_owners(db: Session, q="", owner_type="", vlastnictvi="", kontakt="",
         query = query.outerjoin(podil_sub, Owner.id == podil_sub.c.owner_id)
         col = podil_sub.c.total_votes
         query = query.order_by(col.desc().nulls_last() if order == "desc" else col.asc().nulls_last())
-        owners = query.all()
     elif sort == "jednotky":
         # SQL subquery: min unit_number per owner
         unit_sub = (
@@ -106,7 +104,6 @@ def _filter_owners(db: Session, q="", owner_type="", vlastnictvi="", kontakt="",
         query = query.outerjoin(unit_sub, Owner.id == unit_sub.c.owner_id)
         col = unit_sub.c.min_unit
         query = query.order_by(col.desc().nulls_last() if order == "desc" else col.asc().nulls_last())
-        owners = query.all()
     elif sort == "sekce":
         # SQL subquery: min section per owner
         sec_sub = (
@@ -119,7 +116,6 @@ def _filter_owners(db: Session, q="", owner_type="", vlastnictvi="", kontakt="",
         query = query.outerjoin(sec_sub, Owner.id == sec_sub.c.owner_id)
         col = sec_sub.c.min_section
         query = query.order_by(col.desc().nulls_last() if order == "desc" else col.asc().nulls_last())
-        owners = query.all()
     elif sort == "vodometry":
         # SQL subquery: count of water meters per owner (via units)
         meter_sub = (
@@ -133,17 +129,15 @@ def _filter_owners(db: Session, q="", owner_type="", vlastnictvi="", kontakt="",
         query = query.outerjoin(meter_sub, Owner.id == meter_sub.c.owner_id)
         col = meter_sub.c.meter_count
         query = query.order_by(col.desc().nulls_last() if order == "desc" else col.asc().nulls_last())
-        owners = query.all()
     elif sort_col is not None:
         if order == "desc":
             query = query.order_by(sort_col.desc().nulls_last())
         else:
             query = query.order_by(sort_col.asc().nulls_last())
-        owners = query.all()
     else:
-        owners = query.order_by(Owner.name_normalized).all()
+        query = query.order_by(Owner.name_normalized)
 
-    return owners
+    return query
 
 
 def _owner_meter_counts(db: Session) -> dict[int, int]:
@@ -259,8 +253,7 @@ def _owner_units_context(owner, db):
         ).order_by(Unit.unit_number).all()
     else:
         available_units = db.query(Unit).order_by(Unit.unit_number).all()
-    svj_info = db.query(SvjInfo).first()
-    declared_shares = svj_info.total_shares if svj_info and svj_info.total_shares else 0
+    declared_shares = reference_data.declared_shares(db)
     return available_units, declared_shares
 
 
@@ -1,29 +1,28 @@
 from __future__ import annotations
 
-import csv
-import io
 from datetime import date, datetime
-from io import BytesIO
 
 from fastapi import APIRouter, Depends, Form, Query, Request
-from fastapi.responses import HTMLResponse, RedirectResponse, Response
-from openpyxl import Workbook
-from openpyxl.styles import Font
+from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy import func, or_
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from app.database import get_db
-from app.models import ActivityAction, Owner, OwnerType, OwnerUnit, Prescription, PrescriptionYear, SvjInfo, Unit, UnitBalance, log_activity
+from app.models import ActivityAction, Owner, OwnerType, OwnerUnit, Prescription, PrescriptionYear, Unit, UnitBalance, log_activity
 from app.routers.payments._helpers import compute_debt_map
+from app.services import reference_data
+from app.services.page_cache import OWNERSHIP_TABLES, PAYMENT_TABLES, WATER_TABLES, cached_page
 from app.services.code_list_service import get_all_code_lists
 from app.services.owner_exchange import recalculate_unit_votes
 from app.services.owner_service import merge_owners
-from app.utils import build_list_url, excel_auto_width, is_htmx_partial, is_valid_email, strip_diacritics, utcnow
+from app.services.streaming_export import export_response
+from app.utils import build_list_url, is_htmx_partial, is_valid_email, strip_diacritics, utcnow
 
 from ._helpers import (
     SORT_COLUMNS,
     _address_context,
     _filter_owners,
+    _filter_owners_query,
     _format_address,
     _header_oob_html,
     _owner_meter_counts,
@@ -189,6 +188,7 @@ async def owner_create(
 
 
 @router.get("/")
+@cached_page(*OWNERSHIP_TABLES, *PAYMENT_TABLES, *WATER_TABLES)
 async def owner_list(
     request: Request,
     q: str = Query("", alias="q"),
@@ -286,8 +286,7 @@ async def owner_list(
     ).count()
 
     total_scd = db.query(func.sum(OwnerUnit.votes)).filter(OwnerUnit.valid_to.is_(None)).scalar() or 0
-    svj_info = db.query(SvjInfo).first()
-    declared_shares = svj_info.total_shares if svj_info and svj_info.total_shares else 0
+    declared_shares = reference_data.declared_shares(db)
 
     # Ownership type counts
     ownership_counts_raw = (
@@ -351,7 +350,11 @@ async def owner_export(
     if fmt not in ("xlsx", "csv"):
         return RedirectResponse("/vlastnici", status_code=302)
 
-    owners = _filter_owners(db, q, owner_type, vlastnictvi, kontakt, stav, sekce, sort, order)
+    owners = (
+        _filter_owners_query(db, q, owner_type, vlastnictvi, kontakt, stav, sekce, sort, order)
+        .options(selectinload(Owner.units).joinedload(OwnerUnit.unit))
+        .yield_per(500)
+    )
 
     headers = ["Vlastník", "Typ", "Jednotky", "Sekce", "Vodoměrů", "Email", "Email 2", "Telefon", "Podíl SČD", "RČ/IČ", "Trvalá adresa", "Korespondenční adresa"]
 
@@ -399,40 +402,7 @@ async def owner_export(
         suffix = "_vsichni"
     filename = f"vlastnici{suffix}_{timestamp}"
 
-    if fmt == "xlsx":
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Vlastníci"
-        bold = Font(bold=True)
-
-        for col, h in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=h)
-            cell.font = bold
-
-        for row_idx, o in enumerate(owners, 2):
-            for col_idx, val in enumerate(_row(o), 1):
-                ws.cell(row=row_idx, column=col_idx, value=val)
-
-        excel_auto_width(ws)
-
-        buf = BytesIO()
-        wb.save(buf)
-        return Response(
-            content=buf.getvalue(),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f'attachment; filename="{filename}.xlsx"'},
-        )
-    else:
-        buf = io.StringIO()
-        writer = csv.writer(buf, delimiter=";")
-        writer.writerow(headers)
-        for o in owners:
-            writer.writerow(_row(o))
-        return Response(
-            content=buf.getvalue().encode("utf-8-sig"),
-            media_type="text/csv; charset=utf-8",
-            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'},
-        )
+    return export_response(fmt, filename, headers, (_row(o) for o in owners), sheet_title="Vlastníci")
 
 
 @router.get("/{owner_id}")
@@ -460,8 +430,7 @@ async def owner_detail(
     else:
         available_units = db.query(Unit).order_by(Unit.unit_number).all()
 
-    svj_info = db.query(SvjInfo).first()
-    declared_shares = svj_info.total_shares if svj_info and svj_info.total_shares else 0
+    declared_shares = reference_data.declared_shares(db)
 
     # Platební dluh vlastníka (přes jeho jednotky) + předpisy
     owner_debt = 0
@@ -2,26 +2,26 @@ from __future__ import annotations
 
 import json
 import shutil
-import threading
-import time as _time
 from datetime import datetime
 from pathlib import Path
 from urllib.parse import quote
 
 from fastapi import APIRouter, Depends, File, Form, Query, Request, UploadFile
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 
 from app.config import settings
 from app.database import SessionLocal, get_db
 from app.models import ActivityAction, ImportLog, log_activity
+from app.services import jobs
 from app.services.contact_import import preview_contact_import, execute_contact_import
 from app.services.import_mapping import (
     CONTACT_FIELD_DEFS, CONTACT_FIELD_GROUPS,
     build_mapping_context, read_excel_headers, read_excel_sheet_names,
     validate_contact_mapping,
 )
-from app.utils import UPLOAD_LIMITS, build_import_wizard, compute_eta, is_safe_path, validate_upload
+from app.services.parsed_upload import discard_parsed_upload
+from app.utils import UPLOAD_LIMITS, build_import_wizard, is_safe_path, validate_upload
 
 from ._helpers import (
     _load_contact_mapping,
@@ -32,10 +32,6 @@ from ._helpers import (
 
 router = APIRouter()
 
-# In-memory progress tracker for contact import background processing
-_contact_import_progress: dict[str, dict] = {}
-
-
 @router.get("/import-kontaktu")
 async def contact_import_page():
     """Redirect to unified import page (contacts section)."""
@@ -147,60 +143,37 @@ async def contact_import_mapping_submit(
             _save_contact_mapping(db, mapping)
 
     file_key = Path(file_path).name
-
-    # Initialize progress tracker
-    _contact_import_progress[file_key] = {
-        "done": False,
-        "error": None,
-        "result": None,
-        "file_path": file_path,
-        "filename": filename,
-        "mapping": mapping,
-        "started_at": _time.monotonic(),
-        "total": 0,
-        "current": 0,
-        "phase": "Připravuji...",
-    }
-
-    # Start background processing thread
-    thread = threading.Thread(
-        target=_run_contact_preview,
-        args=(file_key, file_path),
-        daemon=True,
-    )
-    thread.start()
+    _start_contact_preview(file_key, file_path, filename, mapping)
 
     return RedirectResponse(f"/vlastnici/import-kontaktu/zpracovani?soubor={quote(file_key)}", status_code=302)
 
 
-def _run_contact_preview(file_key: str, file_path: str):
-    """Background thread: parse Excel and compare with DB."""
+def _run_contact_preview(job: jobs.Job, file_path: str, mapping: dict | None):
+    """Úloha na pozadí: parse Excel and compare with DB.
+
+    ``preview_contact_import`` hlásí průběh zápisem do ``progress[...]`` —
+    ``Job`` tyto zápisy přijímá (phase / total / current).
+    """
     db = SessionLocal()
     try:
-        progress = _contact_import_progress[file_key]
-        mapping = progress.get("mapping")
-        result = preview_contact_import(file_path, db, progress=progress, mapping=mapping)
-        progress["result"] = result
-    except Exception as e:
-        logger.exception("Contact import failed for %s", file_key)
-        _contact_import_progress[file_key]["error"] = str(e)
+        return preview_contact_import(file_path, db, progress=job, mapping=mapping)
     finally:
-        _contact_import_progress[file_key]["done"] = True
         db.close()
 
 
-def _contact_progress_ctx(progress: dict) -> dict:
-    """Compute progress context for contact import templates."""
-
-    total = progress.get("total", 0)
-    current = progress.get("current", 0)
-    eta = compute_eta(current, total, progress["started_at"])
-    return {
-        "total": total,
-        "current": current,
-        **eta,
-        "phase": progress.get("phase", "Připravuji..."),
-    }
+def _start_contact_preview(file_key: str, file_path: str, filename: str, mapping: dict | None) -> jobs.Job:
+    return jobs.submit(
+        "contact_import", _run_contact_preview, file_path, mapping,
+        key=file_key, label="Import kontaktních údajů", pool="heavy",
+        fields={
+            "phase": "Připravuji...",
+            "file_path": file_path,
+            "filename": filename,
+            "mapping": mapping,
+            "template": "partials/contact_import_progress.html",
+            "redirect_url": f"/vlastnici/import-kontaktu/nahled-vysledek?soubor={quote(file_key)}",
+        },
+    )
 
 
 @router.get("/import-kontaktu/zpracovani")
@@ -208,39 +181,17 @@ async def contact_import_processing(
     request: Request,
     soubor: str = Query("", alias="soubor"),
 ):
-    """Progress page -- HTMX polls /import-kontaktu/zpracovani-stav."""
-    progress = _contact_import_progress.get(soubor)
-    if not progress:
+    """Progress page -- HTMX polls /ulohy/{id}/stav."""
+    job = jobs.find("contact_import", soubor)
+    if not job:
         return RedirectResponse("/vlastnici/import#kontakty", status_code=302)
-    if progress.get("done"):
+    if job["done"]:
         return RedirectResponse(f"/vlastnici/import-kontaktu/nahled-vysledek?soubor={quote(soubor)}", status_code=302)
 
     return templates.TemplateResponse(request, "owners/contact_import_processing.html", {
         "active_nav": "owners",
         "file_key": soubor,
-        **_contact_progress_ctx(progress),
-    })
-
-
-@router.get("/import-kontaktu/zpracovani-stav")
-async def contact_import_status(
-    request: Request,
-    soubor: str = Query("", alias="soubor"),
-):
-    """HTMX polling endpoint -- returns progress partial or HX-Redirect when done."""
-    progress = _contact_import_progress.get(soubor)
-    if not progress:
-        response = HTMLResponse("")
-        response.headers["HX-Redirect"] = "/vlastnici/import#kontakty"
-        return response
-
-    if progress.get("done"):
-        response = HTMLResponse("")
-        response.headers["HX-Redirect"] = f"/vlastnici/import-kontaktu/nahled-vysledek?soubor={quote(soubor)}"
-        return response
-
-    return templates.TemplateResponse(request, "partials/contact_import_progress.html", {
-        **_contact_progress_ctx(progress),
+        **jobs.progress_context(job),
     })
 
 
@@ -250,8 +201,8 @@ async def contact_import_preview_page(
     soubor: str = Query("", alias="soubor"),
 ):
     """Show preview from cached result after background processing."""
-    data = _contact_import_progress.pop(soubor, None)
-    if not data or not data.get("result"):
+    data = jobs.find("contact_import", soubor)
+    if not data or not data["done"] or not data.get("result"):
         # Check for error
         if data and data.get("error"):
             return RedirectResponse(f"/vlastnici/import?chyba_kontakty=zpracovani#kontakty", status_code=302)
@@ -283,25 +234,7 @@ async def contact_import_rerun(
     file_key = Path(soubor).name
     saved_mapping = _load_contact_mapping(db)
 
-    _contact_import_progress[file_key] = {
-        "done": False,
-        "error": None,
-        "result": None,
-        "file_path": soubor,
-        "filename": Path(soubor).name,
-        "mapping": saved_mapping,
-        "started_at": _time.monotonic(),
-        "total": 0,
-        "current": 0,
-        "phase": "Připravuji...",
-    }
-
-    thread = threading.Thread(
-        target=_run_contact_preview,
-        args=(file_key, soubor),
-        daemon=True,
-    )
-    thread.start()
+    _start_contact_preview(file_key, soubor, Path(soubor).name, saved_mapping)
 
     return RedirectResponse(f"/vlastnici/import-kontaktu/zpracovani?soubor={quote(file_key)}", status_code=302)
 
@@ -371,6 +304,7 @@ async def contact_import_delete(
     try:
         p = Path(log.file_path)
         if p.exists():
+            discard_parsed_upload(str(p))
             p.unlink()
     except Exception:
         logger.debug("Failed to clean up file: %s", log.file_path)
@@ -18,6 +18,7 @@ from app.services.import_mapping import (
     build_mapping_context, read_excel_headers, read_excel_sheet_names,
     validate_owner_mapping,
 )
+from app.services.parsed_upload import discard_parsed_upload
 from app.utils import UPLOAD_LIMITS, build_import_wizard, is_safe_path, validate_upload
 
 from ._helpers import (
@@ -259,6 +260,7 @@ async def import_delete(
     try:
         p = Path(log.file_path)
         if p.exists():
+            discard_parsed_upload(str(p))
             p.unlink()
     except Exception:
         logger.debug("Failed to clean up file: %s", log.file_path)
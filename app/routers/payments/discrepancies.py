@@ -2,20 +2,19 @@
 
 import asyncio
 import logging
-import threading
-import time
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 from fastapi import APIRouter, Depends, Form, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 
 from app.database import get_db, SessionLocal
 from app.models import BankStatement, Owner, Payment, SmtpProfile, SvjInfo
-from app.utils import build_list_url, compute_eta, flash_from_params, get_invalid_emails, utcnow
-from ._helpers import templates, compute_nav_stats, MONTH_NAMES_LONG, _discrepancy_progress, _discrepancy_lock
+from app.services import jobs, reference_data, statement_view
+from app.utils import build_list_url, flash_from_params, get_invalid_emails, utcnow
+from ._helpers import templates, compute_nav_stats, MONTH_NAMES_LONG
 
 router = APIRouter()
 
@@ -49,11 +48,25 @@ def _ensure_statement_send_settings(db, statement):
         db.commit()
 
 
+def _render_discrepancy_emails(template, discrepancies: list, svj_name: str,
+                               month_name: str, year: int) -> list[tuple[str, str]]:
+    """Render (subject, body) per discrepancy — template compiled once, contexts in batch."""
+    from app.services.payment_discrepancy import build_email_context
+    from app.utils import render_email_batch
+
+    if not template:
+        fallback = f"Upozornění na nesrovnalost v platbě za {month_name} {year}"
+        return [(fallback, "") for _ in discrepancies]
+    contexts = [build_email_context(d, svj_name, month_name, year) for d in discrepancies]
+    subjects = render_email_batch(template.subject_template, contexts)
+    bodies = render_email_batch(template.body_template, contexts)
+    return list(zip(subjects, bodies))
+
+
 def _discrepancy_base_ctx(request, db, statement, discrepancies, back_url, sort, order):
     """Společný kontext pro nesrovnalosti preview stránku."""
-    from app.services.payment_discrepancy import DISCREPANCY_LABELS, build_email_context
-    from app.models import EmailTemplate, EmailLog
-    from app.utils import render_email_template
+    from app.services.payment_discrepancy import DISCREPANCY_LABELS
+    from app.models import EmailLog
 
     # Inicializace send settings z SvjInfo defaults pokud ještě nebyly nastaveny
     _ensure_statement_send_settings(db, statement)
@@ -74,23 +87,19 @@ def _discrepancy_base_ctx(request, db, statement, discrepancies, back_url, sort,
     sendable = [d for d in discrepancies if d.recipient_email]
 
     # Načíst šablonu a SVJ info pro náhledy
-    template = db.query(EmailTemplate).filter_by(name="Upozornění na nesrovnalost v platbě").first()
-    svj = db.query(SvjInfo).first()
+    template = reference_data.email_template(db, "Upozornění na nesrovnalost v platbě")
+    svj = reference_data.svj_settings(db)
     svj_name = svj.name if svj else "SVJ"
     pf = statement.period_from
     month_name = MONTH_NAMES_LONG.get(pf.month, "") if pf else ""
     year = pf.year if pf else 0
 
     # Generovat náhledy pro sendable — dict payment_id → {subject, body}
-    email_previews = {}
-    for d in sendable:
-        ctx_email = build_email_context(d, svj_name, month_name, year)
-        subject = render_email_template(template.subject_template, ctx_email) if template else f"Upozornění na nesrovnalost v platbě za {month_name} {year}"
-        body = render_email_template(template.body_template, ctx_email) if template else ""
-        email_previews[d.payment_id] = {
-            "subject": subject,
-            "body": body,
-        }
+    rendered = _render_discrepancy_emails(template, sendable, svj_name, month_name, year)
+    email_previews = {
+        d.payment_id: {"subject": subject, "body": body}
+        for d, (subject, body) in zip(sendable, rendered)
+    }
 
     # SMTP profily pro dropdown výběr
     smtp_profiles = db.query(SmtpProfile).order_by(SmtpProfile.is_default.desc(), SmtpProfile.id).all()
@@ -117,26 +126,8 @@ def _discrepancy_base_ctx(request, db, statement, discrepancies, back_url, sort,
     }
 
 
-def _discrepancy_eta(progress: dict) -> dict:
-    """Vypočítat ETA a formátovat progress pro šablonu."""
-    eta = compute_eta(progress["sent"] + progress["failed"], progress["total"], progress["started_at"])
-    return {
-        "total": progress["total"],
-        "sent": progress["sent"],
-        "failed": progress["failed"],
-        "current_recipient": progress.get("current_recipient", ""),
-        "error": progress.get("error"),
-        "paused": progress.get("paused", False),
-        "waiting_batch_confirm": progress.get("waiting_batch_confirm", False),
-        "batch_number": progress.get("batch_number", 0),
-        "total_batches": progress.get("total_batches", 0),
-        "done": progress.get("done", False),
-        "elapsed": eta["elapsed"],
-        "eta": eta["eta"],
-    }
-
-
 def _send_discrepancy_emails_batch(
+    job: jobs.Job,
     statement_id: int,
     recipient_data: list[dict],
     batch_size: int = 10,
@@ -144,17 +135,14 @@ def _send_discrepancy_emails_batch(
     confirm_each_batch: bool = False,
     smtp_profile_id: Optional[int] = None,
 ):
-    """Background thread: odeslat upozornění na nesrovnalosti v dávkách."""
+    """Úloha na pozadí: odeslat upozornění na nesrovnalosti v dávkách."""
     from app.services.email_service import create_smtp_connection, send_email
-    from app.models import EmailTemplate, SvjInfo
-    from app.utils import render_email_template
-    from app.services.payment_discrepancy import build_email_context
 
     db = SessionLocal()
     try:
         # Načíst šablonu a SVJ info
-        template = db.query(EmailTemplate).filter_by(name="Upozornění na nesrovnalost v platbě").first()
-        svj = db.query(SvjInfo).first()
+        template = reference_data.email_template(db, "Upozornění na nesrovnalost v platbě")
+        svj = reference_data.svj_settings(db)
         svj_name = svj.name if svj else "SVJ"
         statement = db.query(BankStatement).get(statement_id)
         pf = statement.period_from if statement else None
@@ -166,19 +154,13 @@ def _send_discrepancy_emails_batch(
         for i in range(0, len(recipient_data), batch_size):
             batches.append(recipient_data[i:i + batch_size])
 
-        with _discrepancy_lock:
-            _discrepancy_progress[statement_id]["total_batches"] = len(batches)
+        job.update(total_batches=len(batches))
 
         # Počáteční prodleva 5s — uživatel vidí progress a může pozastavit/zrušit
-        for _ in range(10):
-            with _discrepancy_lock:
-                if _discrepancy_progress[statement_id].get("done"):
-                    return
-            time.sleep(0.5)
+        job.sleep(5)
 
         for batch_idx, batch in enumerate(batches):
-            with _discrepancy_lock:
-                _discrepancy_progress[statement_id]["batch_number"] = batch_idx + 1
+            job.update(batch_number=batch_idx + 1)
 
             # Shared SMTP connection per batch
             smtp_conn = None
@@ -187,68 +169,49 @@ def _send_discrepancy_emails_batch(
             except Exception:
                 logger.warning("Failed to create shared SMTP connection, falling back to per-email")
 
-            for rcpt in batch:
-                # Check paused / done
-                while True:
-                    with _discrepancy_lock:
-                        paused = _discrepancy_progress[statement_id].get("paused")
-                        done = _discrepancy_progress[statement_id].get("done")
-                    if not paused:
-                        break
-                    if done:
-                        if smtp_conn:
-                            try:
-                                smtp_conn.quit()
-                            except Exception:
-                                pass
-                        return
-                    time.sleep(0.5)
+            try:
+                # Render the whole batch up front (compiled template shared by the run)
+                rendered = _render_discrepancy_emails(
+                    template, [rcpt["disc"] for rcpt in batch], svj_name, month_name, year,
+                )
+
+                for rcpt, (subject, body) in zip(batch, rendered):
+                    # Pauza / zrušení
+                    job.checkpoint()
+                    job.update(current_recipient=rcpt["name"])
+
+                    body_html = body.replace("\n", "<br>")
 
-                with _discrepancy_lock:
-                    if _discrepancy_progress[statement_id].get("done"):
-                        if smtp_conn:
-                            try:
-                                smtp_conn.quit()
-                            except Exception:
-                                pass
-                        return
-                    _discrepancy_progress[statement_id]["current_recipient"] = rcpt["name"]
-
-                # Render personalized email
-                ctx_email = build_email_context(rcpt["disc"], svj_name, month_name, year)
-                subject = render_email_template(template.subject_template, ctx_email) if template else f"Upozornění na nesrovnalost v platbě za {month_name} {year}"
-                body = render_email_template(template.body_template, ctx_email) if template else ""
-                body_html = body.replace("\n", "<br>")
-
-                try:
-                    result = send_email(
-                        to_email=rcpt["email"],
-                        to_name=rcpt["name"],
-                        subject=subject,
-                        body_html=body_html,
-                        module="payment_notice",
-                        reference_id=statement_id,
-                        db=db,
-                        smtp_server=smtp_conn,
-                        smtp_profile_id=smtp_profile_id,
-                    )
-                except Exception as exc:
-                    logger.exception("Chyba při odesílání pro %s (%s)", rcpt["name"], rcpt["email"])
-                    result = {"success": False, "error": str(exc)}
-                    smtp_conn = None
                     try:
-                        smtp_conn = create_smtp_connection(profile_id=smtp_profile_id)
-                    except Exception:
-                        logger.warning("Nepodařilo se obnovit SMTP spojení")
+                        result = send_email(
+                            to_email=rcpt["email"],
+                            to_name=rcpt["name"],
+                            subject=subject,
+                            body_html=body_html,
+                            module="payment_notice",
+                            reference_id=statement_id,
+                            db=db,
+                            smtp_server=smtp_conn,
+                            smtp_profile_id=smtp_profile_id,
+                        )
+                    except Exception as exc:
+                        logger.exception("Chyba při odesílání pro %s (%s)", rcpt["name"], rcpt["email"])
+                        result = {"success": False, "error": str(exc)}
+                        smtp_conn = None
+                        try:
+                            smtp_conn = create_smtp_connection(profile_id=smtp_profile_id)
+                        except Exception:
+                            logger.warning("Nepodařilo se obnovit SMTP spojení")
 
-                with _discrepancy_lock:
                     if result.get("success"):
-                        _discrepancy_progress[statement_id]["sent"] += 1
+                        job.advance(sent=job.get("sent", 0) + 1)
                         # Zaznamenat odeslání na platbu
                         try:
                             payment = db.query(Payment).get(rcpt["payment_id"])
                             if payment:
                                 payment.notified_at = utcnow()
+                                if statement:
+                                    statement_view.bump_revision(statement)
                                 db.commit()
                         except Exception:
                             logger.warning("Failed to set notified_at for payment %s", rcpt["payment_id"])
@@ -257,49 +220,36 @@ def _send_discrepancy_emails_batch(
                             except Exception:
                                 pass
                     else:
-                        _discrepancy_progress[statement_id]["failed"] += 1
-                        _discrepancy_progress[statement_id].setdefault("failed_ids", []).append(rcpt["payment_id"])
-
-            # Close shared SMTP connection after batch
-            if smtp_conn:
-                try:
-                    smtp_conn.quit()
-                except Exception:
-                    pass
-                smtp_conn = None
+                        job.advance(
+                            failed=job.get("failed", 0) + 1,
+                            failed_ids=job.get("failed_ids", []) + [rcpt["payment_id"]],
+                        )
+            finally:
+                # Close shared SMTP connection after batch (i po zrušení)
+                if smtp_conn:
+                    try:
+                        smtp_conn.quit()
+                    except Exception:
+                        pass
 
             # After batch: wait for interval or confirm
             if batch_idx < len(batches) - 1:
+                job.update(current_recipient="")
                 if confirm_each_batch:
                     # Pozastavit a čekat na potvrzení
-                    with _discrepancy_lock:
-                        _discrepancy_progress[statement_id]["waiting_batch_confirm"] = True
-                    while True:
-                        with _discrepancy_lock:
-                            done = _discrepancy_progress[statement_id].get("done")
-                            waiting = _discrepancy_progress[statement_id].get("waiting_batch_confirm")
-                        if done:
-                            return
-                        if not waiting:
-                            break
-                        time.sleep(0.5)
+                    job.wait_for_confirm()
                 else:
-                    for _ in range(batch_interval * 2):
-                        with _discrepancy_lock:
-                            done = _discrepancy_progress[statement_id].get("done")
-                        if done:
-                            return
-                        time.sleep(0.5)
-
-    except Exception as e:
-        logger.exception("Error in batch discrepancy email sending for statement %s", statement_id)
-        with _discrepancy_lock:
-            _discrepancy_progress[statement_id]["error"] = str(e)
+                    job.sleep(batch_interval)
+
+        return {"sent": job.get("sent", 0), "failed": job.get("failed", 0)}
     finally:
-        with _discrepancy_lock:
-            _discrepancy_progress[statement_id]["done"] = True
-            _discrepancy_progress[statement_id]["current_recipient"] = ""
-            _discrepancy_progress[statement_id]["finished_at"] = time.monotonic()
+        # Po dokončení i zrušení zpět na nesrovnalosti se souhrnem
+        sent, failed = job.get("sent", 0), job.get("failed", 0)
+        flash_code = "sent_warn" if failed > 0 else "sent"
+        job.update(
+            current_recipient="",
+            redirect_url=f"/platby/vypisy/{statement_id}/nesrovnalosti?flash={flash_code}&sent={sent}&failed={failed}",
+        )
         db.close()
 
 
@@ -394,10 +344,8 @@ async def discrepancy_test_email(
     db: Session = Depends(get_db),
 ):
     """Odeslat testovací email s náhledem první nesrovnalosti."""
-    from app.services.payment_discrepancy import detect_discrepancies, build_email_context
+    from app.services.payment_discrepancy import detect_discrepancies
     from app.services.email_service import send_email
-    from app.models import EmailTemplate, SvjInfo
-    from app.utils import render_email_template
 
     statement = db.query(BankStatement).get(statement_id)
     if not statement:
@@ -412,16 +360,14 @@ async def discrepancy_test_email(
 
     # Vzít první nesrovnalost pro test
     d = sendable[0]
-    template = db.query(EmailTemplate).filter_by(name="Upozornění na nesrovnalost v platbě").first()
-    svj = db.query(SvjInfo).first()
+    template = reference_data.email_template(db, "Upozornění na nesrovnalost v platbě")
+    svj = reference_data.svj_settings(db)
     svj_name = svj.name if svj else "SVJ"
     pf = statement.period_from
     month_name = MONTH_NAMES_LONG.get(pf.month, "") if pf else ""
     year = pf.year if pf else 0
 
-    ctx_email = build_email_context(d, svj_name, month_name, year)
-    subject = render_email_template(template.subject_template, ctx_email) if template else f"Upozornění na nesrovnalost v platbě za {month_name} {year}"
-    body = render_email_template(template.body_template, ctx_email) if template else ""
+    subject, body = _render_discrepancy_emails(template, [d], svj_name, month_name, year)[0]
     body_html = body.replace("\n", "<br>")
 
     form_data = await request.form()
@@ -473,10 +419,8 @@ async def discrepancy_send(
         return RedirectResponse(f"/platby/vypisy/{statement_id}/nesrovnalosti", status_code=302)
 
     # Check no concurrent sending
-    with _discrepancy_lock:
-        progress = _discrepancy_progress.get(statement_id)
-        if progress and not progress.get("done"):
-            return RedirectResponse(f"/platby/vypisy/{statement_id}/nesrovnalosti/prubeh", status_code=302)
+    if jobs.active("payment_notices", statement_id):
+        return RedirectResponse(f"/platby/vypisy/{statement_id}/nesrovnalosti/prubeh", status_code=302)
 
     from app.services.payment_discrepancy import detect_discrepancies
 
@@ -511,30 +455,25 @@ async def discrepancy_send(
     batch_interval = statement.send_batch_interval or 5
     confirm_batch = statement.send_confirm_each_batch or False
 
-    # Initialize progress
-    with _discrepancy_lock:
-        _discrepancy_progress[statement_id] = {
-            "total": len(recipients),
+    jobs.submit(
+        "payment_notices", _send_discrepancy_emails_batch,
+        statement_id, recipients, batch_size, batch_interval, confirm_batch, statement.smtp_profile_id,
+        key=statement_id, label=f"Upozornění na nesrovnalosti — {statement.filename}", pool="email",
+        total=len(recipients),
+        fields={
             "sent": 0,
             "failed": 0,
+            "failed_ids": [],
             "current_recipient": "",
-            "done": False,
-            "error": None,
-            "started_at": time.monotonic(),
-            "paused": False,
             "waiting_batch_confirm": False,
             "batch_number": 0,
             "total_batches": 0,
-            "failed_ids": [],
-        }
-
-    # Start background thread
-    thread = threading.Thread(
-        target=_send_discrepancy_emails_batch,
-        args=(statement_id, recipients, batch_size, batch_interval, confirm_batch, statement.smtp_profile_id),
-        daemon=True,
+            "template": "partials/_send_progress_inner.html",
+            "progress_label": "Odesílání upozornění",
+            # Po dokončení 3 s zobrazit výsledek
+            "redirect_delay": 3,
+        },
     )
-    thread.start()
 
     return RedirectResponse(f"/platby/vypisy/{statement_id}/nesrovnalosti/prubeh", status_code=302)
 
@@ -550,11 +489,10 @@ async def discrepancy_progress_page(
     if not statement:
         return RedirectResponse("/platby/vypisy", status_code=302)
 
-    with _discrepancy_lock:
-        progress = _discrepancy_progress.get(statement_id)
-        if not progress:
-            return RedirectResponse(f"/platby/vypisy/{statement_id}/nesrovnalosti", status_code=302)
-        progress = dict(progress)
+    job = jobs.find("payment_notices", statement_id)
+    if not job or job["done"] and not job["error"]:
+        redirect_url = job.get("redirect_url") if job else None
+        return RedirectResponse(redirect_url or f"/platby/vypisy/{statement_id}/nesrovnalosti", status_code=302)
 
     back_url = request.query_params.get("back", f"/platby/vypisy/{statement_id}")
 
@@ -566,71 +504,32 @@ async def discrepancy_progress_page(
         "statement_id": statement_id,
         "back_url": back_url,
         "month_names": MONTH_NAMES_LONG,
-        **_discrepancy_eta(progress),
+        **jobs.progress_context(job),
         **(compute_nav_stats(db)),
     }
     return templates.TemplateResponse(request, "payments/nesrovnalosti_progress.html", ctx)
 
 
-@router.get("/vypisy/{statement_id}/nesrovnalosti/prubeh-stav")
-async def discrepancy_progress_status(
-    request: Request,
-    statement_id: int,
-):
-    """HTMX polling endpoint — vrací progress partial nebo redirect po dokončení."""
-    with _discrepancy_lock:
-        progress = _discrepancy_progress.get(statement_id)
-        if not progress:
-            response = HTMLResponse("")
-            response.headers["HX-Redirect"] = f"/platby/vypisy/{statement_id}/nesrovnalosti"
-            return response
-        # Po dokončení počkat 3 sekundy, aby uživatel viděl výsledek
-        if progress.get("done"):
-            finished_at = progress.get("finished_at", 0)
-            if time.monotonic() - finished_at >= 3:
-                sent = progress["sent"]
-                failed = progress["failed"]
-                _discrepancy_progress.pop(statement_id, None)
-                response = HTMLResponse("")
-                flash_code = "sent_warn" if failed > 0 else "sent"
-                response.headers["HX-Redirect"] = f"/platby/vypisy/{statement_id}/nesrovnalosti?flash={flash_code}&sent={sent}&failed={failed}"
-                return response
-        progress = dict(progress)
-
-    return templates.TemplateResponse(request, "partials/_send_progress_inner.html", {
-        "statement_id": statement_id,
-        "progress_label": "Odesílání upozornění",
-        **_discrepancy_eta(progress),
-    })
+def _control(statement_id: int, action) -> RedirectResponse:
+    job = jobs.active("payment_notices", statement_id)
+    if job:
+        action(job["id"])
+    return RedirectResponse(f"/platby/vypisy/{statement_id}/nesrovnalosti/prubeh", status_code=302)
 
 
 @router.post("/vypisy/{statement_id}/nesrovnalosti/pozastavit")
 async def discrepancy_pause(statement_id: int):
     """Pozastavit odesílání."""
-    with _discrepancy_lock:
-        progress = _discrepancy_progress.get(statement_id)
-        if progress and not progress.get("done"):
-            progress["paused"] = True
-    return RedirectResponse(f"/platby/vypisy/{statement_id}/nesrovnalosti/prubeh", status_code=302)
+    return _control(statement_id, jobs.pause)
 
 
 @router.post("/vypisy/{statement_id}/nesrovnalosti/pokracovat")
 async def discrepancy_resume(statement_id: int):
     """Pokračovat v odesílání."""
-    with _discrepancy_lock:
-        progress = _discrepancy_progress.get(statement_id)
-        if progress and not progress.get("done"):
-            progress["paused"] = False
-            progress["waiting_batch_confirm"] = False
-    return RedirectResponse(f"/platby/vypisy/{statement_id}/nesrovnalosti/prubeh", status_code=302)
+    return _control(statement_id, jobs.resume)
 
 
 @router.post("/vypisy/{statement_id}/nesrovnalosti/zrusit")
 async def discrepancy_cancel(statement_id: int):
-    """Zrušit odesílání — zastavit thread."""
-    with _discrepancy_lock:
-        progress = _discrepancy_progress.get(statement_id)
-        if progress and not progress.get("done"):
-            progress["done"] = True
-            progress["finished_at"] = time.monotonic()
-    return RedirectResponse(f"/platby/vypisy/{statement_id}/nesrovnalosti/prubeh", status_code=302)
+    """Zrušit odesílání — úloha skončí na nejbližším kroku."""
+    return _control(statement_id, jobs.cancel)
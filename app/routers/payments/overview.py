@@ -1,15 +1,15 @@
 """Přehled plateb — matice, dlužníci, detail jednotky."""
 
-import io
 from datetime import datetime
 from io import BytesIO
 
 from fastapi import APIRouter, Depends, Form, Query, Request
-from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from fastapi.responses import RedirectResponse, Response
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models import PrescriptionYear, Unit, Space
+from app.services.page_cache import OWNERSHIP_TABLES, PAYMENT_TABLES, SPACE_TABLES, cached_page
 from app.services.payment_overview import (
     compute_debtor_list,
     compute_payment_matrix,
@@ -18,6 +18,7 @@ from app.services.payment_overview import (
     compute_space_payment_matrix,
     compute_space_payment_detail,
 )
+from app.services.streaming_export import Styled, export_response
 from app.utils import build_list_url, excel_auto_width, is_htmx_partial, strip_diacritics, utcnow
 
 from ._helpers import templates, compute_nav_stats, MONTH_NAMES_SHORT
@@ -80,6 +81,7 @@ def _sorted_owners_names(owners) -> str:
 
 
 @router.get("/prehled")
+@cached_page(*OWNERSHIP_TABLES, *PAYMENT_TABLES, *SPACE_TABLES)
 async def platby_prehled(
     request: Request,
     rok: int = Query(0),
@@ -211,9 +213,7 @@ async def matice_export(
     db: Session = Depends(get_db),
 ):
     """Export matice plateb do Excelu nebo CSV — jednotky i prostory."""
-    import csv as csv_mod
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill
+    from openpyxl.styles import PatternFill
 
     if fmt not in ("xlsx", "csv"):
         return RedirectResponse("/platby/prehled", status_code=302)
@@ -280,68 +280,22 @@ async def matice_export(
             owner_name = _sorted_owners_names(r["owners"]) or (r["prescription"].owner_name or "")
             return (r["unit"].unit_number, r["prescription"].section or "", owner_name)
 
-    if fmt == "csv":
-        buf_csv = io.StringIO()
-        buf_csv.write("\ufeff")
-        writer = csv_mod.writer(buf_csv, delimiter=";")
-        writer.writerow(headers)
+    red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+
+    def _rows():
         for r in rows:
             cislo, popis, jmeno = _row_values(r)
             row_out = [cislo, popis, jmeno, r["monthly"], r.get("opening", 0)]
             for m in months_with_data:
-                row_out.append(r["months"].get(m, {}).get("paid", 0))
-            row_out += [r["total_paid"], r["saldo"]]
-            writer.writerow(row_out)
-        filename = f"{base_name}_{rok}{suffix}_{date_str}.csv"
-        return Response(
-            content=buf_csv.getvalue().encode("utf-8"),
-            media_type="text/csv; charset=utf-8",
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-        )
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"Matice {rok}"
-
-    bold = Font(bold=True)
-    red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-
-    for col, h in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=h)
-        cell.font = bold
-
-    for i, r in enumerate(rows, 2):
-        cislo, popis, jmeno = _row_values(r)
-        ws.cell(row=i, column=1, value=cislo)
-        ws.cell(row=i, column=2, value=popis)
-        ws.cell(row=i, column=3, value=jmeno)
-        ws.cell(row=i, column=4, value=r["monthly"])
-        ws.cell(row=i, column=5, value=r.get("opening", 0))
-        col = 6
-        for m in months_with_data:
-            paid = r["months"].get(m, {}).get("paid", 0)
-            cell = ws.cell(row=i, column=col, value=paid)
-            if paid < r["monthly"] and r["monthly"] > 0:
-                cell.fill = red_fill
-            col += 1
-        ws.cell(row=i, column=col, value=r["total_paid"])
-        saldo_cell = ws.cell(row=i, column=col + 1, value=r["saldo"])
-        if r["saldo"] < 0:
-            saldo_cell.fill = red_fill
-
-    excel_auto_width(ws)
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-
-    filename = f"{base_name}_{rok}{suffix}_{date_str}.xlsx"
-
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+                paid = r["months"].get(m, {}).get("paid", 0)
+                underpaid = paid < r["monthly"] and r["monthly"] > 0
+                row_out.append(Styled(paid, fill=red_fill) if underpaid else paid)
+            row_out.append(r["total_paid"])
+            row_out.append(Styled(r["saldo"], fill=red_fill) if r["saldo"] < 0 else r["saldo"])
+            yield row_out
+
+    filename = f"{base_name}_{rok}{suffix}_{date_str}"
+    return export_response(fmt, filename, headers, _rows(), sheet_title=f"Matice {rok}")
 
 
 # ── Dlužníci ─────────────────────────────────────────────────────────
@@ -13,7 +13,7 @@ from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
 from app.models import (
-    ActivityAction, PrescriptionYear, Prescription, PrescriptionItem, Unit,
+    ActivityAction, PrescriptionYear, Prescription, Unit,
     VariableSymbolMapping, SymbolSource, log_activity,
 )
 from app.config import settings
@@ -81,7 +81,7 @@ async def predpisy_import_upload(
     db: Session = Depends(get_db),
 ):
     """Zpracování importu předpisů z DOCX."""
-    from app.services.prescription_import import parse_prescription_docx
+    from app.services.prescription_import import iter_prescriptions, save_prescriptions
 
     form = await request.form()
     force = form.get("force_overwrite")
@@ -157,9 +157,12 @@ async def predpisy_import_upload(
         db.delete(existing)
         db.flush()
 
-    # Parsování DOCX
+    # První průchod DOCX — jen VS a čísla prostorů pro kontrolu konfliktů.
+    # Dokument se čte proudově; pro uložení se projde znovu (save_prescriptions).
     try:
-        result = parse_prescription_docx(file_content, year)
+        docx_symbols = [
+            (p["variable_symbol"], p["space_number"]) for p in iter_prescriptions(file_content)
+        ]
     except Exception as e:
         logger.error("DOCX parse error: %s", e)
         return templates.TemplateResponse(request, "payments/predpisy_import.html", {
@@ -171,17 +174,18 @@ async def predpisy_import_upload(
         })
 
     # Detekce VS konfliktů — porovnat DOCX vs existující mapování
-    units_by_number = {u.unit_number: u for u in db.query(Unit).all()}
+    units = db.query(Unit).all()
+    units_by_number = {u.unit_number: u for u in units}
+    units_by_id = {u.id: u for u in units}
+    mappings_by_vs = {m.variable_symbol: m for m in db.query(VariableSymbolMapping).all()}
     vs_conflicts = []
-    for p_data in result["prescriptions"]:
-        vs = p_data.get("variable_symbol")
-        space_num = p_data.get("space_number")
+    for vs, space_num in docx_symbols:
         if vs and space_num:
             docx_unit = units_by_number.get(space_num)
             if docx_unit:
-                existing_vs = db.query(VariableSymbolMapping).filter_by(variable_symbol=vs).first()
+                existing_vs = mappings_by_vs.get(vs)
                 if existing_vs and existing_vs.unit_id != docx_unit.id:
-                    existing_unit = db.query(Unit).get(existing_vs.unit_id)
+                    existing_unit = units_by_id.get(existing_vs.unit_id)
                     vs_conflicts.append({
                         "vs": vs,
                         "docx_unit": space_num,
@@ -214,7 +218,7 @@ async def predpisy_import_upload(
     # Přepsat konfliktní VS mapování pokud uživatel potvrdil
     if vs_conflicts and form.get("force_vs_conflicts"):
         for c in vs_conflicts:
-            mapping = db.query(VariableSymbolMapping).get(c["mapping_id"])
+            mapping = mappings_by_vs.get(c["vs"])
             if mapping:
                 docx_unit = units_by_number.get(c["docx_unit"])
                 if docx_unit:
@@ -222,69 +226,22 @@ async def predpisy_import_upload(
                     mapping.source = SymbolSource.AUTO
                     mapping.description = f"Přepsáno z předpisu {year}"
 
-    # Uložení do DB
+    # Uložení do DB — druhý průchod DOCX, předpisy po dávkách
     prescription_year = PrescriptionYear(
         year=year,
-        valid_from=result.get("valid_from"),
         description=f"Import z {original_filename}",
         source_filename=original_filename,
-        total_units=len(result["prescriptions"]),
-        total_monthly=sum(p["monthly_total"] for p in result["prescriptions"]),
     )
     db.add(prescription_year)
     db.flush()
 
-    vs_created = 0
-    matched_units = 0
-
-    for p_data in result["prescriptions"]:
-        # Najít jednotku podle čísla prostoru
-        unit = units_by_number.get(p_data.get("space_number"))
-
-        prescription = Prescription(
-            prescription_year_id=prescription_year.id,
-            unit_id=unit.id if unit else None,
-            variable_symbol=p_data.get("variable_symbol"),
-            space_number=p_data.get("space_number"),
-            section=p_data.get("section"),
-            space_type=p_data.get("space_type"),
-            owner_name=p_data.get("owner_name"),
-            monthly_total=p_data["monthly_total"],
-        )
-        db.add(prescription)
-        db.flush()
-
-        if unit:
-            matched_units += 1
-
-        # Položky předpisu
-        for idx, item in enumerate(p_data.get("items", [])):
-            db.add(PrescriptionItem(
-                prescription_id=prescription.id,
-                name=item["name"],
-                amount=item["amount"],
-                category=item["category"],
-                order=idx,
-            ))
-
-        # Automatické vytvoření VS mapování
-        vs = p_data.get("variable_symbol")
-        if vs and unit:
-            existing_vs = db.query(VariableSymbolMapping).filter_by(variable_symbol=vs).first()
-            if not existing_vs:
-                db.add(VariableSymbolMapping(
-                    variable_symbol=vs,
-                    unit_id=unit.id,
-                    source=SymbolSource.AUTO,
-                    description=f"Auto z předpisu {year}",
-                ))
-                vs_created += 1
+    stats = save_prescriptions(db, prescription_year, iter_prescriptions(file_content), units_by_number)
 
     log_activity(
         db, ActivityAction.IMPORTED, "prescription_year", "platby",
         entity_id=prescription_year.id,
         entity_name=f"Předpisy {year}",
-        description=f"{len(result['prescriptions'])} jednotek",
+        description=f"{stats['total']} jednotek",
     )
     db.commit()
 
@@ -296,8 +253,8 @@ async def predpisy_import_upload(
             pass
 
     return RedirectResponse(
-        f"/platby/predpisy/{prescription_year.id}?flash=import_ok&matched={matched_units}"
-        f"&total={len(result['prescriptions'])}&vs_created={vs_created}",
+        f"/platby/predpisy/{prescription_year.id}?flash=import_ok&matched={stats['matched']}"
+        f"&total={stats['total']}&vs_created={stats['vs_created']}",
         status_code=302,
     )
 
@@ -12,16 +12,18 @@ logger = logging.getLogger(__name__)
 
 from fastapi import APIRouter, Depends, Form, Query, Request, UploadFile, File
 from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, Response
-from sqlalchemy import asc as sa_asc, desc as sa_desc, func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func
+from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.config import settings
 from app.models import (
-    ActivityAction, BankStatement, Owner, OwnerUnit, Payment, PaymentAllocation,
-    PaymentDirection, PaymentMatchStatus, Space, SpaceTenant, Tenant, Unit,
-    log_activity,
+    ActivityAction, BankStatement, Payment, PaymentAllocation,
+    PaymentDirection, PaymentMatchStatus, Space, Unit, log_activity,
 )
+from app.services import statement_view
+from app.services.statement_view import Directory, StatementView
+from app.services.streaming_export import export_response
 from app.utils import (
     build_list_url, excel_auto_width, flash_from_params, is_htmx_partial,
     is_safe_path, strip_diacritics, utcnow, validate_upload, UPLOAD_LIMITS,
@@ -31,35 +33,6 @@ from ._helpers import templates, compute_nav_stats, MONTH_NAMES_LONG
 router = APIRouter()
 
 
-def _build_suggest_map(
-    payments: list,
-    name_index: list[tuple[set, int]],
-) -> dict[int, int]:
-    """Vybudovat mapu payment_id → entity_id z name_index (words_set, entity_id).
-
-    Pro každou UNMATCHED příjmovou platbu najde nejlepší shodu dle společných slov
-    v counter_account_name + note + message.
-    """
-    suggest_map: dict[int, int] = {}
-    for p in payments:
-        if p.match_status != PaymentMatchStatus.UNMATCHED or p.direction != PaymentDirection.INCOME:
-            continue
-        text_parts = [p.counter_account_name or "", p.note or "", p.message or ""]
-        sender_words = {w for w in strip_diacritics(" ".join(text_parts)).split() if len(w) > 2}
-        if not sender_words:
-            continue
-        best_id = None
-        best_score = 0
-        for name_words, entity_id in name_index:
-            common = sender_words & name_words
-            if len(common) >= 1 and len(common) > best_score:
-                best_score = len(common)
-                best_id = entity_id
-        if best_id and best_score >= 1:
-            suggest_map[p.id] = best_id
-    return suggest_map
-
-
 # ── Seznam výpisů ──────────────────────────────────────────────────────
 
 
@@ -186,9 +159,6 @@ async def vypisy_export(
     db: Session = Depends(get_db),
 ):
     """Export filtrovaných bankovních výpisů."""
-    from openpyxl import Workbook
-    from openpyxl.styles import Font
-
     if fmt not in ("xlsx", "csv"):
         return RedirectResponse("/platby/vypisy", status_code=302)
 
@@ -232,40 +202,7 @@ async def vypisy_export(
     timestamp = datetime.now().strftime("%Y%m%d")
     filename = f"vypisy{suffix}_{timestamp}"
 
-    if fmt == "xlsx":
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Bankovní výpisy"
-        bold = Font(bold=True)
-
-        for col, h in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=h)
-            cell.font = bold
-
-        for row_idx, s in enumerate(statements, 2):
-            for col_idx, val in enumerate(_row(s), 1):
-                ws.cell(row=row_idx, column=col_idx, value=val)
-
-        excel_auto_width(ws)
-
-        buf = BytesIO()
-        wb.save(buf)
-        return Response(
-            content=buf.getvalue(),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f'attachment; filename="{filename}.xlsx"'},
-        )
-    else:
-        buf = io.StringIO()
-        writer = csv.writer(buf, delimiter=";")
-        writer.writerow(headers)
-        for s in statements:
-            writer.writerow(_row(s))
-        return Response(
-            content=buf.getvalue().encode("utf-8-sig"),
-            media_type="text/csv; charset=utf-8",
-            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'},
-        )
+    return export_response(fmt, filename, headers, (_row(s) for s in statements), sheet_title="Bankovní výpisy")
 
 
 # ── Import CSV ─────────────────────────────────────────────────────────
@@ -548,92 +485,24 @@ async def vypis_import_upload(
 # ── Detail výpisu ──────────────────────────────────────────────────────
 
 
-SORT_COLUMNS_PAYMENTS = {
-    "datum": Payment.date,
-    "castka": Payment.amount,
-    "vs": Payment.vs,
-    "protiucet": Payment.counter_account_name,
-    "stav": Payment.match_status,
-    "jednotka": None,  # Python-side sort
-    "prostor": None,  # Python-side sort
-}
-
-
 def _filter_payments(
     db: Session,
-    statement_id: int,
+    statement: BankStatement,
     q: str = "",
     stav: str = "",
     smer: str = "",
     typ: str = "",
     sort: str = "datum",
     order: str = "asc",
-) -> list:
-    """Sdílená filtrační logika pro detail výpisu (seznam, HTMX, export)."""
-    from app.models import PaymentAllocation as PA
-    query = (
-        db.query(Payment)
-        .filter_by(statement_id=statement_id)
-        .options(
-            joinedload(Payment.unit),
-            joinedload(Payment.space),
-            joinedload(Payment.owner),
-            joinedload(Payment.allocations).joinedload(PA.unit),
-            joinedload(Payment.allocations).joinedload(PA.space),
-        )
-    )
-
-    if stav:
-        query = query.filter(Payment.match_status == stav)
-
-    if smer == "prijem":
-        query = query.filter(Payment.direction == PaymentDirection.INCOME)
-    elif smer == "vydej":
-        query = query.filter(Payment.direction == PaymentDirection.EXPENSE)
-
-    if typ == "jednotky":
-        query = query.filter(Payment.unit_id.isnot(None))
-    elif typ == "prostory":
-        query = query.filter(Payment.space_id.isnot(None))
-
-    col = SORT_COLUMNS_PAYMENTS.get(sort, Payment.date)
-    if col is not None:
-        order_fn = sa_desc if order == "desc" else sa_asc
-        query = query.order_by(order_fn(col).nulls_last())
-
-    payments = query.all()
-
-    if sort in ("jednotka", "prostor"):
-        def _unit_key(p):
-            if p.unit:
-                return p.unit.unit_number or 0
-            for a in (p.allocations or []):
-                if a.unit:
-                    return a.unit.unit_number or 0
-            return 0
-
-        def _space_key(p):
-            if p.space:
-                return p.space.space_number or 0
-            for a in (p.allocations or []):
-                if a.space:
-                    return a.space.space_number or 0
-            return 0
-
-        key_fn = _unit_key if sort == "jednotka" else _space_key
-        payments.sort(key=key_fn, reverse=(order == "desc"))
+) -> tuple[list, StatementView, Directory]:
+    """Sdílená filtrační logika pro detail výpisu (seznam, HTMX, export).
 
-    if q:
-        q_ascii = strip_diacritics(q)
-        payments = [
-            p for p in payments
-            if q in (p.vs or "")
-            or q_ascii in strip_diacritics(p.counter_account_name or "")
-            or q_ascii in strip_diacritics(p.note or "")
-            or q_ascii in strip_diacritics(p.message or "")
-        ]
-
-    return payments
+    Filtr a řazení běží nad cachovaným view modelem výpisu (``statement_view``),
+    z DB se načtou jen zobrazené platby. Vrací (platby, view model, sdílená část).
+    """
+    view, directory, loaded = statement_view.get_view(db, statement)
+    rows = view.filter(q, stav, smer, typ, sort, order)
+    return statement_view.load_payments(db, statement.id, rows, loaded), view, directory
 
 
 @router.get("/vypisy/{statement_id}")
@@ -653,54 +522,13 @@ async def vypis_detail(
     if not statement:
         return RedirectResponse("/platby/vypisy", status_code=302)
 
-    payments = _filter_payments(db, statement_id, q, stav, smer, typ, sort, order)
+    payments, view, directory = _filter_payments(db, statement, q, stav, smer, typ, sort, order)
 
     # Statistiky
     total_income = sum(p.amount for p in payments if p.direction == PaymentDirection.INCOME)
     total_expense = sum(p.amount for p in payments if p.direction == PaymentDirection.EXPENSE)
     matched_count = sum(1 for p in payments if p.match_status != PaymentMatchStatus.UNMATCHED)
 
-    # Bubble counts (celkové počty bez filtrů — ale respektují typ filtr)
-    typ_filter = []
-    if typ == "jednotky":
-        typ_filter.append(Payment.unit_id.isnot(None))
-    elif typ == "prostory":
-        typ_filter.append(Payment.space_id.isnot(None))
-
-    all_payments_for_counts = (
-        db.query(Payment.match_status, Payment.direction, func.count())
-        .filter_by(statement_id=statement_id)
-        .filter(*typ_filter)
-        .group_by(Payment.match_status, Payment.direction)
-        .all()
-    )
-    bubble_counts = {
-        "vse": 0,
-        "auto_matched": 0,
-        "suggested": 0,
-        "manual": 0,
-        "unmatched": 0,
-        "prijem": 0,
-        "vydej": 0,
-    }
-    for status, direction, cnt in all_payments_for_counts:
-        bubble_counts["vse"] += cnt
-        bubble_counts[status.value] += cnt
-        if direction == PaymentDirection.INCOME:
-            bubble_counts["prijem"] += cnt
-        else:
-            bubble_counts["vydej"] += cnt
-
-    # Typ bubble counts (celkové počty bez stav/smer filtrů)
-    all_count = db.query(func.count()).filter(Payment.statement_id == statement_id).scalar() or 0
-    unit_count = db.query(func.count()).filter(
-        Payment.statement_id == statement_id, Payment.unit_id.isnot(None)
-    ).scalar() or 0
-    space_count = db.query(func.count()).filter(
-        Payment.statement_id == statement_id, Payment.space_id.isnot(None)
-    ).scalar() or 0
-    typ_counts = {"vse": all_count, "jednotky": unit_count, "prostory": space_count}
-
     # Flash zprávy
     flash_message, flash_type = flash_from_params(request, {
         "import_ok": ("{msg}", "success"),
@@ -715,91 +543,7 @@ async def vypis_detail(
         "unlock_ok": ("Párování odemčeno.", "success"),
     })
 
-    # Nesrovnalosti pro upozornění
-    from app.services.payment_discrepancy import detect_discrepancies, DISCREPANCY_LABELS
-    discrepancies = detect_discrepancies(db, statement_id)
-
-    # Kandidáti pro nenapárované platby
-    from app.services.payment_matching import compute_candidates
-    from app.models import Prescription, PrescriptionYear
-    pf = statement.period_from
-    cand_year = pf.year if pf else utcnow().year
-    candidates_map = compute_candidates(db, payments, cand_year, statement_id=statement.id)
-
-    # Mapa unit_id → měsíční předpis + VS (pro tooltipy)
-    unit_monthly = {}
-    unit_vs = {}
-    py = db.query(PrescriptionYear).filter_by(year=cand_year).first()
-    if py:
-        for presc in db.query(Prescription).filter_by(prescription_year_id=py.id).all():
-            if presc.unit_id:
-                if presc.monthly_total:
-                    unit_monthly[presc.unit_id] = presc.monthly_total
-                if presc.variable_symbol:
-                    unit_vs[presc.unit_id] = presc.variable_symbol
-
-    # Units + owner names for assignment dropdown (1 JOIN místo 3 dotazů)
-    unit_owner_names = {}  # unit_id → owner display_name
-    unit_name_index = []  # list of (words_set, unit_id)
-    units_by_id = {}
-    unit_owner_rows = (
-        db.query(Unit, Owner)
-        .outerjoin(OwnerUnit, (OwnerUnit.unit_id == Unit.id) & (OwnerUnit.valid_to.is_(None)))
-        .outerjoin(Owner, Owner.id == OwnerUnit.owner_id)
-        .all()
-    )
-    for unit, owner in unit_owner_rows:
-        units_by_id[unit.id] = unit
-        if owner:
-            if owner.display_name:
-                existing = unit_owner_names.get(unit.id)
-                if existing:
-                    unit_owner_names[unit.id] = existing + ", " + owner.display_name
-                else:
-                    unit_owner_names[unit.id] = owner.display_name
-            if owner.name_normalized:
-                words = {w for w in strip_diacritics(owner.name_normalized).split() if len(w) > 2}
-                if words:
-                    unit_name_index.append((words, unit.id))
-    # Řadit podle jména vlastníka (bez diakritiky), jednotky bez vlastníka na konec
-    all_units_list = sorted(
-        units_by_id.values(),
-        key=lambda u: strip_diacritics(unit_owner_names.get(u.id, "zzz")),
-    )
-
-    # Suggest map: payment_id → unit_id (pre-select based on counterparty name / message)
-    unit_suggest_map = _build_suggest_map(payments, unit_name_index)
-
-    # Spaces + tenant names for assignment dropdown
-    all_spaces = db.query(Space).order_by(Space.space_number).all()
-    space_tenant_names = {}
-    active_sts = (
-        db.query(SpaceTenant)
-        .filter_by(is_active=True)
-        .options(joinedload(SpaceTenant.tenant).joinedload(Tenant.owner))
-        .all()
-    )
-    space_monthly = {}  # space_id → monthly_rent
-    space_vs = {}  # space_id → variable_symbol
-    space_name_index = []  # (words_set, space_id)
-    for st in active_sts:
-        if st.monthly_rent:
-            space_monthly[st.space_id] = st.monthly_rent
-        if st.variable_symbol:
-            space_vs[st.space_id] = st.variable_symbol
-        if st.tenant:
-            name = st.tenant.display_name
-            if name:
-                space_tenant_names[st.space_id] = name
-                norm = strip_diacritics(name)
-                words = {w for w in norm.split() if len(w) > 2}
-                if words:
-                    space_name_index.append((words, st.space_id))
-    # Řadit podle jména nájemce (bez diakritiky), prostory bez nájemce na konec
-    all_spaces.sort(key=lambda s: strip_diacritics(space_tenant_names.get(s.id, "zzz")))
-
-    # Suggest map: payment_id → space_id (pre-select based on counterparty/message)
-    space_suggest_map = _build_suggest_map(payments, space_name_index)
+    from app.services.payment_discrepancy import DISCREPANCY_LABELS
 
     list_url = build_list_url(request)
     back_url = request.query_params.get("back", "")
@@ -813,28 +557,29 @@ async def vypis_detail(
         "total_income": total_income,
         "total_expense": total_expense,
         "matched_count": matched_count,
-        "candidates_map": candidates_map,
-        "unit_monthly": unit_monthly,
-        "unit_vs": unit_vs,
-        "all_units_list": all_units_list,
-        "unit_owner_names": unit_owner_names,
-        "unit_suggest_map": unit_suggest_map,
-        "all_spaces": all_spaces,
-        "space_tenant_names": space_tenant_names,
-        "space_monthly": space_monthly,
-        "space_vs": space_vs,
-        "space_suggest_map": space_suggest_map,
+        "candidates_map": view.candidates_map,
+        "unit_monthly": directory.unit_monthly,
+        "unit_vs": directory.unit_vs,
+        "all_units_list": directory.all_units_list,
+        "unit_owner_names": directory.unit_owner_names,
+        "unit_suggest_map": view.unit_suggest_map,
+        "all_spaces": directory.all_spaces,
+        "space_tenant_names": directory.space_tenant_names,
+        "space_monthly": directory.space_monthly,
+        "space_vs": directory.space_vs,
+        "space_suggest_map": view.space_suggest_map,
         "sort": sort,
         "order": order,
         "q": q,
         "stav": stav,
         "smer": smer,
         "typ": typ,
-        "bubble_counts": bubble_counts,
-        "typ_counts": typ_counts,
+        # Bubliny = celkové počty bez stav/smer filtrů, jen podle typ filtru
+        "bubble_counts": view.bubble_counts.get(typ, view.bubble_counts[""]),
+        "typ_counts": view.typ_counts,
         "list_url": list_url,
         "back_url": back_url,
-        "discrepancies": discrepancies,
+        "discrepancies": view.discrepancies,
         "discrepancy_labels": DISCREPANCY_LABELS,
         "flash_message": flash_message,
         "flash_type": flash_type,
@@ -896,7 +641,7 @@ async def vypis_detail_export(
     if not statement:
         return RedirectResponse("/platby/vypisy", status_code=302)
 
-    payments = _filter_payments(db, statement_id, q, stav, smer, typ, sort, order)
+    payments, _, _ = _filter_payments(db, statement, q, stav, smer, typ, sort, order)
 
     status_labels = {
         "auto_matched": "Napárováno",
@@ -1125,6 +870,8 @@ async def platba_prirazeni(
                 amount=alloc_amount,
             ))
 
+    if statement:
+        statement_view.bump_revision(statement)
     db.commit()
 
     return RedirectResponse(
@@ -1174,6 +921,8 @@ async def platba_prirazeni_prostor(
         amount=payment.amount,
     ))
 
+    if statement:
+        statement_view.bump_revision(statement)
     db.commit()
 
     return RedirectResponse(
@@ -1202,6 +951,8 @@ async def platba_potvrdit_vse(
         Payment.statement_id == statement_id,
         Payment.match_status == PaymentMatchStatus.SUGGESTED,
     ).update({Payment.match_status: PaymentMatchStatus.MANUAL})
+    if count and statement:
+        statement_view.bump_revision(statement)
     db.commit()
 
     return RedirectResponse(
@@ -1228,6 +979,7 @@ async def platba_potvrdit(
     payment = db.query(Payment).filter_by(id=payment_id, statement_id=statement_id).first()
     if payment and payment.match_status == PaymentMatchStatus.SUGGESTED:
         payment.match_status = PaymentMatchStatus.MANUAL
+        statement_view.bump_revision(statement)
         db.commit()
 
     return RedirectResponse(
@@ -1260,6 +1012,7 @@ async def platba_odmitnout(
         payment.match_status = PaymentMatchStatus.UNMATCHED
         # Smazat alokace
         db.query(PaymentAllocation).filter_by(payment_id=payment.id).delete()
+        statement_view.bump_revision(statement)
         db.commit()
 
     return RedirectResponse(
@@ -1319,6 +1072,7 @@ async def vypis_preparovat(
     year = statement.period_from.year if statement.period_from else utcnow().year
     result = match_payments(db, statement_id, year)
     statement.matched_count = result["matched"]
+    statement_view.bump_revision(statement)
     db.commit()
 
     suggested = result.get('suggested', 0)
@@ -1361,6 +1115,7 @@ async def vypis_smazat(
         )
         db.delete(statement)
         db.commit()
+        statement_view.discard(statement_id)
     return RedirectResponse("/platby/vypisy", status_code=302)
 
 
@@ -1386,6 +1141,7 @@ async def vypis_zamknout(
     else:
         statement.locked_at = utcnow()
         flash = "lock_ok"
+    statement_view.bump_revision(statement)
     db.commit()
 
     url = _detail_redirect_url(statement_id, form_data, flash)
@@ -7,7 +7,8 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 
 from app.models import Space, SpaceStatus, SpaceTenant, SvjInfo, Tenant
-from app.utils import strip_diacritics, templates
+from app.services.search_index import search_filter
+from app.utils import templates
 
 logger = logging.getLogger(__name__)
 
@@ -32,17 +33,7 @@ def _filter_spaces(db: Session, q="", stav="", sekce="", najemce="", sort="space
     )
 
     if q:
-        search_ascii = f"%{strip_diacritics(q)}%"
-        search = f"%{q}%"
-        query = query.filter(
-            Space.designation.ilike(search)
-            | Space.section.ilike(search)
-            | Space.note.ilike(search)
-            | Space.tenants.any(
-                SpaceTenant.is_active
-                & SpaceTenant.tenant.has(Tenant.name_normalized.like(search_ascii))
-            )
-        )
+        query = query.filter(search_filter(Space, "space", q))
     if stav:
         query = query.filter(Space.status == stav)
     if sekce:
@@ -1,12 +1,7 @@
-import csv
-import io
 from datetime import date as date_type, datetime
-from io import BytesIO
 
 from fastapi import APIRouter, Depends, Form, Query, Request
 from fastapi.responses import RedirectResponse, Response
-from openpyxl import Workbook
-from openpyxl.styles import Font
 from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
@@ -15,8 +10,10 @@ from app.models import (
     Prescription, PrescriptionYear, SymbolSource, VariableSymbolMapping,
     log_activity,
 )
+from app.services.page_cache import PAYMENT_TABLES, SPACE_TABLES, cached_page
+from app.services.streaming_export import export_response
 from app.utils import (
-    build_list_url, build_name_with_titles, excel_auto_width,
+    build_list_url, build_name_with_titles,
     is_htmx_partial, is_valid_email, strip_diacritics, templates, utcnow,
 )
 
@@ -661,6 +658,7 @@ async def space_terminate_tenant(
 
 
 @router.get("/")
+@cached_page(*SPACE_TABLES, *PAYMENT_TABLES, "code_list_items")
 async def space_list(
     request: Request,
     q: str = Query("", alias="q"),
@@ -768,40 +766,7 @@ async def space_export(
         suffix = "_vse"
     filename = f"prostory{suffix}_{timestamp}"
 
-    if fmt == "xlsx":
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Prostory"
-        bold = Font(bold=True)
-
-        for col, h in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=h)
-            cell.font = bold
-
-        for row_idx, s in enumerate(spaces, 2):
-            for col_idx, val in enumerate(_row(s), 1):
-                ws.cell(row=row_idx, column=col_idx, value=val)
-
-        excel_auto_width(ws)
-
-        buf = BytesIO()
-        wb.save(buf)
-        return Response(
-            content=buf.getvalue(),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f'attachment; filename="{filename}.xlsx"'},
-        )
-    else:
-        buf = io.StringIO()
-        writer = csv.writer(buf, delimiter=";")
-        writer.writerow(headers)
-        for s in spaces:
-            writer.writerow(_row(s))
-        return Response(
-            content=buf.getvalue().encode("utf-8-sig"),
-            media_type="text/csv; charset=utf-8",
-            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'},
-        )
+    return export_response(fmt, filename, headers, (_row(s) for s in spaces), sheet_title="Prostory")
 
 
 # ── Detail (catch-all — must be last) ─────────────────────────────────
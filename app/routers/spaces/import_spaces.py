@@ -17,6 +17,7 @@ from app.services.import_mapping import (
     build_mapping_context, detect_header_row, read_excel_headers,
     read_excel_sheet_names, validate_space_mapping,
 )
+from app.services.parsed_upload import discard_parsed_upload
 from app.services.space_import import import_spaces_from_excel, preview_spaces_from_excel
 from app.utils import UPLOAD_LIMITS, build_import_wizard, is_safe_path, validate_upload
 
@@ -303,6 +304,7 @@ async def space_import_delete(
     try:
         p = Path(log.file_path)
         if p.exists():
+            discard_parsed_upload(str(p))
             p.unlink()
     except Exception:
         logger.debug("Failed to clean up file: %s", log.file_path)
@@ -3,7 +3,7 @@ import re
 
 from difflib import SequenceMatcher
 
-from sqlalchemy import cast, Integer
+from sqlalchemy import cast, insert, Integer
 from sqlalchemy.orm import Session
 
 from app.models import (
@@ -15,7 +15,6 @@ from app.utils import strip_diacritics
 
 logger = logging.getLogger(__name__)
 
-
 SYNC_SORT_COLUMNS = {
     "unit": cast(SyncRecord.unit_number, Integer),
     "owner": SyncRecord.excel_owner_name,
@@ -29,6 +28,95 @@ SYNC_SORT_COLUMNS = {
 
 ALLOWED_UPDATE_FIELDS = {"ownership_type", "space_type", "podil_scd", "owner_name"}
 
+# Velikost dávky pro hromadný INSERT záznamů
+_RECORD_CHUNK = 500
+
+
+def _load_excel_data(db: Session) -> list[dict]:
+    """Current ownerships as flat dicts for compare_owners — one SQL projection.
+
+    Replaces loading Owner objects and lazy-loading ``ou.unit`` per ownership.
+    Names are normalized once per owner, not per CSV comparison.
+    """
+    rows = (
+        db.query(
+            Owner.id, Owner.title, Owner.first_name, Owner.last_name,
+            Owner.name_with_titles, Owner.name_normalized, Owner.owner_type,
+            Unit.unit_number, Unit.space_type, Unit.podil_scd, OwnerUnit.ownership_type,
+        )
+        .join(OwnerUnit, OwnerUnit.owner_id == Owner.id)
+        .join(Unit, Unit.id == OwnerUnit.unit_id)
+        .filter(Owner.is_active == True, OwnerUnit.valid_to.is_(None))  # noqa: E712
+        .order_by(Owner.id, Unit.unit_number)
+        .all()
+    )
+
+    per_owner: dict[int, dict] = {}
+    excel_data = []
+    for (owner_id, title, first_name, last_name, name_with_titles, name_normalized,
+         owner_type, unit_number, space_type, podil_scd, ownership_type) in rows:
+        owner = per_owner.get(owner_id)
+        if owner is None:
+            # Same format as Owner.display_name
+            parts = [p for p in (title, last_name, first_name) if p]
+            owner = per_owner[owner_id] = {
+                "owner_name": " ".join(parts) if parts else (name_with_titles or ""),
+                "first_name": first_name,
+                "last_name": last_name or "",
+                "first_name_norm": normalize_for_matching(first_name or ""),
+                "last_name_norm": normalize_for_matching(last_name or ""),
+                "name_normalized": name_normalized,
+                "owner_type": owner_type.value,
+            }
+        excel_data.append({
+            "unit_number": str(unit_number),
+            **owner,
+            "space_type": space_type or "",
+            "podil_scd": podil_scd or 0,
+            "ownership_type": ownership_type or "",
+        })
+    return excel_data
+
+
+def _save_sync_results(db: Session, session, comparison: list[dict]) -> None:
+    """Fill session totals and bulk-insert its SyncRecords (no commit)."""
+    session.total_records = len(comparison)
+    session.total_matches = sum(1 for c in comparison if c["status"] == SyncStatus.MATCH)
+    session.total_name_order = sum(1 for c in comparison if c["status"] == SyncStatus.NAME_ORDER)
+    session.total_differences = sum(1 for c in comparison if c["status"] == SyncStatus.DIFFERENCE)
+    session.total_missing = sum(
+        1 for c in comparison
+        if c["status"] in (SyncStatus.MISSING_CSV, SyncStatus.MISSING_EXCEL)
+    )
+
+    values = [
+        {
+            "session_id": session.id,
+            "unit_number": comp["unit_number"],
+            "csv_owner_name": comp.get("csv_owner_name"),
+            "excel_owner_name": comp.get("excel_owner_name"),
+            "csv_ownership_type": comp.get("csv_ownership_type"),
+            "excel_ownership_type": comp.get("excel_ownership_type"),
+            "csv_space_type": comp.get("csv_space_type"),
+            "excel_space_type": comp.get("excel_space_type"),
+            "excel_podil_scd": comp.get("excel_podil_scd"),
+            "csv_share": comp.get("csv_share"),
+            "csv_email": comp.get("csv_email", ""),
+            "csv_phone": comp.get("csv_phone", ""),
+            "status": comp["status"],
+            "match_details": comp.get("match_details"),
+            "resolution": (
+                SyncResolution.ACCEPTED
+                if comp["status"] in (SyncStatus.MATCH, SyncStatus.NAME_ORDER)
+                else SyncResolution.PENDING
+            ),
+        }
+        for comp in comparison
+    ]
+    for i in range(0, len(values), _RECORD_CHUNK):
+        db.execute(insert(SyncRecord), values[i:i + _RECORD_CHUNK])
+    db.flush()
+
 
 def _apply_owner_name_update(db, unit, record, new_value):
     """Apply owner name changes from CSV to DB. Returns list of change descriptions."""
@@ -8,20 +8,23 @@ from fastapi.responses import FileResponse, RedirectResponse
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill
 from sqlalchemy import and_, cast, func, Integer, or_
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models import (
     ActivityAction, Owner, OwnerUnit, ShareCheckSession, SyncRecord,
-    SyncResolution, SyncSession, SyncStatus, Unit, log_activity,
+    SyncSession, SyncStatus, Unit, log_activity,
 )
+from app.services import jobs
 from app.services.csv_comparator import compare_owners, parse_sousede_csv
 from app.utils import (
     UPLOAD_LIMITS, build_list_url, excel_auto_width, is_htmx_partial,
     strip_diacritics, templates, validate_upload,
 )
-from ._helpers import SYNC_SORT_COLUMNS
+from ._helpers import (
+    SYNC_SORT_COLUMNS, _load_excel_data, _save_sync_results,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -202,80 +205,97 @@ async def sync_create(
     if not csv_content:
         return RedirectResponse("/synchronizace", status_code=302)
 
-    csv_records = parse_sousede_csv(csv_content)
-
-    # Get current Excel data
-    owners = db.query(Owner).filter_by(is_active=True).options(
-        joinedload(Owner.units)
-    ).all()
-
-    excel_data = []
-    for owner in owners:
-        for ou in owner.current_units:
-            unit_num = str(ou.unit.unit_number)
-            excel_data.append({
-                "unit_number": unit_num,
-                "owner_name": owner.display_name,
-                "first_name": owner.first_name,
-                "last_name": owner.last_name or "",
-                "name_normalized": owner.name_normalized,
-                "owner_type": owner.owner_type.value,
-                "space_type": ou.unit.space_type or "",
-                "podil_scd": ou.unit.podil_scd or 0,
-                "ownership_type": ou.ownership_type or "",
-            })
-
-    # Compare
-    comparison = compare_owners(csv_records, excel_data)
-
-    # Create session and records
-    session = SyncSession(
-        csv_filename=file.filename,
-        csv_path=str(dest),
-        total_records=len(comparison),
-        total_matches=sum(1 for c in comparison if c["status"] == SyncStatus.MATCH),
-        total_name_order=sum(1 for c in comparison if c["status"] == SyncStatus.NAME_ORDER),
-        total_differences=sum(1 for c in comparison if c["status"] == SyncStatus.DIFFERENCE),
-        total_missing=sum(
-            1 for c in comparison
-            if c["status"] in (SyncStatus.MISSING_CSV, SyncStatus.MISSING_EXCEL)
-        ),
-    )
+    # Session first — the comparison itself runs in a background thread
+    session = SyncSession(csv_filename=file.filename, csv_path=str(dest))
     db.add(session)
-    db.flush()
-
-    for comp in comparison:
-        record = SyncRecord(
-            session_id=session.id,
-            unit_number=comp["unit_number"],
-            csv_owner_name=comp.get("csv_owner_name"),
-            excel_owner_name=comp.get("excel_owner_name"),
-            csv_ownership_type=comp.get("csv_ownership_type"),
-            excel_ownership_type=comp.get("excel_ownership_type"),
-            csv_space_type=comp.get("csv_space_type"),
-            excel_space_type=comp.get("excel_space_type"),
-            excel_podil_scd=comp.get("excel_podil_scd"),
-            csv_share=comp.get("csv_share"),
-            csv_email=comp.get("csv_email", ""),
-            csv_phone=comp.get("csv_phone", ""),
-            status=comp["status"],
-            match_details=comp.get("match_details"),
-            resolution=(
-                SyncResolution.ACCEPTED
-                if comp["status"] in (SyncStatus.MATCH, SyncStatus.NAME_ORDER)
-                else SyncResolution.PENDING
-            ),
-        )
-        db.add(record)
+    db.commit()
 
-    log_activity(
-        db, ActivityAction.IMPORTED, "sync_session", "sync",
-        entity_id=session.id,
-        entity_name=session.csv_filename or f"Sync #{session.id}",
-        description=f"{len(comparison)} záznamů",
+    jobs.submit(
+        "sync", _process_sync_csv, session.id, csv_content,
+        key=session.id, label="Porovnání CSV s evidencí", pool="heavy",
+        fields={
+            "template": "partials/tax_progress.html",
+            "error_title": "Porovnání selhalo",
+            "error_back_url": "/synchronizace",
+            "error_back_label": "Zpět na kontroly",
+            "unit_label": "záznamů",
+            "redirect_url": f"/synchronizace/{session.id}",
+        },
     )
-    db.commit()
-    return RedirectResponse(f"/synchronizace/{session.id}", status_code=302)
+
+    return RedirectResponse(f"/synchronizace/{session.id}/zpracovani", status_code=302)
+
+
+_SYNC_PHASE_TEXT = {
+    "parse": "načítání CSV",
+    "compare": "porovnání vlastníků",
+    "save": "ukládání záznamů",
+}
+
+
+def _process_sync_csv(job: jobs.Job, session_id: int, csv_content: str):
+    """Úloha na pozadí: parse CSV, compare with current owners, bulk-save records."""
+    db = SessionLocal()
+    try:
+        job.update(message=_SYNC_PHASE_TEXT["parse"])
+        csv_records = parse_sousede_csv(csv_content)
+        job.next_phase(len(csv_records), _SYNC_PHASE_TEXT["compare"])
+
+        excel_data = _load_excel_data(db)
+
+        def _on_progress(n: int):
+            job.update(current=n)
+
+        comparison = compare_owners(csv_records, excel_data, on_progress=_on_progress)
+
+        job.update(message=_SYNC_PHASE_TEXT["save"])
+
+        session = db.query(SyncSession).get(session_id)
+        _save_sync_results(db, session, comparison)
+        log_activity(
+            db, ActivityAction.IMPORTED, "sync_session", "sync",
+            entity_id=session.id,
+            entity_name=session.csv_filename or f"Sync #{session.id}",
+            description=f"{len(comparison)} záznamů",
+        )
+        db.commit()
+        return {"records": len(comparison)}
+    except BaseException:
+        db.rollback()
+        # Nedokončená session nemá záznamy — smazat i s CSV souborem
+        session = db.query(SyncSession).get(session_id)
+        if session:
+            try:
+                Path(session.csv_path).unlink(missing_ok=True)
+            except Exception:
+                logger.debug("Failed to clean up CSV: %s", session.csv_path)
+            db.delete(session)
+            db.commit()
+        raise
+    finally:
+        db.close()
+
+
+@router.get("/{session_id}/zpracovani")
+async def sync_processing(
+    session_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """Progress page while the CSV is compared in background."""
+    job = jobs.find("sync", session_id)
+    if not job or (job["done"] and not job["error"]):
+        return RedirectResponse(f"/synchronizace/{session_id}", status_code=302)
+
+    session = db.query(SyncSession).get(session_id)
+    if not session and not job["error"]:
+        return RedirectResponse("/synchronizace", status_code=302)
+
+    return templates.TemplateResponse(request, "sync/processing.html", {
+        "active_nav": "kontroly",
+        "session": session or SyncSession(id=session_id, csv_filename=""),
+        **jobs.progress_context(job),
+    })
 
 
 @router.get("/{session_id}")
@@ -290,6 +310,9 @@ async def sync_detail(
     db: Session = Depends(get_db),
 ):
     """Detail synchronizační session s porovnáním záznamů."""
+    if jobs.active("sync", session_id):
+        return RedirectResponse(f"/synchronizace/{session_id}/zpracovani", status_code=302)
+
     session = db.query(SyncSession).get(session_id)
     if not session:
         return RedirectResponse("/synchronizace", status_code=302)
@@ -1,8 +1,6 @@
 from __future__ import annotations
 
 import logging
-import threading
-from datetime import date
 from urllib.parse import urlparse
 
 from fastapi import Request
@@ -15,22 +13,11 @@ from app.models import (
     BounceType, EmailBounce, MatchStatus, Owner, OwnerUnit, SendStatus,
     TaxDistribution, TaxDocument, TaxSession, Unit,
 )
+from app.services import ownership
 from app.utils import build_wizard_steps, templates
 
 logger = logging.getLogger(__name__)
 
-# In-memory progress tracker for background PDF processing
-_processing_progress: dict[int, dict] = {}
-_processing_lock = threading.Lock()
-
-# In-memory progress tracker for background email sending
-_sending_progress: dict[int, dict] = {}
-_sending_lock = threading.Lock()
-
-# In-memory progress tracker for background score recomputation
-_recompute_progress: dict[int, dict] = {}
-_recompute_lock = threading.Lock()
-
 
 def recover_stuck_sending_sessions():
     """Reset any SENDING sessions to PAUSED on startup (server restart recovery)."""
@@ -129,26 +116,12 @@ def _find_coowners(owner_id: int, unit_number: str, tax_year: int | None, db: Se
     if not unit:
         return [owner_id]
 
+    # Tax year → owners overlapping the year, otherwise only current owners
     if tax_year:
-        year_start = date(tax_year, 1, 1)
-        year_end = date(tax_year, 12, 31)
+        owners = ownership.load(db, *ownership.year_bounds(tax_year), unit_ids=[unit.id])
     else:
-        year_start = None
-        year_end = None
-
-    owner_ids = set()
-    for ou in unit.owners:
-        # Check period overlap with tax year
-        if year_start and year_end:
-            ou_from = ou.valid_from or date(1900, 1, 1)
-            ou_to = ou.valid_to or date(2099, 12, 31)
-            if ou_to < year_start or ou_from > year_end:
-                continue
-        else:
-            # No tax year — only current owners
-            if ou.valid_to is not None:
-                continue
-        owner_ids.add(ou.owner_id)
+        owners = ownership.load(db, unit_ids=[unit.id])
+    owner_ids = {ou.owner_id for ou in owners}
 
     # Always include the original matched owner
     owner_ids.add(owner_id)
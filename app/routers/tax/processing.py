@@ -1,14 +1,10 @@
 from __future__ import annotations
 
 import re
-import threading
-import time as _time
-from datetime import date
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, Form, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy import or_
+from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session, joinedload
 
 from app.database import SessionLocal, get_db
@@ -16,18 +12,13 @@ from app.models import (
     MatchStatus, Owner, OwnerUnit, SendStatus,
     TaxDistribution, TaxDocument, TaxSession,
 )
-from app.utils import compute_eta
+from app.services import jobs, ownership
 from app.services.owner_matcher import match_name
 from app.services.pdf_extractor import (
     extract_owner_from_tax_pdf, parse_unit_from_filename,
 )
 
-from ._helpers import (
-    logger, templates,
-    _processing_progress, _processing_lock,
-    _recompute_progress, _recompute_lock,
-    _tax_wizard,
-)
+from ._helpers import logger, templates, _tax_wizard
 
 router = APIRouter()
 
@@ -45,16 +36,8 @@ def _prepare_owner_lookup(db: Session, tax_year) -> tuple[list[dict], dict[str,
 
     # Build unit->owner mapping — include owners overlapping with tax year
     if tax_year:
-        year_start = date(tax_year, 1, 1)
-        year_end = date(tax_year, 12, 31)
-        owner_units = (
-            db.query(OwnerUnit)
-            .options(joinedload(OwnerUnit.unit))
-            .filter(
-                or_(OwnerUnit.valid_to.is_(None), OwnerUnit.valid_to >= year_start),
-                or_(OwnerUnit.valid_from.is_(None), OwnerUnit.valid_from <= year_end),
-            )
-            .all()
+        owner_units = ownership.load(
+            db, *ownership.year_bounds(tax_year), options=(joinedload(OwnerUnit.unit),),
         )
     else:
         owner_units = (
@@ -262,8 +245,8 @@ def _propagate_emails(
         d.email_address_used = owner_emails[d.owner_id]
 
 
-def _process_tax_files(session_id: int, file_paths: list, tax_year):
-    """Background thread: extract text from PDFs and match owners."""
+def _process_tax_files(job: jobs.Job, session_id: int, file_paths: list, tax_year):
+    """Úloha na pozadí: extract text from PDFs and match owners."""
     db = SessionLocal()
     try:
         owner_dicts, unit_to_owners = _prepare_owner_lookup(db, tax_year)
@@ -275,15 +258,14 @@ def _process_tax_files(session_id: int, file_paths: list, tax_year):
 
         new_doc_ids = []
         for i, file_path in enumerate(file_paths):
-            with _processing_lock:
-                _processing_progress[session_id]["current_file"] = Path(file_path).name
+            job.checkpoint()
+            job.update(message=Path(file_path).name)
 
             doc, extracted = _process_single_pdf(file_path, session_id, db)
             new_doc_ids.append(doc.id)
             _auto_match_distributions(doc, extracted, unit_to_owners, owner_dicts, db)
 
-            with _processing_lock:
-                _processing_progress[session_id]["current"] = i + 1
+            job.update(current=i + 1)
 
         db.flush()
 
@@ -309,33 +291,30 @@ def _process_tax_files(session_id: int, file_paths: list, tax_year):
         _propagate_emails(db, all_doc_ids, owner_emails)
 
         db.commit()
-    except Exception as e:
-        logger.exception("PDF processing failed for session %s", session_id)
-        with _processing_lock:
-            _processing_progress[session_id]["error"] = str(e)
+    except BaseException:
+        # Chyba i zrušení: nic neuložit, smazat osiřelé soubory (#28)
         db.rollback()
-        # Cleanup orphaned files on disk (#28)
         for fp in file_paths:
             try:
                 Path(fp).unlink(missing_ok=True)
             except Exception:
                 logger.debug("Failed to clean up temp file: %s", fp)
+        raise
     finally:
-        with _processing_lock:
-            _processing_progress[session_id]["done"] = True
         db.close()
 
 
-def _progress_eta(progress: dict) -> dict:
-    """Compute ETA fields from progress dict."""
-
-    eta = compute_eta(progress["current"], progress["total"], progress["started_at"])
-    return {
-        "total": progress["total"],
-        "current": progress["current"],
-        "current_file": progress["current_file"],
-        **eta,
-    }
+def start_tax_processing(session_id: int, file_paths: list, tax_year) -> jobs.Job:
+    """Zařadit zpracování nahraných PDF do fronty úloh."""
+    return jobs.submit(
+        "tax_processing", _process_tax_files, session_id, file_paths, tax_year,
+        key=session_id, label="Zpracování PDF souborů", pool="heavy", total=len(file_paths),
+        fields={
+            "template": "partials/tax_progress.html",
+            "redirect_url": f"/rozesilani/{session_id}",
+            "error_back_url": f"/rozesilani/{session_id}",
+        },
+    )
 
 
 @router.get("/{session_id}/zpracovani")
@@ -345,12 +324,9 @@ async def tax_processing(
     db: Session = Depends(get_db),
 ):
     """Show progress page while PDFs are being processed in background."""
-    with _processing_lock:
-        progress = _processing_progress.get(session_id)
-        if not progress or progress.get("done"):
-            _processing_progress.pop(session_id, None)
-            return RedirectResponse(f"/rozesilani/{session_id}", status_code=302)
-        progress = dict(progress)  # snapshot under lock
+    job = jobs.find("tax_processing", session_id)
+    if not job or (job["done"] and not job["error"]):
+        return RedirectResponse(f"/rozesilani/{session_id}", status_code=302)
 
     session = db.query(TaxSession).get(session_id)
     if not session:
@@ -359,43 +335,11 @@ async def tax_processing(
     return templates.TemplateResponse(request, "tax/processing.html", {
         "active_nav": "tax",
         "session": session,
-        "error": progress.get("error"),
-        **_progress_eta(progress),
+        **jobs.progress_context(job),
         **_tax_wizard(session, 1),
     })
 
 
-@router.get("/{session_id}/zpracovani-stav")
-async def tax_processing_status(session_id: int, request: Request):
-    """HTMX polling endpoint — returns progress partial or redirect when done."""
-    with _processing_lock:
-        progress = _processing_progress.get(session_id)
-        if not progress:
-            response = HTMLResponse("")
-            response.headers["HX-Redirect"] = f"/rozesilani/{session_id}"
-            return response
-        if progress.get("done"):
-            error = progress.get("error")
-            if error:
-                # Show error in progress partial — don't redirect
-                progress = dict(progress)
-                _processing_progress.pop(session_id, None)
-                return templates.TemplateResponse(request, "partials/tax_progress.html", {
-                    "error": error,
-                    **_progress_eta(progress),
-                })
-            _processing_progress.pop(session_id, None)
-            response = HTMLResponse("")
-            response.headers["HX-Redirect"] = f"/rozesilani/{session_id}"
-            return response
-        progress = dict(progress)  # snapshot under lock
-
-    return templates.TemplateResponse(request, "partials/tax_progress.html", {
-        "error": None,
-        **_progress_eta(progress),
-    })
-
-
 def _find_best_match(
     cand_texts: list[str],
     unit_number: str | None,
@@ -426,8 +370,14 @@ def _find_best_match(
     return best_match
 
 
-def _recompute_scores_thread(session_id: int, tax_year, reparse_pdfs: bool = False):
-    """Background thread: přepřiřazení vlastníků k PDF dokumentům.
+_RECOMPUTE_PHASES = {
+    "reparse": ("Načítání jmen z PDF", "čtení PDF souborů"),
+    "matching": ("Přepočet přiřazení vlastníků", "přiřazení vlastníků"),
+}
+
+
+def _recompute_scores_thread(job: jobs.Job, session_id: int, tax_year, reparse_pdfs: bool = False):
+    """Úloha na pozadí: přepřiřazení vlastníků k PDF dokumentům.
     Pokud reparse_pdfs=True, nejdřív znovu extrahuje jména z PDF souborů."""
     db = SessionLocal()
     try:
@@ -443,10 +393,10 @@ def _recompute_scores_thread(session_id: int, tax_year, reparse_pdfs: bool = Fal
         # Fáze 1: Re-extrakce jmen z PDF (volitelná)
         reparsed = 0
         if reparse_pdfs:
-            with _recompute_lock:
-                _recompute_progress[session_id]["phase"] = "reparse"
-                _recompute_progress[session_id]["total"] = len(docs)
+            title, text = _RECOMPUTE_PHASES["reparse"]
+            job.next_phase(len(docs), text, progress_title=title)
             for i, doc in enumerate(docs):
+                job.checkpoint()
                 if doc.file_path and Path(doc.file_path).exists():
                     try:
                         extracted = extract_owner_from_tax_pdf(doc.file_path)
@@ -459,8 +409,7 @@ def _recompute_scores_thread(session_id: int, tax_year, reparse_pdfs: bool = Fal
                             reparsed += 1
                     except Exception:
                         logger.debug("PDF re-extraction failed: %s", doc.filename)
-                with _recompute_lock:
-                    _recompute_progress[session_id]["current"] = i + 1
+                job.update(current=i + 1)
             db.flush()
 
         # Fáze 2: Přepřiřazení vlastníků
@@ -488,16 +437,14 @@ def _recompute_scores_thread(session_id: int, tax_year, reparse_pdfs: bool = Fal
             )
             docs_to_rematch.append((doc, confirmed_ids, old_auto, had_unmatched))
 
-        with _recompute_lock:
-            _recompute_progress[session_id]["phase"] = "matching"
-            _recompute_progress[session_id]["total"] = len(docs_to_rematch)
-            _recompute_progress[session_id]["current"] = 0
-            _recompute_progress[session_id]["started_at"] = _time.monotonic()
+        title, text = _RECOMPUTE_PHASES["matching"]
+        job.next_phase(len(docs_to_rematch), text, progress_title=title)
 
         reassigned = 0
         newly_matched = 0
 
         for i, (doc, confirmed_ids, old_auto, had_unmatched) in enumerate(docs_to_rematch):
+            job.checkpoint()
             # Staré owner IDs z auto-matched distribucí
             old_owner_ids = set(old_auto.values())
 
@@ -570,27 +517,25 @@ def _recompute_scores_thread(session_id: int, tax_year, reparse_pdfs: bool = Fal
                     else:
                         reassigned += 1
 
-            with _recompute_lock:
-                _recompute_progress[session_id]["current"] = i + 1
+            job.update(current=i + 1)
 
         db.commit()
 
         total = reassigned + newly_matched
-        with _recompute_lock:
-            _recompute_progress[session_id]["result"] = {
-                "total": total,
-                "reassigned": reassigned,
-                "newly": newly_matched,
-                "reparsed": reparsed,
-            }
-    except Exception as e:
-        logger.exception("Recompute scores failed for session %s", session_id)
-        with _recompute_lock:
-            _recompute_progress[session_id]["error"] = str(e)
+        job.update(redirect_url=(
+            f"/rozesilani/{session_id}?flash=prematched&n={total}"
+            f"&reassigned={reassigned}&newly={newly_matched}&reparsed={reparsed}"
+        ))
+        return {
+            "total": total,
+            "reassigned": reassigned,
+            "newly": newly_matched,
+            "reparsed": reparsed,
+        }
+    except BaseException:
         db.rollback()
+        raise
     finally:
-        with _recompute_lock:
-            _recompute_progress[session_id]["done"] = True
         db.close()
 
 
@@ -610,24 +555,18 @@ def tax_recompute_scores(
         return RedirectResponse(f"/rozesilani/{session_id}?flash=locked", status_code=302)
 
     reparse_pdfs = reparse == "1"
-
-    with _recompute_lock:
-        _recompute_progress[session_id] = {
-            "current": 0,
-            "total": 0,
-            "phase": "reparse" if reparse_pdfs else "matching",
-            "started_at": _time.monotonic(),
-            "done": False,
-            "error": None,
-            "result": None,
-        }
-
-    t = threading.Thread(
-        target=_recompute_scores_thread,
-        args=(session_id, session.year, reparse_pdfs),
-        daemon=True,
-    )
-    t.start()
+    if not jobs.active("tax_recompute", session_id):
+        title, text = _RECOMPUTE_PHASES["reparse" if reparse_pdfs else "matching"]
+        jobs.submit(
+            "tax_recompute", _recompute_scores_thread, session_id, session.year, reparse_pdfs,
+            key=session_id, label="Přepočet přiřazení", pool="heavy",
+            fields={
+                "template": "partials/tax_progress.html",
+                "progress_title": title,
+                "redirect_url": f"/rozesilani/{session_id}",
+                "error_back_url": f"/rozesilani/{session_id}",
+            },
+        )
 
     return RedirectResponse(
         f"/rozesilani/{session_id}/prepocitavani", status_code=302
@@ -641,99 +580,18 @@ async def tax_recompute_progress_page(
     db: Session = Depends(get_db),
 ):
     """Stránka s progress barem přepočtu přiřazení."""
-    with _recompute_lock:
-        progress = _recompute_progress.get(session_id)
-        if not progress or progress.get("done"):
-            result = progress.get("result", {}) if progress else {}
-            _recompute_progress.pop(session_id, None)
-            n = result.get("total", 0)
-            reassigned = result.get("reassigned", 0)
-            newly = result.get("newly", 0)
-            reparsed = result.get("reparsed", 0)
-            return RedirectResponse(
-                f"/rozesilani/{session_id}?flash=prematched&n={n}"
-                f"&reassigned={reassigned}&newly={newly}&reparsed={reparsed}",
-                status_code=302,
-            )
-        progress = dict(progress)
+    job = jobs.find("tax_recompute", session_id)
+    if not job or (job["done"] and not job["error"]):
+        redirect_url = job.get("redirect_url") if job else None
+        return RedirectResponse(redirect_url or f"/rozesilani/{session_id}", status_code=302)
 
     session = db.query(TaxSession).get(session_id)
     if not session:
         return RedirectResponse("/rozesilani", status_code=302)
 
-    phase = progress.get("phase", "matching")
-    if phase == "reparse":
-        phase_title = "Načítání jmen z PDF"
-        phase_file = "čtení PDF souborů"
-    else:
-        phase_title = "Přepočet přiřazení vlastníků"
-        phase_file = "přiřazení vlastníků"
-
-    eta = compute_eta(progress["current"], progress["total"], progress["started_at"])
-
     return templates.TemplateResponse(request, "tax/recompute_progress.html", {
         "active_nav": "tax",
         "session": session,
-        "error": progress.get("error"),
-        "total": progress["total"],
-        "current": progress["current"],
-        "current_file": phase_file,
-        "progress_title": phase_title,
-        **eta,
+        **jobs.progress_context(job),
         **_tax_wizard(session, 2, has_documents=True),
-    })
-
-
-@router.get("/{session_id}/prepocitavani-stav")
-async def tax_recompute_progress_status(session_id: int, request: Request):
-    """HTMX polling endpoint — progress přepočtu přiřazení."""
-    with _recompute_lock:
-        progress = _recompute_progress.get(session_id)
-        if not progress:
-            response = HTMLResponse("")
-            response.headers["HX-Redirect"] = f"/rozesilani/{session_id}"
-            return response
-        if progress.get("done"):
-            error = progress.get("error")
-            if error:
-                progress = dict(progress)
-                _recompute_progress.pop(session_id, None)
-                eta = compute_eta(progress["current"], progress["total"], progress["started_at"])
-                return templates.TemplateResponse(request, "partials/tax_progress.html", {
-                    "error": error,
-                    "total": progress["total"],
-                    "current": progress["current"],
-                    "current_file": None,
-                    **eta,
-                })
-            result = progress.get("result", {})
-            _recompute_progress.pop(session_id, None)
-            n = result.get("total", 0)
-            reassigned = result.get("reassigned", 0)
-            newly = result.get("newly", 0)
-            reparsed = result.get("reparsed", 0)
-            response = HTMLResponse("")
-            response.headers["HX-Redirect"] = (
-                f"/rozesilani/{session_id}?flash=prematched&n={n}"
-                f"&reassigned={reassigned}&newly={newly}&reparsed={reparsed}"
-            )
-            return response
-        progress = dict(progress)
-
-    phase = progress.get("phase", "matching")
-    if phase == "reparse":
-        phase_title = "Načítání jmen z PDF"
-        phase_file = "čtení PDF souborů"
-    else:
-        phase_title = "Přepočet přiřazení vlastníků"
-        phase_file = "přiřazení vlastníků"
-
-    eta = compute_eta(progress["current"], progress["total"], progress["started_at"])
-    return templates.TemplateResponse(request, "partials/tax_progress.html", {
-        "error": None,
-        "total": progress["total"],
-        "current": progress["current"],
-        "current_file": phase_file,
-        "progress_title": phase_title,
-        **eta,
-    })
+    })
\ No newline at end of file
@@ -2,8 +2,6 @@ from __future__ import annotations
 
 import asyncio
 import re
-import threading
-import time
 from typing import Optional
 
 
@@ -20,12 +18,12 @@ from app.models import (
     SmtpProfile, TaxDistribution, TaxDocument, TaxSession,
     ActivityAction, log_activity,
 )
+from app.services import jobs
 from app.services.email_service import create_smtp_connection, send_email
-from app.utils import build_list_url, compute_eta, excel_auto_width, strip_diacritics, utcnow
+from app.utils import build_list_url, excel_auto_width, strip_diacritics, utcnow
 
 from ._helpers import (
     logger, templates,
-    _sending_progress, _sending_lock,
     _tax_wizard, _build_recipients, _find_coowners,
 )
 
@@ -301,14 +299,11 @@ async def tax_send_preview(
         return RedirectResponse("/rozesilani", status_code=302)
 
     # If sending is in progress, redirect to progress page
-    with _sending_lock:
-        progress = _sending_progress.get(session_id)
-        sending_in_progress = progress and not progress.get("done")
-    if sending_in_progress:
+    if jobs.active("tax_sending", session_id):
         return RedirectResponse(f"/rozesilani/{session_id}/rozeslat/prubeh", status_code=302)
 
-    # Edge case: DB says SENDING but no progress dict (server restart)
-    if session.send_status == SendStatus.SENDING and not progress:
+    # Edge case: DB says SENDING but no running job (server restart)
+    if session.send_status == SendStatus.SENDING:
         session.send_status = SendStatus.PAUSED
         db.commit()
 
@@ -775,34 +770,10 @@ async def save_send_settings(
 # ---------------------------------------------------------------------------
 
 
-def _sending_eta(progress: dict) -> dict:
-    """Compute ETA fields from sending progress dict."""
-
-    sent = progress["sent"]
-    failed = progress["failed"]
-    current = sent + failed
-    eta = compute_eta(current, progress["total"], progress["started_at"])
-
-    return {
-        "total": progress["total"],
-        "sent": sent,
-        "failed": failed,
-        "current": current,
-        **eta,
-        "current_recipient": progress.get("current_recipient", ""),
-        "done": progress.get("done", False),
-        "error": progress.get("error"),
-        "paused": progress.get("paused", False),
-        "waiting_batch_confirm": progress.get("waiting_batch_confirm", False),
-        "batch_number": progress.get("batch_number", 0),
-        "total_batches": progress.get("total_batches", 0),
-    }
-
-
-def _send_emails_batch(session_id: int, recipient_data: list, email_subject: str,
+def _send_emails_batch(job: jobs.Job, session_id: int, recipient_data: list, email_subject: str,
                         email_body: str, batch_size: int, batch_interval: int,
                         confirm_each_batch: bool, smtp_profile_id: Optional[int] = None):
-    """Background thread: send emails in batches."""
+    """Úloha na pozadí: odeslání emailů po dávkách."""
     db = SessionLocal()
     try:
         # Split into batches
@@ -810,12 +781,10 @@ def _send_emails_batch(session_id: int, recipient_data: list, email_subject: str
         for i in range(0, len(recipient_data), batch_size):
             batches.append(recipient_data[i:i + batch_size])
 
-        with _sending_lock:
-            _sending_progress[session_id]["total_batches"] = len(batches)
+        job.update(total_batches=len(batches))
 
         for batch_idx, batch in enumerate(batches):
-            with _sending_lock:
-                _sending_progress[session_id]["batch_number"] = batch_idx + 1
+            job.update(batch_number=batch_idx + 1)
 
             # Create shared SMTP connection per batch (#25)
             smtp_conn = None
@@ -824,132 +793,123 @@ def _send_emails_batch(session_id: int, recipient_data: list, email_subject: str
             except Exception:
                 logger.warning("Failed to create shared SMTP connection, falling back to per-email")
 
-            for rcpt in batch:
-                # Check paused
-                while True:
-                    with _sending_lock:
-                        paused = _sending_progress[session_id].get("paused")
-                        done = _sending_progress[session_id].get("done")
-                    if not paused:
-                        break
-                    if done:
-                        if smtp_conn:
-                            try:
-                                smtp_conn.quit()
-                            except Exception:
-                                logger.debug("SMTP quit failed during pause/cancel cleanup", exc_info=True)
-                        return
-                    time.sleep(0.5)
-
-                with _sending_lock:
-                    _sending_progress[session_id]["current_recipient"] = rcpt["name"]
-
-                # Gather only unsent attachment file paths
-                unsent_docs = [d for d in rcpt["docs"] if not d.get("sent")]
-                attachments = [d["file_path"] for d in unsent_docs] if unsent_docs else [d["file_path"] for d in rcpt["docs"]]
-                unsent_dist_ids = [d["dist_id"] for d in unsent_docs] if unsent_docs else rcpt["dist_ids"]
-
-                # Send email — wrapped in try/except so one failure
-                # never kills the entire batch
-                try:
-                    result = send_email(
-                        to_email=rcpt["email"],
-                        to_name=rcpt["name"],
-                        subject=email_subject,
-                        body_html=email_body,
-                        attachments=attachments,
-                        module="tax",
-                        reference_id=session_id,
-                        db=db,
-                        smtp_server=smtp_conn,
-                        smtp_profile_id=smtp_profile_id,
-                    )
-                except Exception as exc:
-                    logger.exception("Neočekávaná chyba při odesílání pro %s (%s)",
-                                     rcpt["name"], rcpt["email"])
-                    result = {"success": False, "error": str(exc)}
-                    # Shared SMTP connection is likely dead — recreate
-                    smtp_conn = None
+            try:
+                for rcpt in batch:
+                    # Pauza / zrušení
+                    job.checkpoint()
+                    job.update(current_recipient=rcpt["name"])
+
+                    # Gather only unsent attachment file paths
+                    unsent_docs = [d for d in rcpt["docs"] if not d.get("sent")]
+                    attachments = [d["file_path"] for d in unsent_docs] if unsent_docs else [d["file_path"] for d in rcpt["docs"]]
+                    unsent_dist_ids = [d["dist_id"] for d in unsent_docs] if unsent_docs else rcpt["dist_ids"]
+
+                    # Send email — wrapped in try/except so one failure
+                    # never kills the entire batch
                     try:
-                        smtp_conn = create_smtp_connection(profile_id=smtp_profile_id)
-                    except Exception:
-                        logger.warning("Nepodařilo se obnovit SMTP spojení")
-
-                # Batch-update distribution statuses in DB (avoid N+1)
-                dists = (
-                    db.query(TaxDistribution)
-                    .filter(TaxDistribution.id.in_(unsent_dist_ids))
-                    .all()
-                )
-                for dist in dists:
-                    if result["success"]:
-                        dist.email_status = EmailDeliveryStatus.SENT
-                        dist.email_sent = True
-                        dist.email_sent_at = utcnow()
-                        dist.email_address_used = rcpt["email"]
-                        dist.email_error = None
-                    else:
-                        dist.email_status = EmailDeliveryStatus.FAILED
-                        dist.email_error = result.get("error", "Unknown error")
-                        dist.email_address_used = rcpt["email"]
-
-                db.commit()
+                        result = send_email(
+                            to_email=rcpt["email"],
+                            to_name=rcpt["name"],
+                            subject=email_subject,
+                            body_html=email_body,
+                            attachments=attachments,
+                            module="tax",
+                            reference_id=session_id,
+                            db=db,
+                            smtp_server=smtp_conn,
+                            smtp_profile_id=smtp_profile_id,
+                        )
+                    except Exception as exc:
+                        logger.exception("Neočekávaná chyba při odesílání pro %s (%s)",
+                                         rcpt["name"], rcpt["email"])
+                        result = {"success": False, "error": str(exc)}
+                        # Shared SMTP connection is likely dead — recreate
+                        smtp_conn = None
+                        try:
+                            smtp_conn = create_smtp_connection(profile_id=smtp_profile_id)
+                        except Exception:
+                            logger.warning("Nepodařilo se obnovit SMTP spojení")
+
+                    # Batch-update distribution statuses in DB (avoid N+1)
+                    dists = (
+                        db.query(TaxDistribution)
+                        .filter(TaxDistribution.id.in_(unsent_dist_ids))
+                        .all()
+                    )
+                    for dist in dists:
+                        if result["success"]:
+                            dist.email_status = EmailDeliveryStatus.SENT
+                            dist.email_sent = True
+                            dist.email_sent_at = utcnow()
+                            dist.email_address_used = rcpt["email"]
+                            dist.email_error = None
+                        else:
+                            dist.email_status = EmailDeliveryStatus.FAILED
+                            dist.email_error = result.get("error", "Unknown error")
+                            dist.email_address_used = rcpt["email"]
+
+                    db.commit()
 
-                with _sending_lock:
                     if result["success"]:
-                        _sending_progress[session_id]["sent"] += 1
+                        job.advance(sent=job.get("sent", 0) + 1)
                     else:
-                        _sending_progress[session_id]["failed"] += 1
-
-            # Close shared SMTP connection after batch
-            if smtp_conn:
-                try:
-                    smtp_conn.quit()
-                except Exception:
-                    logger.debug("SMTP quit failed after batch cleanup", exc_info=True)
-                smtp_conn = None
+                        job.advance(failed=job.get("failed", 0) + 1)
+            finally:
+                # Close shared SMTP connection after batch (i po zrušení)
+                if smtp_conn:
+                    try:
+                        smtp_conn.quit()
+                    except Exception:
+                        logger.debug("SMTP quit failed after batch cleanup", exc_info=True)
 
             # After batch: wait for confirmation or interval
             if batch_idx < len(batches) - 1:  # not last batch
+                job.update(current_recipient="")
                 if confirm_each_batch:
-                    with _sending_lock:
-                        _sending_progress[session_id]["waiting_batch_confirm"] = True
-                    while True:
-                        with _sending_lock:
-                            waiting = _sending_progress[session_id].get("waiting_batch_confirm")
-                            done = _sending_progress[session_id].get("done")
-                        if not waiting:
-                            break
-                        if done:
-                            return
-                        time.sleep(0.5)
+                    job.wait_for_confirm()
                 else:
-                    # Wait batch_interval seconds (but check for pause)
-                    for _ in range(batch_interval * 2):
-                        with _sending_lock:
-                            done = _sending_progress[session_id].get("done")
-                        if done:
-                            return
-                        time.sleep(0.5)
+                    job.sleep(batch_interval)
 
         # Complete
         session = db.query(TaxSession).get(session_id)
         if session:
             session.send_status = SendStatus.COMPLETED
             db.commit()
-
-    except Exception as e:
-        logger.exception("Error in batch email sending for session %s", session_id)
-        with _sending_lock:
-            _sending_progress[session_id]["error"] = str(e)
+        return {"sent": job.get("sent", 0), "failed": job.get("failed", 0)}
     finally:
-        with _sending_lock:
-            _sending_progress[session_id]["done"] = True
-            _sending_progress[session_id]["current_recipient"] = ""
-            _sending_progress[session_id]["finished_at"] = time.monotonic()
+        job.update(current_recipient="")
         db.close()
 
 
+def _start_sending(session: TaxSession, recipients: list) -> jobs.Job:
+    """Zařadit rozesílku do fronty úloh (pool ``email``)."""
+    return jobs.submit(
+        "tax_sending", _send_emails_batch,
+        session.id,
+        recipients,
+        session.email_subject or "",
+        session.email_body or "",
+        session.send_batch_size or 10,
+        session.send_batch_interval or 5,
+        session.send_confirm_each_batch or False,
+        session.smtp_profile_id,
+        key=session.id, label=f"Rozesílka — {session.title}", pool="email",
+        total=len(recipients),
+        fields={
+            "sent": 0,
+            "failed": 0,
+            "current_recipient": "",
+            "waiting_batch_confirm": False,
+            "batch_number": 0,
+            "total_batches": 0,
+            "template": "partials/_send_progress_inner.html",
+            # Po dokončení 3 s zobrazit výsledek, pak zpět na rozesílku
+            "redirect_url": f"/rozesilani/{session.id}/rozeslat",
+            "redirect_delay": 3,
+        },
+    )
+
+
 @router.post("/{session_id}/rozeslat/odeslat")
 async def start_batch_send(
     session_id: int,
@@ -968,11 +928,9 @@ async def start_batch_send(
         return RedirectResponse(f"/rozesilani/{session_id}/rozeslat", status_code=302)
 
     # Check no concurrent sending
-    with _sending_lock:
-        progress = _sending_progress.get(session_id)
-        if progress and not progress.get("done"):
-            logger.info("Session %s: concurrent sending in progress", session_id)
-            return RedirectResponse(f"/rozesilani/{session_id}/rozeslat/prubeh", status_code=302)
+    if jobs.active("tax_sending", session_id):
+        logger.info("Session %s: concurrent sending in progress", session_id)
+        return RedirectResponse(f"/rozesilani/{session_id}/rozeslat/prubeh", status_code=302)
 
     # Get selected keys from form
     form = await request.form()
@@ -1019,38 +977,7 @@ async def start_batch_send(
                  description=f"Rozesílka zahájena: {len(recipients_to_send)} příjemců")
     db.commit()
 
-    # Initialize progress
-    with _sending_lock:
-        _sending_progress[session_id] = {
-            "total": len(recipients_to_send),
-            "sent": 0,
-            "failed": 0,
-            "current_recipient": "",
-            "done": False,
-            "error": None,
-            "started_at": time.monotonic(),
-            "paused": False,
-            "waiting_batch_confirm": False,
-            "batch_number": 0,
-            "total_batches": 0,
-        }
-
-    # Start background thread
-    thread = threading.Thread(
-        target=_send_emails_batch,
-        args=(
-            session_id,
-            recipients_to_send,
-            session.email_subject or "",
-            session.email_body or "",
-            session.send_batch_size or 10,
-            session.send_batch_interval or 5,
-            session.send_confirm_each_batch or False,
-            session.smtp_profile_id,
-        ),
-        daemon=True,
-    )
-    thread.start()
+    _start_sending(session, recipients_to_send)
 
     return RedirectResponse(f"/rozesilani/{session_id}/rozeslat/prubeh", status_code=302)
 
@@ -1066,58 +993,27 @@ async def sending_progress_page(
     if not session:
         return RedirectResponse("/rozesilani", status_code=302)
 
-    with _sending_lock:
-        progress = _sending_progress.get(session_id)
-        if not progress:
-            return RedirectResponse(f"/rozesilani/{session_id}/rozeslat", status_code=302)
-        progress = dict(progress)
+    job = jobs.find("tax_sending", session_id)
+    if not job:
+        return RedirectResponse(f"/rozesilani/{session_id}/rozeslat", status_code=302)
 
     return templates.TemplateResponse(request, "tax/sending.html", {
         "active_nav": "tax",
         "session": session,
-        **_sending_eta(progress),
+        **jobs.progress_context(job),
         **_tax_wizard(session, 3),
     })
 
 
-@router.get("/{session_id}/rozeslat/prubeh-stav")
-async def sending_progress_status(
-    session_id: int,
-    request: Request,
-):
-    """HTMX polling endpoint — returns progress partial or redirect when done."""
-    with _sending_lock:
-        progress = _sending_progress.get(session_id)
-        if not progress:
-            response = HTMLResponse("")
-            response.headers["HX-Redirect"] = f"/rozesilani/{session_id}/rozeslat"
-            return response
-        # Po dokončení počkat 3 sekundy, aby uživatel viděl výsledek
-        if progress.get("done"):
-            finished_at = progress.get("finished_at", 0)
-            if time.monotonic() - finished_at >= 3:
-                _sending_progress.pop(session_id, None)
-                response = HTMLResponse("")
-                response.headers["HX-Redirect"] = f"/rozesilani/{session_id}/rozeslat"
-                return response
-        progress = dict(progress)  # snapshot under lock
-
-    return templates.TemplateResponse(request, "partials/_send_progress_inner.html", {
-        "session_id": session_id,
-        **_sending_eta(progress),
-    })
-
-
 @router.post("/{session_id}/rozeslat/pozastavit")
 async def pause_sending(
     session_id: int,
     db: Session = Depends(get_db),
 ):
     """Pause the sending process."""
-    with _sending_lock:
-        progress = _sending_progress.get(session_id)
-        if progress and not progress.get("done"):
-            progress["paused"] = True
+    job = jobs.active("tax_sending", session_id)
+    if job:
+        jobs.pause(job["id"])
 
     session = db.query(TaxSession).get(session_id)
     if session:
@@ -1133,11 +1029,9 @@ async def resume_sending(
     db: Session = Depends(get_db),
 ):
     """Resume the sending process (also confirms batch)."""
-    with _sending_lock:
-        progress = _sending_progress.get(session_id)
-        if progress and not progress.get("done"):
-            progress["paused"] = False
-            progress["waiting_batch_confirm"] = False
+    job = jobs.active("tax_sending", session_id)
+    if job:
+        jobs.resume(job["id"])
 
     session = db.query(TaxSession).get(session_id)
     if session:
@@ -1153,11 +1047,9 @@ async def cancel_sending(
     db: Session = Depends(get_db),
 ):
     """Cancel the sending process — stop thread, reset QUEUED distributions to PENDING."""
-    with _sending_lock:
-        progress = _sending_progress.get(session_id)
-        if progress and not progress.get("done"):
-            progress["done"] = True  # signal thread to stop
-            progress["finished_at"] = time.monotonic()
+    job = jobs.active("tax_sending", session_id)
+    if job:
+        jobs.cancel(job["id"])
 
     # Reset QUEUED distributions back to PENDING
     queued_dists = (
@@ -1192,10 +1084,8 @@ async def retry_failed(
         return RedirectResponse("/rozesilani", status_code=302)
 
     # Check no concurrent sending
-    with _sending_lock:
-        progress = _sending_progress.get(session_id)
-        if progress and not progress.get("done"):
-            return RedirectResponse(f"/rozesilani/{session_id}/rozeslat/prubeh", status_code=302)
+    if jobs.active("tax_sending", session_id):
+        return RedirectResponse(f"/rozesilani/{session_id}/rozeslat/prubeh", status_code=302)
 
     # Build recipients and filter to failed only
     documents = (
@@ -1224,37 +1114,6 @@ async def retry_failed(
     session.send_status = SendStatus.SENDING
     db.commit()
 
-    # Initialize progress
-    with _sending_lock:
-        _sending_progress[session_id] = {
-            "total": len(failed_recipients),
-            "sent": 0,
-            "failed": 0,
-            "current_recipient": "",
-            "done": False,
-            "error": None,
-            "started_at": time.monotonic(),
-            "paused": False,
-            "waiting_batch_confirm": False,
-            "batch_number": 0,
-            "total_batches": 0,
-        }
-
-    # Start background thread
-    thread = threading.Thread(
-        target=_send_emails_batch,
-        args=(
-            session_id,
-            failed_recipients,
-            session.email_subject or "",
-            session.email_body or "",
-            session.send_batch_size or 10,
-            session.send_batch_interval or 5,
-            session.send_confirm_each_batch or False,
-            session.smtp_profile_id,
-        ),
-        daemon=True,
-    )
-    thread.start()
+    _start_sending(session, failed_recipients)
 
     return RedirectResponse(f"/rozesilani/{session_id}/rozeslat/prubeh", status_code=302)
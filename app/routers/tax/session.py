@@ -1,8 +1,6 @@
 from __future__ import annotations
 
 import shutil
-import threading
-import time as _time
 from datetime import datetime
 from html import escape
 from io import BytesIO
@@ -28,10 +26,9 @@ from app.utils import UPLOAD_LIMITS, build_list_url, excel_auto_width, is_htmx_p
 
 from ._helpers import (
     logger, templates,
-    _processing_progress, _processing_lock,
     _TAX_WIZARD_STEPS, _tax_wizard, _session_stats, _unit_by_number,
 )
-from .processing import _process_tax_files
+from .processing import start_tax_processing
 
 router = APIRouter()
 
@@ -250,24 +247,7 @@ async def tax_create(
                  description=f"Nahráno {len(saved_files)} PDF souborů")
     db.commit()
 
-    # Initialize progress tracker
-    with _processing_lock:
-        _processing_progress[session.id] = {
-            "total": len(saved_files),
-            "current": 0,
-            "current_file": "",
-            "done": False,
-            "error": None,
-            "started_at": _time.monotonic(),
-        }
-
-    # Start background processing thread
-    thread = threading.Thread(
-        target=_process_tax_files,
-        args=(session.id, saved_files, year),
-        daemon=True,
-    )
-    thread.start()
+    start_tax_processing(session.id, saved_files, year)
 
     return RedirectResponse(f"/rozesilani/{session.id}/zpracovani", status_code=302)
 
@@ -363,24 +343,7 @@ async def tax_upload_additional(
 
     db.commit()
 
-    # Initialize progress tracker
-    with _processing_lock:
-        _processing_progress[session_id] = {
-            "total": len(saved_files),
-            "current": 0,
-            "current_file": "",
-            "done": False,
-            "error": None,
-            "started_at": _time.monotonic(),
-        }
-
-    # Start background processing thread
-    thread = threading.Thread(
-        target=_process_tax_files,
-        args=(session_id, saved_files, session.year),
-        daemon=True,
-    )
-    thread.start()
+    start_tax_processing(session_id, saved_files, session.year)
 
     return RedirectResponse(f"/rozesilani/{session_id}/zpracovani", status_code=302)
 
@@ -2,10 +2,11 @@ from __future__ import annotations
 
 import logging
 
-from sqlalchemy import func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import String, func, select, type_coerce
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from app.models import Owner, OwnerType, Space, SpaceTenant, Tenant
+from app.models import OwnerType, Space, SpaceTenant, Tenant
+from app.services.search_index import search_filter
 from app.utils import strip_diacritics, templates
 
 logger = logging.getLogger(__name__)
@@ -56,21 +57,37 @@ def find_existing_tenant(
     return None
 
 
+# Počet nájemců na jednu stránku tabulky (další se dotahují při scrollu)
+TENANT_PAGE_SIZE = 100
+
+# Řazení v SQL — jméno, typ, kontakty se berou z navázaného vlastníka
+# (hybridy na Tenant), prostor/nájemné z aktivních nájmů. Výrazy jsou bez NULL,
+# takže slouží i jako klíč keyset stránkování.
+_ACTIVE_RELS = (SpaceTenant.tenant_id == Tenant.id) & (SpaceTenant.is_active == True)  # noqa: E712
+
 SORT_COLUMNS = {
-    "name": None,  # Python-side — resolved from owner or own fields
-    "type": None,  # Python-side — resolved type
-    "phone": None,  # Python-side — resolved phone
-    "email": None,  # Python-side — resolved email
-    "space": None,  # Python-side — active space number
-    "rent": None,  # Python-side — active rent
+    "name": Tenant.resolved_name_normalized,
+    "type": func.coalesce(type_coerce(Tenant.resolved_type, String), OwnerType.PHYSICAL.name),
+    "phone": Tenant.resolved_phone,
+    "email": Tenant.resolved_email,
+    "space": func.coalesce(
+        select(func.min(Space.space_number))
+        .select_from(SpaceTenant).join(Space, Space.id == SpaceTenant.space_id)
+        .where(_ACTIVE_RELS).scalar_subquery(),
+        0,
+    ),
+    "rent": func.coalesce(
+        select(func.sum(SpaceTenant.monthly_rent)).where(_ACTIVE_RELS).scalar_subquery(),
+        0,
+    ),
 }
 
 
-def _filter_tenants(db: Session, q="", typ="", stav="", sort="name", order="asc"):
-    """Filter and sort tenants. Returns list[Tenant] with eager-loaded relations."""
+def _filter_tenants(db: Session, q="", typ="", stav=""):
+    """SQL dotaz na nájemce podle filtrů (bez řazení) s eager-loaded relacemi."""
     query = db.query(Tenant).options(
         joinedload(Tenant.owner),
-        joinedload(Tenant.spaces).joinedload(SpaceTenant.space),
+        selectinload(Tenant.spaces).joinedload(SpaceTenant.space),
     )
 
     if stav == "active":
@@ -79,64 +96,27 @@ def _filter_tenants(db: Session, q="", typ="", stav="", sort="name", order="asc"
         query = query.filter(Tenant.is_active == False)  # noqa: E712
 
     if typ == "physical":
-        query = query.filter(
-            ((Tenant.owner_id.isnot(None)) & Tenant.owner.has(Owner.owner_type == OwnerType.PHYSICAL))
-            | ((Tenant.owner_id.is_(None)) & (Tenant.tenant_type == OwnerType.PHYSICAL))
-        )
+        query = query.filter(Tenant.resolved_type == OwnerType.PHYSICAL)
     elif typ == "legal":
-        query = query.filter(
-            ((Tenant.owner_id.isnot(None)) & Tenant.owner.has(Owner.owner_type == OwnerType.LEGAL_ENTITY))
-            | ((Tenant.owner_id.is_(None)) & (Tenant.tenant_type == OwnerType.LEGAL_ENTITY))
-        )
+        query = query.filter(Tenant.resolved_type == OwnerType.LEGAL_ENTITY)
     elif typ == "linked":
         query = query.filter(Tenant.owner_id.isnot(None))
     elif typ == "standalone":
         query = query.filter(Tenant.owner_id.is_(None))
 
-    tenants = query.all()
+    if q:
+        # FTS5 index (bez FTS5 LIKE) — jméno/kontakty/RČ/IČ z navázaného vlastníka i vlastní, prostory
+        query = query.filter(search_filter(Tenant, "tenant", q))
 
-    # Deduplikace — joinedload na spaces může vrátit duplicity
-    seen_ids = set()
-    unique_tenants = []
-    for t in tenants:
-        if t.id not in seen_ids:
-            seen_ids.add(t.id)
-            unique_tenants.append(t)
-    tenants = unique_tenants
+    return query
 
-    # Text search (Python-side for resolved fields)
-    if q:
-        search_ascii = strip_diacritics(q)
-        filtered = []
-        for t in tenants:
-            if (search_ascii in (t.resolved_name_normalized or "")
-                    or q.lower() in (t.resolved_email or "").lower()
-                    or q in (t.resolved_phone or "")
-                    or q in (t.resolved_birth_number or "")
-                    or q in (t.resolved_company_id or "")):
-                filtered.append(t)
-            else:
-                # Search in designation of any active space
-                for sr in t.active_space_rels:
-                    if sr.space and q.lower() in (sr.space.designation or "").lower():
-                        filtered.append(t)
-                        break
-        tenants = filtered
-
-    # Python-side sort — cache active rels per tenant (property je neindexovaná)
-    rels_cache = {t.id: t.active_space_rels for t in tenants}
-    sort_fns = {
-        "name": lambda t: t.resolved_name_normalized or "",
-        "type": lambda t: (t.resolved_type or OwnerType.PHYSICAL).value,
-        "phone": lambda t: t.resolved_phone or "",
-        "email": lambda t: t.resolved_email or "",
-        "space": lambda t: (rels_cache[t.id][0].space.space_number if rels_cache[t.id] else 0),
-        "rent": lambda t: sum((sr.monthly_rent or 0) for sr in rels_cache[t.id]),
-    }
-    fn = sort_fns.get(sort, sort_fns["name"])
-    tenants.sort(key=fn, reverse=(order == "desc"))
 
-    return tenants
+def _sorted_tenants(query, sort="name", order="asc"):
+    """Seřadit dotaz z ``_filter_tenants`` v SQL (tiebreaker id). Vrací list[Tenant]."""
+    sort_expr = SORT_COLUMNS.get(sort, SORT_COLUMNS["name"])
+    if order == "desc":
+        return query.order_by(sort_expr.desc(), Tenant.id.desc()).all()
+    return query.order_by(sort_expr.asc(), Tenant.id.asc()).all()
 
 
 def _tenant_stats(db: Session):
@@ -146,15 +126,9 @@ def _tenant_stats(db: Session):
     linked = db.query(Tenant).filter(Tenant.owner_id.isnot(None)).count()
     standalone = total - linked
 
-    # FO/PO — musíme brát resolved type (z Owner pokud propojený, jinak tenant_type)
-    physical = db.query(Tenant).filter(
-        ((Tenant.owner_id.isnot(None)) & Tenant.owner.has(Owner.owner_type == OwnerType.PHYSICAL))
-        | ((Tenant.owner_id.is_(None)) & (Tenant.tenant_type == OwnerType.PHYSICAL))
-    ).count()
-    legal = db.query(Tenant).filter(
-        ((Tenant.owner_id.isnot(None)) & Tenant.owner.has(Owner.owner_type == OwnerType.LEGAL_ENTITY))
-        | ((Tenant.owner_id.is_(None)) & (Tenant.tenant_type == OwnerType.LEGAL_ENTITY))
-    ).count()
+    # FO/PO — resolved type (z Owner pokud propojený, jinak tenant_type)
+    physical = db.query(Tenant).filter(Tenant.resolved_type == OwnerType.PHYSICAL).count()
+    legal = db.query(Tenant).filter(Tenant.resolved_type == OwnerType.LEGAL_ENTITY).count()
 
     return {
         "total": total,
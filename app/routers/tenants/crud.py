@@ -1,22 +1,21 @@
-import csv
-import io
 from datetime import datetime
-from io import BytesIO
+from urllib.parse import urlencode
 
 from fastapi import APIRouter, Depends, Form, Query, Request
 from fastapi.responses import RedirectResponse, Response
-from openpyxl import Workbook
-from openpyxl.styles import Font
 from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
 from app.models import ActivityAction, Owner, OwnerType, Space, SpaceTenant, Tenant, log_activity
+from app.services.streaming_export import export_response
 from app.utils import (
-    build_list_url, build_name_with_titles, excel_auto_width,
-    is_htmx_partial, is_valid_email, strip_diacritics, templates, utcnow,
+    build_name_with_titles,
+    is_htmx_partial, is_valid_email, keyset_page, strip_diacritics, templates, utcnow,
 )
 
-from ._helpers import _filter_tenants, _tenant_stats, logger
+from ._helpers import (
+    SORT_COLUMNS, TENANT_PAGE_SIZE, _filter_tenants, _sorted_tenants, _tenant_stats, logger,
+)
 
 router = APIRouter()
 
@@ -488,17 +487,35 @@ async def tenant_list(
     order: str = Query("asc", alias="order"),
     back: str = Query("", alias="back"),
     flash: str = Query("", alias="flash"),
+    cursor: str = Query(""),
     db: Session = Depends(get_db),
 ):
-    """Seznam nájemců s filtry, hledáním a řazením."""
-    tenants = _filter_tenants(db, q, typ, stav, sort, order)
+    """Seznam nájemců s filtry, hledáním a řazením.
+
+    Filtrování, řazení i stránkování běží v SQL — další stránky si tabulka
+    dotahuje HTMX požadavkem (``cursor``) při doscrollování na konec.
+    """
+    tenant_query = _filter_tenants(db, q, typ, stav)
+    if sort not in SORT_COLUMNS:
+        sort = "name"
+    tenants, next_cursor = keyset_page(
+        tenant_query, SORT_COLUMNS[sort], Tenant.id, cursor,
+        descending=(order == "desc"), page_size=TENANT_PAGE_SIZE,
+    )
 
-    list_url = build_list_url(request)
+    # Back links and next-page URL never carry the cursor of the current page
+    params = [(k, v) for k, v in request.query_params.multi_items() if k != "cursor"]
+    list_url = request.url.path + ("?" + urlencode(params) if params else "")
+    next_page_url = ""
+    if next_cursor:
+        next_page_url = request.url.path + "?" + urlencode(params + [("cursor", next_cursor)])
 
     if is_htmx_partial(request):
         return templates.TemplateResponse(request, "tenants/partials/_tbody.html", {
             "tenants": tenants,
             "list_url": list_url,
+            "next_page_url": next_page_url,
+            "q": q,
         })
 
     stats = _tenant_stats(db)
@@ -511,6 +528,8 @@ async def tenant_list(
         "active_nav": "tenants",
         "tenants": tenants,
         "list_url": list_url,
+        "next_page_url": next_page_url,
+        "filtered_count": tenant_query.order_by(None).count(),
         "back_url": back,
         "q": q,
         "typ": typ,
@@ -539,7 +558,7 @@ async def tenant_export(
     if fmt not in ("xlsx", "csv"):
         return RedirectResponse("/najemci", status_code=302)
 
-    tenants = _filter_tenants(db, q, typ, stav, sort, order)
+    tenants = _sorted_tenants(_filter_tenants(db, q, typ, stav), sort, order)
 
     headers = ["Jméno", "Propojení", "Typ", "RČ/IČ", "Telefon", "Email", "Prostor", "Nájemné", "VS"]
     type_labels = {"physical": "FO", "legal": "PO"}
@@ -576,44 +595,8 @@ async def tenant_export(
         suffix = "_vsichni"
     filename = f"najemci{suffix}_{timestamp}"
 
-    if fmt == "xlsx":
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Nájemci"
-        bold = Font(bold=True)
-
-        for col, h in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=h)
-            cell.font = bold
-
-        row_idx = 2
-        for t in tenants:
-            for row in _rows_for(t):
-                for col_idx, val in enumerate(row, 1):
-                    ws.cell(row=row_idx, column=col_idx, value=val)
-                row_idx += 1
-
-        excel_auto_width(ws)
-
-        buf = BytesIO()
-        wb.save(buf)
-        return Response(
-            content=buf.getvalue(),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f'attachment; filename="{filename}.xlsx"'},
-        )
-    else:
-        buf = io.StringIO()
-        writer = csv.writer(buf, delimiter=";")
-        writer.writerow(headers)
-        for t in tenants:
-            for row in _rows_for(t):
-                writer.writerow(row)
-        return Response(
-            content=buf.getvalue().encode("utf-8-sig"),
-            media_type="text/csv; charset=utf-8",
-            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'},
-        )
+    rows = (row for t in tenants for row in _rows_for(t))
+    return export_response(fmt, filename, headers, rows, sheet_title="Nájemci")
 
 
 # ── Detail (catch-all — must be last) ─────────────────────────────────
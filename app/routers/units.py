@@ -8,7 +8,7 @@ from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from markupsafe import escape
 from openpyxl import Workbook
 from openpyxl.styles import Font
-from sqlalchemy import cast, func, String
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
@@ -16,6 +16,8 @@ from app.models import ActivityAction, Owner, OwnerUnit, SvjInfo, Unit, UnitBala
 from app.routers.payments._helpers import compute_debt_map
 from app.services.code_list_service import get_all_code_lists
 from app.services.owner_exchange import recalculate_unit_votes
+from app.services.page_cache import OWNERSHIP_TABLES, PAYMENT_TABLES, cached_page
+from app.services.search_index import search_filter
 from app.utils import build_list_url, excel_auto_width, is_htmx_partial, strip_diacritics, templates, utcnow
 
 router = APIRouter()
@@ -410,16 +412,7 @@ def _filter_units(db: Session, q="", typ="", sekce="", sort="unit_number", order
     )
 
     if q:
-        search = f"%{q}%"
-        search_ascii = f"%{strip_diacritics(q)}%"
-        query = query.filter(
-            cast(Unit.unit_number, String).ilike(search)
-            | Unit.building_number.ilike(search)
-            | Unit.space_type.ilike(search)
-            | Unit.section.ilike(search)
-            | Unit.address.ilike(search)
-            | Unit.owners.any(OwnerUnit.owner.has(Owner.name_normalized.like(search_ascii)))
-        )
+        query = query.filter(search_filter(Unit, "unit", q))
     if typ:
         query = query.filter(Unit.space_type == typ)
     if sekce:
@@ -451,6 +444,7 @@ def _filter_units(db: Session, q="", typ="", sekce="", sort="unit_number", order
 
 
 @router.get("/")
+@cached_page(*OWNERSHIP_TABLES, *PAYMENT_TABLES)
 async def unit_list(
     request: Request,
     q: str = Query("", alias="q"),
@@ -1,11 +1,12 @@
 import logging
 
-from sqlalchemy import func
+from sqlalchemy import String, case, func, select, type_coerce
 from sqlalchemy.orm import Session
 
 from app.models import (
-    Ballot, BallotStatus, BallotVote, SvjInfo, VotingStatus,
+    Ballot, BallotStatus, BallotVote, Owner, VotingStatus, VoteValue,
 )
+from app.services import reference_data
 from app.utils import build_wizard_steps, templates
 
 
@@ -65,10 +66,57 @@ def _voting_wizard(voting, current_step: int = None) -> dict:
     }
 
 
+# Počet lístků na jednu stránku tabulky (další se dotahují při scrollu)
+BALLOT_PAGE_SIZE = 100
+
+# Pořadí hlasů při řazení podle bodu: PRO, PROTI, Zdržel, neplatný, bez hlasu
+_VOTE_SORT_RANK = case(
+    (BallotVote.vote == VoteValue.FOR, 0),
+    (BallotVote.vote == VoteValue.AGAINST, 1),
+    (BallotVote.vote == VoteValue.ABSTAIN, 2),
+    else_=3,
+)
+
+
+def _ballot_sort_expr(sort: str):
+    """SQL sort expression for a ballot list column, or None for unknown sort key.
+
+    Expressions are NULL-free so they can serve as keyset pagination keys.
+    ``bod_<item_id>`` sorts by the vote for that item via a correlated subquery.
+    """
+    if sort == "owner":
+        return func.coalesce(Owner.name_normalized, "")
+    if sort == "units":
+        return func.coalesce(Ballot.units_text, "")
+    if sort == "votes":
+        return func.coalesce(Ballot.total_votes, 0)
+    if sort == "proxy":
+        return func.coalesce(Ballot.proxy_holder_name, "")
+    if sort == "status":
+        return func.coalesce(type_coerce(Ballot.status, String), "")
+    if sort.startswith("bod_"):
+        try:
+            item_id = int(sort[4:])
+        except ValueError:
+            logger.debug("Invalid item_id in sort key: '%s'", sort)
+            return None
+        vote_rank = (
+            select(_VOTE_SORT_RANK)
+            .where(
+                BallotVote.ballot_id == Ballot.id,
+                BallotVote.voting_item_id == item_id,
+                BallotVote.vote.isnot(None),
+            )
+            .limit(1)
+            .scalar_subquery()
+        )
+        return func.coalesce(vote_rank, 4)
+    return None
+
+
 def _get_declared_shares(db: Session) -> int:
     """Get total declared shares from SVJ administration settings."""
-    svj_info = db.query(SvjInfo).first()
-    return svj_info.total_shares if svj_info and svj_info.total_shares else 0
+    return reference_data.declared_shares(db)
 
 
 def _ballot_stats(voting, db: Session):
@@ -1,21 +1,24 @@
 
 from io import BytesIO
 from pathlib import Path
+from urllib.parse import urlencode
 
 from fastapi import APIRouter, Depends, Query, Request
 from fastapi.responses import FileResponse, RedirectResponse, Response
 from openpyxl import Workbook
 from openpyxl.styles import Font
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, contains_eager, joinedload, selectinload
 
 from app.database import get_db
 from app.models import (
     Ballot, BallotStatus, BallotVote, Owner, OwnerUnit, Voting,
     VotingStatus, VoteValue,
 )
-from app.utils import build_list_url, excel_auto_width, is_htmx_partial, strip_diacritics, utcnow
+from app.utils import build_list_url, excel_auto_width, is_htmx_partial, keyset_page, strip_diacritics, utcnow
 
 from ._helpers import (
+    BALLOT_PAGE_SIZE,
+    _ballot_sort_expr,
     _ballot_stats,
     _voting_wizard,
     logger,
@@ -35,20 +38,24 @@ async def ballot_list(
     sort: str = Query("owner"),
     order: str = Query("asc"),
     back: str = Query(""),
+    cursor: str = Query(""),
     db: Session = Depends(get_db),
 ):
-    """Seznam hlasovacích lístků s filtry podle stavu."""
+    """Seznam hlasovacích lístků s filtry podle stavu.
+
+    Stránkuje se přes keyset (``cursor``) — další stránky si tabulka
+    dotahuje HTMX požadavkem při doscrollování na konec.
+    """
     voting = db.query(Voting).options(
         joinedload(Voting.items),
     ).get(voting_id)
     if not voting:
         return RedirectResponse("/hlasovani", status_code=302)
 
-    # SQL-based ballot query with filters
-    needs_owner_join = False
-    ballot_query = db.query(Ballot).options(
-        joinedload(Ballot.owner).joinedload(Owner.units).joinedload(OwnerUnit.unit),
-        joinedload(Ballot.votes),
+    # Owner join is always present — owner sort and search both need it
+    ballot_query = db.query(Ballot).join(Ballot.owner).options(
+        contains_eager(Ballot.owner).selectinload(Owner.units).joinedload(OwnerUnit.unit),
+        selectinload(Ballot.votes),
     ).filter(Ballot.voting_id == voting_id)
 
     # Filter by status (SQL)
@@ -63,78 +70,58 @@ async def ballot_list(
     if q:
         q_ascii = strip_diacritics(q)
         q_pattern = f"%{q_ascii}%"
-        ballot_query = ballot_query.join(Ballot.owner).filter(
-            Owner.name_normalized.like(q_pattern)
-        )
-        needs_owner_join = True
-
-    # SQL sort for simple columns
-    BALLOT_SORT_SQL = {"owner", "votes", "status"}
-    if sort in BALLOT_SORT_SQL:
-        if sort == "owner":
-            if not needs_owner_join:
-                ballot_query = ballot_query.join(Ballot.owner)
-            col = Owner.name_normalized
-        elif sort == "votes":
-            col = Ballot.total_votes
-        else:
-            col = Ballot.status
-        ballot_query = ballot_query.order_by(
-            col.desc().nulls_last() if order == "desc" else col.asc().nulls_last()
-        )
-
-    ballots = ballot_query.all()
-
-    # Python-side sort for complex keys (units, proxy, vote columns)
-    if sort not in BALLOT_SORT_SQL:
-        sort_keys = {
-            "units": lambda b: b.units_text or "",
-            "proxy": lambda b: (b.proxy_holder_name or ""),
-        }
-        if sort.startswith("bod_"):
-            try:
-                item_id = int(sort[4:])
-                vote_order = {"for": 0, "against": 1, "abstain": 2}
-                sort_keys[sort] = lambda b, _iid=item_id: next(
-                    (vote_order.get(bv.vote.value, 3) for bv in b.votes if bv.voting_item_id == _iid and bv.vote),
-                    4,
-                )
-            except ValueError:
-                logger.debug("Invalid item_id in sort key: '%s'", sort)
-        key_fn = sort_keys.get(sort, lambda b: (b.owner.name_normalized or ""))
-        ballots = sorted(ballots, key=key_fn, reverse=(order == "desc"))
+        ballot_query = ballot_query.filter(Owner.name_normalized.like(q_pattern))
 
-    list_url = build_list_url(request)
+    sort_expr = _ballot_sort_expr(sort)
+    if sort_expr is None:
+        sort = "owner"
+        sort_expr = _ballot_sort_expr(sort)
 
-    back_url = back or "/hlasovani"
-    back_label = (
-        "Zpět na přehled" if back == "/"
-        else "Zpět na hlasování"
+    ballots, next_cursor = keyset_page(
+        ballot_query, sort_expr, Ballot.id, cursor,
+        descending=(order == "desc"), page_size=BALLOT_PAGE_SIZE,
     )
 
-    has_processed = voting.has_processed_ballots
+    # Back links and next-page URL never carry the cursor of the current page
+    params = [(k, v) for k, v in request.query_params.multi_items() if k != "cursor"]
+    list_url = request.url.path + ("?" + urlencode(params) if params else "")
+    next_page_url = ""
+    if next_cursor:
+        next_page_url = request.url.path + "?" + urlencode(params + [("cursor", next_cursor)])
+
     ctx = {
-        "request": request,
         "active_nav": "voting",
         "voting": voting,
         "ballots": ballots,
+        "next_page_url": next_page_url,
+        "list_url": list_url,
+    }
+
+    # HTMX partial (search or next page): return only the rows
+    if is_htmx_partial(request):
+        return templates.TemplateResponse(request, "voting/ballots_table.html", ctx)
+
+    back_url = back or "/hlasovani"
+    back_label = (
+        "Zpět na přehled" if back == "/"
+        else "Zpět na hlasování"
+    )
+
+    stats = _ballot_stats(voting, db)
+    has_processed = stats["status_counts"][BallotStatus.PROCESSED.value] > 0
+    ctx.update({
         "current_stav": stav,
         "active_bubble": stav or "all",
         "show_close_voting": has_processed,
         "q": q,
         "sort": sort,
         "order": order,
-        "list_url": list_url,
         "back_url": back_url,
         "back_label": back_label,
-        **_ballot_stats(voting, db),
+        "filtered_count": ballot_query.order_by(None).count(),
+        **stats,
         **_voting_wizard(voting, 4 if has_processed else 3),
-    }
-
-    # HTMX partial: return only the table
-    if is_htmx_partial(request):
-        return templates.TemplateResponse(request, "voting/ballots_table.html", ctx)
-
+    })
     return templates.TemplateResponse(request, "voting/ballots.html", ctx)
 
 
@@ -16,6 +16,7 @@ from app.models import (
 )
 from app.services.voting_import import (
     read_excel_headers, preview_voting_import, execute_voting_import, validate_mapping,
+    discard_parsed_rows,
 )
 from app.utils import UPLOAD_LIMITS, build_import_wizard, is_safe_path, utcnow, validate_upload
 
@@ -303,7 +304,8 @@ async def import_confirm(
     # Single atomic commit for all changes
     db.commit()
 
-    # Clean up uploaded Excel file after successful commit
+    # Clean up uploaded Excel file (and its parsed rows) after successful commit
+    discard_parsed_rows(file_path)
     try:
         Path(file_path).unlink(missing_ok=True)
     except Exception:
@@ -1,14 +1,12 @@
 import shutil
 from datetime import date, datetime
-from io import BytesIO
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, File, Form, Query, Request, UploadFile
-from fastapi.responses import JSONResponse, RedirectResponse, Response
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font, PatternFill
+from fastapi.responses import JSONResponse, RedirectResponse
+from openpyxl.styles import Font, PatternFill
 from sqlalchemy import case, func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, contains_eager, joinedload, selectinload
 
 from app.config import settings
 from app.database import get_db
@@ -17,8 +15,10 @@ from app.models import (
     VotingItem, VotingStatus, VoteValue,
     ActivityAction, log_activity,
 )
+from app.services.page_cache import OWNERSHIP_TABLES, VOTING_TABLES, cached_page
+from app.services.streaming_export import Styled, export_response
 from app.services.word_parser import extract_voting_items, extract_voting_metadata
-from app.utils import UPLOAD_LIMITS, build_list_url, excel_auto_width, is_htmx_partial, strip_diacritics, utcnow, validate_upload
+from app.utils import UPLOAD_LIMITS, build_list_url, is_htmx_partial, strip_diacritics, utcnow, validate_upload
 
 from ._helpers import (
     _VOTING_WIZARD_STEPS,
@@ -327,6 +327,7 @@ async def voting_create(
 
 
 @router.get("/{voting_id}")
+@cached_page(*VOTING_TABLES, *OWNERSHIP_TABLES)
 async def voting_detail(
     voting_id: int,
     request: Request,
@@ -702,32 +703,28 @@ async def update_voting_status(
 @router.get("/{voting_id}/exportovat")
 async def voting_export(voting_id: int, stav: str = "", db: Session = Depends(get_db)):
     """Export voting results to Excel. Optional stav filter: generated, sent, processed (default all processed)."""
-    voting = db.query(Voting).options(
-        joinedload(Voting.items),
-        joinedload(Voting.ballots).joinedload(Ballot.owner),
-        joinedload(Voting.ballots).joinedload(Ballot.votes),
-    ).get(voting_id)
+    voting = db.query(Voting).options(joinedload(Voting.items)).get(voting_id)
     if not voting:
         return RedirectResponse("/hlasovani", status_code=302)
 
     declared = _get_declared_shares(db) or 1
     items = sorted(voting.items, key=lambda i: i.order)
 
-    # Filter ballots by status
+    # Filter ballots by status — streamed from DB, sorted by owner name
     status_filter = {
         "generated": BallotStatus.GENERATED,
         "sent": BallotStatus.SENT,
         "processed": BallotStatus.PROCESSED,
     }
+    ballots = (
+        db.query(Ballot)
+        .join(Owner, Ballot.owner_id == Owner.id)
+        .options(contains_eager(Ballot.owner), selectinload(Ballot.votes))
+        .filter(Ballot.voting_id == voting.id)
+        .order_by(func.coalesce(Owner.name_normalized, ""), Ballot.id)
+    )
     if stav and stav in status_filter:
-        processed = [b for b in voting.ballots if b.status == status_filter[stav]]
-    else:
-        processed = list(voting.ballots)
-    processed.sort(key=lambda b: (b.owner.name_normalized or ""))
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Výsledky hlasování"
+        ballots = ballots.filter(Ballot.status == status_filter[stav])
 
     bold = Font(bold=True)
     header_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
@@ -735,72 +732,58 @@ async def voting_export(voting_id: int, stav: str = "", db: Session = Depends(ge
     red_fill = PatternFill(start_color="FCE4EC", end_color="FCE4EC", fill_type="solid")
 
     # Disclaimer for active votings
-    start_row = 1
+    preamble = None
     if voting.status != VotingStatus.CLOSED:
-        warn_cell = ws.cell(row=1, column=1,
-                            value=f"Průběžné výsledky ke dni {utcnow().strftime('%d.%m.%Y')} — hlasování stále probíhá")
-        warn_cell.font = Font(bold=True, color="FF6600")
-        warn_cell.alignment = Alignment(wrap_text=False)
-        ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=6)
-        start_row = 3
-
-    # Header row
+        preamble = [
+            [Styled(f"Průběžné výsledky ke dni {utcnow().strftime('%d.%m.%Y')} — hlasování stále probíhá",
+                    font=Font(bold=True, color="FF6600"))],
+            [],
+        ]
+
     headers = ["Vlastník", "Jednotky", "Hlasy"]
     for item in items:
         headers.append(f"Bod {item.order}: {item.title}")
-    for col, h in enumerate(headers, 1):
-        cell = ws.cell(row=start_row, column=col, value=h)
-        cell.font = bold
-        cell.fill = header_fill
 
-    # Data rows
+    # Totals per item accumulated while rows stream out
+    totals = {item.id: {VoteValue.FOR: 0, VoteValue.AGAINST: 0} for item in items}
     vote_labels = {"for": "PRO", "against": "PROTI", "abstain": "Zdržel se", "invalid": "Neplatný"}
-    for row_idx, ballot in enumerate(processed, start_row + 1):
-        ws.cell(row=row_idx, column=1, value=ballot.shared_owners_text or ballot.owner.display_name)
-        ws.cell(row=row_idx, column=2, value=ballot.units_text or "")
-        ws.cell(row=row_idx, column=3, value=ballot.total_votes)
-        for item_idx, item in enumerate(items):
-            bv = next((v for v in ballot.votes if v.voting_item_id == item.id), None)
-            if bv and bv.vote:
-                cell = ws.cell(row=row_idx, column=4 + item_idx, value=vote_labels.get(bv.vote.value, ""))
-                if bv.vote == VoteValue.FOR:
-                    cell.fill = green_fill
-                elif bv.vote == VoteValue.AGAINST:
-                    cell.fill = red_fill
-            else:
-                ws.cell(row=row_idx, column=4 + item_idx, value="—")
-
-    # Summary row
-    summary_row = start_row + len(processed) + 2
-    ws.cell(row=summary_row, column=1, value="CELKEM").font = bold
-    for item_idx, item in enumerate(items):
-        votes_for = sum(
-            bv.votes_count for b in processed for bv in b.votes
-            if bv.voting_item_id == item.id and bv.vote == VoteValue.FOR
-        )
-        votes_against = sum(
-            bv.votes_count for b in processed for bv in b.votes
-            if bv.voting_item_id == item.id and bv.vote == VoteValue.AGAINST
-        )
-        pct_for = round(votes_for / declared * 100, 2) if declared else 0
-        pct_against = round(votes_against / declared * 100, 2) if declared else 0
-        cell = ws.cell(row=summary_row, column=4 + item_idx,
-                       value=f"PRO: {votes_for} ({pct_for}%) | PROTI: {votes_against} ({pct_against}%)")
-        cell.font = bold
 
-    excel_auto_width(ws)
+    def _rows():
+        for ballot in ballots.yield_per(500):
+            votes = {v.voting_item_id: v for v in ballot.votes}
+            row = [ballot.shared_owners_text or ballot.owner.display_name, ballot.units_text or "", ballot.total_votes]
+            for item in items:
+                bv = votes.get(item.id)
+                if bv and bv.vote:
+                    if bv.vote in totals[item.id]:
+                        totals[item.id][bv.vote] += bv.votes_count or 0
+                    fill = green_fill if bv.vote == VoteValue.FOR else red_fill if bv.vote == VoteValue.AGAINST else None
+                    row.append(Styled(vote_labels.get(bv.vote.value, ""), fill=fill))
+                else:
+                    row.append("—")
+            yield row
+
+    def _summary():
+        row = [Styled("CELKEM", font=bold), None, None]
+        for item in items:
+            votes_for = totals[item.id][VoteValue.FOR]
+            votes_against = totals[item.id][VoteValue.AGAINST]
+            pct_for = round(votes_for / declared * 100, 2) if declared else 0
+            pct_against = round(votes_against / declared * 100, 2) if declared else 0
+            row.append(Styled(
+                f"PRO: {votes_for} ({pct_for}%) | PROTI: {votes_against} ({pct_against}%)", font=bold,
+            ))
+        return [[], row]
 
-    buf = BytesIO()
-    wb.save(buf)
     timestamp = utcnow().strftime("%Y%m%d")
     stav_labels = {"generated": "nezpracovane", "sent": "odeslane", "processed": "zpracovane"}
     stav_suffix = f"_{stav_labels[stav]}" if stav and stav in stav_labels else "_vsechny"
-    filename = f"hlasovani_{voting.id}{stav_suffix}_{timestamp}.xlsx"
+    filename = f"hlasovani_{voting.id}{stav_suffix}_{timestamp}"
 
-    return Response(
-        content=buf.getvalue(),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    return export_response(
+        "xlsx", filename, headers, _rows(),
+        sheet_title="Výsledky hlasování", header_fill=header_fill,
+        preamble=preamble, merge_preamble=6 if preamble else 0, footer=_summary,
     )
 
 
@@ -4,6 +4,7 @@ import logging
 import re
 from collections import defaultdict
 from datetime import date, datetime
+from functools import lru_cache
 
 from app.models import MeterType
 from app.utils import templates
@@ -92,6 +93,7 @@ def parse_unit_label(label: str) -> tuple[int | None, str, str]:
     return None, "", ""
 
 
+@lru_cache(maxsize=4096)
 def normalize_unit_label(label: str) -> str:
     """Normalize unit label to canonical form with consistent spacing.
 
@@ -144,21 +146,19 @@ def parse_techem_xls(file_path: str, mapping: dict | None = None,
         unit_label, unit_number, unit_letter, meter_serial,
         meter_type, location, user_name, readings: [{date, value}, ...]
     """
-    import xlrd
+    from app.services.parsed_upload import get_parsed_upload
 
-    book = xlrd.open_workbook(file_path)
-    if sheet_name and sheet_name in book.sheet_names():
-        sheet = book.sheet_by_name(sheet_name)
-    else:
-        sheet = book.sheet_by_index(0)
+    # Řádky listu z cache rozparsovaného uploadu (xlrd row_values, 1-based)
+    parsed = get_parsed_upload(file_path)
+    grid = parsed.rows(parsed.resolve_sheet(sheet_name))
 
-    header_idx = header_row - 1  # xlrd is 0-based
+    header_idx = header_row - 1  # grid is 0-based
     data_start = header_row      # data starts on next row (0-based = header_row)
 
-    if sheet.nrows <= data_start:
+    if len(grid) <= data_start:
         return []
 
-    headers = [str(sheet.cell_value(header_idx, c)).strip() for c in range(sheet.ncols)]
+    headers = [str(c).strip() for c in grid[header_idx]]
 
     # Resolve column indices from mapping or auto-detect
     col = {}
@@ -208,26 +208,27 @@ def parse_techem_xls(file_path: str, mapping: dict | None = None,
     date_columns.sort(key=lambda x: x[1])
 
     rows = []
-    for r in range(data_start, sheet.nrows):
+    for values in grid[data_start:]:
+
         # Unit label
         unit_idx = col.get("unit_label", 7)
-        raw_label = str(sheet.cell_value(r, unit_idx)).strip()
+        raw_label = str(values[unit_idx]).strip()
         unit_number, unit_letter, unit_suffix = parse_unit_label(raw_label)
 
         # User name
         name_idx = col.get("user_name", 1)
-        user_name = str(sheet.cell_value(r, name_idx)).strip()
+        user_name = str(values[name_idx]).strip()
 
         # Meter serial
         serial_idx = col.get("meter_serial", 11)
-        meter_serial = str(sheet.cell_value(r, serial_idx)).strip()
+        meter_serial = str(values[serial_idx]).strip()
         # Remove trailing .0 from numbers read as float
         if meter_serial.endswith(".0"):
             meter_serial = meter_serial[:-2]
 
         # Meter type
         type_idx = col.get("meter_type", 10)
-        raw_type = str(sheet.cell_value(r, type_idx)).strip().upper()
+        raw_type = str(values[type_idx]).strip().upper()
         if "SV" in raw_type or "STUD" in raw_type:
             meter_type = "cold"
         elif "TV" in raw_type or "TEPL" in raw_type:
@@ -237,7 +238,7 @@ def parse_techem_xls(file_path: str, mapping: dict | None = None,
 
         # Location
         loc_idx = col.get("location")
-        location = str(sheet.cell_value(r, loc_idx)).strip() if loc_idx is not None else ""
+        location = str(values[loc_idx]).strip() if loc_idx is not None else ""
 
         # Skip rows without meter serial
         if not meter_serial:
@@ -246,7 +247,7 @@ def parse_techem_xls(file_path: str, mapping: dict | None = None,
         # Parse monthly readings
         readings = []
         for col_idx, col_date in date_columns:
-            raw_val = sheet.cell_value(r, col_idx)
+            raw_val = values[col_idx]
             if isinstance(raw_val, (int, float)) and raw_val != 0:
                 readings.append({"date": col_date, "value": float(raw_val)})
             elif isinstance(raw_val, str):
@@ -286,13 +287,9 @@ def parse_water_readings_row_format(
         [{unit_label, unit_number, unit_letter, meter_serial,
           meter_type, location, user_name, readings: [{date, value}]}, ...]
     """
-    from openpyxl import load_workbook
+    from app.services.parsed_upload import get_parsed_upload
 
-    wb = load_workbook(file_path, read_only=True, data_only=True)
-    if sheet_name and sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-    else:
-        ws = wb.active
+    parsed = get_parsed_upload(file_path)
 
     mf = mapping.get("fields", {})
     col = {}
@@ -301,9 +298,7 @@ def parse_water_readings_row_format(
         if key in mf:
             col[key] = int(mf[key])
 
-    # Read all rows into memory (read_only mode needs iteration)
-    all_rows = list(ws.iter_rows(min_row=header_row + 1, values_only=True))
-    wb.close()
+    all_rows = parsed.rows(parsed.resolve_sheet(sheet_name), header_row + 1)
 
     # Group by meter serial
     meters: dict[str, dict] = {}  # serial → meter dict
@@ -13,15 +13,13 @@ from sqlalchemy.orm import Session
 
 from app.config import settings
 from app.database import get_db
-from app.models import (
-    Unit, WaterMeter, WaterReading, MeterType,
-    ImportLog, ActivityAction, log_activity, SvjInfo,
-)
+from app.models import ImportLog, ActivityAction, log_activity, SvjInfo
 from app.services.import_mapping import (
     WATER_METER_FIELD_DEFS, WATER_METER_FIELD_GROUPS,
     build_mapping_context, is_row_format, read_excel_headers,
     read_excel_sheet_names, validate_water_meter_mapping,
 )
+from app.services.water_meter_import import build_unit_label_map, import_water_readings
 from app.utils import (
     build_import_wizard, flash_from_params, is_safe_path, validate_upload,
     UPLOAD_LIMITS, templates,
@@ -238,17 +236,12 @@ async def water_import_preview(
         })
 
     # Match against building_number in DB using normalized labels
-    all_units = db.query(Unit).all()
-    bn_lookup = {}  # normalized label → Unit
-    for u in all_units:
-        if u.building_number:
-            bn_lookup[normalize_unit_label(u.building_number)] = u
-
+    label_map = build_unit_label_map(db)  # normalized label → unit_id
     for row in rows:
         norm = normalize_unit_label(row.get("unit_label", ""))
-        unit = bn_lookup.get(norm) if norm else None
-        row["unit_matched"] = unit is not None
-        row["unit_id"] = unit.id if unit else None
+        unit_id = label_map.get(norm) if norm else None
+        row["unit_matched"] = unit_id is not None
+        row["unit_id"] = unit_id
 
     # Store in preview cache
     batch_id = uuid4().hex[:12]
@@ -303,98 +296,12 @@ async def water_import_confirm(
     meters_data = data["rows"]
     file_path = data["file_path"]
 
-    # Build unit lookup by building_number
-    all_units = db.query(Unit).all()
-    bn_lookup = {}
-    for u in all_units:
-        if u.building_number:
-            bn_lookup[normalize_unit_label(u.building_number)] = u
-
-    # Track existing meters by serial to avoid duplicates
-    existing_meters = {
-        m.meter_serial: m
-        for m in db.query(WaterMeter).all()
-    }
-
-    new_meters = 0
-    new_readings = 0
-    deleted_readings = 0
-    unmatched_units = 0
-    import_batch = batch_id
-
-    for row in meters_data:
-        serial = row["meter_serial"]
-        if not serial:
-            continue
-
-        # Normalized label matching
-        norm = normalize_unit_label(row.get("unit_label", ""))
-        unit = bn_lookup.get(norm) if norm else None
-
-        # Find or create WaterMeter
-        meter = existing_meters.get(serial)
-        if not meter:
-            meter_type_val = MeterType.COLD if row["meter_type"] == "cold" else MeterType.HOT
-            meter = WaterMeter(
-                unit_id=unit.id if unit else None,
-                unit_number=row["unit_number"],
-                unit_letter=row["unit_letter"],
-                unit_suffix=row.get("unit_suffix", ""),
-                meter_serial=serial,
-                meter_type=meter_type_val,
-                location=row["location"] or None,
-            )
-            db.add(meter)
-            db.flush()
-            existing_meters[serial] = meter
-            new_meters += 1
-
-            if not unit:
-                unmatched_units += 1
-        else:
-            # Always update unit link and label fields from building_number lookup
-            if unit and meter.unit_id != unit.id:
-                meter.unit_id = unit.id
-            meter.unit_number = row["unit_number"]
-            meter.unit_letter = row["unit_letter"]
-            meter.unit_suffix = row.get("unit_suffix", "")
-
-        # Import readings for this meter
-        if import_mode == "overwrite":
-            # Delete all existing readings for this meter
-            deleted = db.query(WaterReading).filter_by(meter_id=meter.id).delete()
-            deleted_readings += deleted
-
-        for reading_data in row.get("readings", []):
-            rd = reading_data["date"]
-            rv = reading_data["value"]
-            if rd is None or rv is None:
-                continue
-
-            if import_mode == "overwrite":
-                # All existing deleted — just add
-                db.add(WaterReading(
-                    meter_id=meter.id,
-                    reading_date=rd,
-                    value=rv,
-                    import_batch=import_batch,
-                ))
-                new_readings += 1
-            else:
-                # Append mode — skip existing dates
-                existing_reading = (
-                    db.query(WaterReading)
-                    .filter_by(meter_id=meter.id, reading_date=rd)
-                    .first()
-                )
-                if not existing_reading:
-                    db.add(WaterReading(
-                        meter_id=meter.id,
-                        reading_date=rd,
-                        value=rv,
-                        import_batch=import_batch,
-                    ))
-                    new_readings += 1
+    # Set-based meter resolve + upsert readings + single stats refresh
+    result = import_water_readings(db, meters_data, import_mode, import_batch=batch_id)
+    new_meters = result["new_meters"]
+    new_readings = result["new_readings"]
+    deleted_readings = result["deleted_readings"]
+    unmatched_units = result["unmatched_units"]
 
     total_readings_in_file = sum(len(r.get("readings", [])) for r in meters_data)
 
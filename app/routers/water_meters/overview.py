@@ -6,17 +6,17 @@ from datetime import date
 from fastapi import APIRouter, Depends, Form, Query, Request
 from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from openpyxl import Workbook
-from sqlalchemy import String, cast, func
+from sqlalchemy import String, case, cast, func
 from sqlalchemy.orm import Session, contains_eager, joinedload
 
 from app.database import get_db
-from app.models import WaterMeter, WaterReading, MeterType, Unit, OwnerUnit, Owner, ActivityAction, log_activity
+from app.models import WaterMeter, WaterMeterStats, MeterType, Unit, OwnerUnit, ActivityAction, log_activity
+from app.services.page_cache import OWNERSHIP_TABLES, WATER_TABLES, cached_page
 from app.utils import (
     build_list_url, excel_auto_width, flash_from_params,
     is_htmx_partial, strip_diacritics, templates,
 )
 
-from ._helpers import compute_deviations
 
 router = APIRouter()
 
@@ -25,18 +25,30 @@ SORT_COLUMNS = {
     "typ": WaterMeter.meter_type,
     "serial": WaterMeter.meter_serial,
     "umisteni": WaterMeter.location,
+    "katastral": Unit.unit_number,
+    # Precomputed columns (water_meter_stats, refreshed on import)
+    "hodnota": WaterMeterStats.last_value,
+    "datum": WaterMeterStats.last_date,
+    "odectu": WaterMeterStats.reading_count,
+    "spotreba": WaterMeterStats.consumption,
+    "odchylka": func.abs(WaterMeterStats.deviation_pct),
+    "vlastnik": None,  # Python-side (current owner display name)
 }
 
+# Práh vysoké odchylky od průměru typu (%)
+HIGH_DEVIATION_PCT = 50
+
 
 def _filter_meters(db: Session, q: str = "", typ: str = "", stav: str = "",
                    sort: str = "jednotka", order: str = "asc"):
-    """Filter and sort water meters. Returns list with eager-loaded relations."""
+    """Filter and sort water meters. Returns list with eager-loaded unit, owners and stats."""
     query = (
         db.query(WaterMeter)
         .outerjoin(WaterMeter.unit)
+        .outerjoin(WaterMeter.stats)
         .options(
             contains_eager(WaterMeter.unit).joinedload(Unit.owners).joinedload(OwnerUnit.owner),
-            joinedload(WaterMeter.readings),
+            contains_eager(WaterMeter.stats),
         )
     )
 
@@ -62,7 +74,8 @@ def _filter_meters(db: Session, q: str = "", typ: str = "", stav: str = "",
         query = query.filter(WaterMeter.unit_id.isnot(None))
     elif stav == "neprirazeno":
         query = query.filter(WaterMeter.unit_id.is_(None))
-    # vysoka_odchylka is filtered Python-side after query (needs computed values)
+    elif stav == "vysoka_odchylka":
+        query = query.filter(func.abs(WaterMeterStats.deviation_pct) > HIGH_DEVIATION_PCT)
 
     # Sorting
     sort_col = SORT_COLUMNS.get(sort)
@@ -71,9 +84,7 @@ def _filter_meters(db: Session, q: str = "", typ: str = "", stav: str = "",
             query = query.order_by(sort_col.desc().nulls_last())
         else:
             query = query.order_by(sort_col.asc().nulls_last())
-    elif sort == "jednotka" or sort not in (
-        "hodnota", "datum", "odectu", "spotreba", "vlastnik", "odchylka", "katastral",
-    ):
+    elif sort not in SORT_COLUMNS:
         # Default: sort by unit_letter, then unit_number
         if order == "desc":
             query = query.order_by(
@@ -88,112 +99,67 @@ def _filter_meters(db: Session, q: str = "", typ: str = "", stav: str = "",
 
     meters = query.all()
 
-    # Python-side sort for computed columns
-    if sort == "hodnota":
-        def _last_val(m):
-            if not m.readings:
-                return -1
-            return max(m.readings, key=lambda r: r.reading_date).value or 0
-        meters.sort(key=_last_val, reverse=(order == "desc"))
-    elif sort == "datum":
-        def _last_date(m):
-            if not m.readings:
-                return date.min
-            return max(r.reading_date for r in m.readings)
-        meters.sort(key=_last_date, reverse=(order == "desc"))
-    elif sort == "odectu":
-        meters.sort(key=lambda m: len(m.readings), reverse=(order == "desc"))
-    elif sort == "spotreba":
-        from ._helpers import compute_consumption
-        def _consumption(m):
-            c = compute_consumption(m)
-            return c if c is not None else -1
-        meters.sort(key=_consumption, reverse=(order == "desc"))
-    elif sort == "katastral":
-        def _katastral(m):
-            if m.unit:
-                return m.unit.unit_number or 0
-            return 0
-        meters.sort(key=_katastral, reverse=(order == "desc"))
-    elif sort == "vlastnik":
+    # Python-side sort: owner name comes from current OwnerUnit rows
+    if sort == "vlastnik":
         def _owner_name(m):
             if m.unit and m.unit.current_owners:
                 return m.unit.current_owners[0].owner.display_name.lower()
             return ""
         meters.sort(key=_owner_name, reverse=(order == "desc"))
-    elif sort == "odchylka":
-        # Need deviations — compute on the fly for sort
-        all_for_dev = [m for m in meters]  # already loaded with readings
-        dev_map = compute_deviations(all_for_dev)
-        def _deviation(m):
-            d = dev_map.get(m.id, {}).get("deviation_pct")
-            return abs(d) if d is not None else -1
-        meters.sort(key=_deviation, reverse=(order == "desc"))
-
-    # Python-side filter for high deviation (needs computed values)
-    if stav == "vysoka_odchylka":
-        dev_map = compute_deviations(meters)
-        meters = [
-            m for m in meters
-            if dev_map.get(m.id, {}).get("deviation_pct") is not None
-            and abs(dev_map[m.id]["deviation_pct"]) > 50
-        ]
 
     return meters
 
 
-def _build_ctx(request: Request, meters: list, db: Session, all_meters: list | None = None) -> dict:
-    """Build common template context.
+def _bubble_counts(db: Session) -> dict:
+    """Bubble counts over all meters — one SQL aggregate over meters + stats."""
+    row = (
+        db.query(
+            func.count(WaterMeter.id),
+            func.coalesce(func.sum(case((WaterMeter.meter_type == MeterType.COLD, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((WaterMeter.meter_type == MeterType.HOT, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((WaterMeter.unit_id.isnot(None), 1), else_=0)), 0),
+            func.coalesce(func.sum(case(
+                (func.abs(WaterMeterStats.deviation_pct) > HIGH_DEVIATION_PCT, 1), else_=0,
+            )), 0),
+        )
+        .outerjoin(WaterMeterStats, WaterMeterStats.meter_id == WaterMeter.id)
+        .one()
+    )
+    count_all, count_sv, count_tv, count_linked, count_high_dev = row
+    return {
+        "count_all": count_all,
+        "count_sv": count_sv,
+        "count_tv": count_tv,
+        "count_linked": count_linked,
+        "count_unlinked": count_all - count_linked,
+        "count_high_dev": count_high_dev,
+    }
+
 
-    If *all_meters* is passed (already eager-loaded with readings), it is used
-    for bubble counts and deviations — avoids a second full DB query.
-    """
+def _build_ctx(request: Request, meters: list, db: Session) -> dict:
+    """Build common template context (bubble counts come from SQL aggregates)."""
     q = request.query_params.get("q", "")
     typ = request.query_params.get("typ", "")
     stav = request.query_params.get("stav", "")
     sort = request.query_params.get("sort", "jednotka")
     order = request.query_params.get("order", "asc")
 
-    # Use provided all_meters or load fresh (fallback for export etc.)
-    if all_meters is None:
-        all_meters = db.query(WaterMeter).options(
-            joinedload(WaterMeter.readings),
-        ).all()
-    deviations = compute_deviations(all_meters)
-
-    # Bubble counts (on full dataset, not filtered)
-    count_all = len(all_meters)
-    count_sv = sum(1 for m in all_meters if m.meter_type == MeterType.COLD)
-    count_tv = sum(1 for m in all_meters if m.meter_type == MeterType.HOT)
-    count_linked = sum(1 for m in all_meters if m.unit_id is not None)
-    count_unlinked = count_all - count_linked
-    count_high_dev = sum(
-        1 for m in all_meters
-        if deviations.get(m.id, {}).get("deviation_pct") is not None
-        and abs(deviations[m.id]["deviation_pct"]) > 50
-    )
-
     return {
         "active_nav": "water_meters",
         "meters": meters,
         "total_meters": len(meters),
-        "deviations": deviations,
         "list_url": build_list_url(request),
         "q": q,
         "typ": typ,
         "stav": stav,
         "sort": sort,
         "order": order,
-        "count_all": count_all,
-        "count_sv": count_sv,
-        "count_tv": count_tv,
-        "count_linked": count_linked,
-        "count_unlinked": count_unlinked,
-        "count_high_dev": count_high_dev,
+        **_bubble_counts(db),
     }
 
 
 @router.get("/", response_class=HTMLResponse)
+@cached_page(*WATER_TABLES, *OWNERSHIP_TABLES)
 async def water_meters_overview(request: Request, db: Session = Depends(get_db)):
     q = request.query_params.get("q", "")
     typ = request.query_params.get("typ", "")
@@ -201,12 +167,8 @@ async def water_meters_overview(request: Request, db: Session = Depends(get_db))
     sort = request.query_params.get("sort", "jednotka")
     order = request.query_params.get("order", "asc")
 
-    # Load all meters once for bubble counts + deviations (avoids duplicate query in _build_ctx)
-    all_meters = _filter_meters(db, sort=sort, order=order)
-    has_filter = q or typ or stav
-    meters = _filter_meters(db, q=q, typ=typ, stav=stav, sort=sort, order=order) if has_filter else all_meters
-
-    ctx = _build_ctx(request, meters, db, all_meters=all_meters)
+    meters = _filter_meters(db, q=q, typ=typ, stav=stav, sort=sort, order=order)
+    ctx = _build_ctx(request, meters, db)
 
     ctx["flash_message"], ctx["flash_type"] = flash_from_params(request, {
         "import_ok": ("{msg}", "success"),
@@ -248,15 +210,12 @@ async def water_meters_export(
     headers_list = ["Jednotka", "Katastrální č.", "Sekce", "Vlastník", "Typ", "Sériové č.", "Umístění",
                     "Poslední odečet", "Hodnota (m3)", "Spotřeba (m3)", "Odchylka (%)"]
 
-    from ._helpers import compute_consumption
-    dev_map = compute_deviations(meters)
-
     rows_data = []
     for m in meters:
-        last = max(m.readings, key=lambda r: r.reading_date) if m.readings else None
-        consumption = compute_consumption(m)
-        dev_info = dev_map.get(m.id, {})
-        deviation = dev_info.get("deviation_pct")
+        st = m.stats
+        last_date = st.last_date if st else None
+        consumption = st.consumption if st else None
+        deviation = st.deviation_pct if st else None
         owner_names = ", ".join(
             ou.owner.display_name for ou in m.unit.current_owners
         ) if m.unit and m.unit.current_owners else ""
@@ -268,8 +227,8 @@ async def water_meters_export(
             "SV" if m.meter_type == MeterType.COLD else "TV",
             m.meter_serial,
             m.location or "",
-            last.reading_date.strftime("%d.%m.%Y") if last else "",
-            last.value if last else "",
+            last_date.strftime("%d.%m.%Y") if last_date else "",
+            st.last_value if last_date else "",
             round(consumption, 3) if consumption is not None else "",
             round(deviation, 1) if deviation is not None else "",
         ])
@@ -7,8 +7,6 @@ inline náhled emailu, test email gating, notified_at tracking, historie.
 from __future__ import annotations
 
 import logging
-import threading
-import time
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Form, Request
@@ -19,21 +17,20 @@ from app.database import SessionLocal, get_db
 from urllib.parse import quote
 
 from app.models import (
-    ActivityAction, EmailLog, EmailTemplate, Owner, OwnerUnit,
+    ActivityAction, EmailLog, Owner, OwnerUnit,
     SmtpProfile, SvjInfo, Unit, WaterMeter, MeterType,
     log_activity,
 )
-from app.utils import build_list_url, compute_eta, flash_from_params, get_invalid_emails, render_email_template, templates, utcnow
+from app.services import jobs, ownership, reference_data
+from app.utils import build_list_url, flash_from_params, get_invalid_emails, render_email_batch, templates, utcnow
 
-from ._helpers import compute_consumption, compute_deviations
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# In-memory progress tracker for background email sending
-_sending_progress: dict[str, dict] = {}
-_sending_lock = threading.Lock()
+# Rozesílka vodoměrů je jediná pro celé SVJ — klíč úlohy je konstantní
+_SEND_KEY = "water"
 
 
 # ---------------------------------------------------------------------------
@@ -65,23 +62,17 @@ def _build_recipients(db: Session, limit: int = 0) -> list[dict]:
     """
     meters = db.query(WaterMeter).options(
         joinedload(WaterMeter.unit),
-        joinedload(WaterMeter.readings),
+        joinedload(WaterMeter.stats),
     ).filter(WaterMeter.unit_id.isnot(None)).all()
 
     if not meters:
         return []
 
-    deviations = compute_deviations(meters)
-
-    # Compute type averages for email comparison
-    _type_sums: dict[str, list[float]] = {}
-    for m in meters:
-        c = compute_consumption(m)
-        if c is not None and c >= 0:
-            _type_sums.setdefault(m.meter_type, []).append(c)
+    # Type averages for email comparison — precomputed in water_meter_stats
     type_avg = {
-        mt: round(sum(vals) / len(vals), 1) if vals else 0
-        for mt, vals in _type_sums.items()
+        m.meter_type: round(m.stats.type_avg, 1)
+        for m in meters
+        if m.stats and m.stats.type_avg is not None
     }
 
     # Group meters by unit_id
@@ -90,14 +81,9 @@ def _build_recipients(db: Session, limit: int = 0) -> list[dict]:
         unit_meters.setdefault(m.unit_id, []).append(m)
 
     # Load current owner-unit relationships
-    owner_units = (
-        db.query(OwnerUnit)
-        .filter(OwnerUnit.valid_to.is_(None))
-        .options(
-            joinedload(OwnerUnit.owner),
-            joinedload(OwnerUnit.unit),
-        )
-        .all()
+    owner_units = ownership.load(
+        db, unit_ids=[uid for uid in unit_meters if uid],
+        options=(joinedload(OwnerUnit.owner), joinedload(OwnerUnit.unit)),
     )
 
     # Build {owner_id: {owner, units: {unit_id: unit}}}
@@ -125,51 +111,21 @@ def _build_recipients(db: Session, limit: int = 0) -> list[dict]:
             unit = u_meters[0].unit
             meter_infos = []
             for m in u_meters:
-                consumption = compute_consumption(m)
-                dev_info = deviations.get(m.id, {})
-                sorted_readings = sorted(m.readings, key=lambda r: r.reading_date) if m.readings else []
-                last_reading = sorted_readings[-1] if sorted_readings else None
-                prev_reading = sorted_readings[-2] if len(sorted_readings) >= 2 else None
-
-                # Historical consumption — last 3 periods (last - second-to-last per month)
-                # Group readings by month, keep last two per month
-                monthly_readings: dict[str, list] = {}  # "YYYY-MM" → list of readings
-                for r in sorted_readings:
-                    if r.reading_date:
-                        key = r.reading_date.strftime("%Y-%m")
-                        monthly_readings.setdefault(key, []).append(r)
-
-                history: list[dict] = []
-                for key in sorted(monthly_readings.keys(), reverse=True):
-                    if len(history) >= 3:
-                        break
-                    month_r = monthly_readings[key]
-                    if len(month_r) < 2:
-                        continue  # need at least 2 readings in month
-                    last = month_r[-1]
-                    prev = month_r[-2]
-                    diff = round(last.value - prev.value, 1)
-                    if diff < 0:
-                        continue
-                    history.append({
-                        "date": last.reading_date.strftime("%m/%Y"),
-                        "consumption": diff,
-                    })
-
+                st = m.stats
                 meter_infos.append({
                     "id": m.id,
                     "serial": m.meter_serial,
                     "type": "SV" if m.meter_type == MeterType.COLD else "TV",
                     "type_key": m.meter_type.value,
                     "location": m.location or "",
-                    "last_value": last_reading.value if last_reading else None,
-                    "last_date": last_reading.reading_date if last_reading else None,
-                    "prev_value": prev_reading.value if prev_reading else None,
-                    "prev_date": prev_reading.reading_date if prev_reading else None,
-                    "consumption": consumption,
-                    "deviation_pct": dev_info.get("deviation_pct"),
+                    "last_value": st.last_value if st else None,
+                    "last_date": st.last_date if st else None,
+                    "prev_value": st.prev_value if st else None,
+                    "prev_date": st.prev_date if st else None,
+                    "consumption": st.consumption if st else None,
+                    "deviation_pct": st.deviation_pct if st else None,
                     "notified_at": m.notified_at,
-                    "history": history,
+                    "history": st.history if st else [],
                 })
                 all_meter_serials.append(m.meter_serial)
                 all_meter_ids.append(m.id)
@@ -320,62 +276,42 @@ def _build_email_context(rcpt: dict) -> dict:
     }
 
 
-def _sending_eta(progress: dict) -> dict:
-    """Compute ETA fields from sending progress dict."""
-    sent = progress["sent"]
-    failed = progress["failed"]
-    current = sent + failed
-    eta = compute_eta(current, progress["total"], progress["started_at"])
-
-    return {
-        "total": progress["total"],
-        "sent": sent,
-        "failed": failed,
-        "current": current,
-        "current_recipient": progress.get("current_recipient", ""),
-        "done": progress.get("done", False),
-        "error": progress.get("error"),
-        "paused": progress.get("paused", False),
-        "waiting_batch_confirm": progress.get("waiting_batch_confirm", False),
-        "batch_number": progress.get("batch_number", 0),
-        "total_batches": progress.get("total_batches", 0),
-        "elapsed": eta["elapsed"],
-        "eta": eta["eta"],
-    }
+def _render_emails(template, recipients: list[dict]) -> list[tuple[str, str]]:
+    """Render (subject, body) for recipients — template compiled once, contexts in batch."""
+    if not template:
+        return [(f"Odečty vodoměrů — {r['unit_labels']}", "") for r in recipients]
+    contexts = [_build_email_context(r) for r in recipients]
+    subjects = render_email_batch(template.subject_template, contexts)
+    bodies = render_email_batch(template.body_template, contexts)
+    return list(zip(subjects, bodies))
 
 
 def _send_emails_batch(
-    send_id: str,
+    job: jobs.Job,
     recipient_data: list[dict],
     batch_size: int,
     batch_interval: int,
     confirm_each_batch: bool,
     smtp_profile_id: Optional[int] = None,
 ):
-    """Background thread: send water meter emails in batches."""
+    """Úloha na pozadí: odeslání upozornění k vodoměrům po dávkách."""
     from app.services.email_service import create_smtp_connection, send_email
 
     db = SessionLocal()
     try:
-        template = db.query(EmailTemplate).filter_by(name="Odečty vodoměrů").first()
+        template = reference_data.email_template(db, "Odečty vodoměrů")
 
         batches = []
         for i in range(0, len(recipient_data), batch_size):
             batches.append(recipient_data[i:i + batch_size])
 
-        with _sending_lock:
-            _sending_progress[send_id]["total_batches"] = len(batches)
+        job.update(total_batches=len(batches))
 
         # Počáteční prodleva 5s — uživatel vidí progress a může pozastavit/zrušit
-        for _ in range(10):
-            with _sending_lock:
-                if _sending_progress[send_id].get("done"):
-                    return
-            time.sleep(0.5)
+        job.sleep(5)
 
         for batch_idx, batch in enumerate(batches):
-            with _sending_lock:
-                _sending_progress[send_id]["batch_number"] = batch_idx + 1
+            job.update(batch_number=batch_idx + 1)
 
             smtp_conn = None
             try:
@@ -383,62 +319,39 @@ def _send_emails_batch(
             except Exception:
                 logger.warning("Failed to create shared SMTP connection, falling back to per-email")
 
-            for rcpt in batch:
-                # Check paused / done
-                while True:
-                    with _sending_lock:
-                        paused = _sending_progress[send_id].get("paused")
-                        done = _sending_progress[send_id].get("done")
-                    if not paused:
-                        break
-                    if done:
-                        if smtp_conn:
-                            try:
-                                smtp_conn.quit()
-                            except Exception:
-                                pass
-                        return
-                    time.sleep(0.5)
+            try:
+                # Render the whole batch up front (compiled template shared by the run)
+                rendered = _render_emails(template, batch)
+
+                for rcpt, (subject, body) in zip(batch, rendered):
+                    # Pauza / zrušení
+                    job.checkpoint()
+                    job.update(current_recipient=rcpt["name"])
+
+                    body_html = body.replace("\n", "<br>")
 
-                with _sending_lock:
-                    if _sending_progress[send_id].get("done"):
-                        if smtp_conn:
-                            try:
-                                smtp_conn.quit()
-                            except Exception:
-                                pass
-                        return
-                    _sending_progress[send_id]["current_recipient"] = rcpt["name"]
-
-                # Render personalized email
-                ctx = _build_email_context(rcpt)
-                subject = render_email_template(template.subject_template, ctx) if template else f"Odečty vodoměrů — {rcpt['unit_labels']}"
-                body = render_email_template(template.body_template, ctx) if template else ""
-                body_html = body.replace("\n", "<br>")
-
-                try:
-                    result = send_email(
-                        to_email=rcpt["email"],
-                        to_name=rcpt["name"],
-                        subject=subject,
-                        body_html=body_html,
-                        module="water_notice",
-                        db=db,
-                        smtp_server=smtp_conn,
-                        smtp_profile_id=smtp_profile_id,
-                    )
-                except Exception as exc:
-                    logger.exception("Chyba při odesílání pro %s (%s)", rcpt["name"], rcpt["email"])
-                    result = {"success": False, "error": str(exc)}
-                    smtp_conn = None
                     try:
-                        smtp_conn = create_smtp_connection(profile_id=smtp_profile_id)
-                    except Exception:
-                        logger.warning("Nepodařilo se obnovit SMTP spojení")
+                        result = send_email(
+                            to_email=rcpt["email"],
+                            to_name=rcpt["name"],
+                            subject=subject,
+                            body_html=body_html,
+                            module="water_notice",
+                            db=db,
+                            smtp_server=smtp_conn,
+                            smtp_profile_id=smtp_profile_id,
+                        )
+                    except Exception as exc:
+                        logger.exception("Chyba při odesílání pro %s (%s)", rcpt["name"], rcpt["email"])
+                        result = {"success": False, "error": str(exc)}
+                        smtp_conn = None
+                        try:
+                            smtp_conn = create_smtp_connection(profile_id=smtp_profile_id)
+                        except Exception:
+                            logger.warning("Nepodařilo se obnovit SMTP spojení")
 
-                with _sending_lock:
                     if result.get("success"):
-                        _sending_progress[send_id]["sent"] += 1
+                        job.advance(sent=job.get("sent", 0) + 1)
                         # Zaznamenat odeslání — notified_at na vodoměrech i vlastníkovi
                         try:
                             now = utcnow()
@@ -457,53 +370,39 @@ def _send_emails_batch(
                             except Exception:
                                 pass
                     else:
-                        _sending_progress[send_id]["failed"] += 1
-                        _sending_progress[send_id].setdefault("failed_ids", []).append(rcpt["owner_id"])
-
-            # Close shared SMTP connection after batch
-            if smtp_conn:
-                try:
-                    smtp_conn.quit()
-                except Exception:
-                    pass
-                smtp_conn = None
+                        job.advance(
+                            failed=job.get("failed", 0) + 1,
+                            failed_ids=job.get("failed_ids", []) + [rcpt["owner_id"]],
+                        )
+            finally:
+                # Close shared SMTP connection after batch (i po zrušení)
+                if smtp_conn:
+                    try:
+                        smtp_conn.quit()
+                    except Exception:
+                        pass
 
             # After batch: wait for interval or confirm
             if batch_idx < len(batches) - 1:
+                job.update(current_recipient="")
                 if confirm_each_batch:
-                    with _sending_lock:
-                        _sending_progress[send_id]["waiting_batch_confirm"] = True
-                    while True:
-                        with _sending_lock:
-                            done = _sending_progress[send_id].get("done")
-                            waiting = _sending_progress[send_id].get("waiting_batch_confirm")
-                        if done:
-                            return
-                        if not waiting:
-                            break
-                        time.sleep(0.5)
+                    job.wait_for_confirm()
                 else:
-                    for _ in range(batch_interval * 2):
-                        with _sending_lock:
-                            done = _sending_progress[send_id].get("done")
-                        if done:
-                            return
-                        time.sleep(0.5)
+                    job.sleep(batch_interval)
 
         # Log activity
         log_activity(db, ActivityAction.STATUS_CHANGED, "water_meters", "vodometry",
-                     description=f"Rozesílka odečtů vodoměrů dokončena: {_sending_progress[send_id]['sent']} odesláno")
+                     description=f"Rozesílka odečtů vodoměrů dokončena: {job.get('sent', 0)} odesláno")
         db.commit()
-
-    except Exception as e:
-        logger.exception("Error in water meter batch email sending")
-        with _sending_lock:
-            _sending_progress[send_id]["error"] = str(e)
+        return {"sent": job.get("sent", 0), "failed": job.get("failed", 0)}
     finally:
-        with _sending_lock:
-            _sending_progress[send_id]["done"] = True
-            _sending_progress[send_id]["current_recipient"] = ""
-            _sending_progress[send_id]["finished_at"] = time.monotonic()
+        # Po dokončení i zrušení zpět na rozesílku se souhrnem
+        sent, failed = job.get("sent", 0), job.get("failed", 0)
+        flash_code = "sent_warn" if failed > 0 else "sent"
+        job.update(
+            current_recipient="",
+            redirect_url=f"/vodometry/rozeslat?flash={flash_code}&sent={sent}&failed={failed}",
+        )
         db.close()
 
 
@@ -548,15 +447,13 @@ async def send_preview(request: Request, db: Session = Depends(get_db)):
     recipients.sort(key=sort_key, reverse=(order == "desc"))
 
     # Email template + previews
-    template = db.query(EmailTemplate).filter_by(name="Odečty vodoměrů").first()
+    template = reference_data.email_template(db, "Odečty vodoměrů")
     svj = db.query(SvjInfo).first()
 
-    email_previews = {}
-    for r in all_sendable:
-        ctx = _build_email_context(r)
-        subject = render_email_template(template.subject_template, ctx) if template else f"Odečty vodoměrů — {r['unit_labels']}"
-        body = render_email_template(template.body_template, ctx) if template else ""
-        email_previews[r["owner_id"]] = {"subject": subject, "body": body}
+    email_previews = {
+        r["owner_id"]: {"subject": subject, "body": body}
+        for r, (subject, body) in zip(all_sendable, _render_emails(template, all_sendable))
+    }
 
     # SMTP profily
     smtp_profiles = db.query(SmtpProfile).order_by(SmtpProfile.is_default.desc(), SmtpProfile.id).all()
@@ -648,10 +545,8 @@ async def send_test_email(
 
     # Vzít prvního příjemce pro realistický náhled
     rcpt = sendable[0]
-    template = db.query(EmailTemplate).filter_by(name="Odečty vodoměrů").first()
-    ctx = _build_email_context(rcpt)
-    subject = render_email_template(template.subject_template, ctx) if template else f"Odečty vodoměrů — {rcpt['unit_labels']}"
-    body = render_email_template(template.body_template, ctx) if template else ""
+    template = reference_data.email_template(db, "Odečty vodoměrů")
+    subject, body = _render_emails(template, [rcpt])[0]
     body_html = body.replace("\n", "<br>")
 
     result = await asyncio.to_thread(
@@ -690,11 +585,8 @@ async def start_batch_send(
         return RedirectResponse("/vodometry/rozeslat", status_code=302)
 
     # Check no concurrent sending
-    send_id = "water"
-    with _sending_lock:
-        progress = _sending_progress.get(send_id)
-        if progress and not progress.get("done"):
-            return RedirectResponse("/vodometry/rozeslat/prubeh", status_code=302)
+    if jobs.active("water_sending", _SEND_KEY):
+        return RedirectResponse("/vodometry/rozeslat/prubeh", status_code=302)
 
     form = await request.form()
     selected_ids = form.getlist("selected_ids")
@@ -730,29 +622,25 @@ async def start_batch_send(
                  description=f"Rozesílka odečtů vodoměrů zahájena: {len(recipients)} příjemců")
     db.commit()
 
-    # Initialize progress
-    with _sending_lock:
-        _sending_progress[send_id] = {
-            "total": len(recipients),
+    jobs.submit(
+        "water_sending", _send_emails_batch,
+        recipients, batch_size, batch_interval, confirm_batch, smtp_profile_id,
+        key=_SEND_KEY, label="Rozesílka odečtů vodoměrů", pool="email",
+        total=len(recipients),
+        fields={
             "sent": 0,
             "failed": 0,
+            "failed_ids": [],
             "current_recipient": "",
-            "done": False,
-            "error": None,
-            "started_at": time.monotonic(),
-            "paused": False,
             "waiting_batch_confirm": False,
             "batch_number": 0,
             "total_batches": 0,
-            "failed_ids": [],
-        }
-
-    thread = threading.Thread(
-        target=_send_emails_batch,
-        args=(send_id, recipients, batch_size, batch_interval, confirm_batch, smtp_profile_id),
-        daemon=True,
+            "template": "partials/_send_progress_inner.html",
+            "progress_label": "Odesílání odečtů vodoměrů",
+            # Po dokončení 3 s zobrazit výsledek
+            "redirect_delay": 3,
+        },
     )
-    thread.start()
 
     return RedirectResponse("/vodometry/rozeslat/prubeh", status_code=302)
 
@@ -760,77 +648,37 @@ async def start_batch_send(
 @router.get("/rozeslat/prubeh", response_class=HTMLResponse)
 async def sending_progress_page(request: Request):
     """Show progress page while emails are being sent."""
-    send_id = "water"
-    with _sending_lock:
-        progress = _sending_progress.get(send_id)
-        if not progress:
-            return RedirectResponse("/vodometry/rozeslat", status_code=302)
-        progress = dict(progress)
+    job = jobs.find("water_sending", _SEND_KEY)
+    if not job or job["done"] and not job["error"]:
+        redirect_url = job.get("redirect_url") if job else None
+        return RedirectResponse(redirect_url or "/vodometry/rozeslat", status_code=302)
 
     return templates.TemplateResponse(request, "water_meters/sending.html", {
         "active_nav": "water_meters",
-        **_sending_eta(progress),
+        **jobs.progress_context(job),
     })
 
 
-@router.get("/rozeslat/prubeh-stav", response_class=HTMLResponse)
-async def sending_progress_status(request: Request):
-    """HTMX polling endpoint — returns progress partial or redirect when done."""
-    send_id = "water"
-    with _sending_lock:
-        progress = _sending_progress.get(send_id)
-        if not progress:
-            response = HTMLResponse("")
-            response.headers["HX-Redirect"] = "/vodometry/rozeslat"
-            return response
-        if progress.get("done"):
-            finished_at = progress.get("finished_at", 0)
-            if time.monotonic() - finished_at >= 3:
-                sent = progress["sent"]
-                failed = progress["failed"]
-                _sending_progress.pop(send_id, None)
-                response = HTMLResponse("")
-                flash_code = "sent_warn" if failed > 0 else "sent"
-                response.headers["HX-Redirect"] = f"/vodometry/rozeslat?flash={flash_code}&sent={sent}&failed={failed}"
-                return response
-        progress = dict(progress)
-
-    return templates.TemplateResponse(request, "partials/_send_progress_inner.html", {
-        "progress_label": "Odesílání odečtů vodoměrů",
-        **_sending_eta(progress),
-    })
+def _control(action) -> RedirectResponse:
+    job = jobs.active("water_sending", _SEND_KEY)
+    if job:
+        action(job["id"])
+    return RedirectResponse("/vodometry/rozeslat/prubeh", status_code=302)
 
 
 @router.post("/rozeslat/pozastavit")
 async def pause_sending():
     """Pause the sending process."""
-    send_id = "water"
-    with _sending_lock:
-        progress = _sending_progress.get(send_id)
-        if progress and not progress.get("done"):
-            progress["paused"] = True
-    return RedirectResponse("/vodometry/rozeslat/prubeh", status_code=302)
+    return _control(jobs.pause)
 
 
 @router.post("/rozeslat/pokracovat")
 async def resume_sending():
     """Resume the sending process (also confirms batch)."""
-    send_id = "water"
-    with _sending_lock:
-        progress = _sending_progress.get(send_id)
-        if progress and not progress.get("done"):
-            progress["paused"] = False
-            progress["waiting_batch_confirm"] = False
-    return RedirectResponse("/vodometry/rozeslat/prubeh", status_code=302)
+    return _control(jobs.resume)
 
 
 @router.post("/rozeslat/zrusit")
 async def cancel_sending():
     """Cancel the sending process."""
-    send_id = "water"
-    with _sending_lock:
-        progress = _sending_progress.get(send_id)
-        if progress and not progress.get("done"):
-            progress["done"] = True
-            progress["finished_at"] = time.monotonic()
-    return RedirectResponse("/vodometry/rozeslat/prubeh", status_code=302)
+    return _control(jobs.cancel)
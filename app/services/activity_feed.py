@@ -0,0 +1,294 @@
+"""Sjednocená aktivita pro přehled — tabulka ``activity_feed`` udržovaná triggery.
+
+Přehled dříve načítal posledních 200 ``EmailLog`` + 200 ``ActivityLog``,
+slučoval je v Pythonu a teprve potom filtroval, hledal a řadil — starší
+události chyběly a export četl celou historii do paměti. Teď má každá
+událost řádek v ``activity_feed`` (model ``ActivityFeedItem``) s už
+spočítaným kanonickým modulem, popisem, detailem, stavem a odkazem;
+filtr, hledání, řazení i stránkování (keyset) běží v SQL nad indexy
+``(module, created_at, id)`` a ``(created_at, id)``.
+
+Platební upozornění (``payment_notice``) se slučují už při zápisu: jeden
+řádek za den + předmět (``group_key``), který trigger přepočítá při každé
+změně kteréhokoli e-mailu skupiny.
+
+Hledání používá FTS5 tabulku ``activity_feed_fts`` (external content nad
+``activity_feed``, bez diakritiky, prefixy slov); bez FTS5 spadne na LIKE.
+"""
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import Integer, or_, text
+
+logger = logging.getLogger(__name__)
+
+FEED_TABLE = "activity_feed"
+FEED_FTS = "activity_feed_fts"
+
+# Normalizace raw module stringů na kanonické klíče — sjednocuje EmailLog vs ActivityLog,
+# aby `tax` a `dane` splynuly v jednu bublinu "Rozesílání".
+MODULE_CANONICAL = {
+    "tax": "dane",
+    "voting": "hlasovani",
+    "tenants": "najemci",
+    "water_meter": "vodometry",
+    "water_notice": "vodometry",
+    "water_meters": "vodometry",
+}
+
+KNOWN_MODULES = {
+    "vlastnici", "jednotky", "najemci", "prostory",
+    "hlasovani", "dane", "sync", "platby", "payment_notice",
+    "sprava", "nastaveni", "water_meters", "vodometry",
+}
+
+# entity_type z ActivityLog → detail stránka
+_ENTITY_URLS = {
+    "voting": "/hlasovani/",
+    "tax_session": "/rozesilani/",
+    "owner": "/vlastnici/",
+}
+
+_GROUPED_MODULE = "payment_notice"
+
+_fts_enabled = False
+
+
+def norm_module(m: str) -> str:
+    """Raw module → canonical key; unknown modules (test, None…) fall into ``sprava``."""
+    canonical = MODULE_CANONICAL.get(m or "", m or "")
+    if canonical not in KNOWN_MODULES:
+        return "sprava"
+    return canonical
+
+
+# ── Row builders (SQL) ──────────────────────────────────────────────
+
+def _quote_list(values) -> str:
+    return ", ".join(f"'{v}'" for v in sorted(values))
+
+
+def _module_sql(col: str) -> str:
+    """SQL equivalent of ``norm_module``."""
+    whens = " ".join(f"WHEN {col} = '{raw}' THEN '{canon}'" for raw, canon in MODULE_CANONICAL.items())
+    return f"CASE {whens} WHEN {col} IN ({_quote_list(KNOWN_MODULES)}) THEN {col} ELSE 'sprava' END"
+
+
+_COLUMNS = "source, source_id, group_key, module, created_at, description, detail, status, url, grouped_count"
+# Enum sloupce drží název členu (SENT, STATUS_CHANGED) — lower() dá hodnotu
+_CREATED = "coalesce({a}.created_at, '1970-01-01 00:00:00')"
+
+
+def _email_rows_sql(where: str) -> str:
+    return (
+        f"INSERT INTO {FEED_TABLE} ({_COLUMNS}) "
+        f"SELECT 'email', e.id, NULL, {_module_sql('e.module')}, {_CREATED.format(a='e')}, "
+        "coalesce(e.subject, ''), coalesce(nullif(e.recipient_name, ''), e.recipient_email, ''), "
+        "lower(coalesce(e.status, '')), "
+        "CASE WHEN e.reference_id THEN '/rozesilani/' || e.reference_id ELSE '' END, 1 "
+        f"FROM email_logs e WHERE e.module != '{_GROUPED_MODULE}' AND {where};"
+    )
+
+
+def _group_key_sql(a: str) -> str:
+    # coalesce — e-mail bez předmětu patří do skupiny '' (jako ``subject or ""``)
+    return f"'{_GROUPED_MODULE}|' || date({a}.created_at) || '|' || coalesce({a}.subject, '')"
+
+
+def _group_rows_sql(where: str, key: str) -> str:
+    # Holý sloupec e.reference_id vedle jediného max() bere SQLite z řádku s maximem
+    failed = "sum(e.status = 'FAILED')"
+    return (
+        f"INSERT INTO {FEED_TABLE} ({_COLUMNS}) "
+        f"SELECT 'email', NULL, {key}, '{_GROUPED_MODULE}', max(e.created_at), "
+        "CASE WHEN count(*) = 1 THEN coalesce(e.subject, '') "
+        "ELSE coalesce(e.subject, '') || ' (' || count(*) || '×)' END, "
+        f"CASE WHEN {failed} > 0 THEN sum(e.status = 'SENT') || '× odesláno, ' || {failed} || '× chyba' "
+        "ELSE count(*) || '× odesláno' END, "
+        f"CASE WHEN {failed} > 0 THEN 'failed' ELSE 'sent' END, "
+        "CASE WHEN e.reference_id THEN '/platby/vypisy/' || e.reference_id ELSE '' END, count(*) "
+        f"FROM email_logs e WHERE e.module = '{_GROUPED_MODULE}' AND e.created_at IS NOT NULL AND {where} "
+        "GROUP BY date(e.created_at), coalesce(e.subject, '');"
+    )
+
+
+def _refresh_group_sql(ref: str) -> str:
+    """Recompute the payment_notice group of row ``ref`` (NEW/OLD) — range on (module, created_at)."""
+    return (
+        f"DELETE FROM {FEED_TABLE} WHERE group_key = {_group_key_sql(ref)};\n"
+        + _group_rows_sql(
+            f"coalesce(e.subject, '') = coalesce({ref}.subject, '') "
+            f"AND e.created_at >= date({ref}.created_at) "
+            f"AND e.created_at < date({ref}.created_at, '+1 day')",
+            _group_key_sql(ref),
+        )
+    )
+
+
+def _activity_rows_sql(where: str) -> str:
+    whens = " ".join(f"WHEN '{etype}' THEN '{url}' || a.entity_id" for etype, url in _ENTITY_URLS.items())
+    return (
+        f"INSERT INTO {FEED_TABLE} ({_COLUMNS}) "
+        f"SELECT 'activity', a.id, NULL, {_module_sql('a.module')}, {_CREATED.format(a='a')}, "
+        "coalesce(a.entity_name, ''), coalesce(a.description, ''), lower(coalesce(a.action, '')), "
+        f"CASE WHEN a.entity_id THEN CASE a.entity_type {whens} ELSE '' END ELSE '' END, 1 "
+        f"FROM activity_logs a WHERE {where};"
+    )
+
+
+def _delete_source_sql(source: str, ref: str) -> str:
+    return f"DELETE FROM {FEED_TABLE} WHERE source = '{source}' AND source_id = {ref}.id;"
+
+
+# ── Triggers ────────────────────────────────────────────────────────
+
+# Sloupce email_logs, které ovlivňují řádek aktivity
+_EMAIL_COLUMNS = "module, subject, recipient_name, recipient_email, status, reference_id, created_at"
+_ACTIVITY_COLUMNS = "action, entity_type, entity_id, entity_name, description, module, created_at"
+
+
+def _triggers() -> dict[str, str]:
+    grouped = f"'{_GROUPED_MODULE}'"
+    return {
+        "trg_activity_feed_email_insert": (
+            "AFTER INSERT ON email_logs BEGIN\n"
+            + _email_rows_sql("e.id = NEW.id") + "\nEND"
+        ),
+        "trg_activity_feed_email_update": (
+            f"AFTER UPDATE OF {_EMAIL_COLUMNS} ON email_logs BEGIN\n"
+            + _delete_source_sql("email", "OLD") + "\n"
+            + _email_rows_sql("e.id = NEW.id") + "\nEND"
+        ),
+        "trg_activity_feed_email_delete": (
+            "AFTER DELETE ON email_logs BEGIN\n"
+            + _delete_source_sql("email", "OLD") + "\nEND"
+        ),
+        "trg_activity_feed_group_insert": (
+            f"AFTER INSERT ON email_logs WHEN NEW.module = {grouped} BEGIN\n"
+            + _refresh_group_sql("NEW") + "\nEND"
+        ),
+        "trg_activity_feed_group_update_old": (
+            f"AFTER UPDATE OF {_EMAIL_COLUMNS} ON email_logs WHEN OLD.module = {grouped} BEGIN\n"
+            + _refresh_group_sql("OLD") + "\nEND"
+        ),
+        "trg_activity_feed_group_update_new": (
+            f"AFTER UPDATE OF {_EMAIL_COLUMNS} ON email_logs WHEN NEW.module = {grouped} BEGIN\n"
+            + _refresh_group_sql("NEW") + "\nEND"
+        ),
+        "trg_activity_feed_group_delete": (
+            f"AFTER DELETE ON email_logs WHEN OLD.module = {grouped} BEGIN\n"
+            + _refresh_group_sql("OLD") + "\nEND"
+        ),
+        "trg_activity_feed_activity_insert": (
+            "AFTER INSERT ON activity_logs BEGIN\n"
+            + _activity_rows_sql("a.id = NEW.id") + "\nEND"
+        ),
+        "trg_activity_feed_activity_update": (
+            f"AFTER UPDATE OF {_ACTIVITY_COLUMNS} ON activity_logs BEGIN\n"
+            + _delete_source_sql("activity", "OLD") + "\n"
+            + _activity_rows_sql("a.id = NEW.id") + "\nEND"
+        ),
+        "trg_activity_feed_activity_delete": (
+            "AFTER DELETE ON activity_logs BEGIN\n"
+            + _delete_source_sql("activity", "OLD") + "\nEND"
+        ),
+    }
+
+
+_FTS_COLUMNS = "description, detail, module"
+
+
+def _fts_triggers() -> dict[str, str]:
+    new_values = "NEW.id, NEW.description, NEW.detail, NEW.module"
+    old_values = "'delete', OLD.id, OLD.description, OLD.detail, OLD.module"
+    insert = f"INSERT INTO {FEED_FTS} (rowid, {_FTS_COLUMNS}) VALUES ({new_values});"
+    delete = f"INSERT INTO {FEED_FTS} ({FEED_FTS}, rowid, {_FTS_COLUMNS}) VALUES ({old_values});"
+    return {
+        "trg_activity_feed_fts_insert": f"AFTER INSERT ON {FEED_TABLE} BEGIN\n{insert}\nEND",
+        "trg_activity_feed_fts_update": f"AFTER UPDATE ON {FEED_TABLE} BEGIN\n{delete}\n{insert}\nEND",
+        "trg_activity_feed_fts_delete": f"AFTER DELETE ON {FEED_TABLE} BEGIN\n{delete}\nEND",
+    }
+
+
+# ── Schema management ───────────────────────────────────────────────
+
+def _table_exists(conn, name: str) -> bool:
+    return conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+    ), {"name": name}).first() is not None
+
+
+def ensure_activity_feed(conn) -> None:
+    """Create triggers (and the FTS table); fill the feed when it is empty.
+
+    ``conn`` is a SQLAlchemy Connection from the metadata ``after_create``
+    listener — ``activity_feed`` itself is an ORM table created by create_all.
+    """
+    global _fts_enabled
+
+    fts_new = False
+    if not _table_exists(conn, FEED_FTS):
+        try:
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {FEED_FTS} USING fts5({_FTS_COLUMNS}, "
+                f"content = '{FEED_TABLE}', content_rowid = 'id', "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            ))
+            fts_new = True
+        except Exception as e:  # sqlite3.OperationalError: no such module: fts5
+            logger.warning("FTS5 not available, activity search falls back to LIKE: %s", e)
+    _fts_enabled = _table_exists(conn, FEED_FTS)
+
+    # Triggery se vždy vytvoří znovu — změna definice nepotřebuje migraci
+    triggers = dict(_triggers())
+    if _fts_enabled:
+        triggers.update(_fts_triggers())
+    for name, body in triggers.items():
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(f"CREATE TRIGGER {name} {body}"))
+
+    empty = conn.execute(text(f"SELECT 1 FROM {FEED_TABLE} LIMIT 1")).first() is None
+    has_sources = conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM email_logs) OR EXISTS (SELECT 1 FROM activity_logs)"
+    )).scalar()
+    if empty and has_sources:
+        count = rebuild_activity_feed(conn)
+        logger.info("Built activity feed (%d rows)", count)
+    elif fts_new:
+        conn.execute(text(f"INSERT INTO {FEED_FTS} ({FEED_FTS}) VALUES ('rebuild')"))
+
+
+def rebuild_activity_feed(conn) -> int:
+    """Refill ``activity_feed`` from email_logs + activity_logs; returns number of rows."""
+    conn.execute(text(f"DELETE FROM {FEED_TABLE}"))
+    for stmt in (
+        _email_rows_sql("1"),
+        _group_rows_sql("1", _group_key_sql("e")),
+        _activity_rows_sql("1"),
+    ):
+        conn.execute(text(stmt))
+    return conn.execute(text(f"SELECT count(*) FROM {FEED_TABLE}")).scalar()
+
+
+# ── Querying ────────────────────────────────────────────────────────
+
+def search_condition(q: str):
+    """Filter on ``ActivityFeedItem`` for the activity search box.
+
+    FTS5 (bez diakritiky, prefixy slov) when available, otherwise LIKE.
+    """
+    from app.models import ActivityFeedItem
+    from app.services.search_index import fts_query
+
+    if _fts_enabled:
+        subq = text(
+            f"SELECT rowid AS id FROM {FEED_FTS} WHERE {FEED_FTS} MATCH :feed_match"
+        ).bindparams(feed_match=fts_query(q) or '""').columns(id=Integer)
+        return ActivityFeedItem.id.in_(subq)
+    pattern = f"%{q}%"
+    return or_(
+        ActivityFeedItem.description.ilike(pattern),
+        ActivityFeedItem.detail.ilike(pattern),
+        ActivityFeedItem.module.ilike(pattern),
+    )
@@ -8,10 +8,11 @@ from __future__ import annotations
 import logging
 from datetime import datetime
 
-from openpyxl import load_workbook
 from sqlalchemy.orm import Session
 
-from app.models import Unit, Owner, OwnerUnit, UnitBalance, BalanceSource, VariableSymbolMapping
+from app.models import Unit, UnitBalance, BalanceSource, VariableSymbolMapping
+from app.services.owner_resolver import OwnerResolver
+from app.services.parsed_upload import get_parsed_upload
 from app.utils import strip_diacritics
 
 logger = logging.getLogger(__name__)
@@ -38,16 +39,7 @@ def preview_balance_import(
         vs_map[vsm.variable_symbol] = vsm.unit_id
 
     # Vlastníci per unit pro fuzzy match
-    owner_units = (
-        db.query(OwnerUnit)
-        .filter(OwnerUnit.valid_to.is_(None))
-        .all()
-    )
-    owners_by_unit: dict[int, list] = {}
-    for ou in owner_units:
-        owners_by_unit.setdefault(ou.unit_id, []).append(ou)
-
-    owner_by_id = {o.id: o for o in db.query(Owner).all()}
+    resolver = OwnerResolver.load(db, with_units=True)
 
     result_rows = []
     stats = {"ok": 0, "warning": 0, "error": 0, "skipped": 0, "total_amount": 0.0}
@@ -73,20 +65,18 @@ def preview_balance_import(
         # Párování na vlastníka
         matched_owner = None
         if unit:
-            matched_owner = _match_owner(
-                owner_name, unit.id, owners_by_unit, owner_by_id
-            )
+            matched_owner = resolver.match_in_unit(owner_name, unit.id)
         row["matched_owner"] = matched_owner
 
         # Vlastníci pro náhled — u SJM jen pár odpovídající Excel jménu
         unit_owners = []
         if unit:
-            ou_list = owners_by_unit.get(unit.id, [])
+            ou_list = resolver.owner_units(unit.id)
             sjm_ous = [ou for ou in ou_list if (ou.ownership_type or "").strip().upper() == "SJM"]
             if sjm_ous and owner_name:
                 excel_words = set(strip_diacritics(owner_name or "").split())
                 for ou in sjm_ous:
-                    o = owner_by_id.get(ou.owner_id)
+                    o = resolver.get(ou.owner_id)
                     if o and o.name_normalized and o.name_normalized.split()[0] in excel_words:
                         unit_owners.append(o)
             if not unit_owners and matched_owner:
@@ -135,15 +125,7 @@ def execute_balance_import(
     rows = _parse_excel(file_path, mapping)
 
     units_by_number = {u.unit_number: u for u in db.query(Unit).all()}
-    owner_units = (
-        db.query(OwnerUnit)
-        .filter(OwnerUnit.valid_to.is_(None))
-        .all()
-    )
-    owners_by_unit: dict[int, list] = {}
-    for ou in owner_units:
-        owners_by_unit.setdefault(ou.unit_id, []).append(ou)
-    owner_by_id = {o.id: o for o in db.query(Owner).all()}
+    resolver = OwnerResolver.load(db, with_units=True)
 
     # Smazat existující zůstatky pro rok
     deleted = db.query(UnitBalance).filter_by(year=year).delete()
@@ -153,6 +135,8 @@ def execute_balance_import(
     imported = 0
     skipped = 0
     errors = 0
+    # Zůstatky vytvořené tímto importem (staré pro rok jsou smazané výše)
+    created: dict[int, UnitBalance] = {}
 
     for row in rows:
         unit_number = row.get("unit_number")
@@ -169,12 +153,10 @@ def execute_balance_import(
             errors += 1
             continue
 
-        matched_owner = _match_owner(
-            owner_name, unit.id, owners_by_unit, owner_by_id
-        )
+        matched_owner = resolver.match_in_unit(owner_name, unit.id)
 
         # Pokud pro tuto jednotku už existuje zůstatek (duplicitní řádek), sečíst
-        existing = db.query(UnitBalance).filter_by(unit_id=unit.id, year=year).first()
+        existing = created.get(unit.id)
         if existing:
             existing.opening_amount = round((existing.opening_amount or 0) + (amount or 0), 2)
             # Přidat jméno do poznámky
@@ -199,7 +181,7 @@ def execute_balance_import(
             if status:
                 note_parts.append(str(status))
 
-            db.add(UnitBalance(
+            balance = UnitBalance(
                 unit_id=unit.id,
                 year=year,
                 opening_amount=round(amount or 0, 2),
@@ -207,8 +189,9 @@ def execute_balance_import(
                 owner_id=matched_owner.id if matched_owner else None,
                 owner_name=owner_name.strip() if owner_name else None,
                 note=", ".join(note_parts) if note_parts else None,
-            ))
-            db.flush()
+            )
+            db.add(balance)
+            created[unit.id] = balance
         imported += 1
 
     db.commit()
@@ -222,44 +205,17 @@ def _parse_excel(file_path: str, mapping: dict) -> list[dict]:
     sheet_name = mapping.get("sheet_name")
     start_row = mapping.get("start_row", 2)
 
-    # Podpora .xls přes xlrd
-    if file_path.lower().endswith(".xls"):
-        return _parse_xls(file_path, fields, sheet_name, start_row)
-
-    wb = load_workbook(file_path, read_only=True, data_only=True)
-    if sheet_name and sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-    else:
-        ws = wb.active
+    # .xlsx i starší .xls — obojí přes sdílenou cache rozparsovaných uploadů
+    parsed_upload = get_parsed_upload(file_path)
+    sheet_rows = parsed_upload.rows(parsed_upload.resolve_sheet(sheet_name), start_row)
 
     rows = []
-    for i, row in enumerate(ws.iter_rows(min_row=start_row, values_only=True), start=start_row):
+    for i, row in enumerate(sheet_rows, start=start_row):
         parsed = _extract_row(row, fields)
         if parsed:
             parsed["_row_num"] = i
             rows.append(parsed)
 
-    wb.close()
-    return rows
-
-
-def _parse_xls(file_path: str, fields: dict, sheet_name: str | None, start_row: int) -> list[dict]:
-    """Parsuje starší .xls formát přes xlrd."""
-    import xlrd
-    wb = xlrd.open_workbook(file_path)
-    if sheet_name and sheet_name in wb.sheet_names():
-        ws = wb.sheet_by_name(sheet_name)
-    else:
-        ws = wb.sheet_by_index(0)
-
-    rows = []
-    for r in range(start_row - 1, ws.nrows):
-        row_values = [ws.cell_value(r, c) for c in range(ws.ncols)]
-        parsed = _extract_row(row_values, fields)
-        if parsed:
-            parsed["_row_num"] = r + 1
-            rows.append(parsed)
-
     return rows
 
 
@@ -295,51 +251,3 @@ def _extract_row(row_values, fields: dict) -> dict | None:
             result["unit_number"] = None
 
     return result
-
-
-def _match_owner(
-    excel_name: str,
-    unit_id: int,
-    owners_by_unit: dict[int, list],
-    owner_by_id: dict[int, "Owner"],
-) -> "Owner | None":
-    """Fuzzy match vlastníka z Excelu na vlastníka v evidenci dané jednotky."""
-    if not excel_name or not excel_name.strip():
-        return None
-
-    unit_ous = owners_by_unit.get(unit_id, [])
-    if not unit_ous:
-        return None
-
-    search = strip_diacritics(excel_name.strip())
-
-    best_owner = None
-    best_score = 0
-
-    for ou in unit_ous:
-        owner = owner_by_id.get(ou.owner_id)
-        if not owner:
-            continue
-        owner_norm = owner.name_normalized or ""
-
-        # Exact match
-        if search == owner_norm:
-            return owner
-
-        # Příjmení match (první slovo excelu vs první slovo evidence)
-        search_parts = search.split()
-        owner_parts = owner_norm.split()
-        if search_parts and owner_parts and search_parts[0] == owner_parts[0]:
-            score = 80
-            if score > best_score:
-                best_score = score
-                best_owner = owner
-
-        # Partial: excel name contains owner's last name
-        if owner_parts and owner_parts[0] in search:
-            score = 60
-            if score > best_score:
-                best_score = score
-                best_owner = owner
-
-    return best_owner
@@ -0,0 +1,127 @@
+"""Počítadla změn tabulek — verze pro cache odvozených dat.
+
+Posluchač ``after_flush`` si do ``session.info`` poznamená tabulky, kterých se
+flush dotkl (hromadné ``query.update()`` / ``delete()`` zachytí
+``after_bulk_update/delete``, ``db.execute(insert/update/delete(...))``
+posluchač ``after_cursor_execute``), a ``after_commit`` jim zvýší verzi. Cache
+odvozených dat (``reference_data``, view model detailu výpisu, stránky
+seznamů v ``page_cache``) si k hodnotě uloží :func:`version` tabulek, ze kterých
+vznikla, a při neshodě přepočítá.
+
+Session s necommitnutou změnou to pozná přes :func:`pending` a čte přímo z DB.
+Core DML mimo session (``engine.begin()``) se započítá při commitu spojení.
+Raw SQL (``text()``) a obnova zálohy → :func:`invalidate`.
+Verze jsou per proces — aplikace běží v jednom procesu (uvicorn bez workerů).
+"""
+from __future__ import annotations
+
+import threading
+import weakref
+from collections import defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# session.info klíč — tabulky změněné v aktuální (necommitnuté) transakci
+_PENDING_KEY = "changed_tables"
+
+_versions: defaultdict[str, int] = defaultdict(int)
+# Zvyšuje se při invalidate() bez tabulek — zneplatní všechny verze najednou
+_epoch = 0
+_lock = threading.Lock()
+
+# Connection → session, která na něm má transakci (after_cursor_execute zná jen spojení)
+_session_of: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+# Connection mimo session → tabulky změněné Core DML v necommitnuté transakci
+_conn_pending: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def version(*tables: str) -> tuple[int, ...]:
+    """Aktuální verze daných tabulek (porovnatelná n-tice, začíná epochou)."""
+    with _lock:
+        return (_epoch, *(_versions[t] for t in tables))
+
+
+def pending(session: Session) -> set[str]:
+    """Tabulky, které session flushnula, ale ještě necommitnula."""
+    return session.info.get(_PENDING_KEY, set())
+
+
+def invalidate(*tables: str) -> None:
+    """Zvýšit verzi daných tabulek (bez argumentů všech)."""
+    global _epoch
+    with _lock:
+        if tables:
+            for table in tables:
+                _versions[table] += 1
+        else:
+            _epoch += 1
+
+
+def _mark_pending(session: Session, tables) -> None:
+    if tables:
+        session.info.setdefault(_PENDING_KEY, set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    touched = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            touched.add(table)
+    _mark_pending(session, touched)
+
+
+@event.listens_for(Session, "after_bulk_update")
+@event.listens_for(Session, "after_bulk_delete")
+def _after_bulk_write(context):
+    # db.query(SmtpProfile).update({...}) neprochází flush
+    _mark_pending(context.session, {context.mapper.local_table.name})
+
+
+@event.listens_for(Session, "after_begin")
+def _after_begin(session, transaction, connection):
+    _session_of[connection] = weakref.ref(session)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # db.execute(insert(WaterMeter), rows) apod. neprochází flush ani bulk eventy
+    if context is None or not (context.isinsert or context.isupdate or context.isdelete):
+        return
+    table = getattr(getattr(context.compiled, "statement", None), "table", None)
+    name = getattr(table, "name", None)
+    if not name:
+        return
+    ref = _session_of.get(conn)
+    session = ref() if ref is not None else None
+    if session is not None:
+        _mark_pending(session, {name})
+    else:
+        _conn_pending.setdefault(conn, set()).add(name)
+
+
+@event.listens_for(Engine, "commit")
+def _after_conn_commit(conn):
+    changed = _conn_pending.pop(conn, None)
+    if changed:
+        invalidate(*changed)
+
+
+@event.listens_for(Engine, "rollback")
+def _after_conn_rollback(conn):
+    _conn_pending.pop(conn, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    changed = session.info.pop(_PENDING_KEY, None)
+    if changed:
+        invalidate(*changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
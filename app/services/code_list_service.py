@@ -1,7 +1,7 @@
 """Code list service — shared code list operations."""
 from sqlalchemy.orm import Session
 
-from app.models import CodeListItem, OwnerUnit, Unit
+from app.models import OwnerUnit, Unit
 
 CODE_LIST_CATEGORIES = {
     "space_type": {"label": "Typ prostoru", "model": Unit, "column": "space_type"},
@@ -14,14 +14,10 @@ CODE_LIST_ORDER = ["space_type", "section", "room_count", "ownership_type"]
 
 
 def get_all_code_lists(db: Session) -> dict:
-    """Return {category: [items]} for all code list categories."""
-    items = (
-        db.query(CodeListItem)
-        .order_by(CodeListItem.category, CodeListItem.order, CodeListItem.value)
-        .all()
-    )
-    result = {cat: [] for cat in CODE_LIST_ORDER}
-    for item in items:
-        if item.category in result:
-            result[item.category].append(item)
-    return result
+    """Return {category: [items]} for all code list categories.
+
+    Položky jsou neměnné snímky z cache referenčních dat
+    (``app.services.reference_data``) — pro úpravy načíst ``CodeListItem`` přes ``db``.
+    """
+    from app.services import reference_data
+    return reference_data.code_lists(db)
@@ -13,10 +13,11 @@ Default Excel format (KontaktyVlastnici):
   20-24: Trvalá adresa, 25-29: Korespondenční adresa
   30: GSM, 31: Pevný telefon, 32: Email
 """
-from openpyxl import load_workbook
 from sqlalchemy.orm import Session
 
 from app.models import Owner, OwnerType
+from app.services.owner_resolver import OwnerResolver
+from app.services.parsed_upload import get_parsed_upload
 from app.utils import strip_diacritics
 
 
@@ -140,59 +141,28 @@ def _load_and_parse_excel(
     start_row = mapping.get("start_row", 7)
 
     try:
-        wb = load_workbook(file_path, read_only=True, data_only=True)
+        parsed = get_parsed_upload(file_path)
     except Exception as e:
         import logging as _log
         _log.getLogger(__name__).warning("Failed to open Excel: %s", e)
         return [], "Nepodařilo se otevřít Excel soubor."
 
-    # Select sheet
-    if sheet_name and sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-    elif "ZU" in wb.sheetnames:
-        ws = wb["ZU"]
-    else:
-        ws = wb.active
-
     # Pre-load all data rows into list of tuples (row_num, cells...)
     data_rows = []
-    for row in ws.iter_rows(min_row=start_row, values_only=False):
+    sheet_rows = parsed.rows(parsed.resolve_sheet(sheet_name, "ZU"), start_row)
+    for row_num, row in enumerate(sheet_rows, start=start_row):
         cells = {}
-        for cell in row:
-            if cell.value is not None:
-                val = str(cell.value).strip()
+        for col, value in enumerate(row, start=1):
+            if value is not None:
+                val = str(value).strip()
                 if val:
-                    cells[cell.column] = val
+                    cells[col] = val
         if cells:
-            data_rows.append((row[0].row, cells))
+            data_rows.append((row_num, cells))
 
-    wb.close()
     return data_rows, None
 
 
-def _build_owner_lookups(db: Session) -> tuple[dict, dict]:
-    """Build owner lookup dicts from active owners.
-
-    Returns:
-        (owner_by_name, owner_by_rc) — dicts mapping normalized name / RČ / IČ to Owner.
-    """
-    owners = db.query(Owner).filter_by(is_active=True).all()
-    owner_by_name = {}
-    owner_by_rc = {}
-    for o in owners:
-        if o.name_normalized:
-            key = o.name_normalized.strip()
-            if key not in owner_by_name:
-                owner_by_name[key] = o
-        if o.birth_number:
-            rc_key = o.birth_number.replace(" ", "").replace("/", "")
-            owner_by_rc[rc_key] = o
-        if o.company_id:
-            ic_key = o.company_id.replace(" ", "")
-            owner_by_rc[ic_key] = o
-    return owner_by_name, owner_by_rc
-
-
 def _extract_owner_name(
     cells: dict,
     mapping: dict,
@@ -390,7 +360,7 @@ def preview_contact_import(
         progress["total"] = len(data_rows)
         progress["current"] = 0
 
-    owner_by_name, owner_by_rc = _build_owner_lookups(db)
+    resolver = OwnerResolver.load(db)
 
     # Name building columns — for display of Excel name
     # Default layout has separate first_name(16), last_name(17), title_before(15), title_after(18)
@@ -418,14 +388,11 @@ def preview_contact_import(
 
         # Match to DB owner
         norm_name = _build_normalized_name(first_name, last_name)
-        owner = owner_by_name.get(norm_name)
+        owner = resolver.exact(norm_name)
 
         # Fallback: try RČ/IČ
         if not owner and match_rc_col_0 is not None:
-            rc_raw = cells.get(match_rc_col_0 + 1)
-            if rc_raw:
-                rc_key = rc_raw.replace(" ", "").replace("/", "")
-                owner = owner_by_rc.get(rc_key)
+            owner = resolver.by_identifier(cells.get(match_rc_col_0 + 1))
 
         # Skip duplicate rows for same owner
         if owner and owner.id in seen_owners:
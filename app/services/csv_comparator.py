@@ -9,12 +9,16 @@ import logging
 import re
 from difflib import SequenceMatcher
 from io import StringIO
+from typing import Callable
 
 from app.models.sync import SyncStatus
 from app.services.owner_matcher import normalize_for_matching
 
 logger = logging.getLogger(__name__)
 
+# Jak často compare_owners hlásí průběh (počet CSV záznamů)
+_PROGRESS_EVERY = 25
+
 
 def parse_sousede_csv(csv_content: str) -> list[dict]:
     """Parse CSV from sousede.cz or internal export. Tries multiple delimiters and column names."""
@@ -121,6 +125,14 @@ def _compare_structured_names(
         (e.get("first_name", ""), e.get("last_name", ""))
         for e in excel_entries
     ]
+    # Normalized forms — precomputed once per owner by the caller when available
+    db_norms = [
+        (
+            e["first_name_norm"] if "first_name_norm" in e else normalize_for_matching(first),
+            e["last_name_norm"] if "last_name_norm" in e else normalize_for_matching(last),
+        )
+        for e, (first, last) in zip(excel_entries, db_names)
+    ]
 
     # Only attempt structured comparison when counts match
     if not csv_names or not db_names or len(csv_names) != len(db_names):
@@ -143,11 +155,9 @@ def _compare_structured_names(
         csv_first = normalize_for_matching(csv_parts[1]) if len(csv_parts) > 1 else ""
 
         found = False
-        for i, (db_first, db_last) in enumerate(db_names):
+        for i, (db_first_n, db_last_n) in enumerate(db_norms):
             if i in used_db:
                 continue
-            db_first_n = normalize_for_matching(db_first)
-            db_last_n = normalize_for_matching(db_last)
 
             if csv_first == db_first_n and csv_last == db_last_n:
                 found = True
@@ -293,11 +303,14 @@ def _sort_results(results: list[dict]) -> None:
 def compare_owners(
     csv_records: list[dict],
     excel_data: list[dict],
+    on_progress: Callable[[int], None] | None = None,
 ) -> list[dict]:
     """
     Compare CSV records against Excel owner data.
     excel_data: [{"unit_number": str, "owner_name": str, "name_normalized": str,
-                  "owner_type": str}]
+                  "owner_type": str}] (optionally ``first_name_norm`` /
+                  ``last_name_norm`` precomputed per owner)
+    ``on_progress(n)`` is called with the number of CSV records compared so far.
     Returns comparison results with status.
     """
     results = []
@@ -310,7 +323,9 @@ def compare_owners(
 
     csv_units_seen = set()
 
-    for csv_rec in csv_records:
+    for idx, csv_rec in enumerate(csv_records, 1):
+        if on_progress is not None and idx % _PROGRESS_EVERY == 0:
+            on_progress(idx)
         unit = csv_rec["unit_number"]
         csv_units_seen.add(unit)
         csv_owners_raw = csv_rec.get("owners", "")
@@ -415,6 +430,8 @@ def compare_owners(
                     "match_details": "Jednotka v Excelu, ale ne v CSV",
                 })
 
+    if on_progress is not None:
+        on_progress(len(csv_records))
     _sort_results(results)
 
     return results
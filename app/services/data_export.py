@@ -1,14 +1,13 @@
 """Export data tables to Excel (.xlsx) and CSV formats."""
 from __future__ import annotations
 
-import csv
 import io
 from datetime import datetime
 
-from openpyxl import Workbook
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 
-from app.utils import excel_auto_width
+from app.services.streaming_export import export_response, iter_csv, write_xlsx
 from app.models import (
     Owner, Unit, OwnerUnit, Proxy,
     Voting, VotingItem, Ballot, BallotVote,
@@ -111,136 +110,129 @@ def _date(val) -> str:
 
 
 # ── Row generators ──────────────────────────────────────────────────
+# Ploché dotazy s yield_per — řádky se streamují z DB kurzoru, bez
+# načítání celých stromů objektů do paměti.
+
+_YIELD_PER = 500
+
 
 def _rows_owners(db: Session):
-    owners = (
-        db.query(Owner).filter_by(is_active=True)
-        .options(joinedload(Owner.units).joinedload(OwnerUnit.unit))
-        .order_by(Owner.name_normalized)
-        .all()
+    rows = (
+        db.query(OwnerUnit, Owner, Unit)
+        .join(Owner, OwnerUnit.owner_id == Owner.id)
+        .join(Unit, OwnerUnit.unit_id == Unit.id)
+        .filter(Owner.is_active == True, OwnerUnit.valid_to.is_(None))  # noqa: E712
+        .order_by(Owner.name_normalized, Owner.id, Unit.unit_number)
+        .yield_per(_YIELD_PER)
     )
-    for owner in owners:
+    for ou, owner, u in rows:
         rc_ic = owner.company_id or owner.birth_number or ""
-        for ou in owner.current_units:
-            u = ou.unit
-            yield [
-                u.unit_number, u.building_number or "", u.podil_scd,
-                u.floor_area, u.room_count or "", u.space_type or "",
-                u.section or "", u.orientation_number, u.address or "",
-                u.lv_number, ou.ownership_type or "", ou.share, ou.votes,
-                owner.first_name, owner.last_name or "", owner.title or "",
-                rc_ic,
-                owner.perm_street or "", owner.perm_district or "",
-                owner.perm_city or "", owner.perm_zip or "",
-                owner.perm_country or "",
-                owner.corr_street or "", owner.corr_district or "",
-                owner.corr_city or "", owner.corr_zip or "",
-                owner.corr_country or "",
-                owner.phone or "", owner.phone_secondary or "",
-                owner.phone_landline or "",
-                owner.email or "", owner.email_secondary or "",
-                owner.owner_since or "", owner.note or "",
-            ]
+        yield [
+            u.unit_number, u.building_number or "", u.podil_scd,
+            u.floor_area, u.room_count or "", u.space_type or "",
+            u.section or "", u.orientation_number, u.address or "",
+            u.lv_number, ou.ownership_type or "", ou.share, ou.votes,
+            owner.first_name, owner.last_name or "", owner.title or "",
+            rc_ic,
+            owner.perm_street or "", owner.perm_district or "",
+            owner.perm_city or "", owner.perm_zip or "",
+            owner.perm_country or "",
+            owner.corr_street or "", owner.corr_district or "",
+            owner.corr_city or "", owner.corr_zip or "",
+            owner.corr_country or "",
+            owner.phone or "", owner.phone_secondary or "",
+            owner.phone_landline or "",
+            owner.email or "", owner.email_secondary or "",
+            owner.owner_since or "", owner.note or "",
+        ]
 
 
 def _rows_votings(db: Session):
-    votings = (
-        db.query(Voting)
-        .options(
-            joinedload(Voting.items),
-            joinedload(Voting.ballots).joinedload(Ballot.owner),
-            joinedload(Voting.ballots).joinedload(Ballot.votes),
-        )
-        .order_by(Voting.created_at.desc())
-        .all()
+    rows = (
+        db.query(BallotVote, Ballot, Voting, Owner, VotingItem)
+        .join(Ballot, BallotVote.ballot_id == Ballot.id)
+        .join(Voting, Ballot.voting_id == Voting.id)
+        .outerjoin(Owner, Ballot.owner_id == Owner.id)
+        .outerjoin(VotingItem, BallotVote.voting_item_id == VotingItem.id)
+        .order_by(Voting.created_at.desc(), Voting.id, Ballot.id, BallotVote.id)
+        .yield_per(_YIELD_PER)
     )
-    for v in votings:
-        for b in v.ballots:
-            owner_name = b.owner.display_name if b.owner else ""
-            for bv in b.votes:
-                item = bv.voting_item
-                yield [
-                    v.title, v.status.value,
-                    _date(v.start_date), _date(v.end_date),
-                    v.quorum_threshold * 100, v.total_votes_possible,
-                    item.order if item else "", item.title if item else "",
-                    owner_name, b.units_text or "", b.total_votes,
-                    bv.vote.value if bv.vote else "",
-                    bv.votes_count,
-                ]
+    for bv, b, v, owner, item in rows:
+        yield [
+            v.title, v.status.value,
+            _date(v.start_date), _date(v.end_date),
+            v.quorum_threshold * 100, v.total_votes_possible,
+            item.order if item else "", item.title if item else "",
+            owner.display_name if owner else "", b.units_text or "", b.total_votes,
+            bv.vote.value if bv.vote else "",
+            bv.votes_count,
+        ]
 
 
 def _rows_tax(db: Session):
-    sessions = (
-        db.query(TaxSession)
-        .options(
-            joinedload(TaxSession.documents)
-            .joinedload(TaxDocument.distributions)
-            .joinedload(TaxDistribution.owner),
-        )
-        .order_by(TaxSession.created_at.desc())
-        .all()
+    rows = (
+        db.query(TaxDistribution, TaxDocument, TaxSession, Owner)
+        .join(TaxDocument, TaxDistribution.document_id == TaxDocument.id)
+        .join(TaxSession, TaxDocument.session_id == TaxSession.id)
+        .outerjoin(Owner, TaxDistribution.owner_id == Owner.id)
+        .order_by(TaxSession.created_at.desc(), TaxSession.id, TaxDocument.id, TaxDistribution.id)
+        .yield_per(_YIELD_PER)
     )
-    for s in sessions:
-        for doc in s.documents:
-            for dist in doc.distributions:
-                owner_name = dist.owner.display_name if dist.owner else ""
-                yield [
-                    s.title, s.year or "",
-                    doc.filename, doc.unit_number or "",
-                    doc.extracted_owner_name or "",
-                    owner_name,
-                    dist.match_status.value if dist.match_status else "",
-                    round(dist.match_confidence * 100, 1) if dist.match_confidence else "",
-                    "Ano" if dist.email_sent else "Ne",
-                    dist.admin_note or "",
-                ]
+    for dist, doc, s, owner in rows:
+        yield [
+            s.title, s.year or "",
+            doc.filename, doc.unit_number or "",
+            doc.extracted_owner_name or "",
+            owner.display_name if owner else "",
+            dist.match_status.value if dist.match_status else "",
+            round(dist.match_confidence * 100, 1) if dist.match_confidence else "",
+            "Ano" if dist.email_sent else "Ne",
+            dist.admin_note or "",
+        ]
 
 
 def _rows_sync(db: Session):
-    sessions = (
-        db.query(SyncSession)
-        .options(joinedload(SyncSession.records))
-        .order_by(SyncSession.created_at.desc())
-        .all()
+    rows = (
+        db.query(SyncRecord, SyncSession)
+        .join(SyncSession, SyncRecord.session_id == SyncSession.id)
+        .order_by(SyncSession.created_at.desc(), SyncSession.id, SyncRecord.id)
+        .yield_per(_YIELD_PER)
     )
-    for s in sessions:
-        for r in s.records:
-            yield [
-                s.csv_filename, _fmt(s.created_at),
-                r.unit_number or "",
-                r.csv_owner_name or "", r.excel_owner_name or "",
-                r.csv_ownership_type or "", r.excel_ownership_type or "",
-                r.csv_email or "", r.csv_phone or "",
-                r.csv_space_type or "", r.excel_space_type or "",
-                r.csv_share, r.excel_podil_scd,
-                r.status.value if r.status else "",
-                r.resolution.value if r.resolution else "",
-                r.admin_corrected_name or "", r.admin_note or "",
-            ]
+    for r, s in rows:
+        yield [
+            s.csv_filename, _fmt(s.created_at),
+            r.unit_number or "",
+            r.csv_owner_name or "", r.excel_owner_name or "",
+            r.csv_ownership_type or "", r.excel_ownership_type or "",
+            r.csv_email or "", r.csv_phone or "",
+            r.csv_space_type or "", r.excel_space_type or "",
+            r.csv_share, r.excel_podil_scd,
+            r.status.value if r.status else "",
+            r.resolution.value if r.resolution else "",
+            r.admin_corrected_name or "", r.admin_note or "",
+        ]
 
 
 def _rows_share_check(db: Session):
-    sessions = (
-        db.query(ShareCheckSession)
-        .options(joinedload(ShareCheckSession.records))
-        .order_by(ShareCheckSession.created_at.desc())
-        .all()
+    rows = (
+        db.query(ShareCheckRecord, ShareCheckSession)
+        .join(ShareCheckSession, ShareCheckRecord.session_id == ShareCheckSession.id)
+        .order_by(ShareCheckSession.created_at.desc(), ShareCheckSession.id, ShareCheckRecord.id)
+        .yield_per(_YIELD_PER)
     )
-    for s in sessions:
-        for r in s.records:
-            yield [
-                s.filename, _fmt(s.created_at), s.filename,
-                r.unit_number or "",
-                r.db_share, r.file_share,
-                r.status.value if r.status else "",
-                r.resolution.value if r.resolution else "",
-                r.admin_note or "",
-            ]
+    for r, s in rows:
+        yield [
+            s.filename, _fmt(s.created_at), s.filename,
+            r.unit_number or "",
+            r.db_share, r.file_share,
+            r.status.value if r.status else "",
+            r.resolution.value if r.resolution else "",
+            r.admin_note or "",
+        ]
 
 
 def _rows_logs(db: Session):
-    for e in db.query(EmailLog).order_by(EmailLog.created_at.desc()).all():
+    for e in db.query(EmailLog).order_by(EmailLog.created_at.desc()).yield_per(_YIELD_PER):
         yield [
             "Email", _fmt(e.created_at),
             f"{e.recipient_name or ''} <{e.recipient_email}>",
@@ -248,7 +240,7 @@ def _rows_logs(db: Session):
             e.status.value if e.status else "",
             e.error_message or "",
         ]
-    for i in db.query(ImportLog).order_by(ImportLog.created_at.desc()).all():
+    for i in db.query(ImportLog).order_by(ImportLog.created_at.desc()).yield_per(_YIELD_PER):
         yield [
             "Import", _fmt(i.created_at),
             i.filename,
@@ -292,37 +284,44 @@ _ROW_GENERATORS = {
 
 # ── Public API ──────────────────────────────────────────────────────
 
-def export_category_xlsx(db: Session, category: str) -> bytes:
-    """Return XLSX bytes for the given category."""
+def _xlsx_rows(db: Session, category: str):
+    for row in _ROW_GENERATORS[category](db):
+        yield [_fmt(v) if isinstance(v, datetime) else v for v in row]
+
+
+def _csv_rows(db: Session, category: str):
+    for row in _ROW_GENERATORS[category](db):
+        yield [_fmt(v) for v in row]
+
+
+def write_category(db: Session, category: str, fmt: str, fp) -> None:
+    """Write the export for ``category`` into a binary file object (e.g. ZIP member)."""
     info = _EXPORTS[category]
-    gen = _ROW_GENERATORS[category]
+    if fmt == "xlsx":
+        write_xlsx(fp, info["headers"], _xlsx_rows(db, category),
+                   sheet_title=info["label"], max_width=50)
+    else:
+        for chunk in iter_csv(info["headers"], _csv_rows(db, category)):
+            fp.write(chunk)
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = info["label"][:31]  # Excel sheet name limit
-    ws.append(info["headers"])
-    for cell in ws[1]:
-        cell.font = cell.font.copy(bold=True)
 
-    for row in gen(db):
-        ws.append([_fmt(v) if isinstance(v, datetime) else v for v in row])
+def export_category_response(db: Session, category: str, fmt: str, filename: str) -> StreamingResponse:
+    """Streamed download of ``category`` (``filename`` without extension)."""
+    info = _EXPORTS[category]
+    rows = _xlsx_rows(db, category) if fmt == "xlsx" else _csv_rows(db, category)
+    return export_response(fmt, filename, info["headers"], rows,
+                           sheet_title=info["label"], max_width=50)
 
-    excel_auto_width(ws, max_width=50)
 
+def export_category_xlsx(db: Session, category: str) -> bytes:
+    """Return XLSX bytes for the given category."""
     buf = io.BytesIO()
-    wb.save(buf)
+    write_category(db, category, "xlsx", buf)
     return buf.getvalue()
 
 
 def export_category_csv(db: Session, category: str) -> bytes:
     """Return UTF-8 CSV bytes for the given category."""
-    info = _EXPORTS[category]
-    gen = _ROW_GENERATORS[category]
-
-    buf = io.StringIO()
-    writer = csv.writer(buf, delimiter=";")
-    writer.writerow(info["headers"])
-    for row in gen(db):
-        writer.writerow([_fmt(v) for v in row])
-
-    return buf.getvalue().encode("utf-8-sig")  # BOM for Excel compatibility
+    buf = io.BytesIO()
+    write_category(db, category, "csv", buf)
+    return buf.getvalue()  # BOM for Excel compatibility is written by iter_csv
@@ -14,6 +14,7 @@ from email.mime.application import MIMEApplication
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.utils import formataddr, formatdate
+from functools import lru_cache
 from pathlib import Path
 
 from sqlalchemy.orm import Session
@@ -28,7 +29,10 @@ logger = logging.getLogger(__name__)
 _TAG_RE = re.compile(r"<[^>]+>")
 
 
+@lru_cache(maxsize=128)
 def _html_to_plain(html: str | None) -> str | None:
+    # Memoizováno podle obsahu — u hromadné rozesílky se stejným tělem
+    # pro všechny příjemce (daňové podklady) se konverze provede jen jednou.
     if not html:
         return None
     text = html.replace("<br>", "\n").replace("<br/>", "\n").replace("<br />", "\n")
@@ -106,25 +110,18 @@ def _imap_save_to_sent(msg, smtp_host: str, user: str, password: str, use_tls: b
 
 
 def _get_default_profile():
-    """Načte výchozí SmtpProfile z DB (is_default=True) nebo None."""
-    from app.database import SessionLocal
-    from app.models.smtp_profile import SmtpProfile
-    db = SessionLocal()
-    try:
-        return db.query(SmtpProfile).filter_by(is_default=True).first()
-    finally:
-        db.close()
+    """Snímek výchozího SmtpProfile (is_default=True) nebo None.
+
+    Z cache referenčních dat — hromadná rozesílka nevolá DB na každou zprávu.
+    """
+    from app.services import reference_data
+    return reference_data.default_smtp_profile()
 
 
 def _get_profile_by_id(profile_id: int):
-    """Načte SmtpProfile dle ID nebo None."""
-    from app.database import SessionLocal
-    from app.models.smtp_profile import SmtpProfile
-    db = SessionLocal()
-    try:
-        return db.query(SmtpProfile).get(profile_id)
-    finally:
-        db.close()
+    """Snímek SmtpProfile dle ID nebo None (z cache referenčních dat)."""
+    from app.services import reference_data
+    return reference_data.smtp_profile(profile_id)
 
 
 def _smtp_params_from_profile(profile):
@@ -8,12 +8,12 @@ Falls back to DEFAULT_OWNER_MAPPING when no mapping is provided.
 """
 import logging
 
-from openpyxl import load_workbook
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
 from app.models.owner import Owner, OwnerType, OwnerUnit, Unit
+from app.services.parsed_upload import get_parsed_upload
 from app.utils import build_name_with_titles, strip_diacritics
 
 # Default column indices (0-based) — legacy layout
@@ -190,16 +190,10 @@ def _describe_skip_error(row: tuple, row_idx: int, fm: dict) -> str:
     return msg
 
 
-def _get_worksheet(file_path: str, sheet_name: str | None = None):
-    """Open workbook and return the correct worksheet."""
-    wb = load_workbook(file_path, read_only=True, data_only=True)
-    if sheet_name and sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-    elif "Vlastnici_SVJ" in wb.sheetnames:
-        ws = wb["Vlastnici_SVJ"]
-    else:
-        ws = wb.active
-    return wb, ws
+def _get_sheet_rows(file_path: str, sheet_name: str | None, start_row: int) -> list[tuple]:
+    """Rows of the owner sheet from ``start_row`` (via the parsed-upload cache)."""
+    parsed = get_parsed_upload(file_path)
+    return parsed.rows(parsed.resolve_sheet(sheet_name, "Vlastnici_SVJ"), start_row)
 
 
 def _parse_row(row: tuple, row_idx: int, fm: dict) -> dict | None:
@@ -267,7 +261,7 @@ def preview_owners_from_excel(file_path: str, mapping: dict | None = None) -> di
     sheet_name = m.get("sheet_name")
     start_row = m.get("start_row", 2)
 
-    wb, ws = _get_worksheet(file_path, sheet_name)
+    sheet_rows = _get_sheet_rows(file_path, sheet_name, start_row)
 
     owner_keys = set()
     unit_numbers = set()
@@ -275,7 +269,7 @@ def preview_owners_from_excel(file_path: str, mapping: dict | None = None) -> di
     errors = []
     preview_rows = []
 
-    for row_idx, row in enumerate(ws.iter_rows(min_row=start_row, values_only=True), start=start_row):
+    for row_idx, row in enumerate(sheet_rows, start=start_row):
         parsed = _parse_row(row, row_idx, fm)
         if parsed is None:
             if row and any(c is not None for c in row[:15]):
@@ -310,8 +304,6 @@ def preview_owners_from_excel(file_path: str, mapping: dict | None = None) -> di
             "phone": parsed["phone_gsm"] or "",
         })
 
-    wb.close()
-
     return {
         "rows_processed": rows_processed,
         "owners_count": len(owner_keys),
@@ -328,14 +320,14 @@ def import_owners_from_excel(db: Session, file_path: str, mapping: dict | None =
     sheet_name = m.get("sheet_name")
     start_row = m.get("start_row", 2)
 
-    wb, ws = _get_worksheet(file_path, sheet_name)
+    sheet_rows = _get_sheet_rows(file_path, sheet_name, start_row)
 
     # First pass: collect all rows grouped by owner key
     owner_groups: dict[str, list[dict]] = {}
     rows_processed = 0
     errors = []
 
-    for row_idx, row in enumerate(ws.iter_rows(min_row=start_row, values_only=True), start=start_row):
+    for row_idx, row in enumerate(sheet_rows, start=start_row):
         parsed = _parse_row(row, row_idx, fm)
         if parsed is None:
             if row and any(c is not None for c in row[:15]):
@@ -346,8 +338,6 @@ def import_owners_from_excel(db: Session, file_path: str, mapping: dict | None =
         key = _owner_group_key(parsed["first_name"], parsed["last_name"], parsed["birth_or_ic"])
         owner_groups.setdefault(key, []).append(parsed)
 
-    wb.close()
-
     # Second pass: create DB records
     owners_created = 0
     units_created = 0
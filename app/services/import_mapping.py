@@ -5,8 +5,7 @@ header names, and validation of mapping dicts.
 """
 from __future__ import annotations
 
-from openpyxl import load_workbook
-
+from app.services.parsed_upload import get_parsed_upload
 from app.utils import strip_diacritics
 
 
@@ -18,53 +17,22 @@ def read_excel_headers(file_path: str, sheet_name: str | None = None, header_row
     """Read headers from a specific row in an Excel file.
 
     Returns list of header strings (empty cells become "Sloupec N").
-    Supports both .xlsx (openpyxl) and .xls (xlrd) formats.
+    Supports both .xlsx (openpyxl) and .xls (xlrd) formats; the workbook
+    is read through the shared parsed-upload cache.
     """
-    if file_path.lower().endswith(".xls") and not file_path.lower().endswith(".xlsx"):
-        return _read_xls_headers(file_path, sheet_name, header_row)
-
-    wb = load_workbook(file_path, read_only=True, data_only=True)
-    if sheet_name and sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-    else:
-        ws = wb.active
-    headers = []
-    for row in ws.iter_rows(min_row=header_row, max_row=header_row, values_only=True):
-        headers = [
-            str(c).strip() if c is not None else f"Sloupec {i + 1}"
-            for i, c in enumerate(row)
-        ]
-    wb.close()
-    return headers
-
-
-def _read_xls_headers(file_path: str, sheet_name: str | None, header_row: int) -> list[str]:
-    """Read headers from .xls file using xlrd."""
-    import xlrd
-    wb = xlrd.open_workbook(file_path)
-    if sheet_name and sheet_name in wb.sheet_names():
-        ws = wb.sheet_by_name(sheet_name)
-    else:
-        ws = wb.sheet_by_index(0)
-    row_idx = header_row - 1  # xlrd is 0-based
-    if row_idx >= ws.nrows:
+    parsed = get_parsed_upload(file_path)
+    row = parsed.row(parsed.resolve_sheet(sheet_name), header_row)
+    if row is None:
         return []
     return [
-        str(ws.cell_value(row_idx, c)).strip() if ws.cell_value(row_idx, c) != "" else f"Sloupec {c + 1}"
-        for c in range(ws.ncols)
+        str(c).strip() if c is not None and c != "" else f"Sloupec {i + 1}"
+        for i, c in enumerate(row)
     ]
 
 
 def read_excel_sheet_names(file_path: str) -> list[str]:
     """Return list of sheet names in an Excel file."""
-    if file_path.lower().endswith(".xls") and not file_path.lower().endswith(".xlsx"):
-        import xlrd
-        wb = xlrd.open_workbook(file_path)
-        return wb.sheet_names()
-    wb = load_workbook(file_path, read_only=True)
-    names = list(wb.sheetnames)
-    wb.close()
-    return names
+    return list(get_parsed_upload(file_path).sheet_names)
 
 
 # ---------------------------------------------------------------------------
@@ -597,13 +565,8 @@ def detect_header_row(
     best_data = 2
     best_matches = -1
 
-    wb = load_workbook(file_path, read_only=True, data_only=True)
-    ws = wb[sheet_name] if sheet_name and sheet_name in wb.sheetnames else wb.active
-
-    rows_cache: list[list] = []
-    for row in ws.iter_rows(min_row=1, max_row=max_scan, values_only=True):
-        rows_cache.append(list(row))
-    wb.close()
+    parsed = get_parsed_upload(file_path)
+    rows_cache = [list(row) for row in parsed.rows(parsed.resolve_sheet(sheet_name), 1, max_scan)]
 
     for idx, row_data in enumerate(rows_cache):
         # Skip rows with <2 non-empty cells
@@ -0,0 +1,556 @@
+"""Úlohy na pozadí — omezený pool workerů, perzistentní záznam, pauza a zrušení.
+
+Dlouhé operace (zpracování daňových PDF, přepočet přiřazení, rozesílky emailů,
+kontrola nedoručených, synchronizace, import kontaktů, zálohy) se spouští přes
+``submit(kind, fn, *args, key=..., pool=...)``. Funkce dostane jako první
+argument ``Job``: průběh hlásí přes ``job.update(...)`` / ``job.advance()``
+a mezi kroky volá ``job.checkpoint()`` — tam se zastaví při pauze a vyhodí
+``JobCancelled`` po zrušení. Návratová hodnota funkce je výsledek úlohy.
+
+Souběh hlídá dispatcher: celkem nejvýš ``settings.job_workers`` běžících
+úloh, v poolu ``heavy`` (CPU + zápisy do SQLite) nejvýš
+``settings.job_heavy_workers``, v poolu ``email`` nejvýš ``EMAIL_WORKERS``.
+Ostatní čekají ve frontě v pořadí zadání.
+
+Živý stav je v paměti (polling čte odtud); do tabulky ``background_jobs`` se
+zapisuje při změně stavu hned a průběh nejvýš jednou za ``PERSIST_INTERVAL``.
+Po restartu ``recover_interrupted_jobs()`` označí nedokončené úlohy jako
+přerušené. Průběh + ETA pro UI vrací ``GET /ulohy/{id}/stav``.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from app.config import settings
+from app.models.job import BackgroundJob, JobStatus
+from app.utils import compute_eta, utcnow
+
+logger = logging.getLogger(__name__)
+
+# Souběh rozesílek (SMTP spojení, většinu času čekají na interval dávky)
+EMAIL_WORKERS = 2
+# Nejkratší odstup zápisů průběhu do DB (s)
+PERSIST_INTERVAL = 2.0
+# Kolik dokončených úloh držet v paměti (starší se čtou z DB)
+FINISHED_KEEP = 100
+# Dokončené úlohy starší než tolik dní se při startu mažou
+HISTORY_DAYS = 90
+# Výsledek větší než tolik znaků se do DB neukládá (zůstane jen v paměti)
+RESULT_JSON_MAX = 64_000
+# Interval kontroly pauzy / zrušení (s)
+_POLL = 0.5
+
+POOLS = ("heavy", "email", "light")
+_FINISHED = (JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED)
+_ACTIVE = (JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.PAUSED)
+
+STATUS_LABELS = {
+    "queued": "Ve frontě",
+    "running": "Běží",
+    "paused": "Pozastaveno",
+    "done": "Dokončeno",
+    "failed": "Chyba",
+    "cancelled": "Zrušeno",
+}
+
+_jobs: dict[int, "Job"] = {}
+_queue: deque[int] = deque()
+_running: dict[str, int] = {pool: 0 for pool in POOLS}
+_lock = threading.RLock()
+
+
+class JobCancelled(Exception):
+    """Úloha byla zrušena — vyhazuje ``Job.checkpoint()``."""
+
+
+def _session_factory():
+    from app.database import SessionLocal
+    return SessionLocal()
+
+
+class Job:
+    """Běžící (nebo čekající) úloha — API pro funkci úlohy i pro routery."""
+
+    def __init__(self, job_id, kind: str, key, label: str, pool: str, fn, args: tuple,
+                 total: int = 0, fields: dict | None = None):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.label = label
+        self.pool = pool
+        self.status = JobStatus.QUEUED
+        self.current = 0
+        self.total = total
+        self.message = ""
+        self.error: str | None = None
+        self.result = None
+        self.fields: dict = dict(fields or {})
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._fn = fn
+        self._args = args
+        self._cancel = threading.Event()
+        self._resume = threading.Event()
+        self._resume.set()
+        self._persisted = 0.0
+
+    # ── Průběh ──────────────────────────────────────────────────────
+
+    def update(self, current: int | None = None, total: int | None = None,
+               message: str | None = None, **fields) -> None:
+        """Zapsat průběh; do DB se propíše nejvýš jednou za PERSIST_INTERVAL."""
+        with _lock:
+            if current is not None:
+                self.current = current
+            if total is not None:
+                self.total = total
+            if message is not None:
+                self.message = message
+            self.fields.update(fields)
+        self._persist()
+
+    def advance(self, step: int = 1, **fields) -> None:
+        """Posunout ``current`` o ``step`` (+ volitelně další pole)."""
+        with _lock:
+            self.current += step
+            self.fields.update(fields)
+        self._persist()
+
+    def next_phase(self, total: int = 0, message: str = "", **fields) -> None:
+        """Nová fáze úlohy — průběh od nuly, ETA se počítá od začátku fáze."""
+        with _lock:
+            self.current = 0
+            self.total = total
+            self.message = message
+            self.started_at = time.monotonic()
+            self.fields.update(fields)
+        self._persist(force=True)
+
+    def get(self, name: str, default=None):
+        with _lock:
+            return self.fields.get(name, default)
+
+    def __setitem__(self, name: str, value) -> None:
+        # Služby, které hlásí průběh zápisem do dictu (preview_contact_import)
+        self.update(**{name: value})
+
+    # ── Pauza / zrušení ─────────────────────────────────────────────
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def checkpoint(self) -> None:
+        """Počkat, dokud je úloha pozastavená; po zrušení vyhodit JobCancelled."""
+        while not self._resume.wait(_POLL):
+            if self._cancel.is_set():
+                break
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def sleep(self, seconds: float) -> None:
+        """Přerušitelné čekání (interval mezi dávkami)."""
+        deadline = time.monotonic() + seconds
+        while True:
+            self.checkpoint()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._cancel.wait(min(_POLL, remaining))
+
+    def wait_for_confirm(self) -> None:
+        """Zastavit se před další dávkou, dokud uživatel nepotvrdí (``resume``)."""
+        with _lock:
+            self.fields["waiting_batch_confirm"] = True
+            self._resume.clear()
+        self._persist(force=True)
+        try:
+            self.checkpoint()
+        finally:
+            with _lock:
+                self.fields["waiting_batch_confirm"] = False
+
+    # ── Stav ────────────────────────────────────────────────────────
+
+    @property
+    def done(self) -> bool:
+        return self.status in _FINISHED
+
+    def snapshot(self) -> dict:
+        """Kopie stavu pro šablony (pole úlohy + ``fields``)."""
+        with _lock:
+            return {
+                **self.fields,
+                "id": self.id,
+                "kind": self.kind,
+                "key": self.key,
+                "label": self.label,
+                "pool": self.pool,
+                "status": self.status.value,
+                "status_label": STATUS_LABELS[self.status.value],
+                "current": self.current,
+                "total": self.total,
+                "message": self.message,
+                "error": self.error,
+                "result": self.result,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "queued": self.status == JobStatus.QUEUED,
+                "queue_position": _queue.index(self.id) + 1 if self.id in _queue else 0,
+                "paused": self.status == JobStatus.PAUSED,
+                "done": self.status in _FINISHED,
+                "cancelled": self.status == JobStatus.CANCELLED or self._cancel.is_set(),
+            }
+
+    def _persist(self, force: bool = False) -> None:
+        if self.id is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._persisted < PERSIST_INTERVAL:
+            return
+        self._persisted = now
+        _write(self)
+
+
+# ── DB ──────────────────────────────────────────────────────────────
+
+
+def _dumps(value, limit: int | None = None) -> str | None:
+    if value is None:
+        return None
+    try:
+        text = json.dumps(value, ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        return None
+    if limit is not None and len(text) > limit:
+        return None
+    return text
+
+
+def _write(job: Job, **values) -> None:
+    """Propsat stav úlohy do background_jobs (chyba zápisu úlohu nezastaví)."""
+    with _lock:
+        values.update({
+            "status": job.status,
+            "current": job.current,
+            "total": job.total,
+            "message": (job.message or "")[:500] or None,
+            "error": job.error,
+            "fields_json": _dumps(job.fields),
+        })
+        result = job.result
+    if job.done:
+        values["result_json"] = _dumps(result, RESULT_JSON_MAX)
+    try:
+        db = _session_factory()
+        try:
+            db.query(BackgroundJob).filter_by(id=job.id).update(values)
+            db.commit()
+        finally:
+            db.close()
+    except Exception:
+        logger.warning("Nepodařilo se uložit stav úlohy %s #%s", job.kind, job.id, exc_info=True)
+
+
+def _row_snapshot(row: BackgroundJob) -> dict:
+    """Snapshot z DB řádku — úloha z minulého běhu nebo už vypadlá z paměti."""
+    fields = json.loads(row.fields_json) if row.fields_json else {}
+    status = row.status.value
+    return {
+        **fields,
+        "id": row.id,
+        "kind": row.kind,
+        "key": row.key,
+        "label": row.label,
+        "pool": row.pool,
+        "status": status,
+        "status_label": STATUS_LABELS[status],
+        "current": row.current,
+        "total": row.total,
+        "message": row.message or "",
+        "error": row.error,
+        "result": json.loads(row.result_json) if row.result_json else None,
+        "started_at": None,
+        "finished_at": None,
+        "queued": status == "queued",
+        "queue_position": 0,
+        "paused": status == "paused",
+        "done": row.status in _FINISHED,
+        "cancelled": status == "cancelled",
+        "created_at": row.created_at,
+    }
+
+
+# ── Plánování ───────────────────────────────────────────────────────
+
+
+def _pool_limit(pool: str) -> int:
+    if pool == "heavy":
+        return max(1, settings.job_heavy_workers)
+    if pool == "email":
+        return EMAIL_WORKERS
+    return max(1, settings.job_workers)
+
+
+def _dispatch() -> None:
+    """Spustit čekající úlohy, na které zbývá místo v poolu."""
+    with _lock:
+        for job_id in list(_queue):
+            if sum(_running.values()) >= max(1, settings.job_workers):
+                break
+            job = _jobs[job_id]
+            if _running[job.pool] >= _pool_limit(job.pool):
+                continue
+            _queue.remove(job_id)
+            _running[job.pool] += 1
+            job.status = JobStatus.RUNNING
+            job.started_at = time.monotonic()
+            threading.Thread(
+                target=_run, args=(job,), name=f"job-{job.kind}-{job.id}", daemon=True,
+            ).start()
+
+
+def _run(job: Job) -> None:
+    _write(job, started_at=utcnow())
+    status = JobStatus.DONE
+    try:
+        result = job._fn(job, *job._args)
+        if result is not None:
+            job.result = result
+        if job.cancel_requested:
+            status = JobStatus.CANCELLED
+    except JobCancelled:
+        status = JobStatus.CANCELLED
+    except Exception as exc:
+        logger.exception("Úloha %s #%s selhala", job.kind, job.id)
+        status = JobStatus.FAILED
+        job.error = str(exc) or exc.__class__.__name__
+    with _lock:
+        job.status = status
+        job.finished_at = time.monotonic()
+        _running[job.pool] -= 1
+    _write(job, finished_at=utcnow())
+    _prune()
+    _dispatch()
+
+
+def _prune() -> None:
+    with _lock:
+        finished = sorted(j.id for j in _jobs.values() if j.done)
+        for job_id in finished[:-FINISHED_KEEP]:
+            del _jobs[job_id]
+
+
+def submit(kind: str, fn, *args, key=None, label: str = "", pool: str = "heavy",
+           total: int = 0, fields: dict | None = None) -> Job:
+    """Zařadit úlohu ``fn(job, *args)`` do fronty; vrací ``Job`` (id je hned známé).
+
+    ``fields`` jsou počáteční doplňková pole průběhu — kromě dat pro šablonu
+    (``sent``, ``batch_number`` …) i nastavení zobrazení pro ``/ulohy/{id}/stav``:
+    ``template`` (partial), ``redirect_url`` (kam po dokončení),
+    ``redirect_delay`` (s), ``progress_title``, ``unit_label`` …
+    """
+    if pool not in POOLS:
+        raise ValueError(f"Neznámý pool úloh: {pool}")
+    key = str(key) if key is not None else None
+    db = _session_factory()
+    try:
+        row = BackgroundJob(kind=kind, key=key, label=label, pool=pool,
+                            status=JobStatus.QUEUED, total=total,
+                            fields_json=_dumps(fields or {}))
+        db.add(row)
+        db.commit()
+        job_id = row.id
+    finally:
+        db.close()
+    job = Job(job_id, kind, key, label, pool, fn, args, total=total, fields=fields)
+    with _lock:
+        _jobs[job_id] = job
+        _queue.append(job_id)
+    _dispatch()
+    return job
+
+
+def run_inline(kind: str, fn, *args, key=None, label: str = "", total: int = 0,
+               fields: dict | None = None) -> Job:
+    """Spustit úlohu hned v aktuálním vlákně bez fronty a DB záznamu (skripty, testy).
+
+    Výjimky funkce propadnou volajícímu; vrací dokončený ``Job``.
+    """
+    job = Job(None, kind, str(key) if key is not None else None, label, "light", fn, args,
+              total=total, fields=fields)
+    job.status = JobStatus.RUNNING
+    job.started_at = time.monotonic()
+    try:
+        result = fn(job, *args)
+        if result is not None:
+            job.result = result
+        job.status = JobStatus.DONE
+    except JobCancelled:
+        job.status = JobStatus.CANCELLED
+    finally:
+        if job.status == JobStatus.RUNNING:
+            job.status = JobStatus.FAILED
+        job.finished_at = time.monotonic()
+    return job
+
+
+# ── Dotazy a řízení ─────────────────────────────────────────────────
+
+
+def get(job_id: int) -> dict | None:
+    """Snapshot úlohy podle id (paměť, jinak DB)."""
+    with _lock:
+        job = _jobs.get(job_id)
+    if job is not None:
+        return job.snapshot()
+    db = _session_factory()
+    try:
+        row = db.query(BackgroundJob).get(job_id)
+        return _row_snapshot(row) if row else None
+    finally:
+        db.close()
+
+
+def find(kind: str, key=None) -> dict | None:
+    """Nejnovější úloha daného druhu (a klíče) — i dokončená."""
+    key = str(key) if key is not None else None
+    with _lock:
+        for job_id in sorted(_jobs, reverse=True):
+            job = _jobs[job_id]
+            if job.kind == kind and job.key == key:
+                return job.snapshot()
+    db = _session_factory()
+    try:
+        row = (
+            db.query(BackgroundJob)
+            .filter_by(kind=kind, key=key)
+            .order_by(BackgroundJob.id.desc())
+            .first()
+        )
+        return _row_snapshot(row) if row else None
+    finally:
+        db.close()
+
+
+def active(kind: str, key=None) -> dict | None:
+    """Běžící, pozastavená nebo čekající úloha daného druhu (a klíče)."""
+    key = str(key) if key is not None else None
+    with _lock:
+        for job_id in sorted(_jobs, reverse=True):
+            job = _jobs[job_id]
+            if job.kind == kind and job.key == key and not job.done:
+                return job.snapshot()
+    return None
+
+
+def recent(limit: int = 50) -> list[dict]:
+    """Poslední úlohy (nejnovější první) — živé z paměti, ostatní z DB."""
+    db = _session_factory()
+    try:
+        rows = db.query(BackgroundJob).order_by(BackgroundJob.id.desc()).limit(limit).all()
+        snapshots = [_row_snapshot(row) for row in rows]
+    finally:
+        db.close()
+    with _lock:
+        live = {job_id: job for job_id, job in _jobs.items()}
+    return [
+        {**live[s["id"]].snapshot(), "created_at": s["created_at"]} if s["id"] in live else s
+        for s in snapshots
+    ]
+
+
+def cancel(job_id: int) -> bool:
+    """Zrušit úlohu — čekající hned, běžící na nejbližším ``checkpoint()``."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        queued = job.id in _queue
+        if queued:
+            _queue.remove(job.id)
+            job.status = JobStatus.CANCELLED
+            job.finished_at = time.monotonic()
+        job._cancel.set()
+        job._resume.set()
+    if queued:
+        _write(job, finished_at=utcnow())
+    return True
+
+
+def pause(job_id: int) -> bool:
+    """Pozastavit běžící úlohu (zastaví se na nejbližším ``checkpoint()``)."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job.status != JobStatus.RUNNING:
+            return False
+        job.status = JobStatus.PAUSED
+        job._resume.clear()
+    _write(job)
+    return True
+
+
+def resume(job_id: int) -> bool:
+    """Pokračovat po pauze nebo potvrdit další dávku."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        if job.status == JobStatus.PAUSED:
+            job.status = JobStatus.RUNNING
+        job._resume.set()
+    _write(job)
+    return True
+
+
+def progress_context(snapshot: dict) -> dict:
+    """Snapshot + procenta, uplynulý čas a ETA pro šablony průběhu."""
+    current, total = snapshot["current"], snapshot["total"]
+    started = snapshot.get("started_at")
+    if started is not None and snapshot.get("finished_at") is not None:
+        # Dokončená úloha — uplynulý čas zmrazit na okamžik dokončení
+        started = time.monotonic() - (snapshot["finished_at"] - started)
+    if started is not None:
+        eta = compute_eta(current, total, started)
+        if snapshot["done"]:
+            eta["eta"] = ""
+    else:
+        eta = {"pct": int(current / total * 100) if total > 0 else 0, "elapsed": "", "eta": ""}
+    return {
+        "current_file": snapshot["message"],
+        "progress_title": snapshot["label"],
+        **snapshot,
+        "job_id": snapshot["id"],
+        **eta,
+    }
+
+
+def recover_interrupted_jobs() -> int:
+    """Po startu: nedokončené úlohy z minulého běhu → FAILED; smazat starou historii."""
+    with _lock:
+        live = [job_id for job_id, job in _jobs.items() if not job.done]
+    db = _session_factory()
+    try:
+        query = db.query(BackgroundJob).filter(BackgroundJob.status.in_(_ACTIVE))
+        if live:
+            query = query.filter(BackgroundJob.id.notin_(live))
+        count = query.update({
+            "status": JobStatus.FAILED,
+            "error": "Přerušeno restartem aplikace",
+            "finished_at": utcnow(),
+        }, synchronize_session=False)
+        db.query(BackgroundJob).filter(
+            BackgroundJob.status.in_(_FINISHED),
+            BackgroundJob.created_at < utcnow() - timedelta(days=HISTORY_DAYS),
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    if count:
+        logger.warning("Označeno %d přerušených úloh na pozadí", count)
+    return count
@@ -0,0 +1,317 @@
+"""Retence logů — přesun starých e-mail/aktivita/bounce logů do archivu a zhutnění DB.
+
+Pravidla (``LogRetentionPolicy``) určují pro každý typ logu, kolik dní se
+řádky drží v hlavní DB; pravidlo s prázdným ``module`` platí pro všechny
+moduly bez vlastního pravidla, ``keep_days = None`` znamená držet navždy.
+
+Starší řádky se po dávkách zkopírují do archivní SQLite DB
+(``data/archive/logs_archive.db``, tabulka ``archived_logs``) — celý řádek
+jako zlib-komprimovaný JSON, vedle něj dotazovatelné sloupce (typ, id,
+modul, datum, krátký souhrn) — a teprve po commitu archivu se smažou z hlavní
+DB. Potom ``compact_database`` uvolní místo: první běh přepne DB na
+``auto_vacuum = INCREMENTAL`` (jednorázový VACUUM), další už jen
+``PRAGMA incremental_vacuum``. Historie běhů se ukládá do
+``retention_log.json`` vedle archivu.
+
+Archiv není součástí ZIP záloh — zálohy tak přestanou růst s historií logů.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import ActivityLog, EmailBounce, EmailLog, LogRetentionPolicy
+from app.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PATH = settings.archive_dir / "logs_archive.db"
+REPORT_PATH = settings.archive_dir / "retention_log.json"
+
+# Počet řádků archivovaných v jedné transakci
+CHUNK_SIZE = 1000
+# Kolik posledních běhů drží historie
+_REPORT_KEEP = 20
+
+# Pořadí je důležité: bounce logy před e-maily (odkazují na email_logs)
+LOG_TYPES = {
+    "email_bounces": {
+        "label": "Nedoručené emaily",
+        "model": EmailBounce,
+        "summary": ("recipient_email", "subject"),
+    },
+    "email_logs": {
+        "label": "Emaily",
+        "model": EmailLog,
+        "summary": ("recipient_email", "subject"),
+    },
+    "activity_logs": {
+        "label": "Aktivita",
+        "model": ActivityLog,
+        "summary": ("entity_name", "description"),
+    },
+}
+
+DEFAULT_KEEP_DAYS = {
+    "email_bounces": 730,
+    "email_logs": 730,
+    "activity_logs": 1095,
+}
+
+
+# ── Policies ────────────────────────────────────────────────────────
+
+def get_policies(db: Session) -> list[LogRetentionPolicy]:
+    """All policies; missing default (module "") rows are created from ``DEFAULT_KEEP_DAYS``."""
+    policies = db.query(LogRetentionPolicy).all()
+    present = {p.log_type for p in policies if not p.module}
+    for log_type in LOG_TYPES:
+        if log_type not in present:
+            policy = LogRetentionPolicy(log_type=log_type, module="", keep_days=DEFAULT_KEEP_DAYS[log_type])
+            db.add(policy)
+            policies.append(policy)
+    db.flush()
+    order = list(LOG_TYPES)
+    return sorted(policies, key=lambda p: (order.index(p.log_type) if p.log_type in order else 99, p.module))
+
+
+def _expired_conditions(policies: list[LogRetentionPolicy], log_type: str, now: datetime) -> list[tuple]:
+    """[(policy, WHERE clause)] for rows of ``log_type`` past their retention."""
+    model = LOG_TYPES[log_type]["model"]
+    own = [p for p in policies if p.log_type == log_type]
+    overrides = [p.module for p in own if p.module]
+    out = []
+    for policy in own:
+        if policy.keep_days is None:
+            continue
+        cond = model.created_at < now - timedelta(days=policy.keep_days)
+        if policy.module:
+            cond = cond & (model.module == policy.module)
+        elif overrides:
+            cond = cond & or_(model.module.is_(None), model.module.notin_(overrides))
+        out.append((policy, cond))
+    return out
+
+
+def preview_retention(db: Session, now: datetime | None = None) -> list[dict]:
+    """Number of rows each policy would archive right now."""
+    now = now or utcnow()
+    policies = get_policies(db)
+    rows = []
+    for log_type, meta in LOG_TYPES.items():
+        model = meta["model"]
+        for policy, cond in _expired_conditions(policies, log_type, now):
+            rows.append({
+                "log_type": log_type,
+                "module": policy.module,
+                "keep_days": policy.keep_days,
+                "count": db.query(model).filter(cond).count(),
+            })
+    return rows
+
+
+# ── Archive DB ──────────────────────────────────────────────────────
+
+def _open_archive() -> sqlite3.Connection:
+    ARCHIVE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(ARCHIVE_PATH))
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS archived_logs ("
+        "log_type TEXT NOT NULL, id INTEGER NOT NULL, module TEXT, created_at TEXT, "
+        "summary TEXT, payload BLOB NOT NULL, archived_at TEXT NOT NULL, "
+        "PRIMARY KEY (log_type, id))"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS ix_archived_logs_type_created "
+        "ON archived_logs (log_type, created_at)"
+    )
+    return conn
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return getattr(value, "value", str(value))
+
+
+def _archive_row(log_type: str, row: dict, archived_at: str) -> tuple:
+    summary = " · ".join(str(row[c]) for c in LOG_TYPES[log_type]["summary"] if row.get(c))
+    payload = zlib.compress(json.dumps(row, default=_json_default, ensure_ascii=False).encode("utf-8"), 9)
+    created = row.get("created_at")
+    return (
+        log_type, row["id"], row.get("module"),
+        created.isoformat(sep=" ") if isinstance(created, datetime) else created,
+        summary[:300], payload, archived_at,
+    )
+
+
+def archive_expired_logs(db: Session, now: datetime | None = None) -> dict[str, int]:
+    """Move rows past their retention into the archive DB; returns {log_type: archived}.
+
+    Každá dávka se nejdřív zapíše a commitne do archivu, teprve potom se
+    smaže z hlavní DB — přerušený běh nic neztratí, opakovaný jen přepíše
+    už archivované řádky.
+    """
+    now = now or utcnow()
+    policies = get_policies(db)
+    db.commit()
+    archived_at = utcnow().isoformat(sep=" ")
+    archived = {log_type: 0 for log_type in LOG_TYPES}
+
+    archive = _open_archive()
+    try:
+        for log_type, meta in LOG_TYPES.items():
+            table = meta["model"].__table__
+            for _policy, cond in _expired_conditions(policies, log_type, now):
+                while True:
+                    rows = db.execute(
+                        select(table).where(cond).order_by(table.c.id).limit(CHUNK_SIZE)
+                    ).mappings().all()
+                    if not rows:
+                        break
+                    archive.executemany(
+                        "INSERT OR REPLACE INTO archived_logs "
+                        "(log_type, id, module, created_at, summary, payload, archived_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [_archive_row(log_type, dict(r), archived_at) for r in rows],
+                    )
+                    archive.commit()
+
+                    ids = [r["id"] for r in rows]
+                    if log_type == "email_logs":
+                        # Bounce, který v DB zůstává, přijde jen o odkaz na archivovaný e-mail
+                        db.execute(
+                            EmailBounce.__table__.update()
+                            .where(EmailBounce.email_log_id.in_(ids))
+                            .values(email_log_id=None)
+                        )
+                    db.execute(table.delete().where(table.c.id.in_(ids)))
+                    db.commit()
+                    archived[log_type] += len(ids)
+    finally:
+        archive.close()
+
+    if any(archived.values()):
+        logger.info("Log retention archived %s", archived)
+    return archived
+
+
+def archive_stats() -> dict:
+    """Row counts per log type and archive file size."""
+    counts = {log_type: 0 for log_type in LOG_TYPES}
+    if not ARCHIVE_PATH.is_file():
+        return {"counts": counts, "total": 0, "size": 0}
+    conn = _open_archive()
+    try:
+        for log_type, count in conn.execute(
+            "SELECT log_type, count(*) FROM archived_logs GROUP BY log_type"
+        ):
+            counts[log_type] = count
+    finally:
+        conn.close()
+    return {"counts": counts, "total": sum(counts.values()), "size": ARCHIVE_PATH.stat().st_size}
+
+
+def query_archive(log_type: str = "", q: str = "", limit: int = 200) -> list[dict]:
+    """Newest archived rows (optionally by type / text in summary or module), payload decoded."""
+    if not ARCHIVE_PATH.is_file():
+        return []
+    where, params = [], []
+    if log_type:
+        where.append("log_type = ?")
+        params.append(log_type)
+    if q:
+        where.append("(summary LIKE ? OR module LIKE ?)")
+        params.extend([f"%{q}%", f"%{q}%"])
+    sql = (
+        "SELECT log_type, id, module, created_at, summary, payload, archived_at FROM archived_logs"
+        + (" WHERE " + " AND ".join(where) if where else "")
+        + " ORDER BY created_at DESC, id DESC LIMIT ?"
+    )
+    conn = _open_archive()
+    try:
+        rows = conn.execute(sql, [*params, limit]).fetchall()
+    finally:
+        conn.close()
+    return [
+        {
+            "log_type": lt, "id": row_id, "module": module or "",
+            "created_at": created_at or "", "summary": summary or "",
+            "archived_at": archived_at,
+            "data": json.loads(zlib.decompress(payload).decode("utf-8")),
+        }
+        for lt, row_id, module, created_at, summary, payload, archived_at in rows
+    ]
+
+
+# ── Compaction ──────────────────────────────────────────────────────
+
+def _db_size(conn: sqlite3.Connection) -> int:
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+
+
+def compact_database(db_path: str) -> dict:
+    """Return freed pages to the OS; returns sizes in bytes before/after.
+
+    První běh přepne DB na ``auto_vacuum = INCREMENTAL`` (vyžaduje jeden
+    plný VACUUM), další běhy uvolní jen volné stránky přes
+    ``incremental_vacuum`` bez přepisu celé DB.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        before = _db_size(conn)
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            conn.execute("PRAGMA incremental_vacuum")
+            mode = "incremental"
+        else:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            mode = "full"
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        after = _db_size(conn)
+    finally:
+        conn.close()
+    return {"mode": mode, "size_before": before, "size_after": after, "reclaimed": max(before - after, 0)}
+
+
+# ── Run + report ────────────────────────────────────────────────────
+
+def read_retention_log() -> list[dict]:
+    """Previous retention runs, newest first."""
+    try:
+        return json.loads(REPORT_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+
+
+def _write_retention_log(entry: dict) -> None:
+    entries = [entry, *read_retention_log()][:_REPORT_KEEP]
+    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = REPORT_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(entries, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, REPORT_PATH)
+
+
+def run_retention(db: Session, db_path: str, now: datetime | None = None) -> dict:
+    """Archive expired logs, compact the main DB and record the run."""
+    archived = archive_expired_logs(db, now)
+    compaction = compact_database(db_path)
+    entry = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "archived": archived,
+        "archived_total": sum(archived.values()),
+        **compaction,
+    }
+    _write_retention_log(entry)
+    return entry
@@ -68,14 +68,31 @@ def normalize_for_matching(name: str) -> str:
 
 def name_parts_match(name1: str, name2: str) -> float:
     """Compare two names by splitting into parts and checking overlap."""
-    parts1 = set(normalize_for_matching(name1).split())
-    parts2 = set(normalize_for_matching(name2).split())
+    return _parts_score(
+        set(normalize_for_matching(name1).split()),
+        set(normalize_for_matching(name2).split()),
+    )
+
+
+def name_similarity(norm1: str, norm2: str) -> float:
+    """Similarity of two names already passed through normalize_for_matching.
+
+    Same score as match_name (max of sequence ratio and parts overlap), for
+    callers that normalize each name once and compare many pairs.
+    """
+    if norm1 == norm2:
+        return 1.0 if norm1 else 0.0
+    seq_ratio = SequenceMatcher(None, norm1, norm2).ratio()
+    return max(seq_ratio, _parts_score(set(norm1.split()), set(norm2.split())))
+
+
+def _parts_score(parts1: set, parts2: set) -> float:
     if not parts1 or not parts2:
         return 0.0
     # Remove connectors
     connectors = {"a", "and", "und"}
-    parts1 -= connectors
-    parts2 -= connectors
+    parts1 = parts1 - connectors
+    parts2 = parts2 - connectors
     if not parts1 or not parts2:
         return 0.0
     intersection = parts1 & parts2
@@ -0,0 +1,162 @@
+"""Párování jmen z importů na vlastníky v paměti.
+
+Importy prostorů, zůstatků a kontaktů dřív hledaly vlastníka dotazem na
+každý řádek (``name_normalized == ...``, ``LIKE 'prijmeni%'``). ``OwnerResolver``
+načte aktivní vlastníky jedním dotazem a postaví indexy:
+
+- přesné ``name_normalized`` → vlastníci (podle id),
+- seřazené pole jmen pro prefix příjmení (``bisect``, stejné jako ``LIKE 'x%'``),
+- rodné číslo / IČ bez mezer a lomítek,
+- volitelně aktuální vlastnictví jednotek (``with_units=True``).
+
+Náhled i potvrzení importu s tisíci řádky tak dělají konstantní počet dotazů.
+Resolver platí pro jeden běh importu — vlastníky vytvořené během importu nevidí.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models import Owner
+from app.utils import strip_diacritics
+
+# Kratší příjmení se prefixem nehledá (příliš mnoho falešných shod)
+MIN_SURNAME_LENGTH = 3
+
+
+def _identifier_key(value) -> str:
+    """RČ / IČ bez mezer a lomítek (``"850101/1234"`` → ``"8501011234"``)."""
+    return str(value).replace(" ", "").replace("/", "") if value else ""
+
+
+class OwnerResolver:
+    """Indexy vlastníků pro jeden běh importu."""
+
+    def __init__(self, owners: Iterable[Owner], owner_units: Iterable = ()):
+        owners = sorted(owners, key=lambda o: o.id)
+        self._by_id: dict[int, Owner] = {o.id: o for o in owners}
+        self._by_name: dict[str, list[Owner]] = {}
+        self._by_identifier: dict[str, Owner] = {}
+        for o in owners:
+            if o.name_normalized:
+                self._by_name.setdefault(o.name_normalized.strip(), []).append(o)
+            for raw in (o.birth_number, o.company_id):
+                key = _identifier_key(raw)
+                if key:
+                    self._by_identifier.setdefault(key, o)
+        self._names = sorted(self._by_name)
+        self._units: dict[int, list] = {}
+        for ou in owner_units:
+            self._units.setdefault(ou.unit_id, []).append(ou)
+
+    @classmethod
+    def load(cls, db: Session, with_units: bool = False) -> "OwnerResolver":
+        """Načíst aktivní vlastníky (a s ``with_units`` jejich aktuální jednotky)."""
+        owners = db.query(Owner).filter_by(is_active=True).all()
+        owner_units = ()
+        if with_units:
+            from app.services import ownership
+            owner_units = ownership.load(db)
+        return cls(owners, owner_units)
+
+    # ── Přímé lookupy ───────────────────────────────────────────────
+
+    def get(self, owner_id: int) -> Optional[Owner]:
+        return self._by_id.get(owner_id)
+
+    def exact(self, name_norm: str) -> Optional[Owner]:
+        """Vlastník s přesně tímto ``name_normalized`` (při duplicitě nejnižší id)."""
+        owners = self._by_name.get((name_norm or "").strip())
+        return owners[0] if owners else None
+
+    def by_identifier(self, value) -> Optional[Owner]:
+        """Vlastník podle rodného čísla nebo IČ."""
+        return self._by_identifier.get(_identifier_key(value))
+
+    def with_prefix(self, prefix: str) -> list[Owner]:
+        """Vlastníci, jejichž ``name_normalized`` začíná ``prefix`` (podle id)."""
+        if not prefix:
+            return []
+        found = []
+        i = bisect_left(self._names, prefix)
+        while i < len(self._names) and self._names[i].startswith(prefix):
+            found.extend(self._by_name[self._names[i]])
+            i += 1
+        return sorted(found, key=lambda o: o.id)
+
+    def owner_units(self, unit_id: int) -> list:
+        """Aktuální vlastnictví jednotky (jen s ``with_units=True``)."""
+        return self._units.get(unit_id, [])
+
+    # ── Párování jména ──────────────────────────────────────────────
+
+    def _surname_candidates(self, name_norm: str) -> list[Owner]:
+        parts = name_norm.split()
+        if not parts or len(parts[0]) < MIN_SURNAME_LENGTH:
+            return []
+        return self.with_prefix(parts[0])
+
+    def match(self, name: str) -> Optional[Owner]:
+        """Jednoznačný vlastník pro jméno: přesná shoda, jinak jediný se stejným příjmením.
+
+        Víc kandidátů se stejným ``name_normalized`` = duplicitní záznamy
+        jedné osoby → první.
+        """
+        if not name:
+            return None
+        name_norm = strip_diacritics(name)
+        owner = self.exact(name_norm)
+        if owner:
+            return owner
+        candidates = self._surname_candidates(name_norm)
+        if len({c.name_normalized for c in candidates}) == 1:
+            return candidates[0]
+        return None
+
+    def candidates(self, name: str) -> list[dict]:
+        """Kandidáti pro náhled importu — ``[{id, name}]`` bez duplicit jména."""
+        if not name:
+            return []
+        name_norm = strip_diacritics(name)
+        owner = self.exact(name_norm)
+        if owner:
+            return [{"id": owner.id, "name": owner.display_name}]
+        seen = set()
+        result = []
+        for c in self._surname_candidates(name_norm):
+            if c.display_name not in seen:
+                seen.add(c.display_name)
+                result.append({"id": c.id, "name": c.display_name})
+        return result
+
+    def match_in_unit(self, name: str, unit_id: int) -> Optional[Owner]:
+        """Vlastník jednotky podle jména z Excelu (přesně > příjmení > příjmení ve jméně)."""
+        if not name or not name.strip():
+            return None
+        search = strip_diacritics(name.strip())
+        search_parts = search.split()
+
+        best_owner = None
+        best_score = 0
+        for ou in self.owner_units(unit_id):
+            owner = self._by_id.get(ou.owner_id)
+            if not owner:
+                continue
+            owner_norm = owner.name_normalized or ""
+            if search == owner_norm:
+                return owner
+            owner_parts = owner_norm.split()
+            if not owner_parts:
+                continue
+            if search_parts and search_parts[0] == owner_parts[0]:
+                score = 80
+            elif owner_parts[0] in search:
+                score = 60
+            else:
+                continue
+            if score > best_score:
+                best_score = score
+                best_owner = owner
+        return best_owner
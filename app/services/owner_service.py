@@ -3,10 +3,9 @@ Owner service — shared owner operations (merge, duplicate detection).
 """
 from __future__ import annotations
 
-from datetime import date
+from datetime import date, datetime
 
-from sqlalchemy import func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, selectinload
 
 from app.models import Owner, OwnerUnit
 from app.utils import utcnow
@@ -62,51 +61,166 @@ def merge_owners(target: Owner, duplicates: list[Owner], db: Session) -> None:
     target.updated_at = utcnow()
 
 
+# Práh podobnosti jmen (owner_matcher.name_similarity) pro kandidáta na duplicitu
+DUPLICATE_THRESHOLD = 0.9
+# Blok jména větší než tohle (běžné křestní jméno) se nepáruje — jen příjmení a identifikátory
+MAX_NAME_BLOCK = 50
+# Platné RČ má 9-10 číslic (bez lomítka), IČ 8 — zástupné hodnoty
+# ("neuvedeno", "------") ani samotné datum narození z importu se nepárují
+_IDENTIFIER_DIGITS = {"rc": (9, 10), "ic": (8,)}
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: dict[int, int] = {}
+
+    def find(self, x: int) -> int:
+        parent = self.parent.setdefault(x, x)
+        if parent != x:
+            parent = self.parent[x] = self.find(parent)
+        return parent
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def _identifier(kind: str, value) -> str:
+    key = str(value or "").replace(" ", "").replace("/", "")
+    return key if key.isdigit() and len(key) in _IDENTIFIER_DIGITS[kind] else ""
+
+
+def _duplicate_pairs(rows) -> list[tuple[int, int, float, str]]:
+    """Páry duplicitních vlastníků: (id_a, id_b, podobnost, důvod).
+
+    ``rows`` = (id, name_with_titles, name_normalized, birth_number, company_id).
+    Porovnávají se jen páry ve stejném bloku — stejné RČ/IČ, stejné
+    ``name_normalized`` nebo sdílená (stemovaná) část jména. Pár se stejným
+    RČ/IČ, ale nepodobným jménem, dostane podobnost jmen (< 1.0) — jistý není.
+    """
+    from app.services.owner_matcher import name_similarity, normalize_for_matching
+
+    norms: dict[int, str] = {}
+    blocks: dict[tuple, list[int]] = {}
+    for owner_id, name, name_norm, birth_number, company_id in rows:
+        norm = normalize_for_matching(name or name_norm or "")
+        norms[owner_id] = norm
+        keys = {("jmeno", name_norm)} if name_norm else set()
+        keys.update(("cast", part) for part in norm.split() if len(part) >= 3)
+        for kind, value in (("rc", birth_number), ("ic", company_id)):
+            identifier = _identifier(kind, value)
+            if identifier:
+                keys.add((kind, identifier))
+        for key in keys:
+            blocks.setdefault(key, []).append(owner_id)
+
+    pairs: dict[tuple[int, int], tuple[float, str]] = {}
+    rejected: set[tuple[int, int]] = set()
+    for (kind, _value), ids in blocks.items():
+        if len(ids) < 2 or (kind == "cast" and len(ids) > MAX_NAME_BLOCK):
+            continue
+        for i, a in enumerate(ids):
+            for b in ids[i + 1:]:
+                key = (a, b) if a < b else (b, a)
+                parts_a, parts_b = norms[a].split(), norms[b].split()
+                if kind in ("rc", "ic"):
+                    # Samotný identifikátor nestačí — jméno musí aspoň podobně sedět
+                    score = 1.0
+                    if set(parts_a) != set(parts_b):
+                        score = name_similarity(norms[a], norms[b])
+                        score = 1.0 if score >= DUPLICATE_THRESHOLD else score
+                    pairs[key] = (score, kind)
+                    continue
+                if key in pairs or (kind == "cast" and key in rejected):
+                    continue
+                if kind == "jmeno" or set(parts_a) == set(parts_b):
+                    pairs[key] = (1.0, "jmeno")
+                    continue
+                # Příjmení (první slovo v evidenci) musí sedět — jinak jen shodné křestní jméno
+                score = 0.0
+                if parts_a[0] in parts_b or parts_b[0] in parts_a:
+                    score = name_similarity(norms[a], norms[b])
+                if score >= DUPLICATE_THRESHOLD:
+                    pairs[key] = (score, "podobne")
+                else:
+                    rejected.add(key)
+    return [(a, b, score, reason) for (a, b), (score, reason) in pairs.items()]
+
+
 def find_duplicate_groups(db: Session) -> list[dict]:
-    """Find groups of active owners with the same name_normalized.
+    """Find groups of active owners that are likely the same person.
+
+    Owners are blocked by stemmed name parts, name_normalized and birth
+    number / company ID; pairs inside a block are scored by
+    ``owner_matcher.name_similarity`` and connected with union-find.
 
     Returns list of dicts:
         {
             "name_normalized": str,
             "owners": [Owner, ...],
             "recommended_id": int,  # ID of the recommended merge target
+            "certain": bool,        # same name (after titles/diacritics) or same RČ/IČ with similar name
+            "confidence": float,    # weakest pair similarity in the group
+            "reasons": list[str],   # "jmeno", "rc", "ic", "podobne"
         }
     Sorted by name_normalized.
     """
-    # Find name_normalized values with more than one active owner
-    dupes = (
-        db.query(Owner.name_normalized, func.count(Owner.id).label("cnt"))
-        .filter(Owner.is_active == True, Owner.name_normalized != "")
-        .group_by(Owner.name_normalized)
-        .having(func.count(Owner.id) > 1)
-        .order_by(Owner.name_normalized)
+    rows = (
+        db.query(Owner.id, Owner.name_with_titles, Owner.name_normalized, Owner.birth_number, Owner.company_id)
+        .filter(Owner.is_active == True)  # noqa: E712
         .all()
     )
-
-    groups = []
-    for name_norm, _cnt in dupes:
-        owners = (
+    pairs = _duplicate_pairs(rows)
+    if not pairs:
+        return []
+
+    uf = _UnionFind()
+    for a, b, _score, _reason in pairs:
+        uf.union(a, b)
+    clusters: dict[int, dict] = {}
+    for a, b, score, reason in pairs:
+        cluster = clusters.setdefault(
+            uf.find(a), {"ids": set(), "confidence": 1.0, "reasons": set(), "certain": True},
+        )
+        cluster["ids"].update((a, b))
+        cluster["certain"] = cluster["certain"] and score == 1.0 and reason != "podobne"
+        cluster["confidence"] = min(cluster["confidence"], score)
+        cluster["reasons"].add(reason)
+
+    # Všichni členové skupin jedním dotazem (jednotky přes selectinload)
+    member_ids = set().union(*(c["ids"] for c in clusters.values()))
+    owners_by_id = {
+        o.id: o for o in (
             db.query(Owner)
-            .options(joinedload(Owner.units).joinedload(OwnerUnit.unit))
-            .filter(Owner.name_normalized == name_norm, Owner.is_active == True)
-            .order_by(Owner.created_at)
+            .options(selectinload(Owner.units).joinedload(OwnerUnit.unit))
+            .filter(Owner.id.in_(member_ids))
             .all()
         )
-        if len(owners) < 2:
-            continue
-
-        # Recommend: prefer excel source with most units, then oldest
-        def _score(o):
-            source_priority = 0 if o.data_source == "excel" else (1 if o.data_source == "manual" else 2)
-            unit_count = len(o.current_units)
-            return (source_priority, -unit_count, o.created_at or datetime.min)
+    }
 
-        recommended = min(owners, key=_score)
+    # Recommend: prefer excel source with most units, then oldest
+    def _score(o):
+        source_priority = 0 if o.data_source == "excel" else (1 if o.data_source == "manual" else 2)
+        unit_count = len(o.current_units)
+        return (source_priority, -unit_count, o.created_at or datetime.min)
 
+    groups = []
+    for cluster in clusters.values():
+        owners = sorted(
+            (owners_by_id[i] for i in cluster["ids"] if i in owners_by_id),
+            key=lambda o: (o.created_at or datetime.min, o.id),
+        )
+        if len(owners) < 2:
+            continue
         groups.append({
-            "name_normalized": name_norm,
+            "name_normalized": owners[0].name_normalized or "",
             "owners": owners,
-            "recommended_id": recommended.id,
+            "recommended_id": min(owners, key=_score).id,
+            "certain": cluster["certain"],
+            "confidence": round(cluster["confidence"], 3),
+            "reasons": sorted(cluster["reasons"]),
         })
 
+    groups.sort(key=lambda g: (g["name_normalized"], g["owners"][0].id))
     return groups
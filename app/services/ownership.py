@@ -0,0 +1,121 @@
+"""Vlastnictví jednotek v čase — kdo vlastnil jednotku ke dni / v období.
+
+Historie je v ``OwnerUnit.valid_from`` / ``valid_to``. Interval je polouzavřený
+``[valid_from, valid_to)``: výměna vlastníka k datu D nastaví starému
+``valid_to = D`` a novému ``valid_from = D`` (``owner_exchange``), takže ke dni
+D vlastní jednotku jen nový vlastník. ``NULL`` znamená neomezeno (vlastník
+odjakživa / dosud).
+
+Podmínky :func:`overlaps` a :func:`on_day` jdou přímo do ``filter()``;
+:func:`load` načte jedním dotazem vlastnictví pro mnoho jednotek a vrátí
+:class:`OwnershipIndex` s dotazy per jednotka a den bez dalšího SQL.
+Dotazy obslouží složený index ``(unit_id, valid_from, valid_to)``.
+
+Aktuální vlastníci (``valid_to IS NULL``) — :func:`current` nebo ``load(db)``.
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.models import OwnerUnit
+
+
+def year_bounds(year: int) -> tuple[date, date]:
+    """První a poslední den roku."""
+    return date(year, 1, 1), date(year, 12, 31)
+
+
+def current():
+    """SQL podmínka: vlastnictví trvá (``valid_to IS NULL``)."""
+    return OwnerUnit.valid_to.is_(None)
+
+
+def overlaps(start: date, end: date):
+    """SQL podmínka: vlastnictví se překrývá s obdobím ``start``–``end`` (včetně)."""
+    return and_(
+        or_(OwnerUnit.valid_from.is_(None), OwnerUnit.valid_from <= end),
+        or_(OwnerUnit.valid_to.is_(None), OwnerUnit.valid_to > start),
+    )
+
+
+def on_day(day: date):
+    """SQL podmínka: vlastník k danému dni."""
+    return overlaps(day, day)
+
+
+def _covers(ou: OwnerUnit, start: date, end: date) -> bool:
+    return (ou.valid_from is None or ou.valid_from <= end) and (ou.valid_to is None or ou.valid_to > start)
+
+
+def _sort_key(ou: OwnerUnit):
+    return (ou.valid_from or date.min, ou.id or 0)
+
+
+class OwnershipIndex:
+    """Vlastnictví načtená pro období, seskupená per jednotka (řazená podle ``valid_from``)."""
+
+    def __init__(self, owner_units: Iterable[OwnerUnit]):
+        self._by_unit: dict[int, list[OwnerUnit]] = {}
+        for ou in sorted(owner_units, key=_sort_key):
+            self._by_unit.setdefault(ou.unit_id, []).append(ou)
+
+    def __iter__(self):
+        for rows in self._by_unit.values():
+            yield from rows
+
+    def unit_ids(self) -> set[int]:
+        return set(self._by_unit)
+
+    def owner_units(self, unit_id: int) -> list[OwnerUnit]:
+        """Všechna načtená vlastnictví jednotky (v celém období)."""
+        return list(self._by_unit.get(unit_id, ()))
+
+    def owners_on(self, unit_id: int, day: date) -> list[OwnerUnit]:
+        """Vlastnictví jednotky platná k danému dni (spoluvlastníci)."""
+        return [ou for ou in self._by_unit.get(unit_id, ()) if _covers(ou, day, day)]
+
+    def owner_on(self, unit_id: int, day: date) -> Optional[int]:
+        """ID vlastníka k danému dni (u spoluvlastnictví první podle pořadí)."""
+        rows = self.owners_on(unit_id, day)
+        return rows[0].owner_id if rows else None
+
+    def latest_owner(self, unit_id: int) -> Optional[int]:
+        """ID posledního vlastníka v načteném období (nejpozdější ``valid_from``)."""
+        rows = self._by_unit.get(unit_id)
+        if not rows:
+            return None
+        latest_from = _sort_key(rows[-1])[0]
+        return next(ou.owner_id for ou in rows if _sort_key(ou)[0] == latest_from)
+
+
+def load(
+    db: Session,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    unit_ids: Optional[Iterable[int]] = None,
+    options: Iterable = (),
+) -> OwnershipIndex:
+    """Vlastnictví překrývající období ``start``–``end`` jedním dotazem.
+
+    Bez ``start`` aktuální vlastníci; bez ``end`` jen den ``start``.
+    ``unit_ids`` omezí dotaz na vybrané jednotky, ``options`` se předají do
+    ``query.options()`` (např. ``joinedload(OwnerUnit.owner)``).
+    """
+    query = db.query(OwnerUnit)
+    if start is None:
+        query = query.filter(current())
+    else:
+        query = query.filter(overlaps(start, end or start))
+    if unit_ids is not None:
+        unit_ids = list(unit_ids)
+        if not unit_ids:
+            return OwnershipIndex(())
+        query = query.filter(OwnerUnit.unit_id.in_(unit_ids))
+    options = tuple(options)
+    if options:
+        query = query.options(*options)
+    return OwnershipIndex(query.all())
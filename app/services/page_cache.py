@@ -0,0 +1,159 @@
+"""Podmíněný GET a cache vyrenderovaných stránek seznamů.
+
+Dekorátor :func:`cached_page` obalí GET handler těžkého seznamu (matice plateb,
+vlastníci, jednotky, …). Z verzí tabulek, ze kterých stránka vzniká
+(``change_tracking.version``), URL s query, HTMX hlaviček, počtu dlužníků
+v navigaci (``request.state``) a dnešního data spočítá silný ETag:
+
+- ``If-None-Match`` se shoduje → ``304 Not Modified`` bez dotazů a renderu,
+- ETag je v cache → vrátí se uložené HTML (tělo tabulky i celá stránka),
+- jinak handler běží normálně a výsledek (200 HTML) se uloží pod ETag.
+
+Změna kterékoli z tabulek zvýší její verzi → nový ETag → starý záznam v cache
+už nikdo nepožádá a LRU ho časem vytlačí. Dnešní datum je v klíči kvůli dluhům
+(počet uplynulých měsíců), ID procesu kvůli změně šablon po restartu.
+
+Session s necommitnutou změnou (``change_tracking.pending``) cache obchází.
+Raw SQL mimo ORM → ``change_tracking.invalidate()``.
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import date
+
+from starlette.responses import HTMLResponse, Response
+
+from app.services import change_tracking
+
+# Horní mez součtu velikostí uložených stránek (matice plateb má stovky KB)
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+CACHE_CONTROL = "private, no-cache"
+
+# Skupiny tabulek pro deklaraci závislostí stránek (raději víc než míň)
+OWNERSHIP_TABLES = ("owners", "owner_units", "units", "svj_info", "code_list_items")
+PAYMENT_TABLES = (
+    "prescription_years", "prescriptions", "prescription_items", "payments",
+    "payment_allocations", "unit_balances", "bank_statements",
+    "variable_symbol_mappings", "settlements", "settlement_items",
+)
+SPACE_TABLES = ("spaces", "space_tenants", "tenants")
+WATER_TABLES = ("water_meters", "water_readings", "water_meter_stats")
+VOTING_TABLES = ("votings", "voting_items", "ballots", "ballot_votes", "proxies")
+
+# Mění se při každém startu — nové šablony/kód nesmí potkat starý ETag
+_BOOT_ID = uuid.uuid4().hex
+
+# ETag → (hlavičky bez content-length, tělo)
+_cache: OrderedDict[str, tuple[list[tuple[bytes, bytes]], bytes]] = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+
+def _etag(request, tables: tuple[str, ...], versions: tuple[int, ...]) -> str:
+    parts = [
+        _BOOT_ID,
+        request.url.path,
+        "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items())),
+        request.headers.get("HX-Request", ""),
+        request.headers.get("HX-Boosted", ""),
+        str(getattr(request.state, "nav_debtor_count", "")),
+        date.today().isoformat(),
+        ",".join(tables),
+        ",".join(map(str, versions)),
+    ]
+    digest = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+def _get(etag: str):
+    with _lock:
+        entry = _cache.get(etag)
+        if entry is not None:
+            _cache.move_to_end(etag)
+        return entry
+
+
+def _put(etag: str, headers: list[tuple[bytes, bytes]], body: bytes) -> None:
+    global _cache_bytes
+    if len(body) > MAX_CACHE_BYTES // 4:
+        return
+    with _lock:
+        if etag in _cache:
+            return
+        _cache[etag] = (headers, body)
+        _cache_bytes += len(body)
+        while _cache_bytes > MAX_CACHE_BYTES and _cache:
+            _, (_, old_body) = _cache.popitem(last=False)
+            _cache_bytes -= len(old_body)
+
+
+def clear() -> None:
+    """Vyprázdnit cache stránek (testy, obnova zálohy)."""
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+
+def _finish(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.headers["Vary"] = "HX-Request, HX-Boosted"
+    return response
+
+
+def cached_page(*tables: str):
+    """Dekorátor GET handleru — ETag/304 a cache HTML podle verzí ``tables``.
+
+    Handler musí mít parametry ``request`` a ``db`` (FastAPI je předává
+    jako kwargs). Ukládají se jen odpovědi 200 s HTML; přesměrování a chyby
+    projdou beze změny.
+    """
+    tables = tuple(sorted(set(tables)))
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            request = kwargs["request"]
+            db = kwargs["db"]
+            if change_tracking.pending(db):
+                return await handler(*args, **kwargs)
+
+            versions = change_tracking.version(*tables)
+            etag = _etag(request, tables, versions)
+            if _matches(request.headers.get("If-None-Match", ""), etag):
+                return _finish(Response(status_code=304), etag)
+
+            entry = _get(etag)
+            if entry is not None:
+                headers, body = entry
+                response = HTMLResponse(body)
+                response.raw_headers = [*headers, (b"content-length", str(len(body)).encode())]
+                return _finish(response, etag)
+
+            response = await handler(*args, **kwargs)
+            body = getattr(response, "body", None)
+            if (
+                response.status_code != 200
+                or body is None
+                or not response.headers.get("content-type", "").startswith("text/html")
+            ):
+                return response
+            # Commit během renderu → výsledek nemusí odpovídat verzím z klíče
+            if change_tracking.pending(db) or change_tracking.version(*tables) != versions:
+                return response
+            _put(etag, [(k, v) for k, v in response.raw_headers if k != b"content-length"], body)
+            return _finish(response, etag)
+
+        return wrapper
+
+    return decorator
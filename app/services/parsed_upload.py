@@ -0,0 +1,274 @@
+"""Cache rozparsovaných uploadů sdílená kroky importních průvodců.
+
+Upload → mapování → náhled → potvrzení dříve v každém kroku znovu otevíral
+stejný sešit (``load_workbook`` / ``xlrd.open_workbook``). Sešit se teď
+přečte jednou: názvy listů, aktivní list a mřížka hodnot všech listů se
+uloží v kompaktní sloupcové podobě (gzip JSON) do ``data/temp/parsed_uploads``
+pod SHA-256 obsahu souboru (vedle ``<hash>.src`` s cestou k uploadu).
+Další kroky a přemapování čtou odtud.
+
+Hodnoty odpovídají tomu, co vrací původní čtení: pro ``.xlsx`` openpyxl
+``iter_rows(values_only=True)`` v režimu read_only + data_only, pro ``.xls``
+``xlrd`` ``row_values``. Záznam vyprší spolu s uploadem — po smazání
+zdrojového souboru nebo po ``CACHE_TTL`` sekundách.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, time as dtime, timedelta
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = settings.temp_dir / "parsed_uploads"
+# Jak dlouho se rozparsovaný upload drží na disku (průvodce trvá minuty)
+CACHE_TTL = 24 * 3600
+# Počet sešitů držených i v paměti procesu
+_MEMORY_MAX = 4
+# Počet zapamatovaných otisků souborů (path, mtime, size) → sha256
+_DIGESTS_MAX = 256
+_FORMAT_VERSION = 1
+
+_memory: OrderedDict[str, "ParsedWorkbook"] = OrderedDict()
+_digests: OrderedDict[tuple, str] = OrderedDict()  # (path, mtime_ns, size) → sha256
+_lock = threading.Lock()
+
+
+class ParsedWorkbook:
+    """Názvy listů + řádky hodnot všech listů jednoho uploadu."""
+
+    def __init__(self, sheet_names: list[str], active: str | None, sheets: dict[str, list[tuple]]):
+        self.sheet_names = sheet_names
+        self.active = active
+        self._sheets = sheets
+
+    def resolve_sheet(self, sheet_name: str | None = None, *preferred: str) -> str | None:
+        """Requested sheet if present, else first present ``preferred`` name, else the active sheet."""
+        if sheet_name and sheet_name in self._sheets:
+            return sheet_name
+        for name in preferred:
+            if name in self._sheets:
+                return name
+        return self.active
+
+    def rows(self, sheet_name: str | None = None, min_row: int = 1, max_row: int | None = None) -> list[tuple]:
+        """Rows of a sheet (1-based inclusive bounds, like ``iter_rows``)."""
+        grid = self._sheets.get(sheet_name if sheet_name in self._sheets else self.active, [])
+        start = max(min_row - 1, 0)
+        return grid[start:max_row] if max_row is not None else grid[start:]
+
+    def row(self, sheet_name: str | None, row_number: int) -> tuple | None:
+        """Single 1-based row or None when out of range."""
+        found = self.rows(sheet_name, row_number, row_number)
+        return found[0] if found else None
+
+
+# ── Reading source workbooks ────────────────────────────────────────
+
+def _is_xls(file_path: str) -> bool:
+    lower = file_path.lower()
+    return lower.endswith(".xls") and not lower.endswith(".xlsx")
+
+
+def _read_source(file_path: str) -> ParsedWorkbook:
+    if _is_xls(file_path):
+        import xlrd
+        book = xlrd.open_workbook(file_path)
+        sheets = {}
+        for sheet in book.sheets():
+            sheets[sheet.name] = [tuple(sheet.row_values(r)) for r in range(sheet.nrows)]
+        names = book.sheet_names()
+        return ParsedWorkbook(names, names[0] if names else None, sheets)
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheets = {ws.title: list(ws.iter_rows(values_only=True)) for ws in wb.worksheets}
+        active = wb.active.title if wb.active is not None else None
+        return ParsedWorkbook(list(wb.sheetnames), active, sheets)
+    finally:
+        wb.close()
+
+
+# ── Compact on-disk form ────────────────────────────────────────────
+# Každý list se ukládá po sloupcích (opakující se hodnoty se dobře komprimují),
+# typy mimo JSON se značkují jednoklíčovým dictem.
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, dtime):
+        return {"t": value.isoformat()}
+    if isinstance(value, timedelta):
+        return {"td": value.total_seconds()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "t" in value:
+            return dtime.fromisoformat(value["t"])
+        if "td" in value:
+            return timedelta(seconds=value["td"])
+    return value
+
+
+def _encode_sheet(grid: list[tuple]) -> dict:
+    lengths = [len(r) for r in grid]
+    width = max(lengths, default=0)
+    columns = [
+        [_encode_value(r[c]) if c < len(r) else None for r in grid]
+        for c in range(width)
+    ]
+    ragged = any(n != width for n in lengths)
+    return {"nrows": len(grid), "columns": columns, "lengths": lengths if ragged else None}
+
+
+def _decode_sheet(data: dict) -> list[tuple]:
+    columns = [[_decode_value(v) for v in col] for col in data["columns"]]
+    nrows = data["nrows"]
+    rows = [tuple(col[r] for col in columns) for r in range(nrows)] if columns else [() for _ in range(nrows)]
+    if data.get("lengths") is not None:
+        rows = [row[:n] for row, n in zip(rows, data["lengths"])]
+    return rows
+
+
+def _cache_path(digest: str) -> Path:
+    return CACHE_DIR / f"{digest}.json.gz"
+
+
+def _write_cache(digest: str, file_path: str, parsed: ParsedWorkbook) -> None:
+    payload = {
+        "version": _FORMAT_VERSION,
+        "sheet_names": parsed.sheet_names,
+        "active": parsed.active,
+        "sheets": {name: _encode_sheet(grid) for name, grid in parsed._sheets.items()},
+    }
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = _cache_path(digest).with_suffix(".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=5) as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    tmp.replace(_cache_path(digest))
+    # Zdrojový upload vedle — podle něj prune pozná, že upload zmizel
+    _cache_path(digest).with_name(f"{digest}.src").write_text(
+        str(Path(file_path).resolve()), encoding="utf-8",
+    )
+
+
+def _read_cache(digest: str) -> ParsedWorkbook | None:
+    path = _cache_path(digest)
+    if not path.exists():
+        return None
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != _FORMAT_VERSION:
+            return None
+        sheets = {name: _decode_sheet(data) for name, data in payload["sheets"].items()}
+        return ParsedWorkbook(payload["sheet_names"], payload["active"], sheets)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Parsed upload cache %s unreadable: %s", path.name, e)
+        return None
+
+
+def prune_parsed_uploads(now: float | None = None) -> int:
+    """Delete cache entries older than CACHE_TTL or whose source upload is gone."""
+    if not CACHE_DIR.exists():
+        return 0
+    now = now or time.time()
+    removed = 0
+    for src in CACHE_DIR.glob("*.src"):
+        try:
+            expired = now - src.stat().st_mtime > CACHE_TTL
+            if not expired:
+                expired = not Path(src.read_text(encoding="utf-8").strip()).exists()
+            if expired:
+                _cache_path(src.stem).unlink(missing_ok=True)
+                src.unlink()
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+# ── Public API ──────────────────────────────────────────────────────
+
+def _file_digest(file_path: str) -> str:
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        digest = _digests.get(key)
+        if digest:
+            _digests.move_to_end(key)
+    if digest:
+        return digest
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _lock:
+        _digests[key] = digest
+        while len(_digests) > _DIGESTS_MAX:
+            _digests.popitem(last=False)
+    return digest
+
+
+def get_parsed_upload(file_path: str) -> ParsedWorkbook:
+    """Return the parsed workbook for an upload — memory, then disk, then source file."""
+    digest = _file_digest(file_path)
+    with _lock:
+        parsed = _memory.get(digest)
+        if parsed is not None:
+            _memory.move_to_end(digest)
+            return parsed
+
+    parsed = _read_cache(digest)
+    if parsed is None:
+        parsed = _read_source(file_path)
+        try:
+            _write_cache(digest, file_path, parsed)
+            prune_parsed_uploads()
+        except OSError as e:
+            logger.warning("Failed to write parsed upload cache: %s", e)
+
+    with _lock:
+        _memory[digest] = parsed
+        while len(_memory) > _MEMORY_MAX:
+            _memory.popitem(last=False)
+    return parsed
+
+
+def discard_parsed_upload(file_path: str) -> None:
+    """Drop cached parse of an upload (call before deleting the uploaded file)."""
+    try:
+        digest = _file_digest(file_path)
+    except OSError:
+        return
+    with _lock:
+        _memory.pop(digest, None)
+        for key in [k for k, v in _digests.items() if v == digest]:
+            del _digests[key]
+    try:
+        _cache_path(digest).unlink(missing_ok=True)
+        _cache_path(digest).with_name(f"{digest}.src").unlink(missing_ok=True)
+    except OSError:
+        pass
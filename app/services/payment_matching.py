@@ -10,16 +10,19 @@ from __future__ import annotations
 
 import logging
 import re
+from bisect import bisect_left
+from itertools import combinations
 from typing import Optional
 
 from sqlalchemy.orm import Session
 
 from app.models import (
     VariableSymbolMapping, Prescription, Payment, PaymentAllocation,
-    PaymentDirection, PaymentMatchStatus, Unit, OwnerUnit,
-    PrescriptionYear, Owner, SvjInfo,
+    PaymentDirection, PaymentMatchStatus, Unit,
+    PrescriptionYear, Owner,
     Space, SpaceTenant, Tenant,
 )
+from app.services import ownership, reference_data
 from app.utils import strip_diacritics
 
 
@@ -28,7 +31,7 @@ DEFAULT_VS_PREFIX = "1098"
 
 def _get_vs_prefix(db: Session) -> str:
     """Načíst VS prefix ze SvjInfo, fallback na default."""
-    info = db.query(SvjInfo).first()
+    info = reference_data.svj_settings(db)
     if info and info.vs_prefix:
         return info.vs_prefix
     return DEFAULT_VS_PREFIX
@@ -45,6 +48,10 @@ MIN_COMMON_WORDS = 2
 MAX_PRESCRIPTION_RATIO = 10
 # Minimální skóre pro VS-prefix SUGGESTED match (jméno=2 + částka=3 = 5)
 MIN_MATCH_SCORE = 5
+# Platba může pokrýt 1-12 měsíců předpisu
+MAX_MONTHS = 12
+# Max. počet jednotek jednoho vlastníka v kombinované platbě (byt + garáž + sklep…)
+MAX_COMBINATION_UNITS = 4
 
 
 def _clean_name_words(text: str) -> set[str]:
@@ -109,8 +116,8 @@ def compute_candidates(db: Session, payments: list, year: int,
         already_matched_units = {r[0] for r in matched_allocs if r[0]}
         already_matched_spaces = {r[1] for r in matched_allocs if r[1]}
 
-    # Owner jména per unit (vyčištěná slova + příjmení)
-    active_ous = db.query(OwnerUnit).filter(OwnerUnit.valid_to.is_(None)).all()
+    # Owner jména per unit (vyčištěná slova + příjmení) — vlastníci v období plateb
+    active_ous = ownership.load(db, *_payment_period(unmatched))
     unit_owner_words: dict[int, list[set]] = {}  # unit_number → [set of words]
     unit_owner_surnames: dict[int, set] = {}     # unit_number → {příjmení}
     for ou in active_ous:
@@ -127,12 +134,17 @@ def compute_candidates(db: Session, payments: list, year: int,
 
     # Prostory — nájemci + nájemné
     all_spaces = {s.id: s for s in db.query(Space).all()}
-    active_sts = db.query(SpaceTenant).filter_by(is_active=True).all()
-    all_tenants = {t.id: t for t in db.query(Tenant).all()}
+    # Jméno nájemce (i z navázaného vlastníka) rovnou v SQL — bez lazy-load Tenant.owner
+    active_sts = (
+        db.query(SpaceTenant, Tenant.display_name, Tenant.name_normalized)
+        .outerjoin(Tenant, Tenant.id == SpaceTenant.tenant_id)
+        .filter(SpaceTenant.is_active == True)  # noqa: E712
+        .all()
+    )
     space_info: dict[int, dict] = {}  # space_number → {space_id, monthly, designation}
     space_tenant_words: dict[int, list[set]] = {}  # space_number → [set of words]
     space_tenant_surnames: dict[int, set] = {}     # space_number → {příjmení}
-    for st in active_sts:
+    for st, tenant_name, tenant_name_norm in active_sts:
         space = all_spaces.get(st.space_id)
         if not space:
             continue
@@ -148,20 +160,15 @@ def compute_candidates(db: Session, payments: list, year: int,
             "monthly": monthly,
             "designation": space.designation or "",
         }
-        tenant = all_tenants.get(st.tenant_id)
-        if tenant:
-            # display_name resolves owner name for linked tenants
-            name = strip_diacritics(tenant.display_name) if tenant.display_name else (
-                tenant.name_normalized or ""
-            )
-            if name:
-                words = _clean_name_words(name)
-                if words:
-                    space_tenant_words.setdefault(space.space_number, []).append(words)
-                    first_word = name.split()[0] if name.split() else ""
-                    surname = _clean_name_words(first_word)
-                    if surname:
-                        space_tenant_surnames.setdefault(space.space_number, set()).update(surname)
+        name = strip_diacritics(tenant_name) if tenant_name else (tenant_name_norm or "")
+        if name:
+            words = _clean_name_words(name)
+            if words:
+                space_tenant_words.setdefault(space.space_number, []).append(words)
+                first_word = name.split()[0] if name.split() else ""
+                surname = _clean_name_words(first_word)
+                if surname:
+                    space_tenant_surnames.setdefault(space.space_number, set()).update(surname)
 
     result = {}
     for payment in unmatched:
@@ -197,13 +204,11 @@ def compute_candidates(db: Session, payments: list, year: int,
             score = 2
             reasons = []
             amount_match = False
-            if monthly > 0:
-                for n in range(1, 13):
-                    if abs(payment.amount - monthly * n) < 0.01:
-                        reasons.append(f"{n}×{monthly:.0f}")
-                        score += 3
-                        amount_match = True
-                        break
+            n = _months_multiple(payment.amount, monthly)
+            if n:
+                reasons.append(f"{n}×{monthly:.0f}")
+                score += 3
+                amount_match = True
 
             candidates.append({
                 "type": "unit",
@@ -242,13 +247,11 @@ def compute_candidates(db: Session, payments: list, year: int,
             score = 2
             reasons = []
             amount_match = False
-            if monthly > 0:
-                for n in range(1, 13):
-                    if abs(payment.amount - monthly * n) < 0.01:
-                        reasons.append(f"{n}×{monthly:.0f}")
-                        score += 3
-                        amount_match = True
-                        break
+            n = _months_multiple(payment.amount, monthly)
+            if n:
+                reasons.append(f"{n}×{monthly:.0f}")
+                score += 3
+                amount_match = True
 
             candidates.append({
                 "type": "space",
@@ -297,48 +300,142 @@ def _find_name_matches(sender_words: set, name_lookup: list[dict]) -> list[dict]
     return [entry for _, entry in matches]
 
 
+def _to_halere(amount: float) -> int:
+    """Částka v Kč → celé haléře (klíč indexu částek, bez float tolerance)."""
+    return int(round(amount * 100))
+
+
+def _months_multiple(amount: float, monthly_total: Optional[float]) -> Optional[int]:
+    """Počet měsíců n (1-12), pro který amount == monthly_total × n, jinak None."""
+    if not monthly_total or monthly_total <= 0:
+        return None
+    monthly_h = _to_halere(monthly_total)
+    if monthly_h <= 0:
+        return None
+    n, rest = divmod(_to_halere(amount), monthly_h)
+    return n if not rest and 1 <= n <= MAX_MONTHS else None
+
+
 def _check_amount_match(amount: float, monthly_total: Optional[float]) -> bool:
     """True pokud amount je přesný násobek monthly_total (1-12×)."""
-    if not monthly_total or monthly_total <= 0:
-        return False
+    return _months_multiple(amount, monthly_total) is not None
 
-    for n in range(1, 13):
-        expected = monthly_total * n
-        if abs(amount - expected) < 0.01:
-            return True
-    return False
 
+def _entry_key(entry: dict):
+    return entry.get("unit_id") or id(entry)
 
-def _find_multi_unit_match(amount: float, candidates: list[dict]) -> Optional[list[dict]]:
-    """Zkusit najít kombinaci jednotek jednoho vlastníka kde součet předpisů = amount.
 
-    Seskupí kandidáty podle owner_id, pro každého vlastníka s 2+ jednotkami
-    zkouší kombinace (2-4) kde sum(monthly * n) = amount (přesná shoda).
+class AmountIndex:
+    """Součty předpisů vlastníků pro jeden běh párování (v haléřích).
+
+    Pro vlastníka s 2+ jednotkami se až při prvním dotazu (jen když je mezi
+    kandidáty platby) postaví mapa součtů dvojic jednotek a uloží se pro další
+    platby. Kombinace 3 a 4 jednotek se dohledají meet-in-the-middle
+    (jednotka / dvojice + dvojice z mapy) — paměť i čas O(k²) místo výčtu
+    všech kombinací. Dotaz zkouší jen 12 dělitelů částky (1-12 měsíců).
+
+    Pořadí výsledku je stejné jako u původního výčtu: nejmenší kombinace,
+    pak pořadí ``combinations()``; počet měsíců o výběru nerozhoduje.
     """
-    from itertools import combinations
 
-    # Seskupit podle owner_id
-    by_owner: dict[int, list[dict]] = {}
-    for c in candidates:
-        oid = c.get("owner_id")
-        if not oid or not c.get("monthly") or c["monthly"] <= 0:
-            continue
-        by_owner.setdefault(oid, []).append(c)
+    def __init__(self, entries: list[dict]):
+        # owner_id → jednotky v pořadí lookupu (bez duplicit) a jejich pozice
+        self._units: dict[int, list[dict]] = {}
+        self._positions: dict[int, dict] = {}
+        self._values: dict[int, list[int]] = {}
+        # owner_id → součet dvojice v haléřích → dvojice pozic (i, j) seřazené
+        self._pairs: dict[int, dict[int, list[tuple[int, int]]]] = {}
+        by_owner: dict[int, dict] = {}
+        for entry in entries:
+            oid = entry.get("owner_id")
+            if not oid or not entry.get("monthly") or entry["monthly"] <= 0:
+                continue
+            # Jednotka může být v lookupu víckrát (jméno z předpisu i z evidence)
+            by_owner.setdefault(oid, {}).setdefault(_entry_key(entry), entry)
 
-    for owner_id, entries in by_owner.items():
-        if len(entries) < 2:
-            continue
+        for oid, units in by_owner.items():
+            if len(units) < 2:
+                continue
+            self._units[oid] = list(units.values())
+            self._positions[oid] = {key: pos for pos, key in enumerate(units)}
+            self._values[oid] = [_to_halere(e["monthly"]) for e in units.values()]
+
+    def _pair_sums(self, oid: int) -> dict[int, list[tuple[int, int]]]:
+        pairs = self._pairs.get(oid)
+        if pairs is None:
+            values = self._values[oid]
+            pairs = self._pairs[oid] = {}
+            for i, j in combinations(range(len(values)), 2):
+                pairs.setdefault(values[i] + values[j], []).append((i, j))
+        return pairs
+
+    def _first_combo(self, oid: int, target: int, size: int, allowed: list[int]) -> Optional[tuple]:
+        """První kombinace ``size`` povolených pozic (pořadí výčtu) se součtem ``target``."""
+        values = self._values[oid]
+        pairs = self._pair_sums(oid)
+        allowed_set = set(allowed)
+
+        def tail(start: int, rest: int) -> Optional[tuple[int, int]]:
+            # První dvojice (k, l) s k >= start a součtem rest
+            bucket = pairs.get(rest)
+            if not bucket:
+                return None
+            for k, l in bucket[bisect_left(bucket, (start,)):]:
+                if k in allowed_set and l in allowed_set:
+                    return k, l
+            return None
+
+        if size == 2:
+            return tail(0, target)
+        if size == 3:
+            for i in allowed:
+                found = tail(i + 1, target - values[i])
+                if found:
+                    return (i, *found)
+            return None
+        for i, j in combinations(allowed, 2):
+            found = tail(j + 1, target - values[i] - values[j])
+            if found:
+                return (i, j, *found)
+        return None
 
-        # Zkusit kombinace 2-4 jednotek
-        for size in range(2, min(len(entries) + 1, 5)):
-            for combo in combinations(entries, size):
-                combo_sum = round(sum(e["monthly"] for e in combo), 2)
-                # Zkusit n-násobek (1-12 měsíců)
-                for n in range(1, 13):
-                    expected = combo_sum * n
-                    if abs(amount - expected) < 0.01:
-                        return list(combo)
-    return None
+    def multi_unit(self, amount: float, candidates: list[dict]) -> Optional[list[dict]]:
+        """Kombinace jednotek jednoho vlastníka z ``candidates`` se součtem × n = amount."""
+        amount_h = _to_halere(amount)
+        if amount_h <= 0:
+            return None
+        targets = [amount_h // n for n in range(1, MAX_MONTHS + 1) if amount_h % n == 0]
+        by_owner: dict[int, dict] = {}
+        for c in candidates:
+            if c.get("owner_id") in self._units:
+                by_owner.setdefault(c["owner_id"], {}).setdefault(_entry_key(c), c)
+
+        for oid, allowed in by_owner.items():
+            positions = self._positions[oid]
+            by_pos = {positions[k]: c for k, c in allowed.items() if k in positions}
+            allowed_pos = sorted(by_pos)
+            for size in range(2, min(len(allowed_pos), MAX_COMBINATION_UNITS) + 1):
+                found = [
+                    combo for combo in (
+                        self._first_combo(oid, t, size, allowed_pos) for t in targets
+                    ) if combo
+                ]
+                if found:
+                    return [by_pos[pos] for pos in min(found)]
+        return None
+
+
+def _find_multi_unit_match(amount: float, candidates: list[dict],
+                           index: AmountIndex | None = None) -> Optional[list[dict]]:
+    """Zkusit najít kombinaci jednotek jednoho vlastníka kde součet předpisů = amount.
+
+    Seskupí kandidáty podle owner_id, pro každého vlastníka s 2+ jednotkami
+    hledá kombinace (2-4) kde sum(monthly * n) = amount (přesná shoda).
+    Bez ``index`` se postaví jednorázový index jen z kandidátů.
+    """
+    if index is None:
+        index = AmountIndex(candidates)
+    return index.multi_unit(amount, candidates)
 
 
 def _create_allocation(db: Session, payment: Payment, unit_id: Optional[int],
@@ -399,6 +496,22 @@ def _extract_unit_from_vs(vs: str, known_vs_map: dict[str, int],
     return None
 
 
+def _payment_period(payments: list):
+    """Rozsah dat plateb (min, max) — období pro načtení vlastníků."""
+    dates = [p.date for p in payments if p.date]
+    if not dates:
+        return None, None
+    return min(dates), max(dates)
+
+
+def _owner_on(ctx: dict, unit_id: Optional[int], day) -> Optional[int]:
+    """Vlastník jednotky ke dni platby (bez historie k tomu dni poslední známý)."""
+    if not unit_id:
+        return None
+    owner_id = ctx["ownership"].owner_on(unit_id, day) if day else None
+    return owner_id or ctx["owner_by_unit"].get(unit_id)
+
+
 def _phase1_vs_match(db: Session, payments: list, ctx: dict) -> int:
     """Fáze 1: Párování přes variabilní symbol (exaktní shoda z VS mapování).
 
@@ -407,7 +520,6 @@ def _phase1_vs_match(db: Session, payments: list, ctx: dict) -> int:
     """
     vs_map = ctx["vs_map"]
     prescriptions_by_vs = ctx["prescriptions_by_vs"]
-    owner_by_unit = ctx["owner_by_unit"]
 
     matched = 0
     for payment in payments:
@@ -425,7 +537,7 @@ def _phase1_vs_match(db: Session, payments: list, ctx: dict) -> int:
 
         payment.unit_id = unit_id
         payment.space_id = space_id
-        payment.owner_id = owner_by_unit.get(unit_id) if unit_id else None
+        payment.owner_id = _owner_on(ctx, unit_id, payment.date)
         payment.match_status = PaymentMatchStatus.AUTO_MATCHED
 
         prescription = prescriptions_by_vs.get(payment.vs)
@@ -531,6 +643,9 @@ def _phase2_name_match(db: Session, payments: list, ctx: dict) -> int:
                 "prescription_id": presc.id if presc else None,
             })
 
+    # Součty kombinací jednotek — jednou pro celý běh, ne pro každou platbu
+    amount_index = AmountIndex([e for e in name_lookup if e.get("unit_id")])
+
     suggested = 0
     for payment in still_unmatched:
         sender_norm = strip_diacritics(payment.counter_account_name)
@@ -551,7 +666,7 @@ def _phase2_name_match(db: Session, payments: list, ctx: dict) -> int:
             # Single match (unit or space)
             payment.unit_id = best.get("unit_id")
             payment.space_id = best.get("space_id")
-            payment.owner_id = owner_by_unit.get(best["unit_id"]) if best.get("unit_id") else None
+            payment.owner_id = _owner_on(ctx, best.get("unit_id"), payment.date)
             payment.match_status = PaymentMatchStatus.SUGGESTED
             payment.assigned_month = payment.date.month if payment.date else None
 
@@ -573,7 +688,7 @@ def _phase2_name_match(db: Session, payments: list, ctx: dict) -> int:
         else:
             # Zkusit multi-unit match (součet předpisů více jednotek) — jen pro jednotky
             unit_candidates = [c for c in candidates if c.get("unit_id")]
-            multi = _find_multi_unit_match(payment.amount, unit_candidates)
+            multi = _find_multi_unit_match(payment.amount, unit_candidates, amount_index)
             if multi:
                 payment.unit_id = None
                 payment.owner_id = multi[0].get("owner_id")
@@ -592,7 +707,7 @@ def _phase2_name_match(db: Session, payments: list, ctx: dict) -> int:
                 best = candidates[0]
                 payment.unit_id = best.get("unit_id")
                 payment.space_id = best.get("space_id")
-                payment.owner_id = owner_by_unit.get(best["unit_id"]) if best.get("unit_id") else None
+                payment.owner_id = _owner_on(ctx, best.get("unit_id"), payment.date)
                 payment.match_status = PaymentMatchStatus.SUGGESTED
                 payment.assigned_month = payment.date.month if payment.date else None
 
@@ -624,7 +739,6 @@ def _phase3_vs_prefix_match(db: Session, payments: list, ctx: dict) -> int:
     auto_matched_unit_ids = ctx["auto_matched_unit_ids"]
     all_prescriptions = ctx["all_prescriptions"]
     prescriptions_by_unit = ctx["prescriptions_by_unit"]
-    owner_by_unit = ctx["owner_by_unit"]
     all_owners = ctx["all_owners"]
     active_owner_units = ctx["active_owner_units"]
     unit_by_number = ctx["unit_by_number"]
@@ -684,7 +798,7 @@ def _phase3_vs_prefix_match(db: Session, payments: list, ctx: dict) -> int:
 
         if score >= MIN_MATCH_SCORE:
             payment.unit_id = decoded_uid
-            payment.owner_id = owner_by_unit.get(decoded_uid)
+            payment.owner_id = _owner_on(ctx, decoded_uid, payment.date)
             payment.match_status = PaymentMatchStatus.SUGGESTED
             payment.assigned_month = payment.date.month if payment.date else None
             if presc:
@@ -733,16 +847,6 @@ def match_payments(db: Session, statement_id: int, year: int) -> dict:
     all_units = db.query(Unit).all()
     unit_by_number = {u.unit_number: u.id for u in all_units}
 
-    all_owners = {o.id: o for o in db.query(Owner).all()}
-    owner_by_unit = {}
-    active_owner_units = db.query(OwnerUnit).filter(OwnerUnit.valid_to.is_(None)).all()
-    for ou in active_owner_units:
-        owner_by_unit[ou.unit_id] = ou.owner_id
-
-    # Nájemci prostorů pro name matching
-    all_tenants = {t.id: t for t in db.query(Tenant).all()}
-    active_space_tenants = db.query(SpaceTenant).filter_by(is_active=True).all()
-
     payments = (
         db.query(Payment)
         .filter_by(statement_id=statement_id, match_status=PaymentMatchStatus.UNMATCHED)
@@ -750,6 +854,19 @@ def match_payments(db: Session, statement_id: int, year: int) -> dict:
         .all()
     )
 
+    all_owners = {o.id: o for o in db.query(Owner).all()}
+    # Vlastníci v období plateb výpisu — i ti, kteří mezitím jednotku prodali
+    period_start, period_end = _payment_period(payments)
+    owners_in_period = ownership.load(db, period_start, period_end)
+    owner_by_unit = {
+        unit_id: owners_in_period.latest_owner(unit_id) for unit_id in owners_in_period.unit_ids()
+    }
+    active_owner_units = list(owners_in_period)
+
+    # Nájemci prostorů pro name matching
+    all_tenants = {t.id: t for t in db.query(Tenant).all()}
+    active_space_tenants = db.query(SpaceTenant).filter_by(is_active=True).all()
+
     # Sdílený kontext pro fáze
     ctx = {
         "vs_map": vs_map,
@@ -761,6 +878,7 @@ def match_payments(db: Session, statement_id: int, year: int) -> dict:
         "all_owners": all_owners,
         "all_tenants": all_tenants,
         "owner_by_unit": owner_by_unit,
+        "ownership": owners_in_period,
         "active_owner_units": active_owner_units,
         "active_space_tenants": active_space_tenants,
         "auto_matched_unit_ids": set(),  # naplní se po fázi 1
@@ -2,9 +2,10 @@
 
 from collections import defaultdict
 from dataclasses import dataclass
+from datetime import date
 
 from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from app.models import (
     OwnerUnit, Payment, PaymentAllocation, PaymentDirection, PaymentMatchStatus,
@@ -12,6 +13,13 @@ from app.models import (
     Space, SpaceTenant, Tenant,
     Unit, UnitBalance,
 )
+from app.services import ownership
+
+
+def _owners_in_year(index: ownership.OwnershipIndex, unit_id: int) -> list:
+    """Vlastníci jednotky v roce — poslední (aktuální) první, spoluvlastníci v původním pořadí."""
+    rows = sorted(index.owner_units(unit_id), key=lambda ou: ou.valid_from or date.min, reverse=True)
+    return [ou.owner for ou in rows]
 
 
 @dataclass
@@ -81,15 +89,11 @@ def compute_payment_matrix(db: Session, year: int, section: str = "", space_type
     # Jednotky s aktivními vlastníky
     units = db.query(Unit).order_by(Unit.unit_number).all()
 
-    # Aktuální vlastníci per unit (všichni spoluvlastníci)
-    owner_units = (
-        db.query(OwnerUnit)
-        .filter(OwnerUnit.valid_to.is_(None))
-        .all()
+    # Vlastníci per unit v daném roce (všichni spoluvlastníci, i prodávající)
+    owners_in_year = ownership.load(
+        db, *ownership.year_bounds(year), options=(joinedload(OwnerUnit.owner),),
     )
-    owners_by_unit = {}
-    for ou in owner_units:
-        owners_by_unit.setdefault(ou.unit_id, []).append(ou.owner)
+    owners_by_unit = {uid: _owners_in_year(owners_in_year, uid) for uid in owners_in_year.unit_ids()}
 
     # Unikátní typy prostorů z předpisů
     space_types_set = set()
@@ -222,13 +226,11 @@ def compute_unit_payment_detail(db: Session, unit_id: int, year: int) -> dict:
     balance = db.query(UnitBalance).filter_by(unit_id=unit_id, year=year).first()
     opening = balance.opening_amount if balance else 0
 
-    # Aktuální vlastníci (všichni spoluvlastníci)
-    unit_owners = (
-        db.query(OwnerUnit)
-        .filter(OwnerUnit.unit_id == unit_id, OwnerUnit.valid_to.is_(None))
-        .all()
+    # Vlastníci v daném roce (všichni spoluvlastníci)
+    owners_in_year = ownership.load(
+        db, *ownership.year_bounds(year), unit_ids=[unit_id], options=(joinedload(OwnerUnit.owner),),
     )
-    owners = [ou.owner for ou in unit_owners]
+    owners = _owners_in_year(owners_in_year, unit_id)
 
     return {
         "unit": unit,
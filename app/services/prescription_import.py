@@ -10,6 +10,12 @@ Row 5-21: položky předpisu (název | částka)
 Row 22: CELKEM | celková částka
 Row 23: poznámka
 Row 24: datum zpracování
+
+Dokument se nečte přes python-docx (celý objektový model v paměti), ale
+proudově: ``word/document.xml`` se prochází ``iterparse`` a každá tabulka
+se po zpracování zahodí. Text buněk odpovídá ``python-docx`` (``cell.text``,
+``gridSpan``, ``vMerge``). :func:`iter_prescriptions` vrací předpisy jednotek
+postupně, :func:`save_prescriptions` je ukládá po dávkách.
 """
 
 from __future__ import annotations
@@ -17,15 +23,29 @@ from __future__ import annotations
 import io
 import re
 import logging
+import zipfile
 from datetime import date
-from typing import Optional, Tuple
+from typing import IO, Iterable, Iterator, Union
+from xml.etree.ElementTree import iterparse
 
-from docx import Document
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
 
-from app.models.payment import PrescriptionCategory
+from app.models.payment import (
+    Prescription, PrescriptionCategory, PrescriptionItem, PrescriptionYear,
+    SymbolSource, VariableSymbolMapping,
+)
 
 logger = logging.getLogger(__name__)
 
+# Evidenční list má 25 řádků — kratší tabulky nejsou předpisy
+MIN_TABLE_ROWS = 20
+# Počet jednotek ukládaných jedním INSERT
+SAVE_BATCH = 100
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DOCUMENT_XML = "word/document.xml"
+
 # Kategorizace položek předpisu
 _FOND_OPRAV_KEYWORDS = ["fond oprav"]
 _SLUZBY_KEYWORDS = [
@@ -114,97 +134,199 @@ def _extract_valid_from(cell_text: str) -> date | None:
     return None
 
 
-def parse_prescription_docx(file_content: bytes, year: int) -> dict:
-    """Parsuj DOCX s evidenčními listy předpisů.
+# ── Proudové čtení document.xml ───────────────────────────────────────
 
-    Returns:
-        dict s klíči:
-        - valid_from: date | None
-        - prescriptions: list of dict (variable_symbol, space_number, section, ...)
+
+def _run_text(run) -> str:
+    """Text ``w:r`` stejně jako python-docx ``Run.text``."""
+    parts = []
+    for el in run:
+        tag = el.tag
+        if tag == _W + "t":
+            parts.append(el.text or "")
+        elif tag in (_W + "tab", _W + "ptab"):
+            parts.append("\t")
+        elif tag == _W + "br":
+            if el.get(_W + "type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == _W + "cr":
+            parts.append("\n")
+        elif tag == _W + "noBreakHyphen":
+            parts.append("-")
+    return "".join(parts)
+
+
+def _paragraph_text(p) -> str:
+    parts = []
+    for el in p:
+        if el.tag == _W + "r":
+            parts.append(_run_text(el))
+        elif el.tag == _W + "hyperlink":
+            parts.extend(_run_text(r) for r in el.iterfind(_W + "r"))
+    return "".join(parts)
+
+
+def _cell_text(tc) -> str:
+    """Text buňky — odstavce spojené ``\\n`` (vnořené tabulky se ignorují)."""
+    return "\n".join(_paragraph_text(p) for p in tc.iterfind(_W + "p"))
+
+
+def _int_val(el, default: int) -> int:
+    if el is None:
+        return default
+    try:
+        return int(el.get(_W + "val"))
+    except (TypeError, ValueError):
+        return default
+
+
+def _table_rows(tbl) -> list[list[str]]:
+    """Texty buněk po řádcích jako ``[[c.text for c in row.cells] for row in table.rows]``.
+
+    Buňka přes víc sloupců (``gridSpan``) se opakuje, pokračování svislého
+    sloučení (``vMerge``) přebírá text buňky nad sebou.
     """
-    doc = Document(io.BytesIO(file_content))
+    rows = []
+    above: dict[int, tuple[str, int]] = {}  # grid offset → (text, span) buňky nad
+    for tr in tbl.iterfind(_W + "tr"):
+        cells = []
+        offset = _int_val(tr.find(f"{_W}trPr/{_W}gridBefore"), 0)
+        current: dict[int, tuple[str, int]] = {}
+        for tc in tr.iterfind(_W + "tc"):
+            tc_pr = tc.find(_W + "tcPr")
+            span = _int_val(tc_pr.find(_W + "gridSpan") if tc_pr is not None else None, 1)
+            v_merge = tc_pr.find(_W + "vMerge") if tc_pr is not None else None
+            if v_merge is not None and v_merge.get(_W + "val", "continue") == "continue":
+                text, origin_span = above.get(offset, ("", span))
+            else:
+                text, origin_span = _cell_text(tc), span
+            current[offset] = (text, origin_span)
+            cells.extend([text] * origin_span)
+            offset += span
+        above = current
+        rows.append(cells)
+    return rows
+
+
+def iter_docx_tables(source: Union[bytes, str, IO[bytes]]) -> Iterator[list[list[str]]]:
+    """Tabulky v těle dokumentu (bez vnořených), postupně jako řádky textů buněk.
+
+    ``source`` = obsah DOCX, cesta nebo binární soubor. V paměti je vždy jen
+    aktuální tabulka — zpracované prvky těla se hned uvolní.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with zipfile.ZipFile(source) as zf, zf.open(_DOCUMENT_XML) as xml:
+        depth = 0
+        body = None
+        for event, el in iterparse(xml, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 2 and el.tag == _W + "body":
+                    body = el
+                continue
+            if depth == 3 and body is not None:
+                if el.tag == _W + "tbl":
+                    yield _table_rows(el)
+                body.clear()
+            depth -= 1
+
+
+# ── Evidenční list → předpis ───────────────────────────────────────────
+
+
+def _parse_table(rows: list[list[str]]) -> dict:
+    """Předpis jedné jednotky z řádků evidenčního listu."""
+    # Row 0: nadpis — datum platnosti
+    valid_from = _extract_valid_from(rows[0][0])
+
+    # Row 1: VS + adresa + sekce
+    vs = _extract_vs(rows[1][0])
+    section, unit_display = _extract_section_and_unit(rows[1][1])
+
+    # Row 2: číslo prostoru, druh jednotky
+    space_number = _extract_space_number(rows[2][0])
+    space_type = _extract_space_type(rows[2][0])
+
+    # Row 3: typ vlastnictví + jméno vlastníka
+    owner_name = _extract_owner_name(rows[3][1])
+
+    # Rows 5-21: položky předpisu (row 4 = "Předpis plateb:")
+    items = []
+    monthly_total = 0.0
+
+    for row in rows[5:]:
+        cells = [text.strip() for text in row]
+        if len(cells) < 2:
+            continue
 
-    valid_from = None
-    prescriptions = []
+        name = cells[0]
+        amount_text = cells[1]
 
-    for table_idx, table in enumerate(doc.tables):
-        rows = table.rows
-        if len(rows) < 20:
-            logger.debug("Table %d: skipping (only %d rows)", table_idx, len(rows))
+        # Přeskoč prázdné, poznámky, datum
+        if not name or not amount_text:
+            continue
+        if name.startswith("V\xa0případě") or name.startswith("V případě"):
+            continue
+        if name.startswith("Datum"):
             continue
 
-        try:
-            # Row 0: nadpis — extrahuj datum platnosti (jen z první tabulky)
-            if valid_from is None:
-                header_text = rows[0].cells[0].text
-                valid_from = _extract_valid_from(header_text)
-
-            # Row 1: VS + adresa + sekce
-            row1_left = rows[1].cells[0].text
-            row1_right = rows[1].cells[1].text
-
-            vs = _extract_vs(row1_left)
-            section, unit_display = _extract_section_and_unit(row1_right)
-
-            # Row 2: číslo prostoru, druh jednotky
-            row2_left = rows[2].cells[0].text
-            space_number = _extract_space_number(row2_left)
-            space_type = _extract_space_type(row2_left)
-
-            # Row 3: typ vlastnictví + jméno vlastníka
-            row3_right = rows[3].cells[1].text
-            owner_name = _extract_owner_name(row3_right)
-
-            # Rows 5-21: položky předpisu (row 4 = "Předpis plateb:")
-            items = []
-            monthly_total = 0.0
-
-            for row in rows[5:]:
-                cells = [cell.text.strip() for cell in row.cells]
-                if len(cells) < 2:
-                    continue
-
-                name = cells[0]
-                amount_text = cells[1]
-
-                # Přeskoč prázdné, poznámky, datum
-                if not name or not amount_text:
-                    continue
-                if name.startswith("V\xa0případě") or name.startswith("V případě"):
-                    continue
-                if name.startswith("Datum"):
-                    continue
-
-                # CELKEM řádek
-                if name == "CELKEM":
-                    monthly_total = _parse_amount(amount_text)
-                    continue
-
-                amount = _parse_amount(amount_text)
-                items.append({
-                    "name": name,
-                    "amount": amount,
-                    "category": _categorize_item(name).value,
-                })
+        # CELKEM řádek
+        if name == "CELKEM":
+            monthly_total = _parse_amount(amount_text)
+            continue
+
+        amount = _parse_amount(amount_text)
+        items.append({
+            "name": name,
+            "amount": amount,
+            "category": _categorize_item(name).value,
+        })
+
+    # Fallback — spočítat total z položek
+    if monthly_total == 0.0 and items:
+        monthly_total = sum(i["amount"] for i in items)
+
+    return {
+        "valid_from": valid_from,
+        "variable_symbol": vs,
+        "space_number": space_number,
+        "section": section,
+        "unit_display": unit_display,
+        "space_type": space_type,
+        "owner_name": owner_name,
+        "monthly_total": monthly_total,
+        "items": items,
+    }
 
-            # Fallback — spočítat total z položek
-            if monthly_total == 0.0 and items:
-                monthly_total = sum(i["amount"] for i in items)
-
-            prescriptions.append({
-                "variable_symbol": vs,
-                "space_number": space_number,
-                "section": section,
-                "unit_display": unit_display,
-                "space_type": space_type,
-                "owner_name": owner_name,
-                "monthly_total": monthly_total,
-                "items": items,
-            })
 
+def iter_prescriptions(source: Union[bytes, str, IO[bytes]]) -> Iterator[dict]:
+    """Předpisy jednotek z DOCX postupně, jak jdou tabulky v dokumentu.
+
+    Každý záznam má klíče variable_symbol, space_number, section, unit_display,
+    space_type, owner_name, monthly_total, items a valid_from (z nadpisu listu).
+    Tabulky, které nejdou zpracovat, se zalogují a přeskočí.
+    """
+    for table_idx, rows in enumerate(iter_docx_tables(source)):
+        if len(rows) < MIN_TABLE_ROWS:
+            logger.debug("Table %d: skipping (only %d rows)", table_idx, len(rows))
+            continue
+        try:
+            yield _parse_table(rows)
         except Exception as e:
             logger.warning("Table %d parse error: %s", table_idx, e)
-            continue
+
+
+def parse_prescription_docx(file_content: bytes, year: int) -> dict:
+    """Parsuj DOCX s evidenčními listy předpisů.
+
+    Returns:
+        dict s klíči:
+        - valid_from: date | None (z první tabulky, která ho má)
+        - prescriptions: list of dict (variable_symbol, space_number, section, ...)
+    """
+    prescriptions = list(iter_prescriptions(file_content))
+    valid_from = next((p["valid_from"] for p in prescriptions if p["valid_from"]), None)
 
     logger.info(
         "Parsed %d prescriptions from DOCX (year=%d, valid_from=%s)",
@@ -215,3 +337,98 @@ def parse_prescription_docx(file_content: bytes, year: int) -> dict:
         "valid_from": valid_from,
         "prescriptions": prescriptions,
     }
+
+
+# ── Uložení ─────────────────────────────────────────────────────────────
+
+
+def save_prescriptions(
+    db: Session,
+    prescription_year: PrescriptionYear,
+    prescriptions: Iterable[dict],
+    units_by_number: dict,
+    batch_size: int = SAVE_BATCH,
+) -> dict:
+    """Uložit předpisy po dávkách tak, jak přicházejí z :func:`iter_prescriptions`.
+
+    Každá dávka = jeden INSERT předpisů (s RETURNING id), jeden INSERT položek
+    a jeden INSERT nových VS mapování. Doplní ``valid_from`` a součty
+    ``prescription_year``.
+
+    Returns:
+        dict: total, matched (spárováno na jednotku), vs_created
+    """
+    year = prescription_year.year
+    known_vs = {vs for (vs,) in db.query(VariableSymbolMapping.variable_symbol)}
+    stats = {"total": 0, "matched": 0, "vs_created": 0}
+    total_monthly = 0.0
+    valid_from = None
+    batch: list[dict] = []
+
+    def _flush_batch():
+        rows = []
+        for p_data in batch:
+            unit = units_by_number.get(p_data.get("space_number"))
+            rows.append({
+                "prescription_year_id": prescription_year.id,
+                "unit_id": unit.id if unit else None,
+                "variable_symbol": p_data.get("variable_symbol"),
+                "space_number": p_data.get("space_number"),
+                "section": p_data.get("section"),
+                "space_type": p_data.get("space_type"),
+                "owner_name": p_data.get("owner_name"),
+                "monthly_total": p_data["monthly_total"],
+            })
+        ids = db.execute(
+            insert(Prescription).returning(Prescription.id, sort_by_parameter_order=True), rows,
+        ).scalars().all()
+
+        items = []
+        mappings = []
+        for prescription_id, row, p_data in zip(ids, rows, batch):
+            for idx, item in enumerate(p_data.get("items", [])):
+                items.append({
+                    "prescription_id": prescription_id,
+                    "name": item["name"],
+                    "amount": item["amount"],
+                    "category": item["category"],
+                    "order": idx,
+                })
+            # Automatické vytvoření VS mapování
+            vs = row["variable_symbol"]
+            if vs and row["unit_id"] and vs not in known_vs:
+                known_vs.add(vs)
+                mappings.append({
+                    "variable_symbol": vs,
+                    "unit_id": row["unit_id"],
+                    "source": SymbolSource.AUTO,
+                    "description": f"Auto z předpisu {year}",
+                })
+            if row["unit_id"]:
+                stats["matched"] += 1
+        if items:
+            db.execute(insert(PrescriptionItem), items)
+        if mappings:
+            db.execute(insert(VariableSymbolMapping), mappings)
+        stats["vs_created"] += len(mappings)
+        batch.clear()
+
+    for p_data in prescriptions:
+        stats["total"] += 1
+        total_monthly += p_data["monthly_total"]
+        if valid_from is None:
+            valid_from = p_data.get("valid_from")
+        batch.append(p_data)
+        if len(batch) >= batch_size:
+            _flush_batch()
+    if batch:
+        _flush_batch()
+
+    prescription_year.valid_from = valid_from
+    prescription_year.total_units = stats["total"]
+    prescription_year.total_monthly = total_monthly
+    logger.info(
+        "Saved %d prescriptions for %d (matched=%d, vs_created=%d)",
+        stats["total"], year, stats["matched"], stats["vs_created"],
+    )
+    return stats
@@ -0,0 +1,322 @@
+"""Profilování requestů — čas requestu, SQL dotazy, N+1 detekce, cProfile na vyžádání.
+
+``profiling_middleware`` (registrovaný v app/main.py) založí pro každý request
+``RequestProfile`` v contextvar; listenery ``before/after_cursor_execute`` na
+``Engine`` do něj zapisují každý SQL dotaz (počet, čas, nejpomalejší
+statementy). Stejný SQL text (parametry se neliší v textu, ``IN (?, ?, …)``
+se sjednotí) opakovaný aspoň ``N_PLUS_ONE_MIN``× v jednom requestu se hlásí
+jako podezření na N+1.
+
+Dokončené profily jdou do kruhového bufferu posledních requestů, do agregátů
+per route a per SQL statement — vše jen v paměti procesu, reset restartem
+nebo ``reset()``. Dotazy mimo request (vlákna na pozadí) se nezapočítávají.
+
+``?_profile=1`` v URL navíc spustí cProfile a místo odpovědi vrátí textový
+report (SQL souhrn + nejdražší funkce podle kumulativního času).
+"""
+from __future__ import annotations
+
+import cProfile
+import heapq
+import io
+import logging
+import pstats
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Kolik posledních requestů drží buffer
+RECENT_MAX = 200
+# Kolik nejpomalejších statementů se drží u jednoho requestu
+SLOWEST_PER_REQUEST = 5
+# Stejný statement opakovaný aspoň tolikrát v jednom requestu = podezření na N+1
+N_PLUS_ONE_MIN = 10
+# Strop počtu různých SQL textů v agregaci (další se už nepřidávají)
+STATEMENT_STATS_MAX = 1000
+# Počet řádků pstats v ?_profile=1 reportu
+PROFILE_TOP = 60
+# Délka SQL textu ukládaná do statistik
+_SQL_MAX = 1000
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_current: ContextVar["RequestProfile | None"] = ContextVar("request_profile", default=None)
+
+_recent: deque[dict] = deque(maxlen=RECENT_MAX)
+_routes: dict[str, dict] = {}
+_statements: dict[str, dict] = {}
+_since = datetime.now()
+_lock = threading.Lock()
+# cProfile smí běžet jen jeden najednou
+_cprofile_lock = threading.Lock()
+
+
+def normalize_sql(statement: str) -> str:
+    """SQL text bez rozdílů v počtu parametrů ``IN (...)`` a bílých znacích."""
+    return _IN_LIST.sub("(?…)", _WHITESPACE.sub(" ", statement).strip())[:_SQL_MAX]
+
+
+class RequestProfile:
+    """SQL dotazy a čas jednoho requestu."""
+
+    __slots__ = ("method", "path", "started", "started_at", "queries", "sql_time", "statements", "slowest")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements: dict[str, list] = {}  # sql → [count, total, max]
+        self.slowest: list[tuple[float, int, str]] = []  # min-heap (duration, seq, sql)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.queries += 1
+        self.sql_time += duration
+        sql = normalize_sql(statement)
+        entry = self.statements.get(sql)
+        if entry is None:
+            self.statements[sql] = [1, duration, duration]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+            entry[2] = max(entry[2], duration)
+        item = (duration, self.queries, sql)
+        if len(self.slowest) < SLOWEST_PER_REQUEST:
+            heapq.heappush(self.slowest, item)
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, item)
+
+    def n_plus_one(self) -> list[dict]:
+        """Statementy opakované aspoň N_PLUS_ONE_MIN× (nejčastější první)."""
+        hits = [
+            {"sql": sql, "count": count, "total_ms": round(total * 1000, 2)}
+            for sql, (count, total, _max) in self.statements.items()
+            if count >= N_PLUS_ONE_MIN
+        ]
+        return sorted(hits, key=lambda h: -h["count"])
+
+    def summary(self, route: str, status: int) -> dict:
+        wall = time.perf_counter() - self.started
+        return {
+            "method": self.method,
+            "path": self.path,
+            "route": route,
+            "status": status,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_ms": round(wall * 1000, 2),
+            "sql_ms": round(self.sql_time * 1000, 2),
+            "queries": self.queries,
+            "distinct_queries": len(self.statements),
+            "n_plus_one": self.n_plus_one(),
+            "slowest": [
+                {"sql": sql, "ms": round(duration * 1000, 2)}
+                for duration, _seq, sql in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+# ── SQLAlchemy instrumentace ────────────────────────────────────────
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("_profile_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    starts = conn.info.get("_profile_start")
+    if profile is None or not starts:
+        return
+    profile.record(statement, time.perf_counter() - starts.pop())
+
+
+# ── Záznam requestů ─────────────────────────────────────────────────
+
+
+def start_request(method: str, path: str) -> tuple[RequestProfile, object]:
+    """Založit profil pro aktuální kontext; vrací (profil, token pro ``finish_request``)."""
+    profile = RequestProfile(method, path)
+    return profile, _current.set(profile)
+
+
+def _route_key(method: str, route) -> str:
+    return f"{method} {route}"
+
+
+def finish_request(profile: RequestProfile, token, route: str, status: int) -> dict:
+    """Uzavřít profil, uložit do bufferu a agregátů; vrací souhrn requestu."""
+    _current.reset(token)
+    summary = profile.summary(route, status)
+    key = _route_key(profile.method, route)
+    with _lock:
+        _recent.append(summary)
+        stats = _routes.get(key)
+        if stats is None:
+            stats = _routes[key] = {
+                "route": key, "count": 0, "wall_ms_total": 0.0, "wall_ms_max": 0.0,
+                "sql_ms_total": 0.0, "queries_total": 0, "queries_max": 0, "n_plus_one": 0,
+            }
+        stats["count"] += 1
+        stats["wall_ms_total"] += summary["wall_ms"]
+        stats["wall_ms_max"] = max(stats["wall_ms_max"], summary["wall_ms"])
+        stats["sql_ms_total"] += summary["sql_ms"]
+        stats["queries_total"] += profile.queries
+        stats["queries_max"] = max(stats["queries_max"], profile.queries)
+        if summary["n_plus_one"]:
+            stats["n_plus_one"] += 1
+        for sql, (count, total, max_duration) in profile.statements.items():
+            entry = _statements.get(sql)
+            if entry is None:
+                if len(_statements) >= STATEMENT_STATS_MAX:
+                    continue
+                entry = _statements[sql] = {"sql": sql, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "route": key}
+            entry["count"] += count
+            entry["total_ms"] += total * 1000
+            if max_duration * 1000 >= entry["max_ms"]:
+                entry["max_ms"] = max_duration * 1000
+                entry["route"] = key
+    return summary
+
+
+def recent_requests(limit: int = 50) -> list[dict]:
+    """Poslední requesty, nejnovější první."""
+    with _lock:
+        return list(reversed(_recent))[:limit]
+
+
+def route_stats() -> list[dict]:
+    """Agregace per route s průměry, seřazená podle celkového času."""
+    with _lock:
+        rows = [dict(s) for s in _routes.values()]
+    for row in rows:
+        n = row["count"] or 1
+        row["wall_ms_avg"] = round(row["wall_ms_total"] / n, 2)
+        row["sql_ms_avg"] = round(row["sql_ms_total"] / n, 2)
+        row["queries_avg"] = round(row["queries_total"] / n, 1)
+        row["wall_ms_total"] = round(row["wall_ms_total"], 2)
+        row["sql_ms_total"] = round(row["sql_ms_total"], 2)
+    return sorted(rows, key=lambda r: -r["wall_ms_total"])
+
+
+def statement_stats(limit: int = 30, order: str = "total") -> list[dict]:
+    """Nejdražší SQL statementy napříč requesty (``order``: total / max / count)."""
+    key = {"max": "max_ms", "count": "count"}.get(order, "total_ms")
+    with _lock:
+        rows = [dict(s) for s in _statements.values()]
+    for row in rows:
+        row["total_ms"] = round(row["total_ms"], 2)
+        row["max_ms"] = round(row["max_ms"], 2)
+        row["avg_ms"] = round(row["total_ms"] / (row["count"] or 1), 3)
+    return sorted(rows, key=lambda r: -r[key])[:limit]
+
+
+def metrics() -> dict:
+    """Strojově čitelný souhrn pro ``/sprava/vykon/metriky``."""
+    routes = route_stats()
+    with _lock:
+        recent = list(_recent)
+    return {
+        "since": _since.isoformat(timespec="seconds"),
+        "requests": sum(r["count"] for r in routes),
+        "queries": sum(r["queries_total"] for r in routes),
+        "wall_ms_total": round(sum(r["wall_ms_total"] for r in routes), 2),
+        "sql_ms_total": round(sum(r["sql_ms_total"] for r in routes), 2),
+        "routes": routes,
+        "statements": statement_stats(limit=50),
+        "n_plus_one": [
+            {"route": r["route"], "path": r["path"], "started_at": r["started_at"], "hits": r["n_plus_one"]}
+            for r in reversed(recent) if r["n_plus_one"]
+        ][:50],
+    }
+
+
+def reset() -> None:
+    """Vymazat buffer i agregace."""
+    global _since
+    with _lock:
+        _recent.clear()
+        _routes.clear()
+        _statements.clear()
+        _since = datetime.now()
+
+
+# ── Middleware ──────────────────────────────────────────────────────
+
+
+def _route_of(request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or request.url.path
+
+
+async def profiling_middleware(request, call_next):
+    """Změřit request (čas + SQL); ``?_profile=1`` vrátí cProfile report."""
+    if not settings.request_profiling or request.url.path.startswith("/static"):
+        return await call_next(request)
+    if (settings.debug and request.query_params.get("_profile") == "1"
+            and _cprofile_lock.acquire(blocking=False)):
+        try:
+            return await _profiled_response(request, call_next)
+        finally:
+            _cprofile_lock.release()
+
+    profile, token = start_request(request.method, request.url.path)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        finish_request(profile, token, _route_of(request), status)
+
+
+async def _profiled_response(request, call_next):
+    profiler = cProfile.Profile()
+    profile, token = start_request(request.method, request.url.path)
+    status = 500
+    profiler.enable()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        # Dočíst tělo ještě pod profilerem (šablona se renderuje před odesláním)
+        async for _chunk in response.body_iterator:
+            pass
+    finally:
+        profiler.disable()
+        summary = finish_request(profile, token, _route_of(request), status)
+
+    out = io.StringIO()
+    out.write(f"{summary['method']} {summary['path']} → {summary['status']}\n")
+    out.write(
+        f"čas {summary['wall_ms']} ms, SQL {summary['sql_ms']} ms, "
+        f"{summary['queries']} dotazů ({summary['distinct_queries']} různých)\n\n"
+    )
+    if summary["n_plus_one"]:
+        out.write("Podezření na N+1:\n")
+        for hit in summary["n_plus_one"]:
+            out.write(f"  {hit['count']}× ({hit['total_ms']} ms) {hit['sql']}\n")
+        out.write("\n")
+    if summary["slowest"]:
+        out.write("Nejpomalejší dotazy:\n")
+        for row in summary["slowest"]:
+            out.write(f"  {row['ms']} ms  {row['sql']}\n")
+        out.write("\n")
+    stats = pstats.Stats(profiler, stream=out)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(PROFILE_TOP)
+    return PlainTextResponse(out.getvalue(), status_code=200)
@@ -0,0 +1,167 @@
+"""Cache referenčních dat — nastavení SVJ, číselníky, e-mailové šablony, SMTP profily.
+
+Tyto tabulky se mění zřídka (Administrace, Nastavení), ale čtou se v horkých
+cestách: dashboard a přehled vlastníků čtou ``SvjInfo`` na každý request,
+párování plateb prefix VS, formuláře jednotek všechny číselníky a každý
+odeslaný e-mail otevíral vlastní ``SessionLocal`` kvůli SMTP profilu.
+
+Hodnoty se drží v paměti procesu jako neměnné snímky (:class:`RefRow`) —
+nikdy ne ORM objekty, takže nejsou vázané na session a nejde je omylem
+změnit a uložit. Kdo potřebuje zapisovat, načte si řádek normálně přes
+``db.query``.
+
+Invalidace při zápisu: snímek si pamatuje verzi své tabulky z
+``app/services/change_tracking.py`` — commit, který se tabulky dotkl (i
+hromadný ``query.update()``), ji zvýší a další čtení snímek obnoví. Dokud
+session změnu necommitne, čte tabulku přímo z DB (vidí vlastní flushnuté
+změny, ostatní dál starý stav). Po obnově zálohy volá
+``run_post_restore_migrations`` :func:`invalidate`.
+
+Cache je oddělená per engine (testy, více DB v jednom procesu).
+"""
+from __future__ import annotations
+
+import threading
+import weakref
+from types import SimpleNamespace
+
+from sqlalchemy.orm import Session
+
+from app.services import change_tracking
+
+SVJ_INFO = "svj_info"
+CODE_LIST_ITEMS = "code_list_items"
+EMAIL_TEMPLATES = "email_templates"
+SMTP_PROFILES = "smtp_profiles"
+
+# engine → {(tabulka, klíč): (verze tabulky, snímek)}
+_cache: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+class RefRow(SimpleNamespace):
+    """Neměnný snímek řádku (jen sloupce, bez relací)."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} je jen pro čtení")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} je jen pro čtení")
+
+
+def _snapshot(obj) -> RefRow | None:
+    if obj is None:
+        return None
+    return RefRow(**{col.key: getattr(obj, col.key) for col in obj.__mapper__.column_attrs})
+
+
+# ── Invalidace ──────────────────────────────────────────────────────
+
+def invalidate(*tables: str) -> None:
+    """Zneplatnit snímky daných tabulek (bez argumentů všech), např. po zápisu raw SQL."""
+    change_tracking.invalidate(*tables)
+
+
+# ── Načítání ────────────────────────────────────────────────────────
+
+def _engine_of(db: Session | None):
+    if db is None:
+        from app.database import engine
+        return engine
+    bind = db.get_bind()
+    return getattr(bind, "engine", bind)
+
+
+def _cached(db: Session | None, table: str, key, loader):
+    """Snímek z cache, při chybění ``loader(session)`` a uložení.
+
+    Bez ``db`` se při chybění otevře krátká ``SessionLocal`` (SMTP profily
+    se čtou i mimo request).
+    """
+    if db is not None and table in change_tracking.pending(db):
+        return loader(db)
+
+    engine = _engine_of(db)
+    current = change_tracking.version(table)
+    with _lock:
+        hit = _cache.get(engine, {}).get((table, key))
+    if hit is not None and hit[0] == current:
+        return hit[1]
+
+    if db is None:
+        from app.database import SessionLocal
+        session = SessionLocal()
+        try:
+            value = loader(session)
+        finally:
+            session.close()
+    else:
+        value = loader(db)
+
+    # Verze z doby před načtením — commit souběžný s načítáním snímek zneplatní
+    with _lock:
+        _cache.setdefault(engine, {})[(table, key)] = (current, value)
+    return value
+
+
+# ── Typované přístupy ───────────────────────────────────────────────
+
+def svj_settings(db: Session) -> RefRow | None:
+    """Snímek jediného řádku ``SvjInfo`` (None, pokud ještě neexistuje)."""
+    from app.models import SvjInfo
+    return _cached(db, SVJ_INFO, "row", lambda s: _snapshot(s.query(SvjInfo).first()))
+
+
+def declared_shares(db: Session) -> int:
+    """Celkový počet podílů dle prohlášení vlastníka (0 = nevyplněno)."""
+    info = svj_settings(db)
+    return info.total_shares if info and info.total_shares else 0
+
+
+def code_lists(db: Session) -> dict[str, list[RefRow]]:
+    """{kategorie: [položky]} v pořadí ``CODE_LIST_ORDER`` (kopie seznamů)."""
+    from app.models import CodeListItem
+    from app.services.code_list_service import CODE_LIST_ORDER
+
+    def load(s: Session) -> dict[str, tuple]:
+        items = (
+            s.query(CodeListItem)
+            .order_by(CodeListItem.category, CodeListItem.order, CodeListItem.value)
+            .all()
+        )
+        grouped = {cat: [] for cat in CODE_LIST_ORDER}
+        for item in items:
+            if item.category in grouped:
+                grouped[item.category].append(_snapshot(item))
+        return {cat: tuple(rows) for cat, rows in grouped.items()}
+
+    return {cat: list(rows) for cat, rows in _cached(db, CODE_LIST_ITEMS, "all", load).items()}
+
+
+def email_template(db: Session, name: str) -> RefRow | None:
+    """Snímek e-mailové šablony podle názvu."""
+    from app.models import EmailTemplate
+    return _cached(
+        db, EMAIL_TEMPLATES, ("name", name),
+        lambda s: _snapshot(s.query(EmailTemplate).filter_by(name=name).first()),
+    )
+
+
+def smtp_profile(profile_id: int, db: Session | None = None) -> RefRow | None:
+    """Snímek SMTP profilu podle ID."""
+    from app.models.smtp_profile import SmtpProfile
+    return _cached(
+        db, SMTP_PROFILES, ("id", profile_id),
+        lambda s: _snapshot(s.get(SmtpProfile, profile_id)),
+    )
+
+
+def default_smtp_profile(db: Session | None = None) -> RefRow | None:
+    """Snímek výchozího SMTP profilu (``is_default=True``)."""
+    from app.models.smtp_profile import SmtpProfile
+    return _cached(
+        db, SMTP_PROFILES, "default",
+        lambda s: _snapshot(s.query(SmtpProfile).filter_by(is_default=True).first()),
+    )
@@ -0,0 +1,364 @@
+"""Fulltextový index (SQLite FTS5) pro vlastníky, nájemce, jednotky a prostory.
+
+Tabulka ``search_index`` má jeden řádek na entitu: ``rowid = id * 4 + druh``,
+zobrazovaný ``label`` a prohledávané sloupce ``name`` (jména) a ``body``
+(e-maily, telefony, RČ, IČ, čísla jednotek, označení prostorů…). Tokenizer
+``unicode61 remove_diacritics 2`` hledá bez ohledu na diakritiku, prefixové
+indexy zrychlují hledání „za psaní“ (``nov*``).
+
+Obsah udržují triggery nad zdrojovými tabulkami — každý trigger smaže dotčené
+řádky indexu podle rowid a vloží je znovu z view ``search_src_<druh>``.
+Index vzniká v ``Base.metadata.create_all`` (listener v ``app/database.py``);
+u existující DB se při prvním vytvoření naplní celý. Bez FTS5 v SQLite
+seznamy filtrují přes LIKE (:func:`search_filter`) a globální hledání nic nevrací.
+"""
+from __future__ import annotations
+
+import logging
+import re
+
+from sqlalchemy import Integer, String, cast, or_, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "search_index"
+
+# Druh entity → kód v rowid (rowid = entity_id * _KIND_COUNT + kód)
+KINDS = {"owner": 0, "tenant": 1, "unit": 2, "space": 3}
+_KIND_COUNT = 4
+
+# Váhy bm25 pro sloupce (entity_type, entity_id, label, name, body)
+_BM25_WEIGHTS = "0.0, 0.0, 0.0, 10.0, 1.0"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_fts_enabled = False
+
+
+# ── Source views ────────────────────────────────────────────────────
+
+def _concat(*exprs: str) -> str:
+    """SQL: non-null values joined with spaces (SQLite 3.40 nemá concat_ws)."""
+    return " || ' ' || ".join(f"coalesce({e}, '')" for e in exprs)
+
+
+def _digits(expr: str) -> str:
+    """SQL: phone / birth number without separators (``+420 777-123`` → ``420777123``)."""
+    out = expr
+    for ch in (" ", "+", "-", "/"):
+        out = f"replace({out}, '{ch}', '')"
+    return out
+
+
+def _phone(expr: str) -> str:
+    """Phone as written, compact and as 9-digit national number."""
+    return _concat(expr, _digits(expr), f"substr({_digits(expr)}, -9)")
+
+
+def _resolved(col: str) -> str:
+    """Tenant field resolved from the linked owner (same rule as Tenant.resolved_*)."""
+    return f"CASE WHEN o.id IS NOT NULL THEN o.{col} ELSE t.{col} END"
+
+
+_VIEWS = {
+    "owner": f"""
+        SELECT o.id AS entity_id, 'owner' AS entity_type,
+               o.name_with_titles AS label,
+               {_concat("o.name_with_titles", "o.name_normalized")} AS name,
+               {_concat(
+                   "o.email", "o.email_secondary",
+                   _phone("o.phone"), _phone("o.phone_secondary"), _phone("o.phone_landline"),
+                   "o.birth_number", _digits("o.birth_number"), "o.company_id",
+                   "(SELECT group_concat(u.unit_number, ' ') FROM owner_units ou"
+                   " JOIN units u ON u.id = ou.unit_id"
+                   " WHERE ou.owner_id = o.id AND ou.valid_to IS NULL)",
+               )} AS body
+        FROM owners o
+        WHERE o.is_active = 1
+    """,
+    "tenant": f"""
+        SELECT t.id AS entity_id, 'tenant' AS entity_type,
+               coalesce({_resolved("name_with_titles")},
+                        trim(coalesce(t.last_name, '') || ' ' || coalesce(t.first_name, ''))) AS label,
+               {_concat(_resolved("name_with_titles"), _resolved("name_normalized"),
+                        "t.first_name", "t.last_name")} AS name,
+               {_concat(
+                   _resolved("email"), _phone(_resolved("phone")),
+                   _resolved("birth_number"), _digits(_resolved("birth_number")),
+                   _resolved("company_id"),
+                   "(SELECT group_concat(s.space_number || ' ' || s.designation, ' ')"
+                   " FROM space_tenants st JOIN spaces s ON s.id = st.space_id"
+                   " WHERE st.tenant_id = t.id AND st.is_active = 1)",
+               )} AS body
+        FROM tenants t
+        LEFT JOIN owners o ON o.id = t.owner_id
+    """,
+    "unit": f"""
+        SELECT u.id AS entity_id, 'unit' AS entity_type,
+               'Jednotka ' || u.unit_number AS label,
+               coalesce((SELECT group_concat(o.name_with_titles || ' ' || o.name_normalized, ' ')
+                         FROM owner_units ou JOIN owners o ON o.id = ou.owner_id
+                         WHERE ou.unit_id = u.id AND ou.valid_to IS NULL), '') AS name,
+               {_concat("u.unit_number", "u.building_number", "u.space_type",
+                        "u.section", "u.address")} AS body
+        FROM units u
+    """,
+    "space": f"""
+        SELECT s.id AS entity_id, 'space' AS entity_type,
+               'Prostor ' || s.space_number || ' – ' || s.designation AS label,
+               coalesce((SELECT group_concat(
+                             coalesce(CASE WHEN o.id IS NOT NULL THEN o.name_with_titles
+                                           ELSE t.name_with_titles END, '') || ' ' ||
+                             coalesce(CASE WHEN o.id IS NOT NULL THEN o.name_normalized
+                                           ELSE t.name_normalized END, ''), ' ')
+                         FROM space_tenants st JOIN tenants t ON t.id = st.tenant_id
+                         LEFT JOIN owners o ON o.id = t.owner_id
+                         WHERE st.space_id = s.id AND st.is_active = 1), '') AS name,
+               {_concat("s.space_number", "s.designation", "s.section", "s.note")} AS body
+        FROM spaces s
+    """,
+}
+
+
+# ── Triggers ────────────────────────────────────────────────────────
+# (zdrojová tabulka, [(druh, SQL vracející id dotčených entit; {r} = NEW/OLD)])
+
+_DEPENDENCIES = {
+    "owners": [
+        ("owner", "SELECT {r}.id AS id"),
+        ("tenant", "SELECT id FROM tenants WHERE owner_id = {r}.id"),
+        ("unit", "SELECT unit_id AS id FROM owner_units WHERE owner_id = {r}.id"),
+        ("space", "SELECT st.space_id AS id FROM space_tenants st"
+                  " JOIN tenants t ON t.id = st.tenant_id WHERE t.owner_id = {r}.id"),
+    ],
+    "owner_units": [
+        ("owner", "SELECT {r}.owner_id AS id"),
+        ("unit", "SELECT {r}.unit_id AS id"),
+    ],
+    "units": [
+        ("unit", "SELECT {r}.id AS id"),
+        ("owner", "SELECT owner_id AS id FROM owner_units WHERE unit_id = {r}.id"),
+    ],
+    "tenants": [
+        ("tenant", "SELECT {r}.id AS id"),
+        ("space", "SELECT space_id AS id FROM space_tenants WHERE tenant_id = {r}.id"),
+    ],
+    "spaces": [
+        ("space", "SELECT {r}.id AS id"),
+        ("tenant", "SELECT tenant_id AS id FROM space_tenants WHERE space_id = {r}.id"),
+    ],
+    "space_tenants": [
+        ("tenant", "SELECT {r}.tenant_id AS id"),
+        ("space", "SELECT {r}.space_id AS id"),
+    ],
+}
+
+
+def _refresh_sql(kind: str, ids_sql: str) -> str:
+    code = KINDS[kind]
+    return (
+        f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN "
+        f"(SELECT id * {_KIND_COUNT} + {code} FROM ({ids_sql}));\n"
+        f"INSERT INTO {SEARCH_TABLE} (rowid, entity_type, entity_id, label, name, body) "
+        f"SELECT entity_id * {_KIND_COUNT} + {code}, entity_type, entity_id, label, name, body "
+        f"FROM search_src_{kind} WHERE entity_id IN ({ids_sql});"
+    )
+
+
+def _trigger_ddl() -> list[str]:
+    statements = []
+    for table, deps in _DEPENDENCIES.items():
+        for event, refs in (("INSERT", ("NEW",)), ("UPDATE", ("OLD", "NEW")), ("DELETE", ("OLD",))):
+            body = "\n".join(
+                _refresh_sql(kind, " UNION ".join(ids.format(r=r) for r in refs))
+                for kind, ids in deps
+            )
+            name = f"trg_search_{table}_{event.lower()}"
+            statements.append(f"DROP TRIGGER IF EXISTS {name}")
+            statements.append(
+                f"CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN\n{body}\nEND"
+            )
+    return statements
+
+
+# ── Schema management ───────────────────────────────────────────────
+
+def ensure_search_index(conn) -> bool:
+    """Create FTS table, source views and triggers; fill the index when new.
+
+    ``conn`` is a SQLAlchemy Connection (used from the metadata ``after_create``
+    listener). Returns False when SQLite lacks FTS5 — lists then keep working
+    through LIKE filters, only the global search returns nothing.
+    """
+    global _fts_enabled
+
+    exists = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+    ), {"name": SEARCH_TABLE}).first() is not None
+    if not exists:
+        try:
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                "entity_type UNINDEXED, entity_id UNINDEXED, label UNINDEXED, name, body, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+            ))
+        except Exception as e:  # sqlite3.OperationalError: no such module: fts5
+            logger.warning("FTS5 not available, search index disabled: %s", e)
+            _fts_enabled = False
+            return False
+    _fts_enabled = True
+
+    # Views a triggery se vždy vytvoří znovu — změna definice nepotřebuje migraci
+    for kind, select in _VIEWS.items():
+        conn.execute(text(f"DROP VIEW IF EXISTS search_src_{kind}"))
+        conn.execute(text(f"CREATE VIEW search_src_{kind} AS {select}"))
+    for stmt in _trigger_ddl():
+        conn.execute(text(stmt))
+
+    if not exists:
+        count = rebuild_search_index(conn)
+        logger.info("Built search index (%d entries)", count)
+    return True
+
+
+def rebuild_search_index(conn) -> int:
+    """Refill the whole index from the source views; returns number of entries."""
+    conn.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    total = 0
+    for kind, code in KINDS.items():
+        total += conn.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, entity_type, entity_id, label, name, body) "
+            f"SELECT entity_id * {_KIND_COUNT} + {code}, entity_type, entity_id, label, name, body "
+            f"FROM search_src_{kind}"
+        )).rowcount or 0
+    return total
+
+
+# ── Querying ────────────────────────────────────────────────────────
+
+def fts_query(q: str) -> str | None:
+    """User input → FTS5 MATCH expression: every word as a quoted prefix term.
+
+    ``"Novák 12"`` → ``"Novák"* "12"*`` (implicit AND). Returns None when
+    the input has no searchable characters.
+    """
+    tokens = _TOKEN_RE.findall(q or "")
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def matching_ids(kind: str, q: str):
+    """Textual subquery of entity ids matching ``q`` — for ``Model.id.in_(...)``.
+
+    Input without searchable characters matches nothing.
+    """
+    return text(
+        f"SELECT entity_id FROM {SEARCH_TABLE} "
+        f"WHERE {SEARCH_TABLE} MATCH :fts_match AND entity_type = :fts_kind"
+    ).bindparams(fts_match=fts_query(q) or '""', fts_kind=kind).columns(entity_id=Integer)
+
+
+def _like_filter(kind: str, q: str):
+    """Podmínka pro seznam bez FTS5 — podřetězec přes LIKE (jako před indexem)."""
+    from app.models import Owner, OwnerUnit, Space, SpaceTenant, Tenant, Unit
+    from app.utils import strip_diacritics
+
+    search = f"%{q}%"
+    search_ascii = f"%{strip_diacritics(q)}%"
+    if kind == "owner":
+        return or_(
+            Owner.name_normalized.like(search_ascii),
+            Owner.name_with_titles.ilike(search),
+            Owner.first_name.ilike(search),
+            Owner.last_name.ilike(search),
+            Owner.email.ilike(search),
+            Owner.phone.ilike(search),
+            Owner.birth_number.ilike(search),
+            Owner.company_id.ilike(search),
+            Owner.units.any(
+                OwnerUnit.valid_to.is_(None)
+                & OwnerUnit.unit.has(cast(Unit.unit_number, String).ilike(search))
+            ),
+        )
+    if kind == "unit":
+        return or_(
+            cast(Unit.unit_number, String).ilike(search),
+            Unit.building_number.ilike(search),
+            Unit.space_type.ilike(search),
+            Unit.section.ilike(search),
+            Unit.address.ilike(search),
+            Unit.owners.any(OwnerUnit.owner.has(Owner.name_normalized.like(search_ascii))),
+        )
+    if kind == "space":
+        return or_(
+            Space.designation.ilike(search),
+            Space.section.ilike(search),
+            Space.note.ilike(search),
+            Space.tenants.any(
+                SpaceTenant.is_active
+                & SpaceTenant.tenant.has(Tenant.name_normalized.like(search_ascii))
+            ),
+        )
+    if kind == "tenant":
+        return or_(
+            Tenant.resolved_name_normalized.like(search_ascii),
+            Tenant.resolved_email.ilike(search),
+            Tenant.resolved_phone.like(search),
+            Tenant.birth_number.like(search),
+            Tenant.company_id.like(search),
+            Tenant.owner.has(or_(Owner.birth_number.like(search), Owner.company_id.like(search))),
+            Tenant.spaces.any(
+                SpaceTenant.is_active & SpaceTenant.space.has(Space.designation.ilike(search))
+            ),
+        )
+    raise ValueError(f"Unknown search kind: {kind}")
+
+
+def search_filter(model, kind: str, q: str):
+    """Filtr seznamu podle hledaného textu — ``query.filter(search_filter(Owner, "owner", q))``.
+
+    S FTS5 id z indexu, bez něj LIKE nad zdrojovými sloupci.
+    """
+    if _fts_enabled:
+        return model.id.in_(matching_ids(kind, q))
+    return _like_filter(kind, q)
+
+
+_URLS = {
+    "owner": "/vlastnici/{id}",
+    "tenant": "/najemci/{id}",
+    "unit": "/jednotky/{id}",
+    "space": "/prostory/{id}",
+}
+KIND_LABELS = {
+    "owner": "Vlastník",
+    "tenant": "Nájemce",
+    "unit": "Jednotka",
+    "space": "Prostor",
+}
+
+
+def global_search(db: Session, q: str, limit: int = 20) -> list[dict]:
+    """Ranked hits across all entity types (bm25, names weigh more than contacts)."""
+    match = fts_query(q)
+    if not match or not _fts_enabled:
+        return []
+    rows = db.execute(text(
+        f"SELECT entity_type, entity_id, label, "
+        f"snippet({SEARCH_TABLE}, 4, '', '', '…', 8) AS snippet "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :m "
+        f"ORDER BY bm25({SEARCH_TABLE}, {_BM25_WEIGHTS}) LIMIT :n"
+    ), {"m": match, "n": limit}).all()
+    return [
+        {
+            "kind": kind,
+            "kind_label": KIND_LABELS[kind],
+            "id": entity_id,
+            "label": label,
+            "snippet": snippet.strip(),
+            "url": _URLS[kind].format(id=entity_id),
+        }
+        for kind, entity_id, label, snippet in rows
+    ]
@@ -6,11 +6,12 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.models import (
-    OwnerUnit, Payment, PaymentAllocation, PaymentDirection, PaymentMatchStatus,
+    Payment, PaymentAllocation, PaymentDirection, PaymentMatchStatus,
     Prescription, PrescriptionItem, PrescriptionYear,
     Settlement, SettlementItem, SettlementStatus,
     UnitBalance,
 )
+from app.services import ownership
 from app.services.payment_overview import PaymentWithAlloc
 from app.utils import utcnow
 
@@ -63,16 +64,13 @@ def generate_settlements(db: Session, year: int) -> dict:
     balances = db.query(UnitBalance).filter_by(year=year).all()
     balance_map = {b.unit_id: b.opening_amount for b in balances}
 
-    # Aktuální vlastník per unit
-    owner_units = (
-        db.query(OwnerUnit)
-        .filter(OwnerUnit.valid_to.is_(None))
-        .all()
-    )
-    owner_by_unit = {}
-    for ou in owner_units:
-        if ou.unit_id not in owner_by_unit:
-            owner_by_unit[ou.unit_id] = ou.owner_id
+    # Vlastník per unit na konci roku (u prodané jednotky bez nového vlastníka poslední v roce)
+    year_start, year_end = ownership.year_bounds(year)
+    owners_in_year = ownership.load(db, year_start, year_end)
+    owner_by_unit = {
+        unit_id: owners_in_year.owner_on(unit_id, year_end) or owners_in_year.latest_owner(unit_id)
+        for unit_id in owners_in_year.unit_ids()
+    }
 
     # Existující settlements pro tento rok — pro update
     existing = db.query(Settlement).filter_by(year=year).all()
@@ -11,13 +11,14 @@ import logging
 import re
 from datetime import date, datetime
 
-from openpyxl import load_workbook
 from sqlalchemy.orm import Session
 
 from app.models import (
     Owner, Prescription, PrescriptionYear, Space, SpaceStatus,
     SpaceTenant, SymbolSource, Tenant, VariableSymbolMapping,
 )
+from app.services.owner_resolver import OwnerResolver
+from app.services.parsed_upload import get_parsed_upload
 from app.utils import build_name_with_titles, strip_diacritics, utcnow
 
 logger = logging.getLogger(__name__)
@@ -98,67 +99,6 @@ def _detect_blocked(designation: str) -> bool:
     return any(kw in norm for kw in BLOCKED_KEYWORDS)
 
 
-def _match_owner(db: Session, tenant_name: str):
-    """Try to find matching Owner by normalized name. Returns Owner or None."""
-    if not tenant_name:
-        return None
-    name_norm = strip_diacritics(tenant_name)
-    # Exact match on name_normalized
-    owner = db.query(Owner).filter(Owner.name_normalized == name_norm).first()
-    if owner:
-        return owner
-    # Partial match — last name match
-    parts = name_norm.split()
-    if parts:
-        # Try matching just the last name (first word in normalized = příjmení)
-        surname = parts[0]
-        if len(surname) >= 3:
-            candidates = db.query(Owner).filter(
-                Owner.name_normalized.like(f"{surname}%")
-            ).all()
-            if len(candidates) == 1:
-                return candidates[0]
-            # Multiple candidates — if all share the same name_normalized,
-            # they are duplicates of the same person → return first
-            if len(candidates) > 1:
-                unique_names = {c.name_normalized for c in candidates}
-                if len(unique_names) == 1:
-                    return candidates[0]
-    return None
-
-
-def _match_owner_candidates(db: Session, tenant_name: str) -> list:
-    """Find all matching Owner candidates for preview display.
-
-    Returns list of dicts {id, name} (deduplicated by display_name).
-    """
-    if not tenant_name:
-        return []
-    name_norm = strip_diacritics(tenant_name)
-    # Exact match
-    owner = db.query(Owner).filter(Owner.name_normalized == name_norm).first()
-    if owner:
-        return [{"id": owner.id, "name": owner.display_name}]
-    # Partial match — surname
-    parts = name_norm.split()
-    if not parts:
-        return []
-    surname = parts[0]
-    if len(surname) < 3:
-        return []
-    candidates = db.query(Owner).filter(
-        Owner.name_normalized.like(f"{surname}%")
-    ).all()
-    # Deduplicate by display_name (multiple OwnerUnit records for same person)
-    seen = set()
-    result = []
-    for c in candidates:
-        if c.display_name not in seen:
-            seen.add(c.display_name)
-            result.append({"id": c.id, "name": c.display_name})
-    return result
-
-
 def preview_spaces_from_excel(file_path: str, mapping: dict, db: Session = None):
     """Parse Excel and return preview dict without saving to DB.
 
@@ -178,8 +118,8 @@ def preview_spaces_from_excel(file_path: str, mapping: dict, db: Session = None)
     start_row = mapping.get("start_row", 2)
 
     try:
-        wb = load_workbook(file_path, read_only=True, data_only=True)
-        ws = wb[sheet_name] if sheet_name and sheet_name in wb.sheetnames else wb.active
+        parsed = get_parsed_upload(file_path)
+        sheet_rows = parsed.rows(parsed.resolve_sheet(sheet_name), start_row)
     except Exception as e:
         logger.error("Failed to open Excel for space preview: %s", e)
         return {
@@ -193,8 +133,9 @@ def preview_spaces_from_excel(file_path: str, mapping: dict, db: Session = None)
     seen_numbers = set()
     blocked_count = 0
     with_tenant_count = 0
+    resolver = OwnerResolver.load(db) if db else None
 
-    for row_idx, row in enumerate(ws.iter_rows(min_row=start_row, values_only=True), start=start_row):
+    for row_idx, row in enumerate(sheet_rows, start=start_row):
         # Skip fully empty rows
         if not any(c is not None for c in row):
             continue
@@ -239,8 +180,8 @@ def preview_spaces_from_excel(file_path: str, mapping: dict, db: Session = None)
         # Try owner matching for preview
         owner_match = None
         owner_candidates = []
-        if db and tenant_name and not is_blocked:
-            owner_candidates = _match_owner_candidates(db, tenant_name)
+        if resolver and tenant_name and not is_blocked:
+            owner_candidates = resolver.candidates(tenant_name)
             if len(owner_candidates) == 1:
                 owner_match = owner_candidates[0]
 
@@ -263,11 +204,6 @@ def preview_spaces_from_excel(file_path: str, mapping: dict, db: Session = None)
             "owner_candidates": owner_candidates,
         })
 
-    try:
-        wb.close()
-    except Exception:
-        pass
-
     return {
         "rows_processed": len(preview_rows) + len(errors),
         "spaces_count": len(preview_rows),
@@ -295,8 +231,8 @@ def import_spaces_from_excel(db: Session, file_path: str, mapping: dict,
     start_row = mapping.get("start_row", 2)
 
     try:
-        wb = load_workbook(file_path, read_only=True, data_only=True)
-        ws = wb[sheet_name] if sheet_name and sheet_name in wb.sheetnames else wb.active
+        parsed = get_parsed_upload(file_path)
+        sheet_rows = parsed.rows(parsed.resolve_sheet(sheet_name), start_row)
     except Exception as e:
         logger.error("Failed to open Excel for space import: %s", e)
         return {
@@ -316,7 +252,12 @@ def import_spaces_from_excel(db: Session, file_path: str, mapping: dict,
     # Get latest PrescriptionYear for auto-creating prescriptions
     latest_py = db.query(PrescriptionYear).order_by(PrescriptionYear.year.desc()).first()
 
-    for row_idx, row in enumerate(ws.iter_rows(min_row=start_row, values_only=True), start=start_row):
+    # Lookupy jednou pro celý soubor (ne dotaz na každý řádek)
+    resolver = OwnerResolver.load(db)
+    existing_numbers = {n for (n,) in db.query(Space.space_number).all()}
+    existing_symbols = {vs for (vs,) in db.query(VariableSymbolMapping.variable_symbol).all()}
+
+    for row_idx, row in enumerate(sheet_rows, start=start_row):
         if not any(c is not None for c in row):
             continue
 
@@ -333,8 +274,7 @@ def import_spaces_from_excel(db: Session, file_path: str, mapping: dict,
         seen_numbers.add(space_number)
 
         # Check if space already exists
-        existing = db.query(Space).filter_by(space_number=space_number).first()
-        if existing:
+        if space_number in existing_numbers:
             errors.append(f"Řádek {row_idx}: prostor č. {space_number} již existuje — přeskočeno")
             continue
 
@@ -384,9 +324,10 @@ def import_spaces_from_excel(db: Session, file_path: str, mapping: dict,
             # Try to match to existing Owner (user override takes priority)
             owner = None
             if owner_overrides and space_number in owner_overrides:
-                owner = db.query(Owner).filter_by(id=owner_overrides[space_number]).first()
+                override_id = owner_overrides[space_number]
+                owner = resolver.get(override_id) or db.get(Owner, override_id)
             if not owner:
-                owner = _match_owner(db, tenant_name)
+                owner = resolver.match(tenant_name)
 
             # Build name fields
             name_norm = strip_diacritics(tenant_name)
@@ -426,10 +367,8 @@ def import_spaces_from_excel(db: Session, file_path: str, mapping: dict,
 
             # Auto-create VariableSymbolMapping
             if vs:
-                existing_vs = db.query(VariableSymbolMapping).filter_by(
-                    variable_symbol=vs
-                ).first()
-                if not existing_vs:
+                if vs not in existing_symbols:
+                    existing_symbols.add(vs)
                     db.add(VariableSymbolMapping(
                         variable_symbol=vs,
                         space_id=space.id,
@@ -444,27 +383,18 @@ def import_spaces_from_excel(db: Session, file_path: str, mapping: dict,
                         f"Řádek {row_idx}: VS '{vs}' již existuje — VS mapování nevytvořeno"
                     )
 
-            # Auto-create Prescription
+            # Auto-create Prescription (prostor je nový — předpis pro něj ještě neexistuje)
             if monthly_rent > 0 and latest_py:
-                existing_presc = db.query(Prescription).filter_by(
-                    prescription_year_id=latest_py.id, space_id=space.id
-                ).first()
-                if not existing_presc:
-                    db.add(Prescription(
-                        prescription_year_id=latest_py.id,
-                        space_id=space.id,
-                        unit_id=None,
-                        variable_symbol=vs or None,
-                        monthly_total=monthly_rent,
-                        owner_name=tenant_name,
-                        created_at=now,
-                        updated_at=now,
-                    ))
-
-    try:
-        wb.close()
-    except Exception:
-        pass
+                db.add(Prescription(
+                    prescription_year_id=latest_py.id,
+                    space_id=space.id,
+                    unit_id=None,
+                    variable_symbol=vs or None,
+                    monthly_total=monthly_rent,
+                    owner_name=tenant_name,
+                    created_at=now,
+                    updated_at=now,
+                ))
 
     db.commit()
 
@@ -0,0 +1,395 @@
+"""View model detailu bankovního výpisu — předpočítaný a cachovaný per výpis.
+
+Detail výpisu (včetně každého HTMX filtru a řazení) dříve pokaždé znovu
+spouštěl ``detect_discrepancies`` a ``compute_candidates`` nad celým výpisem,
+skládal mapy předpisů, join všech jednotek na vlastníky pro dropdown a
+index jmen a pět COUNT dotazů pro bubliny. Teď se vše počítá jednou:
+
+- :class:`StatementView` — per výpis: index plateb pro filtrování a řazení
+  (bez SQL), nesrovnalosti, kandidáti, návrhy přiřazení, počty pro bubliny.
+  Klíč = ``BankStatement.revision`` (zvyšuje :func:`bump_revision` při
+  přiřazení, potvrzení, odmítnutí, přepárování, zamčení) + verze tabulek
+  evidence (``DEPENDENT_TABLES`` z ``change_tracking``).
+- :class:`Directory` — sdílená část všech výpisů téhož roku: dropdowny
+  jednotek a prostorů, jména vlastníků/nájemců, předpisy a VS pro tooltipy.
+  Klíč = rok + verze ``DEPENDENT_TABLES`` — přepárování výpisu ji nepřepočítá.
+
+Platby pro šablonu se i z cache načítají v session requestu (ORM objekty se
+mezi requesty nesdílí) — z indexu se bere jen pořadí a výběr ID.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import NamedTuple
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.models import (
+    BankStatement, Owner, OwnerUnit, Payment, PaymentAllocation, PaymentDirection,
+    PaymentMatchStatus, Prescription, PrescriptionYear, Space, SpaceTenant, Tenant, Unit,
+)
+from app.services import change_tracking
+from app.utils import strip_diacritics
+
+# Evidence, ze které se počítají kandidáti, nesrovnalosti a tooltipy
+DEPENDENT_TABLES = (
+    "units", "owners", "owner_units", "prescriptions", "prescription_years",
+    "spaces", "space_tenants", "tenants",
+)
+
+# Počet výpisů držených v paměti (LRU)
+_MAX_STATEMENTS = 8
+
+_views: OrderedDict[int, "StatementView"] = OrderedDict()
+_directories: dict[int, "Directory"] = {}
+_lock = threading.Lock()
+
+
+def bump_revision(statement: BankStatement) -> None:
+    """Označit změnu párování výpisu — cachovaný view model se přepočítá.
+
+    Volat ve stejné transakci jako změnu plateb/alokací (před ``db.commit()``).
+    """
+    statement.revision = (statement.revision or 0) + 1
+
+
+# ── Sdílená část: jednotky, prostory, předpisy ──────────────────────
+
+class UnitOption(NamedTuple):
+    id: int
+    unit_number: int
+
+
+class SpaceOption(NamedTuple):
+    id: int
+    space_number: int
+    designation: str | None
+
+
+@dataclass
+class Directory:
+    """Dropdowny a tooltipy detailu výpisu pro jeden rok předpisů."""
+    key: tuple
+    unit_monthly: dict[int, float] = field(default_factory=dict)
+    unit_vs: dict[int, str] = field(default_factory=dict)
+    all_units_list: list[UnitOption] = field(default_factory=list)
+    unit_owner_names: dict[int, str] = field(default_factory=dict)
+    unit_name_index: list[tuple[set, int]] = field(default_factory=list)
+    all_spaces: list[SpaceOption] = field(default_factory=list)
+    space_tenant_names: dict[int, str] = field(default_factory=dict)
+    space_monthly: dict[int, float] = field(default_factory=dict)
+    space_vs: dict[int, str] = field(default_factory=dict)
+    space_name_index: list[tuple[set, int]] = field(default_factory=list)
+
+
+def _build_directory(db: Session, year: int, key: tuple) -> Directory:
+    d = Directory(key=key)
+
+    # Mapa unit_id → měsíční předpis + VS (pro tooltipy)
+    py = db.query(PrescriptionYear).filter_by(year=year).first()
+    if py:
+        for presc in db.query(Prescription).filter_by(prescription_year_id=py.id).all():
+            if presc.unit_id:
+                if presc.monthly_total:
+                    d.unit_monthly[presc.unit_id] = presc.monthly_total
+                if presc.variable_symbol:
+                    d.unit_vs[presc.unit_id] = presc.variable_symbol
+
+    # Units + owner names for assignment dropdown (1 JOIN místo 3 dotazů)
+    units_by_id = {}
+    unit_owner_rows = (
+        db.query(Unit, Owner)
+        .outerjoin(OwnerUnit, (OwnerUnit.unit_id == Unit.id) & (OwnerUnit.valid_to.is_(None)))
+        .outerjoin(Owner, Owner.id == OwnerUnit.owner_id)
+        .all()
+    )
+    for unit, owner in unit_owner_rows:
+        units_by_id[unit.id] = UnitOption(unit.id, unit.unit_number)
+        if owner:
+            if owner.display_name:
+                existing = d.unit_owner_names.get(unit.id)
+                d.unit_owner_names[unit.id] = f"{existing}, {owner.display_name}" if existing else owner.display_name
+            if owner.name_normalized:
+                words = {w for w in strip_diacritics(owner.name_normalized).split() if len(w) > 2}
+                if words:
+                    d.unit_name_index.append((words, unit.id))
+    # Řadit podle jména vlastníka (bez diakritiky), jednotky bez vlastníka na konec
+    d.all_units_list = sorted(
+        units_by_id.values(),
+        key=lambda u: strip_diacritics(d.unit_owner_names.get(u.id, "zzz")),
+    )
+
+    # Spaces + tenant names for assignment dropdown
+    spaces = [
+        SpaceOption(s.id, s.space_number, s.designation)
+        for s in db.query(Space).order_by(Space.space_number).all()
+    ]
+    active_sts = (
+        db.query(SpaceTenant)
+        .filter_by(is_active=True)
+        .options(joinedload(SpaceTenant.tenant).joinedload(Tenant.owner))
+        .all()
+    )
+    for st in active_sts:
+        if st.monthly_rent:
+            d.space_monthly[st.space_id] = st.monthly_rent
+        if st.variable_symbol:
+            d.space_vs[st.space_id] = st.variable_symbol
+        if st.tenant:
+            name = st.tenant.display_name
+            if name:
+                d.space_tenant_names[st.space_id] = name
+                words = {w for w in strip_diacritics(name).split() if len(w) > 2}
+                if words:
+                    d.space_name_index.append((words, st.space_id))
+    # Řadit podle jména nájemce (bez diakritiky), prostory bez nájemce na konec
+    spaces.sort(key=lambda s: strip_diacritics(d.space_tenant_names.get(s.id, "zzz")))
+    d.all_spaces = spaces
+    return d
+
+
+# ── Per výpis: index plateb a odvozená data ─────────────────────────
+
+class PaymentRow(NamedTuple):
+    """Sloupce platby potřebné pro filtrování, řazení a součty."""
+    id: int
+    date: date | None
+    amount: float | None
+    vs: str | None
+    counter_account_name: str | None
+    match_status: PaymentMatchStatus
+    direction: PaymentDirection
+    has_unit: bool
+    has_space: bool
+    unit_number: int
+    space_number: int
+    search_text: str  # protistrana + poznámka + zpráva bez diakritiky
+
+
+def _payment_row(p: Payment) -> PaymentRow:
+    unit_number = p.unit.unit_number if p.unit else next(
+        (a.unit.unit_number for a in (p.allocations or []) if a.unit), 0,
+    )
+    space_number = p.space.space_number if p.space else next(
+        (a.space.space_number for a in (p.allocations or []) if a.space), 0,
+    )
+    return PaymentRow(
+        id=p.id,
+        date=p.date,
+        amount=p.amount,
+        vs=p.vs,
+        counter_account_name=p.counter_account_name,
+        match_status=p.match_status,
+        direction=p.direction,
+        has_unit=p.unit_id is not None,
+        has_space=p.space_id is not None,
+        unit_number=unit_number or 0,
+        space_number=space_number or 0,
+        search_text="\0".join(
+            strip_diacritics(t or "") for t in (p.counter_account_name, p.note, p.message)
+        ),
+    )
+
+
+def build_suggest_map(
+    payments: list,
+    name_index: list[tuple[set, int]],
+) -> dict[int, int]:
+    """Vybudovat mapu payment_id → entity_id z name_index (words_set, entity_id).
+
+    Pro každou UNMATCHED příjmovou platbu najde nejlepší shodu dle společných slov
+    v counter_account_name + note + message.
+    """
+    suggest_map: dict[int, int] = {}
+    for p in payments:
+        if p.match_status != PaymentMatchStatus.UNMATCHED or p.direction != PaymentDirection.INCOME:
+            continue
+        text_parts = [p.counter_account_name or "", p.note or "", p.message or ""]
+        sender_words = {w for w in strip_diacritics(" ".join(text_parts)).split() if len(w) > 2}
+        if not sender_words:
+            continue
+        best_id = None
+        best_score = 0
+        for name_words, entity_id in name_index:
+            common = sender_words & name_words
+            if len(common) >= 1 and len(common) > best_score:
+                best_score = len(common)
+                best_id = entity_id
+        if best_id and best_score >= 1:
+            suggest_map[p.id] = best_id
+    return suggest_map
+
+
+# Řazení jako ORDER BY … NULLS LAST (stav se v DB ukládá jménem enumu)
+_SORT_KEYS = {
+    "datum": lambda r: r.date,
+    "castka": lambda r: r.amount,
+    "vs": lambda r: r.vs,
+    "protiucet": lambda r: r.counter_account_name,
+    "stav": lambda r: r.match_status.name if r.match_status else None,
+}
+
+
+def _bubble_counts(rows: list[PaymentRow]) -> dict[str, int]:
+    counts = {
+        "vse": 0, "auto_matched": 0, "suggested": 0, "manual": 0, "unmatched": 0,
+        "prijem": 0, "vydej": 0,
+    }
+    for r in rows:
+        counts["vse"] += 1
+        counts[r.match_status.value] += 1
+        counts["prijem" if r.direction == PaymentDirection.INCOME else "vydej"] += 1
+    return counts
+
+
+@dataclass
+class StatementView:
+    """Předpočítaný detail jednoho výpisu (nezávislý na filtru a řazení)."""
+    key: tuple
+    year: int
+    rows: list[PaymentRow]
+    discrepancies: list
+    candidates_map: dict[int, list[dict]]
+    unit_suggest_map: dict[int, int]
+    space_suggest_map: dict[int, int]
+    bubble_counts: dict[str, dict[str, int]]  # typ filtr → počty
+    typ_counts: dict[str, int]
+
+    def filter(self, q: str = "", stav: str = "", smer: str = "", typ: str = "",
+               sort: str = "datum", order: str = "asc") -> list[PaymentRow]:
+        """Filtr + řazení nad indexem (stejná sémantika jako dřívější SQL dotaz)."""
+        rows = self.rows
+        if stav:
+            rows = [r for r in rows if r.match_status.value == stav]
+        if smer == "prijem":
+            rows = [r for r in rows if r.direction == PaymentDirection.INCOME]
+        elif smer == "vydej":
+            rows = [r for r in rows if r.direction == PaymentDirection.EXPENSE]
+        if typ == "jednotky":
+            rows = [r for r in rows if r.has_unit]
+        elif typ == "prostory":
+            rows = [r for r in rows if r.has_space]
+
+        reverse = order == "desc"
+        if sort in ("jednotka", "prostor"):
+            attr = "unit_number" if sort == "jednotka" else "space_number"
+            rows = sorted(rows, key=lambda r: getattr(r, attr), reverse=reverse)
+        else:
+            key_fn = _SORT_KEYS.get(sort, _SORT_KEYS["datum"])
+            present = sorted((r for r in rows if key_fn(r) is not None), key=key_fn, reverse=reverse)
+            rows = present + [r for r in rows if key_fn(r) is None]
+
+        if q:
+            q_ascii = strip_diacritics(q)
+            rows = [r for r in rows if q in (r.vs or "") or q_ascii in r.search_text]
+        return rows
+
+
+def _load_payments(db: Session, statement_id: int):
+    return (
+        db.query(Payment)
+        .filter_by(statement_id=statement_id)
+        .options(
+            joinedload(Payment.unit),
+            joinedload(Payment.space),
+            joinedload(Payment.owner),
+            joinedload(Payment.allocations).joinedload(PaymentAllocation.unit),
+            joinedload(Payment.allocations).joinedload(PaymentAllocation.space),
+        )
+        .order_by(Payment.id)
+    )
+
+
+def _build_view(db: Session, statement: BankStatement, year: int, key: tuple,
+                directory: Directory, payments: list[Payment]) -> StatementView:
+    from app.services.payment_discrepancy import detect_discrepancies
+    from app.services.payment_matching import compute_candidates
+
+    rows = [_payment_row(p) for p in payments]
+    return StatementView(
+        key=key,
+        year=year,
+        rows=rows,
+        discrepancies=detect_discrepancies(db, statement.id),
+        candidates_map=compute_candidates(db, payments, year, statement_id=statement.id),
+        # Návrh předvybrané jednotky / prostoru podle jména protistrany
+        unit_suggest_map=build_suggest_map(payments, directory.unit_name_index),
+        space_suggest_map=build_suggest_map(payments, directory.space_name_index),
+        bubble_counts={
+            "": _bubble_counts(rows),
+            "jednotky": _bubble_counts([r for r in rows if r.has_unit]),
+            "prostory": _bubble_counts([r for r in rows if r.has_space]),
+        },
+        typ_counts={
+            "vse": len(rows),
+            "jednotky": sum(1 for r in rows if r.has_unit),
+            "prostory": sum(1 for r in rows if r.has_space),
+        },
+    )
+
+
+def get_directory(db: Session, year: int) -> Directory:
+    """Dropdowny a tooltipy pro rok ``year`` (z cache, pokud se evidence nezměnila)."""
+    key = change_tracking.version(*DEPENDENT_TABLES)
+    if change_tracking.pending(db) & set(DEPENDENT_TABLES):
+        return _build_directory(db, year, key)
+    with _lock:
+        cached = _directories.get(year)
+    if cached is not None and cached.key == key:
+        return cached
+    directory = _build_directory(db, year, key)
+    with _lock:
+        _directories[year] = directory
+    return directory
+
+
+def get_view(db: Session, statement: BankStatement) -> tuple[StatementView, Directory, list[Payment] | None]:
+    """View model výpisu + sdílená část; třetí prvek = platby, pokud se právě načetly.
+
+    Při zásahu cache se platby nenačítají — volající si dotáhne jen ty, které
+    po filtru zobrazí (:func:`load_payments`).
+    """
+    pf = statement.period_from
+    year = pf.year if pf else date.today().year
+    directory = get_directory(db, year)
+    key = (statement.revision or 0, directory.key)
+
+    if not change_tracking.pending(db):
+        with _lock:
+            cached = _views.get(statement.id)
+            if cached is not None and cached.key == key:
+                _views.move_to_end(statement.id)
+                return cached, directory, None
+
+    payments = _load_payments(db, statement.id).all()
+    view = _build_view(db, statement, year, key, directory, payments)
+    if change_tracking.pending(db):
+        # Necommitnuté změny v session — neukládat
+        return view, directory, payments
+    with _lock:
+        _views[statement.id] = view
+        _views.move_to_end(statement.id)
+        while len(_views) > _MAX_STATEMENTS:
+            _views.popitem(last=False)
+    return view, directory, payments
+
+
+def load_payments(db: Session, statement_id: int, rows: list[PaymentRow],
+                  loaded: list[Payment] | None = None) -> list[Payment]:
+    """ORM platby (s jednotkou, prostorem, vlastníkem a alokacemi) v pořadí ``rows``."""
+    if loaded is None:
+        query = _load_payments(db, statement_id)
+        if rows and len(rows) < 500:
+            query = query.filter(Payment.id.in_([r.id for r in rows]))
+        loaded = query.all() if rows else []
+    by_id = {p.id: p for p in loaded}
+    return [by_id[r.id] for r in rows if r.id in by_id]
+
+
+def discard(statement_id: int) -> None:
+    """Zahodit view model smazaného výpisu."""
+    with _lock:
+        _views.pop(statement_id, None)
@@ -0,0 +1,205 @@
+"""Statické soubory — obsahové hashe v URL, předkomprimované varianty, komprese odpovědí.
+
+``asset_url("js/app.js")`` (Jinja global) vrací ``/static/js/app.js?v=<hash>``,
+kde hash je z obsahu souboru — po změně souboru se změní URL, takže prohlížeč
+smí soubor s platným ``v`` cachovat natrvalo (``Cache-Control: immutable``).
+Bez ``v`` (nebo se starým) se odpovídá ``no-cache`` a prohlížeč revaliduje přes
+ETag.
+
+Textové soubory (CSS, JS, SVG) se při startu (:func:`build`) zkomprimují do
+paměti — gzip vždy, brotli pokud je nainstalovaný balíček ``brotli``.
+``AssetStaticFiles`` pak podle ``Accept-Encoding`` posílá hotovou variantu bez
+komprese za běhu. Změna souboru na disku (vývoj) se pozná podle mtime/velikosti
+a položka se přepočítá.
+
+``CompressionMiddleware`` gzipuje dynamické odpovědi (HTML tabulky, CSV, JSON);
+binární exporty (XLSX, PDF, ZIP) a SSE proudy propouští beze změny.
+
+Tailwind: pokud existuje předkompilovaný ``css/tailwind.css``
+(``scripts/build_css.py``), ``base.html`` ho načte místo JIT skriptu
+v prohlížeči (``has_asset``).
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder, IdentityResponder
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # volitelná závislost — bez ní jen gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+
+# Přípony, které má smysl komprimovat (obrázky/fonty jsou už komprimované)
+_COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".json", ".txt", ".map"}
+# Menší soubory se nekomprimují — hlavičky by sežraly úsporu
+_MIN_COMPRESS_SIZE = 512
+# Délka obsahového hashe v URL
+_HASH_LENGTH = 12
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# Content-Type dynamických odpovědí, které CompressionMiddleware gzipuje
+_COMPRESSIBLE_TYPES = (
+    "text/html", "text/plain", "text/csv", "text/css", "text/javascript",
+    "application/json", "application/javascript", "image/svg+xml",
+)
+
+
+class _Asset(NamedTuple):
+    digest: str
+    mtime_ns: int
+    size: int
+    # kódování ("br", "gzip") → komprimovaný obsah
+    encoded: dict[str, bytes]
+
+
+_assets: dict[str, _Asset] = {}
+_lock = threading.Lock()
+
+
+def _load(path: Path, stat) -> _Asset:
+    data = path.read_bytes()
+    encoded: dict[str, bytes] = {}
+    if path.suffix in _COMPRESSIBLE_SUFFIXES and len(data) >= _MIN_COMPRESS_SIZE:
+        if brotli is not None:
+            encoded["br"] = brotli.compress(data, quality=11)
+        encoded["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+        # Varianta, která nic neušetří, se neposílá
+        encoded = {enc: body for enc, body in encoded.items() if len(body) < len(data)}
+    digest = hashlib.sha256(data).hexdigest()[:_HASH_LENGTH]
+    return _Asset(digest, stat.st_mtime_ns, stat.st_size, encoded)
+
+
+def _asset(rel_path: str, static_dir: Path | None = None) -> _Asset | None:
+    """Položka manifestu pro soubor (přepočítá se, pokud se soubor změnil)."""
+    path = (static_dir or STATIC_DIR) / rel_path
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    if not path.is_file():
+        return None
+    with _lock:
+        cached = _assets.get(rel_path)
+    if cached and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+        return cached
+    asset = _load(path, stat)
+    with _lock:
+        _assets[rel_path] = asset
+    return asset
+
+
+def build(static_dir: Path | None = None) -> int:
+    """Zahashovat a předkomprimovat všechny statické soubory. Vrací jejich počet."""
+    static_dir = static_dir or STATIC_DIR
+    count = 0
+    for path in sorted(static_dir.rglob("*")):
+        if path.is_file() and not path.name.startswith("."):
+            if _asset(path.relative_to(static_dir).as_posix(), static_dir):
+                count += 1
+    logger.info("Static assets: %d files hashed (brotli: %s)", count, "yes" if brotli else "no")
+    return count
+
+
+def asset_url(rel_path: str) -> str:
+    """URL statického souboru s obsahovým hashem (``/static/css/x.css?v=…``)."""
+    rel_path = rel_path.lstrip("/")
+    asset = _asset(rel_path)
+    if asset is None:
+        return f"/static/{rel_path}"
+    return f"/static/{rel_path}?v={asset.digest}"
+
+
+def has_asset(rel_path: str) -> bool:
+    """True pokud statický soubor existuje (např. předkompilované CSS)."""
+    return (STATIC_DIR / rel_path.lstrip("/")).is_file()
+
+
+def _accepted_encoding(accept: str, available: dict[str, bytes]) -> str | None:
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in accept.split(",")
+        if not part.strip().endswith(";q=0")
+    }
+    for encoding in ("br", "gzip"):
+        if encoding in available and encoding in accepted:
+            return encoding
+    return None
+
+
+class AssetStaticFiles(StaticFiles):
+    """StaticFiles s cache hlavičkami podle hashe a předkomprimovanými variantami."""
+
+    async def get_response(self, path: str, scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code not in (200, 304):
+            return response
+
+        rel_path = path.replace("\\", "/").lstrip("/")
+        asset = _asset(rel_path, Path(self.directory))
+        if asset is None:
+            return response
+
+        version = ""
+        for pair in scope.get("query_string", b"").decode("latin-1").split("&"):
+            if pair.startswith("v="):
+                version = pair[2:]
+        cache_control = IMMUTABLE_CACHE if version == asset.digest else REVALIDATE_CACHE
+
+        request_headers = Headers(scope=scope)
+        encoding = _accepted_encoding(request_headers.get("accept-encoding", ""), asset.encoded)
+        if response.status_code == 200 and encoding and "range" not in request_headers:
+            headers = {
+                k: v for k, v in response.headers.items()
+                if k.lower() not in ("content-length", "accept-ranges", "content-type")
+            }
+            response = Response(
+                asset.encoded[encoding], media_type=response.media_type, headers=headers,
+            )
+            response.headers["Content-Encoding"] = encoding
+
+        response.headers["Cache-Control"] = cache_control
+        if asset.encoded:
+            MutableHeaders(raw=response.raw_headers).add_vary_header("Accept-Encoding")
+        return response
+
+
+class _TextOnlyResponder(GZipResponder):
+    """GZipResponder, který netextové odpovědi propustí beze změny."""
+
+    async def send_with_compression(self, message) -> None:
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            await super().send_with_compression(message)
+            if not content_type.startswith(_COMPRESSIBLE_TYPES):
+                self.content_type_is_excluded = True
+            return
+        await super().send_with_compression(message)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Gzip pro textové odpovědi (HTML, CSV, JSON) — velké tabulky v síti zmenší ~10×."""
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if "gzip" in Headers(scope=scope).get("accept-encoding", ""):
+            responder = _TextOnlyResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
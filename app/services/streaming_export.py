@@ -0,0 +1,180 @@
+"""Streamovaný export do XLSX/CSV — write-only workbook, šířky sloupců ze vzorku.
+
+Řádky přicházejí z generátoru (typicky nad ``query.yield_per()``), takže paměť
+nezávisí na počtu exportovaných záznamů. CSV se odesílá po blocích už během
+čtení z DB; XLSX se zapisuje write-only workbookem do dočasného souboru
+a odesílá po blocích. Šířky sloupců se počítají jen z prvních
+``WIDTH_SAMPLE_ROWS`` řádků (write-only list je musí znát před prvním řádkem).
+"""
+from __future__ import annotations
+
+import csv
+import io
+import tempfile
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+
+from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+
+# Počet řádků, ze kterých se odhadují šířky sloupců
+WIDTH_SAMPLE_ROWS = 200
+# Velikost bloku odesílaného klientovi
+CHUNK_SIZE = 64 * 1024
+# Po kolika řádcích se CSV buffer odešle
+_CSV_FLUSH_ROWS = 500
+# Do této velikosti drží dočasný XLSX soubor v paměti
+_SPOOL_MAX_SIZE = 4 * 1024 * 1024
+
+BOLD = Font(bold=True)
+
+
+@dataclass(frozen=True)
+class Styled:
+    """Hodnota buňky s formátováním (jen XLSX; CSV použije ``value``)."""
+    value: Any
+    font: Font | None = None
+    fill: PatternFill | None = None
+
+
+def _plain(value):
+    return value.value if isinstance(value, Styled) else value
+
+
+def sampled_widths(headers: list, sample: Iterable[list], max_width: int = 45) -> list[int]:
+    """Column widths from header + sampled rows (same rule as ``excel_auto_width``)."""
+    widths = [len(str(h)) if h is not None else 0 for h in headers]
+    for row in sample:
+        for idx, value in enumerate(row):
+            value = _plain(value)
+            if value is None:
+                continue
+            length = len(str(value))
+            if idx >= len(widths):
+                widths.extend([0] * (idx + 1 - len(widths)))
+            if length > widths[idx]:
+                widths[idx] = length
+    return [min(w + 2, max_width) for w in widths]
+
+
+def write_xlsx(
+    fp,
+    headers: list,
+    rows: Iterable[list],
+    *,
+    sheet_title: str = "Export",
+    max_width: int = 45,
+    header_fill: PatternFill | None = None,
+    preamble: list[list] | None = None,
+    merge_preamble: int = 0,
+    footer: Callable[[], list[list]] | None = None,
+) -> int:
+    """Write a single-sheet write-only workbook to ``fp``; returns number of data rows.
+
+    ``preamble`` rows go above the header (``merge_preamble`` merges the first
+    preamble row across that many columns), ``footer`` is called after all
+    data rows are written — it can use totals accumulated by the row generator.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_title[:31])  # Excel sheet name limit
+
+    rows = iter(rows)
+    sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+    for idx, width in enumerate(sampled_widths(headers, sample, max_width), 1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+
+    def _cells(row):
+        out = []
+        for value in row:
+            if isinstance(value, Styled):
+                cell = WriteOnlyCell(ws, value=value.value)
+                if value.font is not None:
+                    cell.font = value.font
+                if value.fill is not None:
+                    cell.fill = value.fill
+                out.append(cell)
+            else:
+                out.append(value)
+        return out
+
+    if preamble:
+        for row in preamble:
+            ws.append(_cells(row))
+        if merge_preamble > 1:
+            ws.merged_cells.add(f"A1:{get_column_letter(merge_preamble)}1")
+
+    ws.append(_cells([Styled(h, font=BOLD, fill=header_fill) for h in headers]))
+
+    count = 0
+    for row in sample:
+        ws.append(_cells(row))
+        count += 1
+    for row in rows:
+        ws.append(_cells(row))
+        count += 1
+
+    if footer is not None:
+        for row in footer():
+            ws.append(_cells(row))
+
+    wb.save(fp)
+    return count
+
+
+def iter_xlsx(headers: list, rows: Iterable[list], **kwargs) -> Iterator[bytes]:
+    """Build the workbook into a spooled temp file and yield it in chunks."""
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE) as tmp:
+        write_xlsx(tmp, headers, rows, **kwargs)
+        tmp.seek(0)
+        while chunk := tmp.read(CHUNK_SIZE):
+            yield chunk
+
+
+def iter_csv(headers: list, rows: Iterable[list], footer: Callable[[], list[list]] | None = None) -> Iterator[bytes]:
+    """Yield UTF-8 CSV (``;`` delimiter, BOM for Excel) in blocks of rows."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";")
+    buf.write("\ufeff")
+    writer.writerow(headers)
+    for idx, row in enumerate(rows, 1):
+        writer.writerow([_plain(v) for v in row])
+        if idx % _CSV_FLUSH_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if footer is not None:
+        for row in footer():
+            writer.writerow([_plain(v) for v in row])
+    yield buf.getvalue().encode("utf-8")
+
+
+def export_response(
+    fmt: str,
+    filename: str,
+    headers: list,
+    rows: Iterable[list],
+    **xlsx_kwargs,
+) -> StreamingResponse:
+    """StreamingResponse with an XLSX or CSV attachment (``filename`` without extension).
+
+    Extra keyword arguments (``sheet_title``, ``max_width``, ``preamble`` …)
+    go to ``write_xlsx``; CSV uses only ``footer``.
+    """
+    if fmt == "xlsx":
+        body = iter_xlsx(headers, rows, **xlsx_kwargs)
+        media_type = XLSX_MEDIA_TYPE
+    else:
+        body = iter_csv(headers, rows, footer=xlsx_kwargs.get("footer"))
+        media_type = CSV_MEDIA_TYPE
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
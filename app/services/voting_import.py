@@ -18,14 +18,20 @@ The mapping dict describes which columns map to which roles:
 from __future__ import annotations
 
 import json
+import os
 import re
-from openpyxl import load_workbook
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from app.models.owner import Owner, OwnerUnit, Unit
 from app.models.voting import (
     Ballot, BallotStatus, BallotVote, Voting, VoteValue,
 )
+from app.services.parsed_upload import discard_parsed_upload, get_parsed_upload
 from app.utils import utcnow
 from app.utils import strip_diacritics as _strip_diacritics
 
@@ -184,10 +190,121 @@ def read_excel_headers(file_path: str) -> list[str]:
     return _read_headers(file_path)
 
 
-def preview_voting_import(file_path: str, mapping: dict, voting: Voting, db: Session) -> dict:
-    """Parse Excel with mapping and return preview without modifying DB."""
-    wb = load_workbook(file_path, read_only=True, data_only=True)
-    ws = wb.active
+# ── Parsed-row cache ──────────────────────────────────────────────────
+# Preview and confirm are separate requests over the same uploaded file and
+# mapping. Parsed rows are ballot-independent, so they are cached per
+# (file, mtime, size, parse-relevant mapping) and confirm never re-reads Excel.
+_PARSE_CACHE_MAX = 8
+_parse_cache: OrderedDict = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+# Mapping keys that influence parsing (clear_existing affects only execution)
+_PARSE_KEYS = (
+    "owner_col", "unit_col", "start_row", "item_mappings", "items",
+    "for_values", "against_values", "abstain_values",
+)
+
+
+def _parse_cache_key(file_path: str, mapping: dict) -> tuple:
+    st = os.stat(file_path)
+    parse_mapping = {k: mapping[k] for k in _PARSE_KEYS if k in mapping}
+    return (
+        str(Path(file_path).resolve()), st.st_mtime_ns, st.st_size,
+        json.dumps(parse_mapping, sort_keys=True, ensure_ascii=False),
+    )
+
+
+def discard_parsed_rows(file_path: str) -> None:
+    """Drop cached parse results for an upload (called when the file is removed)."""
+    resolved = str(Path(file_path).resolve())
+    with _parse_cache_lock:
+        for key in [k for k in _parse_cache if k[0] == resolved]:
+            del _parse_cache[key]
+    discard_parsed_upload(file_path)
+
+
+def _compile_vote_matcher(
+    for_values: tuple[set[str], list],
+    against_values: tuple[set[str], list],
+    abstain_values: tuple[set[str], list],
+):
+    """Pre-compile value sets into one lookup closure with the same priority as ``_match_vote``."""
+    exact: dict[str, str] = {}
+    # Insert lowest priority first so that PRO wins over PROTI over ZDRŽEL
+    for choice, (values, _) in (("abstain", abstain_values), ("against", against_values), ("for", for_values)):
+        for v in values:
+            exact[v] = choice
+    comparisons = [
+        (choice, cmp)
+        for choice, (_, cmp) in (("for", for_values), ("against", against_values), ("abstain", abstain_values))
+        if cmp
+    ]
+
+    def match(raw: str | None, num: float | None) -> str | None:
+        if raw is not None:
+            choice = exact.get(raw.upper())
+            if choice:
+                return choice
+        if num is not None:
+            num_str = str(int(num)) if num == int(num) else str(num)
+            choice = exact.get(num_str)
+            if choice:
+                return choice
+            for choice, cmp in comparisons:
+                if _check_comparisons(num, cmp):
+                    return choice
+        return None
+
+    return match
+
+
+_INVERTED_VOTE = {"for": "against", "against": "for", "abstain": "abstain"}
+
+
+def _compile_item_matchers(item_mappings: list[dict], match_value) -> list:
+    """Build one closure per voting item: row → (item_id, raw_value, vote_choice)."""
+    matchers = []
+    for im in item_mappings:
+        item_id = im["item_id"]
+        for_col = im.get("for_col")
+        against_col = im.get("against_col")
+
+        def match_item(row, _iid=item_id, _for=for_col, _against=against_col):
+            raw_value = None
+            choice = None
+            # Primary column — match value against for/against/abstain sets
+            if _for is not None:
+                raw = _cell(row, _for)
+                raw_value = raw
+                choice = match_value(raw, _cell_numeric(row, _for))
+            # Secondary column (PROTI zvlášť) — only if primary didn't match;
+            # for_values → PROTI, against_values → PRO (inverted)
+            if _against is not None and choice is None:
+                raw = _cell(row, _against)
+                if raw_value is None:
+                    raw_value = raw
+                result = match_value(raw, _cell_numeric(row, _against))
+                choice = _INVERTED_VOTE.get(result)
+            return _iid, raw_value, choice
+
+        matchers.append(match_item)
+    return matchers
+
+
+def parse_vote_rows(file_path: str, mapping: dict) -> list[dict]:
+    """Read vote rows from Excel once and return ballot-independent parsed rows.
+
+    Each row dict has ``row``, ``owner_name``, ``unit_raw``, ``unit_number``,
+    ``vote_choices`` ({item_id: "for"/"against"/"abstain"}) and ``raw_values``.
+    Results are cached per upload file + mapping, so the preview and confirm
+    steps parse the workbook only once.
+    """
+    key = _parse_cache_key(file_path, mapping)
+    with _parse_cache_lock:
+        cached = _parse_cache.get(key)
+        if cached is not None:
+            _parse_cache.move_to_end(key)
+            return cached
 
     owner_col = mapping["owner_col"]
     unit_col = mapping["unit_col"]
@@ -195,17 +312,50 @@ def preview_voting_import(file_path: str, mapping: dict, voting: Voting, db: Ses
     item_mappings = mapping.get("item_mappings") or mapping.get("items", [])
 
     # Parse user-defined values for PRO/PROTI/ZDRŽEL SE
-    for_values = _parse_value_list(mapping.get("for_values", "1, ANO, YES, X, PRO"))
-    against_values = _parse_value_list(mapping.get("against_values", "0, NE, NO, PROTI"))
-    abstain_values = _parse_value_list(mapping.get("abstain_values", "ZDRŽEL, ZDRŽEL SE, ABSTAIN, Z, 2"))
-
-    matched = []
-    unmatched = []
-    no_match = []
-    errors = []
+    match_value = _compile_vote_matcher(
+        _parse_value_list(mapping.get("for_values", "1, ANO, YES, X, PRO")),
+        _parse_value_list(mapping.get("against_values", "0, NE, NO, PROTI")),
+        _parse_value_list(mapping.get("abstain_values", "ZDRŽEL, ZDRŽEL SE, ABSTAIN, Z, 2")),
+    )
+    item_matchers = _compile_item_matchers(item_mappings, match_value)
+
+    rows = []
+    sheet_rows = get_parsed_upload(file_path).rows(None, start_row)
+    for row_idx, row in enumerate(sheet_rows, start=start_row):
+        owner_name = _cell(row, owner_col)
+        unit_raw = _cell(row, unit_col)
+        if not owner_name and not unit_raw:
+            continue
 
-    # Build lookup: unit_number → list of ballots
-    ballot_lookup = {}
+        vote_choices = {}
+        raw_values = {}  # item_id → raw string from cell (for unrecognized tracking)
+        for match_item in item_matchers:
+            item_id, raw, choice = match_item(row)
+            if raw is not None:
+                raw_values[item_id] = raw
+            if choice:
+                vote_choices[item_id] = choice
+
+        rows.append({
+            "row": row_idx,
+            "owner_name": owner_name,
+            "unit_raw": unit_raw,
+            "unit_number": _parse_unit_number(unit_raw) if unit_raw else None,
+            "vote_choices": vote_choices,
+            "raw_values": raw_values,
+        })
+
+    with _parse_cache_lock:
+        _parse_cache[key] = rows
+        while len(_parse_cache) > _PARSE_CACHE_MAX:
+            _parse_cache.popitem(last=False)
+    return rows
+
+
+def _build_ballot_lookup(voting: Voting) -> tuple[dict, dict]:
+    """Map unit_number → ballots and ballot_id → SJM unit numbers in one pass."""
+    ballot_lookup: dict[int, list] = {}
+    sjm_units: dict[int, set[int]] = {}
     for ballot in voting.ballots:
         seen_unit_ids = set()
         # Primary: owner's current units
@@ -213,6 +363,8 @@ def preview_voting_import(file_path: str, mapping: dict, voting: Voting, db: Ses
             unit_num = ou.unit.unit_number
             ballot_lookup.setdefault(unit_num, []).append(ballot)
             seen_unit_ids.add(unit_num)
+            if ou.ownership_type and "SJM" in ou.ownership_type.upper():
+                sjm_units.setdefault(ballot.id, set()).add(unit_num)
         # Fallback: units_text (shared SJM ballots contain units from all members)
         if ballot.units_text:
             for part in ballot.units_text.split(","):
@@ -222,16 +374,27 @@ def preview_voting_import(file_path: str, mapping: dict, voting: Voting, db: Ses
                     if unit_num not in seen_unit_ids:
                         ballot_lookup.setdefault(unit_num, []).append(ballot)
                         seen_unit_ids.add(unit_num)
+    return ballot_lookup, sjm_units
+
+
+def preview_voting_import(file_path: str, mapping: dict, voting: Voting, db: Session) -> dict:
+    """Parse Excel with mapping and return preview without modifying DB."""
+    parsed_rows = parse_vote_rows(file_path, mapping)
+
+    matched = []
+    unmatched = []
+    no_match = []
+    errors = []
+
+    ballot_lookup, sjm_units = _build_ballot_lookup(voting)
 
     # Track which ballots we've already seen (for dedup across rows)
     seen_ballots = {}
 
-    for row_idx, row in enumerate(ws.iter_rows(min_row=start_row, values_only=True), start=start_row):
-        owner_name = _cell(row, owner_col)
-        unit_raw = _cell(row, unit_col)
-
-        if not owner_name and not unit_raw:
-            continue
+    for parsed in parsed_rows:
+        row_idx = parsed["row"]
+        owner_name = parsed["owner_name"]
+        unit_raw = parsed["unit_raw"]
 
         if not unit_raw:
             unmatched.append({
@@ -242,7 +405,7 @@ def preview_voting_import(file_path: str, mapping: dict, voting: Voting, db: Ses
             })
             continue
 
-        unit_number = _parse_unit_number(unit_raw)
+        unit_number = parsed["unit_number"]
         if unit_number is None:
             unmatched.append({
                 "row": row_idx,
@@ -263,38 +426,8 @@ def preview_voting_import(file_path: str, mapping: dict, voting: Voting, db: Ses
             })
             continue
 
-        # Parse vote choices for each item (ballot-independent)
-        vote_choices = {}
-        raw_values = {}  # item_id → raw string from cell (for unrecognized tracking)
-        for im in item_mappings:
-            item_id = im["item_id"]
-            for_col = im.get("for_col")
-            against_col = im.get("against_col")
-
-            # Primary column — match value against for/against/abstain sets
-            if for_col is not None:
-                raw = _cell(row, for_col)
-                num = _cell_numeric(row, for_col)
-                if raw is not None:
-                    raw_values[item_id] = raw
-                result = _match_vote(raw, num, for_values, against_values, abstain_values)
-                if result:
-                    vote_choices[item_id] = result
-
-            # Secondary column (PROTI zvlášť) — only if primary didn't match
-            if against_col is not None and item_id not in vote_choices:
-                raw = _cell(row, against_col)
-                num = _cell_numeric(row, against_col)
-                if raw is not None and item_id not in raw_values:
-                    raw_values[item_id] = raw
-                # In against column, for_values → PROTI, against_values → PRO (inverted)
-                result = _match_vote(raw, num, for_values, against_values, abstain_values)
-                if result == "for":
-                    vote_choices[item_id] = "against"
-                elif result == "against":
-                    vote_choices[item_id] = "for"
-                elif result == "abstain":
-                    vote_choices[item_id] = "abstain"
+        vote_choices = parsed["vote_choices"]
+        raw_values = parsed["raw_values"]
 
         # Detect unrecognized: items with raw values but no match
         unrecognized = {
@@ -331,11 +464,7 @@ def preview_voting_import(file_path: str, mapping: dict, voting: Voting, db: Ses
                 if len(narrowed) < len(ballots_for_unit):
                     sjm_on_unit = [
                         b for b in ballots_for_unit
-                        if any(
-                            ou.unit.unit_number == unit_number
-                            and ou.ownership_type and "SJM" in ou.ownership_type.upper()
-                            for ou in b.owner.current_units
-                        )
+                        if unit_number in sjm_units.get(b.id, ())
                     ]
                     if len(sjm_on_unit) == 2:
                         for b in sjm_on_unit:
@@ -379,8 +508,6 @@ def preview_voting_import(file_path: str, mapping: dict, voting: Voting, db: Ses
                 seen_ballots[ballot.id] = entry
             matched.append(entry)
 
-    wb.close()
-
     # K3: Detect duplicate ballot assignments (SJM risk)
     ballot_row_count: dict[int, int] = {}
     for entry in matched:
@@ -402,15 +529,25 @@ def preview_voting_import(file_path: str, mapping: dict, voting: Voting, db: Ses
     }
 
 
+_VOTE_VALUES = {"for": VoteValue.FOR, "against": VoteValue.AGAINST, "abstain": VoteValue.ABSTAIN}
+
+
 def execute_voting_import(file_path: str, mapping: dict, voting: Voting, db: Session) -> dict:
-    """Execute the import: update BallotVote records and ballot statuses."""
+    """Execute the import: update BallotVote records and ballot statuses.
+
+    Rows come from the parse cache filled by the preview step; vote and ballot
+    updates are written with bulk UPDATE statements instead of per-object flushes.
+    """
     clear_existing = mapping.get("clear_existing", False)
     preview = preview_voting_import(file_path, mapping, voting, db)
 
     processed_count = 0
     skipped_count = 0
     cleared_count = 0
-    errors = []
+
+    ballot_updates = []
+    vote_updates = []
+    now = utcnow()
 
     # Set of ballot IDs that will be updated from import
     matched_ballot_ids = {entry["ballot_id"] for entry in preview["matched"]}
@@ -419,11 +556,11 @@ def execute_voting_import(file_path: str, mapping: dict, voting: Voting, db: Ses
     if clear_existing:
         for ballot in voting.ballots:
             if ballot.id not in matched_ballot_ids and ballot.status == BallotStatus.PROCESSED:
-                ballot.status = BallotStatus.GENERATED
-                ballot.processed_at = None
-                for bv in ballot.votes:
-                    bv.vote = None
-                    # Keep votes_count (the weight) as is
+                ballot_updates.append({
+                    "id": ballot.id, "status": BallotStatus.GENERATED, "processed_at": None,
+                })
+                # Keep votes_count (the weight) as is
+                vote_updates.extend({"id": bv.id, "vote": None} for bv in ballot.votes)
                 cleared_count += 1
 
     # Use already-loaded ballot objects (avoids potential ORM identity issues)
@@ -449,21 +586,37 @@ def execute_voting_import(file_path: str, mapping: dict, voting: Voting, db: Ses
                 # In append mode: skip if vote already set
                 if not clear_existing and bv.vote is not None:
                     continue
-                vote_map = {"for": VoteValue.FOR, "against": VoteValue.AGAINST, "abstain": VoteValue.ABSTAIN}
-                bv.vote = vote_map.get(vote_data["vote"], VoteValue.FOR)
-                bv.votes_count = vote_data["count"]
+                vote_updates.append({
+                    "id": bv.id,
+                    "vote": _VOTE_VALUES.get(vote_data["vote"], VoteValue.FOR),
+                    "votes_count": vote_data["count"],
+                })
                 has_real_votes = True
             elif clear_existing:
                 # Clear mode: reset votes not in import
-                bv.vote = None
+                vote_updates.append({"id": bv.id, "vote": None})
 
         if has_real_votes:
-            ballot.status = BallotStatus.PROCESSED
-            ballot.processed_at = utcnow()
+            ballot_updates.append({
+                "id": ballot.id, "status": BallotStatus.PROCESSED, "processed_at": now,
+            })
             processed_count += 1
         else:
             skipped_count += 1
 
+    if vote_updates or ballot_updates:
+        # Pending ORM changes first, then bulk UPDATE by primary key
+        db.flush()
+        if vote_updates:
+            db.execute(update(BallotVote), vote_updates)
+        if ballot_updates:
+            db.execute(update(Ballot), ballot_updates)
+        # Loaded objects are stale after the bulk statements — reload on next access
+        for ballot in voting.ballots:
+            for bv in ballot.votes:
+                db.expire(bv)
+            db.expire(ballot)
+
     # Save mapping for next time (commit handled by caller)
     voting.import_column_mapping = json.dumps(mapping, ensure_ascii=False)
 
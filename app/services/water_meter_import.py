@@ -0,0 +1,163 @@
+"""Hromadný import odečtů vodoměrů — set-based resolve vodoměrů a upsert odečtů.
+
+Vstupem jsou řádky z ``parse_techem_xls`` / ``parse_water_readings_row_format``
+(jeden dict na vodoměr s listem ``readings``). Jednotky i vodoměry se načtou
+jedním dotazem do mapy, odečty se zapisují přes
+``INSERT ... ON CONFLICT(meter_id, reading_date)`` po dávkách.
+"""
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import MeterType, Unit, WaterMeter, WaterReading
+from app.services.water_meter_stats import refresh_water_meter_stats
+from app.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+# Velikost dávky pro INSERT/DELETE (SQLite limit proměnných v jednom příkazu)
+_CHUNK = 500
+
+
+def _chunks(items: list, size: int = _CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def build_unit_label_map(db: Session) -> dict[str, int]:
+    """Normalized building_number label → unit_id (one query over units)."""
+    from app.routers.water_meters._helpers import normalize_unit_label
+
+    label_map = {}
+    for unit_id, building_number in db.query(Unit.id, Unit.building_number):
+        if building_number:
+            label_map[normalize_unit_label(building_number)] = unit_id
+    return label_map
+
+
+def import_water_readings(
+    db: Session, rows: list[dict], import_mode: str, import_batch: str,
+) -> dict:
+    """Create/update meters and upsert their readings (commit handled by caller).
+
+    ``import_mode`` is ``"append"`` (existing dates are kept) or ``"overwrite"``
+    (all readings of imported meters are replaced). Refreshes water_meter_stats
+    once at the end. Returns counts: new_meters, new_readings, deleted_readings,
+    unmatched_units.
+    """
+    from app.routers.water_meters._helpers import normalize_unit_label
+
+    label_map = build_unit_label_map(db)
+    existing = {
+        serial: {"id": mid, "unit_id": uid}
+        for mid, serial, uid in db.query(WaterMeter.id, WaterMeter.meter_serial, WaterMeter.unit_id)
+    }
+
+    # Resolve every row to a meter state in memory — later rows for the same
+    # serial update labels of the earlier one, as the per-row import did.
+    new_meters: dict[str, dict] = {}
+    updated_meters: dict[str, dict] = {}
+    unmatched_units = 0
+    for row in rows:
+        serial = row["meter_serial"]
+        if not serial:
+            continue
+        norm = normalize_unit_label(row.get("unit_label", ""))
+        unit_id = label_map.get(norm) if norm else None
+        labels = {
+            "unit_number": row["unit_number"],
+            "unit_letter": row["unit_letter"],
+            "unit_suffix": row.get("unit_suffix", ""),
+        }
+        if serial in new_meters:
+            state = new_meters[serial]
+        elif serial in existing:
+            state = updated_meters.setdefault(serial, {
+                "id": existing[serial]["id"], "unit_id": existing[serial]["unit_id"],
+            })
+        else:
+            new_meters[serial] = {
+                "meter_serial": serial,
+                "unit_id": unit_id,
+                "meter_type": MeterType.COLD if row["meter_type"] == "cold" else MeterType.HOT,
+                "location": row["location"] or None,
+                **labels,
+            }
+            if unit_id is None:
+                unmatched_units += 1
+            continue
+        # Always update unit link (when found) and label fields
+        if unit_id is not None:
+            state["unit_id"] = unit_id
+        state.update(labels)
+
+    now = utcnow()
+    if updated_meters:
+        db.execute(update(WaterMeter), [
+            {**state, "updated_at": now} for state in updated_meters.values()
+        ])
+    if new_meters:
+        for chunk in _chunks(list(new_meters.values())):
+            db.execute(insert(WaterMeter), [
+                {**state, "created_at": now, "updated_at": now} for state in chunk
+            ])
+        for mid, serial in db.query(WaterMeter.id, WaterMeter.meter_serial).filter(
+            WaterMeter.meter_serial.in_(list(new_meters))
+        ):
+            existing[serial] = {"id": mid}
+
+    meter_ids = {row["meter_serial"]: existing[row["meter_serial"]]["id"]
+                 for row in rows if row["meter_serial"]}
+
+    deleted_readings = 0
+    if import_mode == "overwrite":
+        for chunk in _chunks(sorted(set(meter_ids.values()))):
+            result = db.execute(delete(WaterReading).where(WaterReading.meter_id.in_(chunk)))
+            deleted_readings += result.rowcount or 0
+
+    values = [
+        {
+            "meter_id": meter_ids[row["meter_serial"]],
+            "reading_date": r["date"],
+            "value": r["value"],
+            "import_batch": import_batch,
+            "created_at": now,
+        }
+        for row in rows if row["meter_serial"]
+        for r in row.get("readings", [])
+        if r["date"] is not None and r["value"] is not None
+    ]
+    stmt = sqlite_insert(WaterReading)
+    if import_mode == "overwrite":
+        # Duplicate dates within the file — the later value wins
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["meter_id", "reading_date"],
+            set_={"value": stmt.excluded.value, "import_batch": stmt.excluded.import_batch},
+        )
+    else:
+        # Append mode — keep readings already stored for that date
+        stmt = stmt.on_conflict_do_nothing(index_elements=["meter_id", "reading_date"])
+    for chunk in _chunks(values):
+        db.execute(stmt, chunk)
+
+    new_readings = db.query(func.count(WaterReading.id)).filter(
+        WaterReading.import_batch == import_batch,
+    ).scalar() or 0
+
+    # Readings changed — recompute materialized per-meter statistics once
+    refresh_water_meter_stats(db)
+    logger.info(
+        "Water import %s: %d meters (%d new), %d readings",
+        import_batch, len(meter_ids), len(new_meters), new_readings,
+    )
+
+    return {
+        "new_meters": len(new_meters),
+        "new_readings": new_readings,
+        "deleted_readings": deleted_readings,
+        "unmatched_units": unmatched_units,
+    }
@@ -0,0 +1,120 @@
+"""Materializované statistiky vodoměrů — přepočet tabulky water_meter_stats.
+
+Statistiky (poslední/předchozí odečet, spotřeba, průměr typu, odchylka,
+historie posledních 3 období) se přepočítávají jen po importu odečtů.
+Přehled, export i rozesílka je pak čtou přímo z DB.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from itertools import groupby
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models import WaterMeter, WaterMeterStats, WaterReading
+from app.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+# Počet období v historii spotřeby (emailová rozesílka)
+HISTORY_PERIODS = 3
+
+
+def compute_history(sorted_readings: list[tuple], periods: int = HISTORY_PERIODS) -> list[dict]:
+    """Historical consumption per month — last minus second-to-last reading in the month.
+
+    ``sorted_readings`` are ``(reading_date, value)`` tuples in chronological order.
+    Returns newest-first list of ``{"date": "MM/YYYY", "consumption": float}``;
+    months with fewer than 2 readings or negative difference are skipped.
+    """
+    monthly: dict[str, list[tuple]] = {}  # "YYYY-MM" → readings
+    for reading_date, value in sorted_readings:
+        if reading_date:
+            monthly.setdefault(reading_date.strftime("%Y-%m"), []).append((reading_date, value))
+
+    history: list[dict] = []
+    for key in sorted(monthly.keys(), reverse=True):
+        if len(history) >= periods:
+            break
+        month_r = monthly[key]
+        if len(month_r) < 2:
+            continue  # need at least 2 readings in month
+        (last_date, last_value), (_, prev_value) = month_r[-1], month_r[-2]
+        if last_value is None or prev_value is None:
+            continue
+        diff = round(last_value - prev_value, 1)
+        if diff < 0:
+            continue
+        history.append({"date": last_date.strftime("%m/%Y"), "consumption": diff})
+    return history
+
+
+def refresh_water_meter_stats(db: Session) -> int:
+    """Recompute water_meter_stats for all meters (commit handled by caller).
+
+    Readings are streamed in one ordered query; type averages (SV/TV) are
+    computed over all meters, same as ``compute_deviations``. Returns number
+    of stats rows written.
+    """
+    db.flush()  # session runs with autoflush=False — make pending readings visible
+    meter_types = dict(db.query(WaterMeter.id, WaterMeter.meter_type).all())
+
+    rows: dict[int, dict] = {}
+    readings = (
+        db.query(WaterReading.meter_id, WaterReading.reading_date, WaterReading.value)
+        .order_by(WaterReading.meter_id, WaterReading.reading_date, WaterReading.id)
+    )
+    for meter_id, group in groupby(readings.yield_per(2000), key=lambda r: r[0]):
+        if meter_id not in meter_types:
+            continue
+        series = [(r[1], r[2]) for r in group]
+        last = series[-1]
+        prev = series[-2] if len(series) >= 2 else (None, None)
+        consumption = None
+        if len(series) >= 2 and last[1] is not None and prev[1] is not None:
+            consumption = round(last[1] - prev[1], 3)
+        rows[meter_id] = {
+            "meter_id": meter_id,
+            "reading_count": len(series),
+            "last_value": last[1],
+            "last_date": last[0],
+            "prev_value": prev[1],
+            "prev_date": prev[0],
+            "consumption": consumption,
+            "history_json": json.dumps(compute_history(series), ensure_ascii=False),
+        }
+
+    # Average consumption per type (SV/TV separately), ignoring negative values
+    type_sums: dict = {}
+    for meter_id, row in rows.items():
+        c = row["consumption"]
+        if c is not None and c >= 0:
+            acc = type_sums.setdefault(meter_types[meter_id], [0.0, 0])
+            acc[0] += c
+            acc[1] += 1
+    type_avg = {key: total / count for key, (total, count) in type_sums.items() if count}
+
+    now = utcnow()
+    values = []
+    for meter_id, meter_type in meter_types.items():
+        row = rows.get(meter_id) or {
+            "meter_id": meter_id, "reading_count": 0,
+            "last_value": None, "last_date": None, "prev_value": None, "prev_date": None,
+            "consumption": None, "history_json": "[]",
+        }
+        avg = type_avg.get(meter_type)
+        c = row["consumption"]
+        row["type_avg"] = avg
+        row["deviation_pct"] = round((c - avg) / avg * 100, 1) if c is not None and avg else None
+        row["updated_at"] = now
+        values.append(row)
+
+    db.query(WaterMeterStats).delete(synchronize_session=False)
+    if values:
+        db.execute(insert(WaterMeterStats), values)
+    # Loaded WaterMeter.stats relationships are stale after the bulk insert
+    db.expire_all()
+    logger.info("Water meter stats refreshed for %d meters", len(values))
+    return len(values)
@@ -770,3 +770,45 @@ function startBatchSend() {
     try { sessionStorage.removeItem(_SS_KEY); } catch(e) {}
     form.submit();
 }
+
+// =========================================================================
+// Průběh úloh na pozadí — SSE (/ulohy/{id}/proud), fallback HTMX polling
+// =========================================================================
+// Element s data-job-stream má zároveň hx-get=".../stav" hx-trigger="every …".
+// Dokud je proud připojený (data-streaming), polling požadavky se ruší.
+// Po "done" (nebo výpadku proudu) polling pokračuje a /stav vyřeší
+// přesměrování / zastavení jako dřív.
+function _openJobStream(el) {
+    if (!window.EventSource || el._jobStream) return;
+    var source = new EventSource(el.dataset.jobStream);
+    el._jobStream = source;
+    function stop() {
+        source.close();
+        el.removeAttribute('data-streaming');
+    }
+    source.addEventListener('progress', function(e) {
+        if (!document.body.contains(el)) { source.close(); return; }
+        el.setAttribute('data-streaming', '');
+        var data = JSON.parse(e.data);
+        // htmx.swap spustí i htmx:afterSwap (přepínání tlačítek v šablonách)
+        htmx.swap(el, data.html, {swapStyle: 'innerHTML'}, {eventInfo: {target: el, elt: el}});
+    });
+    source.addEventListener('done', stop);
+    source.onerror = function() {
+        // EventSource se znovu připojí sám; mezitím převezme polling
+        el.removeAttribute('data-streaming');
+        if (!document.body.contains(el)) source.close();
+    };
+}
+
+function _initJobStreams(root) {
+    root = root || document;
+    if (root.matches && root.matches('[data-job-stream]')) _openJobStream(root);
+    if (root.querySelectorAll) root.querySelectorAll('[data-job-stream]').forEach(_openJobStream);
+}
+
+document.addEventListener('DOMContentLoaded', function() { _initJobStreams(); });
+document.body.addEventListener('htmx:load', function(e) { _initJobStreams(e.detail.elt); });
+document.body.addEventListener('htmx:beforeRequest', function(e) {
+    if (e.detail.elt.hasAttribute && e.detail.elt.hasAttribute('data-streaming')) e.preventDefault();
+});
@@ -1,8 +1,12 @@
 """Shared utility functions used across routers and services."""
 import base64
+import hashlib
+import json
 import logging
 import re
+import threading
 import time as _time
+from collections import OrderedDict
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Optional
@@ -10,6 +14,7 @@ from unicodedata import category, normalize
 
 from cryptography.fernet import Fernet, InvalidToken
 from fastapi import Request, UploadFile
+from sqlalchemy import and_, or_
 
 _logger = logging.getLogger(__name__)
 
@@ -99,6 +104,56 @@ def build_list_url(request: Request) -> str:
     return url
 
 
+def encode_cursor(values: list) -> str:
+    """Encode keyset pagination position (sort value + id) into an opaque URL token."""
+    raw = json.dumps(values, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Optional[list]:
+    """Decode token from ``encode_cursor``. Returns None for empty or malformed input."""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(values, list) or len(values) != 2:
+        return None
+    # Jen skalární hodnoty — dict / vnořený seznam by spadl až v SQL porovnání
+    if not all(v is None or isinstance(v, (str, int, float)) for v in values):
+        return None
+    return values
+
+
+def keyset_page(query, sort_expr, id_col, cursor: str, descending: bool, page_size: int):
+    """Fetch one keyset-paginated page of ``query`` ordered by (sort_expr, id_col).
+
+    ``sort_expr`` must never be NULL (wrap in ``coalesce``) — NULLs break
+    row-value comparison. Returns ``(items, next_cursor)``; ``next_cursor``
+    is ``""`` on the last page.
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        value, last_id = position
+        if descending:
+            query = query.filter(or_(sort_expr < value, and_(sort_expr == value, id_col < last_id)))
+        else:
+            query = query.filter(or_(sort_expr > value, and_(sort_expr == value, id_col > last_id)))
+    if descending:
+        query = query.order_by(sort_expr.desc(), id_col.desc())
+    else:
+        query = query.order_by(sort_expr.asc(), id_col.asc())
+    rows = query.add_columns(sort_expr, id_col).limit(page_size + 1).all()
+
+    next_cursor = ""
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor([rows[-1][-2], rows[-1][-1]])
+    return [r[0] for r in rows], next_cursor
+
+
 def is_htmx_partial(request: Request) -> bool:
     """Check if request is an HTMX partial (not boosted navigation)."""
     return bool(
@@ -232,8 +287,12 @@ def get_invalid_emails(db) -> set:
 
 
 def setup_jinja_filters(templates):
-    """Register custom Jinja2 filters on a Jinja2Templates instance."""
+    """Register custom Jinja2 filters and globals on a Jinja2Templates instance."""
+    from app.services.static_assets import asset_url, has_asset
+
     templates.env.filters["fmt_num"] = fmt_num
+    templates.env.globals["asset_url"] = asset_url
+    templates.env.globals["has_asset"] = has_asset
     return templates
 
 
@@ -335,17 +394,75 @@ def build_name_with_titles(title: Optional[str], first_name: str, last_name: Opt
     return " ".join(parts)
 
 
+# ── Email template engine ───────────────────────────────────────────────────
+# Jedno sdílené Jinja prostředí, zkompilované šablony v LRU podle hashe obsahu —
+# hromadná rozesílka nekompiluje předmět/tělo znovu pro každého příjemce.
+_EMAIL_TEMPLATE_CACHE_MAX = 64
+_email_template_cache: "OrderedDict[str, object]" = OrderedDict()
+_email_template_lock = threading.Lock()
+_email_env = None
+
+
+def _get_email_env():
+    global _email_env
+    if _email_env is None:
+        from jinja2 import BaseLoader, Environment, Undefined
+        env = Environment(loader=BaseLoader(), undefined=Undefined)
+        # Register fmt_num filter for number formatting
+        env.filters["fmt_num"] = fmt_num
+        _email_env = env
+    return _email_env
+
+
+def compile_email_template(template_str: str):
+    """Return compiled Jinja template for ``template_str`` (cached by content hash).
+
+    Returns None when the string is not a valid template — callers then
+    fall back to the raw string, same as before caching.
+    """
+    key = hashlib.sha1(template_str.encode("utf-8")).hexdigest()
+    with _email_template_lock:
+        if key in _email_template_cache:
+            _email_template_cache.move_to_end(key)
+            return _email_template_cache[key]
+    try:
+        tmpl = _get_email_env().from_string(template_str)
+    except Exception:
+        tmpl = None
+    with _email_template_lock:
+        _email_template_cache[key] = tmpl
+        while len(_email_template_cache) > _EMAIL_TEMPLATE_CACHE_MAX:
+            _email_template_cache.popitem(last=False)
+    return tmpl
+
+
 def render_email_template(template_str: str, context: dict) -> str:
     """Render email template string with Jinja2 variables.
 
     Supports {{ variable }} syntax. Unknown variables render as empty string.
     """
-    from jinja2 import BaseLoader, Environment
-    env = Environment(loader=BaseLoader(), undefined=__import__("jinja2").Undefined)
-    # Register fmt_num filter for number formatting
-    env.filters["fmt_num"] = fmt_num
+    if not template_str:
+        return template_str
+    tmpl = compile_email_template(template_str)
+    if tmpl is None:
+        return template_str
     try:
-        tmpl = env.from_string(template_str)
         return tmpl.render(**context)
     except Exception:
         return template_str
+
+
+def render_email_batch(template_str: str, contexts: List[dict]) -> List[str]:
+    """Render one template for many contexts (compiled once) — previews and send batches."""
+    if not template_str:
+        return [template_str for _ in contexts]
+    tmpl = compile_email_template(template_str)
+    if tmpl is None:
+        return [template_str for _ in contexts]
+    out = []
+    for ctx in contexts:
+        try:
+            out.append(tmpl.render(**ctx))
+        except Exception:
+            out.append(template_str)
+    return out
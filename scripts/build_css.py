@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Předkompilace Tailwind CSS z šablon — náhrada JIT skriptu v prohlížeči.
+
+Tailwind CLI projde šablony, JS a Python (třídy skládané v routerech) a vygeneruje
+jen použité utility, minifikované, do ``app/static/css/tailwind.css``. Jakmile
+soubor existuje, ``base.html`` ho načte místo ``tailwind.min.js`` (JIT, který
+generoval CSS v prohlížeči při každém načtení stránky i HTMX swapu). Gzip/brotli
+varianty a hash v URL dodá aplikace při startu (``app/services/static_assets.py``).
+
+Po změně tříd v šablonách skript spustit znovu (jinak nové třídy nebudou mít
+styl) — nebo soubor smazat a aplikace se vrátí k JIT.
+
+CLI se hledá v pořadí: ``--tailwind``, proměnná ``TAILWIND_BIN``, ``tailwindcss``
+v PATH (standalone binárka), ``npx tailwindcss@3``.
+
+Spouští se:
+    python scripts/build_css.py
+    python scripts/build_css.py --tailwind ~/bin/tailwindcss-macos-arm64
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+OUTPUT = PROJECT_ROOT / "app" / "static" / "css" / "tailwind.css"
+
+# Stejná konfigurace jako `tailwind.config={darkMode:'class'}` v base.html
+CONFIG = """module.exports = {{
+  darkMode: 'class',
+  content: [
+    '{root}/app/templates/**/*.html',
+    '{root}/app/static/js/app.js',
+    '{root}/app/**/*.py',
+  ],
+}};
+"""
+
+INPUT_CSS = "@tailwind base;\n@tailwind components;\n@tailwind utilities;\n"
+
+
+def _find_cli(explicit: str | None) -> list[str] | None:
+    if explicit:
+        return [explicit]
+    if os.environ.get("TAILWIND_BIN"):
+        return [os.environ["TAILWIND_BIN"]]
+    if shutil.which("tailwindcss"):
+        return ["tailwindcss"]
+    if shutil.which("npx"):
+        return ["npx", "--yes", "tailwindcss@3"]
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--tailwind", help="cesta k Tailwind CLI (standalone binárka)")
+    parser.add_argument("--output", type=Path, default=OUTPUT)
+    args = parser.parse_args()
+
+    cli = _find_cli(args.tailwind)
+    if not cli:
+        print("Tailwind CLI nenalezeno — stáhněte standalone binárku z "
+              "https://github.com/tailwindlabs/tailwindcss/releases (v3) a předejte --tailwind",
+              file=sys.stderr)
+        return 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Path(tmp) / "tailwind.config.js"
+        config.write_text(CONFIG.format(root=PROJECT_ROOT.as_posix()), encoding="utf-8")
+        source = Path(tmp) / "input.css"
+        source.write_text(INPUT_CSS, encoding="utf-8")
+        cmd = [*cli, "-c", str(config), "-i", str(source), "-o", str(args.output), "--minify"]
+        print(" ".join(cmd))
+        result = subprocess.run(cmd, cwd=PROJECT_ROOT)
+    if result.returncode != 0:
+        print("Build CSS selhal", file=sys.stderr)
+        return result.returncode
+
+    size_kb = args.output.stat().st_size / 1024
+    print(f"Hotovo: {args.output.relative_to(PROJECT_ROOT)} ({size_kb:.0f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
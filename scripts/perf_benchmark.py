@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""Výkonnostní benchmark — syntetický dům v izolovaném /tmp sandboxu.
+
+1. Sandbox v /tmp (prázdná DB, uploads, generated) — reálná data se nečtou
+2. ``TestClient`` spustí aplikaci (create_all + migrace)
+3. ``perf_dataset.generate_dataset`` naplní DB domem o ``--units`` jednotkách
+4. Změří horké cesty (medián z ``--repeat`` běhů):
+   parse_fio_csv, match_payments, compute_payment_matrix, _compute_debts,
+   compare_owners, match_name, _process_tax_files, generate_ballots
+   a list stránky přes TestClient
+5. Výsledek uloží jako JSON do data/perf_reports/ a porovná s baseline
+   (scripts/perf_baselines/units_<N>.json) — případ pomalejší o víc než
+   ``--threshold`` (a zároveň o víc než ``--min-delta`` sekund) je regrese
+
+Baseline: v repu je ``units_100.json``. Časy závisí na stroji — pro jiný
+stroj nebo jiné měřítko (1000 / 10000) ji nejdřív založ přes
+``--save-baseline`` na výchozím commitu; bez baseline jsou všechny případy
+NEW a regrese se nehlásí.
+
+Výsledek: exit code 0 (bez regrese) / 1 (regrese). Sandbox se vždy smaže.
+
+Spouští se:
+    python scripts/perf_benchmark.py --units 100
+    python scripts/perf_benchmark.py --units 1000 --save-baseline   # založení baseline
+    python scripts/perf_benchmark.py --units 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+BASELINE_DIR = PROJECT_ROOT / "scripts" / "perf_baselines"
+REPORTS_DIR = PROJECT_ROOT / "data" / "perf_reports"
+
+# Výchozí tolerance: o kolik smí být případ pomalejší než baseline
+DEFAULT_THRESHOLD = 0.25
+# Absolutní práh — zpomalení pod touto hranicí je šum (krátké případy)
+DEFAULT_MIN_DELTA = 0.05
+
+# Počet jmen párovaných v případu match_name (každé proti všem vlastníkům)
+MATCH_NAME_CANDIDATES = 100
+
+LIST_PAGES = [
+    "/",
+    "/vlastnici",
+    "/jednotky",
+    "/prostory",
+    "/najemci",
+    "/hlasovani",
+    "/vodometry",
+    "/platby/predpisy",
+    "/platby/vypisy",
+    "/platby/prehled",
+    "/platby/dluznici",
+    "/platby/zustatky",
+]
+
+
+# ---------------------------------------------------------------------------
+# Sandbox setup (must run before any `from app.*` import)
+# ---------------------------------------------------------------------------
+
+def setup_sandbox() -> Path:
+    """Prázdný sandbox v /tmp a přepsání env pro pydantic settings."""
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    sandbox = Path(f"/tmp/svj-perf-{ts}")
+    for sub in ("uploads", "generated", "backups", "temp", "archive"):
+        (sandbox / sub).mkdir(parents=True)
+
+    os.environ["DATABASE_PATH"] = str(sandbox / "svj.db")
+    os.environ["UPLOAD_DIR"] = str(sandbox / "uploads")
+    os.environ["GENERATED_DIR"] = str(sandbox / "generated")
+    os.environ["BACKUP_DIR"] = str(sandbox / "backups")
+    os.environ["TEMP_DIR"] = str(sandbox / "temp")
+    os.environ["ARCHIVE_DIR"] = str(sandbox / "archive")
+    return sandbox
+
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+def time_case(
+    fn: Callable[[], object],
+    repeat: int,
+    setup: Callable[[], None] | None = None,
+    teardown: Callable[[], None] | None = None,
+) -> dict:
+    """Medián/min/max z ``repeat`` běhů; setup/teardown se do času nepočítají."""
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        try:
+            fn()
+        finally:
+            runs.append(time.perf_counter() - start)
+            if teardown:
+                teardown()
+    return {
+        "median": round(statistics.median(runs), 4),
+        "min": round(min(runs), 4),
+        "max": round(max(runs), 4),
+        "runs": [round(r, 4) for r in runs],
+    }
+
+
+def compare_to_baseline(
+    cases: dict[str, dict],
+    baseline: dict[str, dict],
+    threshold: float = DEFAULT_THRESHOLD,
+    min_delta: float = DEFAULT_MIN_DELTA,
+) -> list[dict]:
+    """Porovnat mediány s baseline; status OK / REGRESSION / IMPROVED / NEW / MISSING."""
+    rows = []
+    for name, current in cases.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append({"case": name, "baseline": None, "current": current["median"],
+                         "ratio": None, "status": "NEW"})
+            continue
+        b, c = base["median"], current["median"]
+        ratio = c / b if b > 0 else None
+        if c > b * (1 + threshold) and c - b > min_delta:
+            status = "REGRESSION"
+        elif c < b / (1 + threshold) and b - c > min_delta:
+            status = "IMPROVED"
+        else:
+            status = "OK"
+        rows.append({"case": name, "baseline": b, "current": c,
+                     "ratio": round(ratio, 3) if ratio is not None else None, "status": status})
+    for name in baseline:
+        if name not in cases:
+            rows.append({"case": name, "baseline": baseline[name]["median"], "current": None,
+                         "ratio": None, "status": "MISSING"})
+    return rows
+
+
+def baseline_path(units: int) -> Path:
+    return BASELINE_DIR / f"units_{units}.json"
+
+
+def load_baseline(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Benchmark cases
+# ---------------------------------------------------------------------------
+
+def run_cases(dataset: dict, client, repeat: int) -> dict[str, dict]:
+    """Změřit všechny horké cesty nad vygenerovaným domem."""
+    from sqlalchemy import update
+
+    from app.database import SessionLocal
+    from app.models import (
+        Ballot, BallotVote, Owner, Payment, PaymentAllocation, PaymentMatchStatus, TaxSession,
+    )
+    from app.routers.payments._helpers import _compute_debts
+    from app.routers.sync._helpers import _load_excel_data
+    from app.routers.tax.processing import _prepare_owner_lookup, _process_tax_files
+    from app.services import jobs
+    from app.services.bank_import import parse_fio_csv
+    from app.services.csv_comparator import compare_owners, parse_sousede_csv
+    from app.services.owner_matcher import match_name
+    from app.services.payment_matching import match_payments
+    from app.services.payment_overview import compute_payment_matrix
+
+    year = dataset["year"]
+    cases: dict[str, dict] = {}
+    db = SessionLocal()
+    try:
+        # --- Bankovní výpisy ---
+        cases["parse_fio_csv"] = time_case(
+            lambda: [parse_fio_csv(content, name) for name, content in dataset["statement_csvs"]],
+            repeat,
+        )
+
+        def _reset_matching():
+            # Stav po importu — všechny platby roku znovu nenapárované (rollback po měření)
+            ids = dataset["statement_ids"]
+            db.execute(PaymentAllocation.__table__.delete().where(
+                PaymentAllocation.payment_id.in_(db.query(Payment.id).filter(Payment.statement_id.in_(ids)))
+            ))
+            db.execute(
+                update(Payment).where(Payment.statement_id.in_(ids)).values(
+                    match_status=PaymentMatchStatus.UNMATCHED, unit_id=None, space_id=None,
+                    owner_id=None, prescription_id=None, assigned_month=None,
+                )
+            )
+            db.expire_all()
+
+        cases["match_payments"] = time_case(
+            lambda: [match_payments(db, sid, year) for sid in dataset["statement_ids"]],
+            repeat, setup=_reset_matching, teardown=db.rollback,
+        )
+
+        # --- Přehled plateb / dlužníci ---
+        cases["compute_payment_matrix"] = time_case(lambda: compute_payment_matrix(db, year), repeat)
+        cases["_compute_debts"] = time_case(lambda: _compute_debts(db, year), repeat)
+
+        # --- Synchronizace (sousede.cz CSV) ---
+        csv_records = parse_sousede_csv(dataset["sousede_csv"])
+        excel_data = _load_excel_data(db)
+        cases["compare_owners"] = time_case(lambda: compare_owners(csv_records, excel_data), repeat)
+
+        # --- Párování jmen (daně, platby) ---
+        owner_dicts, _unit_to_owners = _prepare_owner_lookup(db, year)
+        names = [o.name_with_titles for o in db.query(Owner).order_by(Owner.id).limit(MATCH_NAME_CANDIDATES)]
+        cases["match_name"] = time_case(
+            lambda: [match_name(n, owner_dicts, require_stem_overlap=True) for n in names],
+            repeat,
+        )
+        db.rollback()
+    finally:
+        db.close()
+
+    # --- Daňové PDF (vlákno zpracování volané přímo, vlastní session) ---
+    if dataset["tax_pdfs"]:
+        tax = {}
+
+        def _new_tax_session():
+            s = SessionLocal()
+            try:
+                session = TaxSession(title=f"Benchmark {time.time_ns()}", year=year)
+                s.add(session)
+                s.commit()
+                tax["id"] = session.id
+            finally:
+                s.close()
+
+        # Bez fronty úloh — měří se samotné zpracování (chyba propadne)
+        cases["_process_tax_files"] = time_case(
+            lambda: jobs.run_inline(
+                "tax_processing", _process_tax_files, tax["id"], list(dataset["tax_pdfs"]), year,
+                total=len(dataset["tax_pdfs"]),
+            ),
+            repeat, setup=_new_tax_session,
+        )
+
+    # --- Hlasovací lístky (endpoint) ---
+    voting_id = dataset["voting_id"]
+
+    def _clear_ballots():
+        s = SessionLocal()
+        try:
+            ballot_ids = s.query(Ballot.id).filter_by(voting_id=voting_id)
+            s.query(BallotVote).filter(BallotVote.ballot_id.in_(ballot_ids)).delete(synchronize_session=False)
+            s.query(Ballot).filter_by(voting_id=voting_id).delete(synchronize_session=False)
+            s.commit()
+        finally:
+            s.close()
+
+    def _generate():
+        resp = client.post(f"/hlasovani/{voting_id}/generovat", follow_redirects=False)
+        if resp.status_code >= 400:
+            raise RuntimeError(f"generate_ballots → {resp.status_code}")
+
+    cases["generate_ballots"] = time_case(_generate, repeat, setup=_clear_ballots)
+
+    # --- List stránky ---
+    for url in LIST_PAGES:
+        def _get(url=url):
+            resp = client.get(url)
+            if resp.status_code != 200:
+                raise RuntimeError(f"GET {url} → {resp.status_code}")
+        cases[f"page {url}"] = time_case(_get, repeat)
+
+    return cases
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def build_report(args, dataset: dict, cases: dict, generate_seconds: float) -> dict:
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": _git_revision(),
+            "units": args.units,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "generate_seconds": round(generate_seconds, 2),
+            "counts": dataset["counts"],
+        },
+        "cases": cases,
+    }
+
+
+def print_comparison(rows: list[dict]) -> None:
+    print(f"{'případ':<32} {'baseline':>10} {'teď':>10} {'poměr':>7}  stav")
+    for r in rows:
+        base = f"{r['baseline']:.3f}" if r["baseline"] is not None else "—"
+        cur = f"{r['current']:.3f}" if r["current"] is not None else "—"
+        ratio = f"{r['ratio']:.2f}" if r["ratio"] is not None else "—"
+        print(f"{r['case']:<32} {base:>10} {cur:>10} {ratio:>7}  {r['status']}")
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def parse_args(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="SVJ výkonnostní benchmark nad syntetickým domem",
+        epilog="Baseline je v repu jen pro --units 100 (scripts/perf_baselines/units_100.json). "
+               "Pro jiné měřítko nebo stroj ji nejdřív ulož přes --save-baseline, "
+               "jinak jsou všechny případy NEW a regrese se nehlásí.",
+    )
+    parser.add_argument("--units", type=int, default=1000, help="počet jednotek (100 / 1000 / 10000)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--repeat", type=int, default=3, help="počet běhů každého případu (medián)")
+    parser.add_argument("--max-tax-pdfs", type=int, default=200, help="strop počtu daňových PDF")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relativní tolerance zpomalení (0.25 = +25 %%)")
+    parser.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA,
+                        help="minimální absolutní zpomalení v sekundách, které se počítá")
+    parser.add_argument("--baseline", type=Path, default=None, help="cesta k baseline JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="uložit výsledek jako novou baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    print(f"=== Perf benchmark — {args.units} jednotek ===")
+
+    sandbox = setup_sandbox()
+    print(f"Sandbox: {sandbox}")
+    try:
+        from fastapi.testclient import TestClient
+
+        from app.database import SessionLocal
+        from app.main import app
+        from perf_dataset import generate_dataset
+
+        with TestClient(app) as client:
+            start = time.perf_counter()
+            db = SessionLocal()
+            try:
+                dataset = generate_dataset(
+                    db, units=args.units, year=args.year, seed=args.seed,
+                    files_dir=sandbox / "uploads", max_tax_pdfs=args.max_tax_pdfs,
+                )
+            finally:
+                db.close()
+            generate_seconds = time.perf_counter() - start
+            print(f"Dataset: {dataset['counts']} ({generate_seconds:.1f}s)")
+
+            cases = run_cases(dataset, client, args.repeat)
+    except Exception:
+        traceback.print_exc()
+        shutil.rmtree(sandbox, ignore_errors=True)
+        return 1
+    shutil.rmtree(sandbox, ignore_errors=True)
+
+    report = build_report(args, dataset, cases, generate_seconds)
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    report_path = REPORTS_DIR / f"perf_{args.units}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    path = args.baseline or baseline_path(args.units)
+    baseline = load_baseline(path)
+    rows = compare_to_baseline(cases, (baseline or {}).get("cases", {}), args.threshold, args.min_delta)
+    print()
+    print_comparison(rows)
+    print()
+    print(f"Report: {report_path}")
+
+    if args.save_baseline:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Baseline uložena: {path}")
+        return 0
+    if baseline is None:
+        print(f"Baseline {path} neexistuje — regrese nelze vyhodnotit; založ ji přes --save-baseline")
+        return 0
+
+    regressions = [r for r in rows if r["status"] == "REGRESSION"]
+    if regressions:
+        print(f"REGRESE: {', '.join(r['case'] for r in regressions)} "
+              f"(práh +{args.threshold:.0%}, min. {args.min_delta}s)")
+        return 1
+    print("Bez regrese.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,589 @@
+"""Syntetický dataset SVJ pro výkonnostní benchmark (scripts/perf_benchmark.py).
+
+Vygeneruje dům o zadaném počtu jednotek: vlastníky (fyzické osoby, SJM
+manželské páry, spoluvlastníky více jednotek, právnické osoby), předpisy
+na rok, roční sadu měsíčních Fio CSV výpisů (importovaných a napárovaných
+stejně jako přes ``POST /platby/vypisy/import``), vodoměry s odečty,
+daňové PDF (jedno na jednotku), hlasování s body a CSV ze sousede.cz pro
+synchronizaci. Data jsou deterministická — stejný ``seed`` a počet jednotek
+dá stejný dům, takže časy z různých běhů jsou porovnatelné.
+
+Zápis jde hromadně (``insert()`` s explicitními id), aby generování 10 000
+jednotek netrvalo déle než samotný benchmark.
+"""
+from __future__ import annotations
+
+import random
+import unicodedata
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.models import (
+    BankStatement, MeterType, Owner, OwnerType, OwnerUnit, Payment, PaymentDirection,
+    PaymentMatchStatus, Prescription, PrescriptionCategory, PrescriptionItem,
+    PrescriptionYear, Space, SpaceStatus, SpaceTenant, SvjInfo, Tenant, Unit, UnitBalance,
+    VariableSymbolMapping, Voting, VotingItem, VotingStatus, WaterMeter, WaterReading,
+)
+from app.services.bank_import import parse_fio_csv
+from app.services.excel_import import _build_name_normalized
+from app.services.payment_matching import DEFAULT_VS_PREFIX, match_payments
+from app.services.water_meter_stats import refresh_water_meter_stats
+from app.utils import build_name_with_titles
+
+BANK_ACCOUNT = "2900708337/2010"
+TOTAL_SHARES = 4103391
+
+_MALE_FIRST = [
+    "Jan", "Petr", "Josef", "Pavel", "Martin", "Tomáš", "Jiří", "Jaroslav", "Miroslav",
+    "Zdeněk", "Václav", "Michal", "František", "Karel", "Lukáš", "Jakub", "David", "Ondřej",
+]
+_FEMALE_FIRST = [
+    "Jana", "Marie", "Eva", "Hana", "Anna", "Lenka", "Kateřina", "Lucie", "Věra",
+    "Alena", "Petra", "Veronika", "Jaroslava", "Martina", "Tereza", "Barbora", "Zuzana",
+]
+# (mužský tvar, ženský tvar)
+_SURNAMES = [
+    ("Novák", "Nováková"), ("Svoboda", "Svobodová"), ("Novotný", "Novotná"),
+    ("Dvořák", "Dvořáková"), ("Černý", "Černá"), ("Procházka", "Procházková"),
+    ("Kučera", "Kučerová"), ("Veselý", "Veselá"), ("Horák", "Horáková"),
+    ("Němec", "Němcová"), ("Marek", "Marková"), ("Pospíšil", "Pospíšilová"),
+    ("Pokorný", "Pokorná"), ("Hájek", "Hájková"), ("Král", "Králová"),
+    ("Jelínek", "Jelínková"), ("Růžička", "Růžičková"), ("Beneš", "Benešová"),
+    ("Fiala", "Fialová"), ("Sedláček", "Sedláčková"), ("Doležal", "Doležalová"),
+    ("Zeman", "Zemanová"), ("Kolář", "Kolářová"), ("Navrátil", "Navrátilová"),
+    ("Čermák", "Čermáková"), ("Urban", "Urbanová"), ("Vaněk", "Vaňková"),
+    ("Blažek", "Blažková"), ("Kříž", "Křížová"), ("Kovář", "Kovářová"),
+    ("Bartoš", "Bartošová"), ("Vlček", "Vlčková"), ("Polák", "Poláková"),
+    ("Musil", "Musilová"), ("Kopecký", "Kopecká"), ("Šimek", "Šimková"),
+    ("Konečný", "Konečná"), ("Malý", "Malá"), ("Holub", "Holubová"),
+    ("Štěpánek", "Štěpánková"), ("Kadlec", "Kadlecová"), ("Dostál", "Dostálová"),
+]
+_TITLES = ["Ing.", "Mgr.", "MUDr.", "JUDr.", "Bc.", "PhDr."]
+_COMPANY_WORDS = ["ALFA", "REAL", "INVEST", "BYTY", "PRAHA", "DOMOV", "GROUP", "SERVIS", "CAPITAL"]
+_SECTIONS = ["A", "B", "C", "D"]
+_MONTHS = 12
+
+
+def ascii_text(text: str) -> str:
+    """Diakritika pryč, velikost písmen zůstává (text do PDF s WinAnsi fontem)."""
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def _next_id(db: Session, model) -> int:
+    return (db.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _bulk(db: Session, model, rows: list[dict], chunk: int = 5000) -> None:
+    for i in range(0, len(rows), chunk):
+        db.execute(insert(model), rows[i:i + chunk])
+
+
+def _vs(unit_number: int) -> str:
+    return f"{DEFAULT_VS_PREFIX}{unit_number:05d}"
+
+
+# ── Vlastníci a jednotky ────────────────────────────────────────────
+
+
+def _person(rng: random.Random, female: bool, surname: tuple[str, str] | None = None) -> dict:
+    surname = surname or rng.choice(_SURNAMES)
+    first = rng.choice(_FEMALE_FIRST if female else _MALE_FIRST)
+    last = surname[1] if female else surname[0]
+    title = rng.choice(_TITLES) if rng.random() < 0.12 else None
+    return {"first_name": first, "last_name": last, "title": title, "owner_type": OwnerType.PHYSICAL}
+
+
+def _company(rng: random.Random, n: int) -> dict:
+    name = f"{rng.choice(_COMPANY_WORDS)} {rng.choice(_COMPANY_WORDS)} {n} s.r.o."
+    return {"first_name": name, "last_name": None, "title": None, "owner_type": OwnerType.LEGAL_ENTITY}
+
+
+def _generate_owners(db: Session, rng: random.Random, n_units: int, year: int) -> dict:
+    """Jednotky + vlastníci + vazby; vrací plánované vlastnictví pro další kroky."""
+    unit_id0 = _next_id(db, Unit)
+    units, shares = [], []
+    for i in range(n_units):
+        area = round(rng.uniform(28, 120), 1)
+        podil = int(area * 100)
+        shares.append(podil)
+        units.append({
+            "id": unit_id0 + i,
+            "unit_number": i + 1,
+            "building_number": "1098",
+            "podil_scd": podil,
+            "floor_area": area,
+            "room_count": rng.choice(["1+kk", "2+kk", "2+1", "3+kk", "3+1", "4+kk"]),
+            "space_type": "byt" if rng.random() < 0.92 else "nebytový prostor",
+            "section": _SECTIONS[i % len(_SECTIONS)],
+            "orientation_number": 1 + i % len(_SECTIONS),
+            "address": f"Synthetická {1 + i % len(_SECTIONS)}, Praha",
+        })
+    _bulk(db, Unit, units)
+
+    owner_id = _next_id(db, Owner)
+    owners: list[dict] = []
+    links: list[dict] = []
+    # unit index → [(owner dict, ownership_type)]
+    holdings: dict[int, list[tuple[dict, str]]] = {}
+
+    def _add_owner(data: dict) -> dict:
+        nonlocal owner_id
+        name_with_titles = build_name_with_titles(data["title"], data["first_name"], data["last_name"])
+        row = {
+            "id": owner_id,
+            **data,
+            "name_with_titles": name_with_titles,
+            "name_normalized": _build_name_normalized(data["first_name"], data["last_name"]),
+            "email": f"vlastnik{owner_id}@example.cz" if rng.random() < 0.85 else None,
+            "phone": f"+420 6{owner_id:08d}"[:16] if rng.random() < 0.7 else None,
+            "perm_city": "Praha",
+            "perm_street": f"Synthetická {owner_id % 90 + 1}",
+            "data_source": "excel",
+            "is_active": True,
+        }
+        owner_id += 1
+        owners.append(row)
+        return row
+
+    valid_from = date(year - 1 - rng.randint(0, 10), 1, 1)
+    i = 0
+    while i < n_units:
+        roll = rng.random()
+        podil = shares[i]
+        if roll < 0.30:
+            # SJM manželé — dva vlastníci, jedna jednotka
+            surname = rng.choice(_SURNAMES)
+            husband = _add_owner(_person(rng, False, surname))
+            wife = _add_owner(_person(rng, True, surname))
+            holdings[i] = [(husband, "SJM"), (wife, "SJM")]
+            for o in (husband, wife):
+                links.append({"owner_id": o["id"], "unit_id": unit_id0 + i, "ownership_type": "SJM",
+                              "share": 1.0, "votes": podil, "valid_from": valid_from})
+            i += 1
+        elif roll < 0.36 and i + 1 < n_units:
+            # Vlastník dvou sousedních jednotek (byt + garáž apod.)
+            owner = _add_owner(_person(rng, rng.random() < 0.5))
+            for j in (i, i + 1):
+                holdings[j] = [(owner, "VL")]
+                links.append({"owner_id": owner["id"], "unit_id": unit_id0 + j, "ownership_type": "VL",
+                              "share": 1.0, "votes": shares[j], "valid_from": valid_from})
+            i += 2
+        elif roll < 0.40:
+            # Podílové spoluvlastnictví (sourozenci apod.)
+            first = _add_owner(_person(rng, False))
+            second = _add_owner(_person(rng, True))
+            holdings[i] = [(first, "Podílové"), (second, "Podílové")]
+            for o in (first, second):
+                links.append({"owner_id": o["id"], "unit_id": unit_id0 + i, "ownership_type": "Podílové",
+                              "share": 0.5, "votes": podil // 2, "valid_from": valid_from})
+            i += 1
+        else:
+            owner = _add_owner(_company(rng, i) if roll > 0.98 else _person(rng, rng.random() < 0.5))
+            holdings[i] = [(owner, "VL")]
+            links.append({"owner_id": owner["id"], "unit_id": unit_id0 + i, "ownership_type": "VL",
+                          "share": 1.0, "votes": podil, "valid_from": valid_from})
+            i += 1
+
+    # Historie — část jednotek má předchozího (už neaktivního) vlastníka
+    for idx in rng.sample(range(n_units), k=n_units // 10):
+        former = _add_owner(_person(rng, rng.random() < 0.5))
+        former["is_active"] = False
+        links.append({"owner_id": former["id"], "unit_id": unit_id0 + idx, "ownership_type": "VL",
+                      "share": 1.0, "votes": 0, "valid_from": date(year - 15, 1, 1),
+                      "valid_to": valid_from - timedelta(days=1)})
+
+    _bulk(db, Owner, owners)
+    _bulk(db, OwnerUnit, links)
+    return {"units": units, "owners": owners, "holdings": holdings}
+
+
+# ── Předpisy, VS, zůstatky ─────────────────────────────────────────
+
+
+def _generate_prescriptions(db: Session, rng: random.Random, units: list[dict],
+                            holdings: dict, year: int) -> dict[int, float]:
+    py = PrescriptionYear(year=year, valid_from=date(year, 1, 1),
+                          description="Syntetický předpis", source_filename="synthetic.docx")
+    db.add(py)
+    db.flush()
+
+    presc_id = _next_id(db, Prescription)
+    prescriptions, items, mappings, balances = [], [], [], []
+    monthly: dict[int, float] = {}
+    for idx, unit in enumerate(units):
+        area = unit["floor_area"]
+        parts = [
+            ("Správa domu", 250.0, PrescriptionCategory.PROVOZNI),
+            ("Fond oprav", round(area * 32), PrescriptionCategory.FOND_OPRAV),
+            ("Teplo", round(area * 18), PrescriptionCategory.SLUZBY),
+            ("Voda", 450.0 + 50 * (idx % 4), PrescriptionCategory.SLUZBY),
+            ("Výtah", 120.0, PrescriptionCategory.SLUZBY),
+        ]
+        total = float(sum(p[1] for p in parts))
+        monthly[unit["id"]] = total
+        names = ", ".join(o["name_with_titles"] for o, _ in holdings.get(idx, []))
+        prescriptions.append({
+            "id": presc_id, "prescription_year_id": py.id, "unit_id": unit["id"],
+            "variable_symbol": _vs(unit["unit_number"]), "space_number": unit["unit_number"],
+            "section": unit["section"], "space_type": unit["space_type"],
+            "owner_name": names[:300], "monthly_total": total,
+        })
+        for order, (name, amount, category) in enumerate(parts):
+            items.append({"prescription_id": presc_id, "name": name, "amount": float(amount),
+                          "category": category, "order": order})
+        mappings.append({"variable_symbol": _vs(unit["unit_number"]), "unit_id": unit["id"],
+                         "is_active": True, "description": f"Jednotka {unit['unit_number']}"})
+        if rng.random() < 0.15:
+            balances.append({"unit_id": unit["id"], "year": year,
+                             "opening_amount": float(rng.choice([-1, 1]) * rng.randint(1, 20) * 500)})
+        presc_id += 1
+
+    py.total_units = len(prescriptions)
+    py.total_monthly = sum(monthly.values())
+    _bulk(db, Prescription, prescriptions)
+    _bulk(db, PrescriptionItem, items)
+    _bulk(db, VariableSymbolMapping, mappings)
+    _bulk(db, UnitBalance, balances)
+    return monthly
+
+
+# ── Fio CSV výpisy ──────────────────────────────────────────────────
+
+_FIO_COLUMNS = (
+    '"ID operace";"Datum";"Objem";"Měna";"Protiúčet";"Název protiúčtu";"Kód banky";'
+    '"Název banky";"KS";"VS";"SS";"Poznámka";"Zpráva pro příjemce";"Typ";"Provedl";'
+    '"Upřesnění";"Poznámka";"BIC";"ID pokynu"'
+)
+
+
+def _amount(value: float) -> str:
+    return f"{value:.2f}".replace(".", ",")
+
+
+def fio_statement_csv(year: int, month: int, transactions: list[dict], opening: float) -> bytes:
+    """Měsíční výpis ve formátu Fio CSV (UTF-8 s BOM, jako export z bankovnictví)."""
+    first = date(year, month, 1)
+    last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    income = sum(t["amount"] for t in transactions if t["amount"] > 0)
+    expense = sum(t["amount"] for t in transactions if t["amount"] < 0)
+    lines = [
+        f'"Výpis č. {month}/{year} z účtu ""{BANK_ACCOUNT}"""',
+        f'"Období: {first:%d.%m.%Y} - {last:%d.%m.%Y}"',
+        f'"Počáteční stav účtu k {first:%d.%m.%Y}: {_amount(opening)} CZK"',
+        f'"Koncový stav účtu k {last:%d.%m.%Y}: {_amount(opening + income + expense)} CZK"',
+        f'"Suma příjmů: +{_amount(income)} CZK"',
+        f'"Suma výdajů: {_amount(expense)} CZK"',
+        '""', '""', '""', "",
+        _FIO_COLUMNS,
+    ]
+    for t in transactions:
+        cells = [
+            t["operation_id"], f"{t['date']:%d.%m.%Y}", _amount(t["amount"]), "CZK",
+            t.get("counter_account", ""), t.get("counter_account_name", ""), "0800",
+            "Česká spořitelna, a.s.", "0308" if t["amount"] > 0 else "", t.get("vs", ""), "",
+            "", t.get("message", ""),
+            "Bezhotovostní příjem" if t["amount"] > 0 else "Bezhotovostní platba",
+            "", "", "", "", t["operation_id"],
+        ]
+        lines.append(";".join(f'"{c}"' for c in cells))
+    return "\n".join(lines).encode("utf-8-sig")
+
+
+def _month_transactions(rng: random.Random, year: int, month: int, units: list[dict],
+                        holdings: dict, monthly: dict[int, float], seq: int) -> list[dict]:
+    """Platby jednoho měsíce: většina s VS, část jen se jménem, část chybí (dlužníci)."""
+    out = []
+    for idx, unit in enumerate(units):
+        roll = rng.random()
+        if roll < 0.04:
+            continue  # nezaplaceno
+        owner = holdings[idx][0][0]
+        amount = monthly[unit["id"]]
+        tx = {
+            "operation_id": f"{year}{month:02d}{seq:07d}",
+            "date": date(year, month, rng.randint(5, 25)),
+            "amount": amount,
+            "counter_account": f"{100000 + owner['id']}/0800",
+            "counter_account_name": owner["name_with_titles"],
+            "vs": _vs(unit["unit_number"]),
+            "message": f"Platba za {month}/{year}",
+        }
+        if roll < 0.08:
+            tx["vs"] = ""  # bez VS — párování jménem + částkou
+        elif roll < 0.10:
+            tx["amount"] = round(amount * 0.9)  # nedoplatek
+        elif roll < 0.11:
+            tx["vs"] = f"{DEFAULT_VS_PREFIX}0{unit['unit_number']:05d}"  # VS s překlepem
+        out.append(tx)
+        seq += 1
+    # Výdaje domu a pár neznámých příjmů
+    for k in range(max(3, len(units) // 50)):
+        out.append({
+            "operation_id": f"{year}{month:02d}{seq:07d}",
+            "date": date(year, month, rng.randint(1, 28)),
+            "amount": -float(rng.randint(2000, 90000)),
+            "counter_account": f"{900000 + k}/0300",
+            "counter_account_name": f"Dodavatel {k}",
+            "message": "Faktura",
+        })
+        seq += 1
+    out.sort(key=lambda t: (t["date"], t["operation_id"]))
+    return out
+
+
+def import_statement(db: Session, content: bytes, filename: str) -> BankStatement:
+    """Import Fio CSV stejně jako ``vypis_import_upload`` (bez ukládání souboru), včetně párování."""
+    result = parse_fio_csv(content, filename)
+    meta = result["metadata"]
+    statement = BankStatement(
+        filename=filename,
+        bank_account=meta.get("bank_account"),
+        period_from=meta.get("period_from"),
+        period_to=meta.get("period_to"),
+        opening_balance=meta.get("opening_balance"),
+        closing_balance=meta.get("closing_balance"),
+        total_income=meta.get("total_income", 0),
+        total_expense=meta.get("total_expense", 0),
+        transaction_count=len(result["transactions"]),
+    )
+    db.add(statement)
+    db.flush()
+    _bulk(db, Payment, [
+        {
+            "statement_id": statement.id,
+            "operation_id": t["operation_id"],
+            "date": t["date"],
+            "amount": t["amount"],
+            "direction": PaymentDirection.INCOME if t["direction"] == "income" else PaymentDirection.EXPENSE,
+            "counter_account": t["counter_account"],
+            "counter_account_name": t["counter_account_name"],
+            "bank_code": t["bank_code"],
+            "bank_name": t["bank_name"],
+            "ks": t["ks"],
+            "vs": t["vs"],
+            "message": t["message"],
+            "payment_type": t["payment_type"],
+            "match_status": PaymentMatchStatus.UNMATCHED,
+        }
+        for t in result["transactions"]
+    ])
+    match_payments(db, statement.id, statement.period_from.year)
+    return statement
+
+
+# ── Vodoměry ────────────────────────────────────────────────────────
+
+
+def _generate_water(db: Session, rng: random.Random, units: list[dict], year: int) -> int:
+    meter_id = _next_id(db, WaterMeter)
+    meters, readings = [], []
+    for unit in units:
+        for meter_type, base in ((MeterType.COLD, 40.0), (MeterType.HOT, 20.0)):
+            meters.append({
+                "id": meter_id, "unit_id": unit["id"], "unit_number": unit["unit_number"],
+                "meter_serial": f"{'SV' if meter_type == MeterType.COLD else 'TV'}{meter_id:08d}",
+                "meter_type": meter_type, "location": "koupelna",
+            })
+            value = round(rng.uniform(100, 900), 3)
+            for reading_date in (date(year - 1, 12, 31), date(year, 6, 30), date(year, 12, 31)):
+                readings.append({"meter_id": meter_id, "reading_date": reading_date, "value": value,
+                                 "import_batch": f"synthetic-{reading_date:%Y%m}"})
+                value = round(value + rng.uniform(0.5, 2.0) * base / 2, 3)
+            meter_id += 1
+    _bulk(db, WaterMeter, meters)
+    _bulk(db, WaterReading, readings)
+    refresh_water_meter_stats(db)
+    return len(meters)
+
+
+# ── Prostory a nájemci ──────────────────────────────────────────────
+
+
+def _generate_spaces(db: Session, rng: random.Random, n_units: int) -> int:
+    count = max(2, n_units // 25)
+    space_id = _next_id(db, Space)
+    tenant_id = _next_id(db, Tenant)
+    spaces, tenants, links = [], [], []
+    for k in range(count):
+        person = _person(rng, rng.random() < 0.5)
+        spaces.append({"id": space_id + k, "space_number": k + 1, "designation": f"Nebytový prostor {k + 1}",
+                       "status": SpaceStatus.RENTED})
+        tenants.append({
+            "id": tenant_id + k, "first_name": person["first_name"], "last_name": person["last_name"],
+            "name_with_titles": build_name_with_titles(None, person["first_name"], person["last_name"]),
+            "name_normalized": _build_name_normalized(person["first_name"], person["last_name"]),
+            "tenant_type": OwnerType.PHYSICAL,
+        })
+        links.append({"space_id": space_id + k, "tenant_id": tenant_id + k,
+                      "monthly_rent": float(rng.randint(15, 60) * 100),
+                      "variable_symbol": f"9{k + 1:05d}", "is_active": True})
+    _bulk(db, Space, spaces)
+    _bulk(db, Tenant, tenants)
+    _bulk(db, SpaceTenant, links)
+    return count
+
+
+# ── Daňové PDF ──────────────────────────────────────────────────────
+
+
+def _pdf_escape(text: str) -> str:
+    return ascii_text(text).replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def text_pdf(lines: list[str]) -> bytes:
+    """Jednostránkové textové PDF (Helvetica) — stačí pro pdfplumber ``extract_text``."""
+    ops = ["BT", "/F1 11 Tf", "14 TL", "50 790 Td"]
+    ops += [f"({_pdf_escape(line)}) Tj T*" for line in lines]
+    ops.append("ET")
+    stream = "\n".join(ops).encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _write_tax_pdfs(target_dir: Path, units: list[dict], holdings: dict, year: int, limit: int) -> list[str]:
+    """Rozúčtování daně za rok — formát bloku „Údaje o vlastníkovi" jako reálné PDF."""
+    target_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for idx, unit in enumerate(units[:limit]):
+        names = [f"{o['last_name'] or ''} {o['first_name']}".strip() for o, _ in holdings.get(idx, [])]
+        lines = [
+            f"Vyuctovani sluzeb za rok {year}",
+            f"Cislo prostoru: {unit['unit_number']}",
+            f"SP 1 {unit['podil_scd']}/{TOTAL_SHARES} Udaje o vlastnikovi:",
+        ]
+        lines += [f"SP {n} {unit['podil_scd']}/{TOTAL_SHARES} {name}" for n, name in enumerate(names, 2)]
+        lines += [f"Vlastnik: {', '.join(names)}", "Celkem k uhrade: 0,00 Kc"]
+        path = target_dir / f"{unit['unit_number']}.pdf"
+        path.write_bytes(text_pdf(lines))
+        paths.append(str(path))
+    return paths
+
+
+# ── CSV ze sousede.cz ───────────────────────────────────────────────
+
+
+def sousede_csv(rng: random.Random, units: list[dict], holdings: dict) -> str:
+    """Export sousede.cz pro ``compare_owners`` — ~5 % jednotek s jiným vlastníkem / zápisem."""
+    rows = ["Název jednotky;Vlastníci jednotky;Typ vlastnictví;Typ jednotky;Podíl na domu;"
+            "Hlavní kontaktní e-mail;Hlavní kontaktní telefon"]
+    for idx, unit in enumerate(units):
+        held = holdings.get(idx, [])
+        names = [o["name_with_titles"] for o, _ in held]
+        typ = "SJM" if held and held[0][1] == "SJM" else "Osobní"
+        roll = rng.random()
+        if roll < 0.03:
+            names = [build_name_with_titles(None, rng.choice(_MALE_FIRST), rng.choice(_SURNAMES)[0])]
+        elif roll < 0.05:
+            names = list(reversed(names))
+        share = f"{unit['podil_scd']}/{TOTAL_SHARES}"
+        email = (held[0][0]["email"] or "") if held else ""
+        rows.append(f"1098/{unit['unit_number']};{', '.join(names)};{typ};Byt;{share};{email};")
+    return "\n".join(rows) + "\n"
+
+
+# ── Hlasování ───────────────────────────────────────────────────────
+
+
+def _generate_voting(db: Session, year: int) -> int:
+    voting = Voting(
+        title=f"Shromáždění {year}", status=VotingStatus.DRAFT,
+        start_date=date(year, 5, 1), end_date=date(year, 5, 31),
+        partial_owner_mode="shared",
+    )
+    db.add(voting)
+    db.flush()
+    for order, title in enumerate(
+        ["Schválení účetní závěrky", "Volba výboru", "Rekonstrukce výtahů", "Výše příspěvku do fondu oprav"], 1,
+    ):
+        db.add(VotingItem(voting_id=voting.id, order=order, title=title))
+    db.flush()
+    return voting.id
+
+
+# ── Vstupní bod ─────────────────────────────────────────────────────
+
+
+def generate_dataset(
+    db: Session,
+    units: int = 100,
+    year: int = 2025,
+    seed: int = 1,
+    files_dir: Path | None = None,
+    max_tax_pdfs: int | None = None,
+) -> dict:
+    """Naplnit (prázdnou) DB syntetickým domem; commit na konci.
+
+    Vrací souhrn pro benchmark: id hlasování, id výpisů, cesty k daňovým PDF,
+    text CSV pro synchronizaci, CSV výpisů a počty řádků.
+    """
+    rng = random.Random(seed)
+    if not db.query(SvjInfo).first():
+        db.add(SvjInfo(name="SVJ Synthetická 1098", total_shares=TOTAL_SHARES,
+                       unit_count=units, vs_prefix=DEFAULT_VS_PREFIX))
+
+    built = _generate_owners(db, rng, units, year)
+    unit_rows, holdings = built["units"], built["holdings"]
+    monthly = _generate_prescriptions(db, rng, unit_rows, holdings, year)
+    meters = _generate_water(db, rng, unit_rows, year)
+    spaces = _generate_spaces(db, rng, units)
+    voting_id = _generate_voting(db, year)
+    db.commit()
+
+    statement_csvs = []
+    statement_ids = []
+    seq, opening, payments = 1, 850000.0, 0
+    for month in range(1, _MONTHS + 1):
+        txs = _month_transactions(rng, year, month, unit_rows, holdings, monthly, seq)
+        seq += len(txs)
+        payments += len(txs)
+        filename = f"Vypis_z_uctu-{BANK_ACCOUNT.split('/')[0]}_{year}{month:02d}.csv"
+        content = fio_statement_csv(year, month, txs, opening)
+        opening += sum(t["amount"] for t in txs)
+        statement_ids.append(import_statement(db, content, filename).id)
+        statement_csvs.append((filename, content))
+        db.commit()
+
+    tax_pdfs = []
+    if files_dir is not None:
+        limit = units if max_tax_pdfs is None else min(units, max_tax_pdfs)
+        tax_pdfs = _write_tax_pdfs(Path(files_dir) / "tax_pdfs", unit_rows, holdings, year, limit)
+
+    return {
+        "units": units,
+        "year": year,
+        "seed": seed,
+        "voting_id": voting_id,
+        "statement_ids": statement_ids,
+        "statement_csvs": statement_csvs,
+        "tax_pdfs": tax_pdfs,
+        "sousede_csv": sousede_csv(rng, unit_rows, holdings),
+        "counts": {
+            "units": len(unit_rows),
+            "owners": len(built["owners"]),
+            "sjm_units": sum(1 for held in holdings.values() if held[0][1] == "SJM"),
+            "payments": payments,
+            "water_meters": meters,
+            "spaces": spaces,
+            "tax_pdfs": len(tax_pdfs),
+        },
+    }
@@ -67,6 +67,25 @@ def client(test_engine, db_session):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def _isolated_parsed_uploads(tmp_path, monkeypatch):
+    """Keep the parsed-upload cache out of data/temp and fresh per test."""
+    from app.services import parsed_upload
+    monkeypatch.setattr(parsed_upload, "CACHE_DIR", tmp_path / "parsed_uploads")
+    monkeypatch.setattr(parsed_upload, "_memory", type(parsed_upload._memory)())
+    monkeypatch.setattr(parsed_upload, "_digests", type(parsed_upload._digests)())
+
+
+@pytest.fixture(autouse=True)
+def _fresh_change_tracking():
+    """Per-test rollback obchází after_commit — verze tabulek (a cache na nich) zneplatnit."""
+    from app.services import change_tracking, page_cache
+    change_tracking.invalidate()
+    yield
+    change_tracking.invalidate()
+    page_cache.clear()
+
+
 @pytest.fixture()
 def tmp_upload_dir(tmp_path):
     """Temporary upload directory."""
@@ -0,0 +1,149 @@
+"""Tests for app/services/activity_feed.py and the dashboard activity feed."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.models import ActivityAction, ActivityFeedItem, ActivityLog, EmailLog, EmailStatus
+from app.routers.dashboard import ACTIVITY_PAGE_SIZE
+from app.services.activity_feed import norm_module, rebuild_activity_feed
+
+T0 = datetime(2025, 5, 1, 10, 0)
+
+
+def _email(db, module="tax", status=EmailStatus.SENT, subject="Daňové podklady", minutes=0, **kw):
+    log = EmailLog(
+        recipient_email=kw.pop("recipient_email", "jan@example.cz"), subject=subject,
+        module=module, status=status, created_at=T0 + timedelta(minutes=minutes), **kw,
+    )
+    db.add(log)
+    db.flush()
+    return log
+
+
+def _activity(db, name, minutes=0, module="vlastnici", **kw):
+    log = ActivityLog(
+        action=ActivityAction.CREATED, entity_type=kw.pop("entity_type", "owner"),
+        entity_name=name, module=module, created_at=T0 + timedelta(minutes=minutes), **kw,
+    )
+    db.add(log)
+    db.flush()
+    return log
+
+
+def _feed(db):
+    return db.query(ActivityFeedItem).order_by(ActivityFeedItem.id).all()
+
+
+# ---------------------------------------------------------------------------
+# 1. Triggers
+# ---------------------------------------------------------------------------
+
+class TestActivityFeedTriggers:
+    def test_email_and_activity_rows(self, db_session):
+        _email(db_session, recipient_name="Jan Novák", reference_id=3, status=EmailStatus.PENDING)
+        _activity(db_session, "Novák Jan", entity_id=9, module="test")
+        email_row, act_row = _feed(db_session)
+        assert (email_row.module, email_row.detail, email_row.status, email_row.url) == (
+            "dane", "Jan Novák", "pending", "/rozesilani/3",
+        )
+        assert (act_row.module, act_row.status, act_row.url) == ("sprava", "created", "/vlastnici/9")
+
+    def test_payment_notices_grouped_at_write_time(self, db_session):
+        logs = [
+            _email(db_session, module="payment_notice", subject="Upozornění", minutes=i,
+                   reference_id=7, recipient_email=f"u{i}@example.cz")
+            for i in range(3)
+        ]
+        _email(db_session, module="payment_notice", subject="Upozornění", minutes=60 * 24)
+        day1, day2 = _feed(db_session)
+        assert day1.grouped_count == 3
+        assert (day1.description, day1.detail, day1.status) == ("Upozornění (3×)", "3× odesláno", "sent")
+        assert day1.url == "/platby/vypisy/7" and day1.created_at == T0 + timedelta(minutes=2)
+        assert day2.description == "Upozornění"
+
+        logs[1].status = EmailStatus.FAILED
+        db_session.flush()
+        day1 = db_session.query(ActivityFeedItem).filter_by(grouped_count=3).one()
+        assert (day1.detail, day1.status) == ("2× odesláno, 1× chyba", "failed")
+
+        for log in logs:
+            db_session.delete(log)
+        db_session.flush()
+        assert [r.description for r in _feed(db_session)] == ["Upozornění"]
+
+    def test_rebuild_matches_triggers(self, db_session):
+        _email(db_session)
+        for i in range(2):
+            _email(db_session, module="payment_notice", subject="Upozornění", minutes=i)
+        _activity(db_session, "Dvořák")
+        columns = ("module", "created_at", "description", "detail", "status", "url", "grouped_count")
+        before = sorted(tuple(getattr(r, c) for c in columns) for r in _feed(db_session))
+
+        conn = db_session.connection()
+        assert rebuild_activity_feed(conn) == 3
+        db_session.expire_all()
+        assert sorted(tuple(getattr(r, c) for c in columns) for r in _feed(db_session)) == before
+        # FTS index follows the rebuilt rows
+        assert conn.execute(text(
+            "SELECT count(*) FROM activity_feed_fts WHERE activity_feed_fts MATCH 'dvorak'"
+        )).scalar() == 1
+
+    def test_group_key_without_subject(self, db_session):
+        # Předmět NULL (zápis mimo ORM) patří do skupiny '' — klíč nesmí být NULL
+        from app.services.activity_feed import _group_key_sql
+
+        key = db_session.execute(text(
+            f"SELECT {_group_key_sql('x')} FROM (SELECT NULL AS subject, '2025-05-01 10:00:00' AS created_at) x"
+        )).scalar()
+        assert key == "payment_notice|2025-05-01|"
+
+    def test_norm_module(self):
+        assert norm_module("tax") == "dane"
+        assert norm_module("water_notice") == "vodometry"
+        assert norm_module("neznamy") == "sprava"
+        assert norm_module(None) == "sprava"
+
+
+# ---------------------------------------------------------------------------
+# 2. Dashboard and export
+# ---------------------------------------------------------------------------
+
+class TestDashboardActivity:
+    def test_keyset_pages_cover_all_events(self, db_session, client):
+        for i in range(ACTIVITY_PAGE_SIZE + 5):
+            _activity(db_session, f"Osoba{i:03d}", minutes=i)
+
+        resp = client.get("/")
+        assert resp.status_code == 200
+        assert f"{ACTIVITY_PAGE_SIZE + 5} záznamů" in resp.text
+        assert "Osoba104" in resp.text and "Osoba004" not in resp.text
+        assert 'hx-trigger="revealed"' in resp.text
+
+        next_url = resp.text.split('hx-get="/?')[1].split('"')[0].replace("&amp;", "&")
+        page2 = client.get("/?" + next_url, headers={"HX-Request": "true"})
+        assert "Osoba004" in page2.text and "Osoba000" in page2.text
+        assert "Osoba005" not in page2.text
+        assert 'hx-trigger="revealed"' not in page2.text
+
+    def test_module_filter_and_search(self, db_session, client):
+        _email(db_session, subject="Rozeslání daní")
+        _activity(db_session, "Příliš žluťoučký kůň")
+
+        resp = client.get("/?modul=tax")
+        assert "Rozeslání daní" in resp.text and "žluťoučký" not in resp.text
+
+        resp = client.get("/?q=zlutou", headers={"HX-Request": "true"})
+        assert "žluťoučký" in resp.text and "Rozeslání daní" not in resp.text
+
+    def test_export_streams_filtered_feed(self, db_session, client):
+        _email(db_session, subject="Rozeslání daní")
+        for i in range(3):
+            _email(db_session, module="payment_notice", subject="Upozornění", minutes=i)
+        resp = client.get("/exportovat/csv?sort=description&order=asc")
+        assert resp.status_code == 200
+        lines = resp.content.decode("utf-8-sig").strip().splitlines()
+        assert lines[0] == "Datum;Modul;Popis;Detail;Stav"
+        assert [line.split(";")[2] for line in lines[1:]] == ["Rozeslání daní", "Upozornění (3×)"]
+
+        resp = client.get("/exportovat/csv?modul=payment_notice")
+        assert len(resp.content.decode("utf-8-sig").strip().splitlines()) == 2
@@ -29,19 +29,22 @@ def test_preview_returns_error_dict(db_session):
     assert result["stats"]["matched_count"] == 0
 
 
-@patch("app.services.contact_import.load_workbook")
-def test_read_only_mode(mock_load_wb, db_session):
+@patch("app.services.parsed_upload.load_workbook")
+def test_read_only_mode(mock_load_wb, db_session, tmp_path):
     """load_workbook should be called with read_only=True."""
     mock_wb = MagicMock()
     mock_wb.sheetnames = ["ZU"]
     mock_ws = MagicMock()
+    mock_ws.title = "ZU"
     mock_ws.iter_rows.return_value = []
-    mock_wb.__getitem__ = MagicMock(return_value=mock_ws)
+    mock_wb.worksheets = [mock_ws]
     mock_wb.active = mock_ws
     mock_load_wb.return_value = mock_wb
+    path = tmp_path / "file.xlsx"
+    path.write_bytes(b"fake")
 
-    preview_contact_import("/fake/file.xlsx", db_session)
+    preview_contact_import(str(path), db_session)
 
     mock_load_wb.assert_called_once_with(
-        "/fake/file.xlsx", read_only=True, data_only=True,
+        str(path), read_only=True, data_only=True,
     )
@@ -654,3 +654,67 @@ class TestCSVCompareIntegration:
         ]
         results = compare_owners(csv_records, excel_data)
         assert results[0]["status"] == SyncStatus.MATCH
+
+
+# ---------------------------------------------------------------------------
+# Sync session: flat owner snapshot + bulk record insert
+# ---------------------------------------------------------------------------
+
+class TestSyncSessionBuild:
+    def _seed(self, db):
+        from app.models import Owner, OwnerType, OwnerUnit, Unit
+
+        unit = Unit(unit_number=14, space_type="byt", podil_scd=120)
+        jan = Owner(first_name="Jan", last_name="Novák", title="Ing.",
+                    name_with_titles="Ing. Novák Jan", name_normalized="novak jan",
+                    owner_type=OwnerType.PHYSICAL, is_active=True)
+        eva = Owner(first_name="Eva", last_name="Nováková", name_with_titles="Nováková Eva",
+                    name_normalized="novakova eva", owner_type=OwnerType.PHYSICAL, is_active=True)
+        db.add_all([unit, jan, eva])
+        db.flush()
+        db.add_all([
+            OwnerUnit(owner_id=jan.id, unit_id=unit.id, ownership_type="SJM", votes=60),
+            OwnerUnit(owner_id=eva.id, unit_id=unit.id, ownership_type="SJM", votes=60),
+        ])
+        db.flush()
+        return jan
+
+    def test_load_excel_data_flat_projection(self, db_session):
+        from app.routers.sync._helpers import _load_excel_data
+
+        self._seed(db_session)
+        data = _load_excel_data(db_session)
+        assert [d["owner_name"] for d in data] == ["Ing. Novák Jan", "Nováková Eva"]
+        assert data[0]["unit_number"] == "14"
+        assert data[0]["podil_scd"] == 120
+        assert data[0]["last_name_norm"] == normalize_for_matching("Novák")
+
+    def test_compare_and_bulk_save(self, db_session):
+        from app.models import SyncRecord, SyncResolution, SyncSession
+        from app.routers.sync._helpers import _load_excel_data, _save_sync_results
+
+        self._seed(db_session)
+        csv_records = parse_sousede_csv(
+            "Jednotka;Vlastníci jednotky;Podíl na domu\n"
+            "1098/14;Novák Jan, Nováková Eva;120\n"
+            "1098/15;Svoboda Petr;80\n"
+        )
+        seen = []
+        comparison = compare_owners(csv_records, _load_excel_data(db_session), on_progress=seen.append)
+        assert seen[-1] == 2
+
+        session = SyncSession(csv_filename="test.csv", csv_path="/tmp/test.csv")
+        db_session.add(session)
+        db_session.flush()
+        _save_sync_results(db_session, session, comparison)
+
+        records = {r.unit_number: r for r in db_session.query(SyncRecord).filter_by(session_id=session.id)}
+        assert records["14"].status == SyncStatus.MATCH
+        assert records["14"].resolution == SyncResolution.ACCEPTED
+        assert records["15"].status == SyncStatus.MISSING_EXCEL
+        assert session.total_records == 2 and session.total_missing == 1
+
+    def test_processing_page_redirects_without_job(self, client):
+        resp = client.get("/synchronizace/999/zpracovani", follow_redirects=False)
+        assert resp.status_code == 302
+        assert resp.headers["location"] == "/synchronizace/999"
@@ -121,3 +121,81 @@ def test_build_mapping_context():
         assert "label" in gd
         assert "color" in gd
         assert "fields" in gd
+
+
+# ---------------------------------------------------------------------------
+# Parsed-upload cache (read_excel_headers / read_excel_sheet_names)
+# ---------------------------------------------------------------------------
+
+def _write_workbook(path):
+    from datetime import datetime
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["Jednotka", None, "Datum"])
+    ws.append([101, "Novák", datetime(2025, 3, 1, 8, 30)])
+    ws.append([102])
+    wb.create_sheet("Druhý").append(["x"])
+    wb.save(path)
+    return str(path)
+
+
+def test_parsed_upload_roundtrip_from_disk(tmp_path):
+    """Columnar on-disk form keeps values, types and ragged rows."""
+    from app.services import parsed_upload
+
+    path = _write_workbook(tmp_path / "upload.xlsx")
+    first = parsed_upload.get_parsed_upload(path)
+    parsed_upload._memory.clear()
+    cached = parsed_upload.get_parsed_upload(path)
+
+    assert cached is not first
+    assert cached.sheet_names == ["Data", "Druhý"]
+    assert cached.rows("Data") == first.rows("Data")
+    assert cached.row("Data", 2)[2].hour == 8
+    assert cached.resolve_sheet("Neexistuje", "Druhý") == "Druhý"
+
+
+def test_headers_reuse_cache_and_discard(tmp_path, monkeypatch):
+    """Later wizard steps read headers without reopening the workbook."""
+    from app.services import parsed_upload
+    from app.services.import_mapping import read_excel_headers, read_excel_sheet_names
+
+    path = _write_workbook(tmp_path / "upload.xlsx")
+    assert read_excel_sheet_names(path) == ["Data", "Druhý"]
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("workbook re-opened")
+    monkeypatch.setattr(parsed_upload, "load_workbook", _fail)
+    parsed_upload._memory.clear()
+    assert read_excel_headers(path, "Data") == ["Jednotka", "Sloupec 2", "Datum"]
+
+    parsed_upload.discard_parsed_upload(path)
+    assert not list(parsed_upload.CACHE_DIR.glob("*.json.gz"))
+
+
+def test_prune_drops_entries_of_deleted_uploads(tmp_path):
+    from app.services import parsed_upload
+
+    path = _write_workbook(tmp_path / "upload.xlsx")
+    parsed_upload.get_parsed_upload(path)
+    (tmp_path / "upload.xlsx").unlink()
+    assert parsed_upload.prune_parsed_uploads() == 1
+    assert not list(parsed_upload.CACHE_DIR.iterdir())
+
+
+def test_file_digests_are_bounded(tmp_path, monkeypatch):
+    """Remembered (path, mtime, size) digests are an LRU, not an ever-growing dict."""
+    from app.services import parsed_upload
+
+    monkeypatch.setattr(parsed_upload, "_DIGESTS_MAX", 2)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"f{i}.txt"
+        path.write_text(str(i))
+        paths.append(path)
+        parsed_upload._file_digest(str(path))
+    remembered = {key[0] for key in parsed_upload._digests}
+    assert remembered == {str(paths[1].resolve()), str(paths[2].resolve())}
@@ -0,0 +1,260 @@
+"""Tests for app/services/jobs.py — bounded pools, persistence, pause/cancel, generic progress endpoint."""
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import BackgroundJob, JobStatus
+from app.services import jobs
+
+
+@pytest.fixture(autouse=True)
+def job_db(tmp_path, monkeypatch):
+    """Worker vlákna potřebují vlastní spojení — souborová DB místo in-memory."""
+    import app.models  # noqa: F401
+    eng = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=eng)
+    factory = sessionmaker(bind=eng)
+    monkeypatch.setattr(jobs, "_session_factory", factory)
+    monkeypatch.setattr(jobs, "_jobs", {})
+    monkeypatch.setattr(jobs, "_queue", jobs.deque())
+    monkeypatch.setattr(jobs, "_running", {pool: 0 for pool in jobs.POOLS})
+    monkeypatch.setattr(jobs, "_POLL", 0.01)
+    yield factory
+    for job in list(jobs._jobs.values()):
+        job._cancel.set()
+        job._resume.set()
+    eng.dispose()
+
+
+def _wait(job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        snapshot = jobs.get(job_id)
+        if snapshot["done"]:
+            return snapshot
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def _row(factory, job_id):
+    db = factory()
+    try:
+        return db.query(BackgroundJob).get(job_id)
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# submit / run
+# ---------------------------------------------------------------------------
+
+class TestRun:
+    def test_progress_and_result_persisted(self, job_db):
+        def work(job, n):
+            for i in range(n):
+                job.checkpoint()
+                job.update(current=i + 1, message=f"krok {i + 1}", extra="x")
+            return {"count": n}
+
+        job = jobs.submit("test", work, 3, key=7, label="Test", total=3)
+        snapshot = _wait(job.id)
+        assert snapshot["status"] == "done"
+        assert snapshot["result"] == {"count": 3}
+        assert snapshot["current"] == 3 and snapshot["extra"] == "x"
+
+        row = _row(job_db, job.id)
+        assert row.status == JobStatus.DONE
+        assert row.key == "7" and row.current == 3
+        assert row.finished_at is not None
+        assert '"count": 3' in row.result_json
+        assert jobs.find("test", 7)["id"] == job.id
+        assert jobs.active("test", 7) is None
+
+    def test_failure_marks_failed_with_error(self, job_db):
+        def boom(job):
+            raise ValueError("rozbité PDF")
+
+        job = jobs.submit("test", boom)
+        snapshot = _wait(job.id)
+        assert snapshot["status"] == "failed"
+        assert snapshot["error"] == "rozbité PDF"
+        assert _row(job_db, job.id).error == "rozbité PDF"
+
+    def test_heavy_pool_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(jobs.settings, "job_heavy_workers", 1)
+        release = threading.Event()
+        first = jobs.submit("test", lambda job: release.wait(5), pool="heavy")
+        second = jobs.submit("test", lambda job: None, pool="heavy")
+        light = jobs.submit("test", lambda job: None, pool="light")
+
+        assert jobs.get(second.id)["queued"]
+        assert jobs.get(second.id)["queue_position"] == 1
+        assert _wait(light.id)["status"] == "done"  # jiný pool neblokuje
+        release.set()
+        assert _wait(first.id)["status"] == "done"
+        assert _wait(second.id)["status"] == "done"
+
+    def test_run_inline_propagates_errors(self):
+        job = jobs.run_inline("test", lambda job, x: job.update(current=x) or x * 2, 21)
+        assert job.result == 42 and job.current == 21 and job.done
+
+        with pytest.raises(RuntimeError):
+            jobs.run_inline("test", lambda job: (_ for _ in ()).throw(RuntimeError("x")))
+
+
+# ---------------------------------------------------------------------------
+# pause / resume / cancel
+# ---------------------------------------------------------------------------
+
+class TestControl:
+    def test_pause_resume_and_cancel(self):
+        started = threading.Event()
+
+        def loop(job):
+            started.set()
+            while True:
+                job.checkpoint()
+                job.advance()
+                time.sleep(0.005)
+
+        job = jobs.submit("test", loop)
+        started.wait(5)
+        assert jobs.pause(job.id)
+        time.sleep(0.05)
+        paused_at = jobs.get(job.id)["current"]
+        time.sleep(0.05)
+        assert jobs.get(job.id)["current"] - paused_at <= 1
+        assert jobs.get(job.id)["paused"]
+
+        assert jobs.resume(job.id)
+        assert jobs.cancel(job.id)
+        snapshot = _wait(job.id)
+        assert snapshot["status"] == "cancelled"
+
+    def test_cancel_queued_job(self, monkeypatch):
+        monkeypatch.setattr(jobs.settings, "job_heavy_workers", 1)
+        release = threading.Event()
+        blocker = jobs.submit("test", lambda job: release.wait(5))
+        waiting = jobs.submit("test", lambda job: None)
+        assert jobs.cancel(waiting.id)
+        assert jobs.get(waiting.id)["status"] == "cancelled"
+        release.set()
+        _wait(blocker.id)
+        assert jobs.get(waiting.id)["status"] == "cancelled"
+
+    def test_wait_for_confirm_blocks_until_resume(self):
+        def batches(job):
+            job.advance()
+            job.wait_for_confirm()
+            job.advance()
+
+        job = jobs.submit("test", batches)
+        deadline = time.monotonic() + 5
+        while not jobs.get(job.id).get("waiting_batch_confirm"):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert jobs.get(job.id)["current"] == 1
+
+        jobs.resume(job.id)
+        snapshot = _wait(job.id)
+        assert snapshot["current"] == 2
+        assert snapshot["waiting_batch_confirm"] is False
+
+
+# ---------------------------------------------------------------------------
+# Restart recovery + endpoints
+# ---------------------------------------------------------------------------
+
+class TestRecovery:
+    def test_interrupted_jobs_marked_failed(self, job_db):
+        db = job_db()
+        db.add(BackgroundJob(kind="tax_processing", key="1", label="x", status=JobStatus.RUNNING))
+        db.add(BackgroundJob(kind="backup", label="y", status=JobStatus.DONE))
+        db.commit()
+        db.close()
+
+        assert jobs.recover_interrupted_jobs() == 1
+        snapshot = jobs.find("tax_processing", 1)
+        assert snapshot["status"] == "failed"
+        assert "restartem" in snapshot["error"]
+        assert jobs.find("backup")["status"] == "done"
+
+
+class TestEndpoints:
+    def test_status_redirects_when_done(self, client):
+        job = jobs.submit("test", lambda job: None, fields={"redirect_url": "/vlastnici"})
+        _wait(job.id)
+        resp = client.get(f"/ulohy/{job.id}/stav")
+        assert resp.headers["HX-Redirect"] == "/vlastnici"
+
+    def test_status_stops_polling_on_failure(self, client):
+        def boom(job):
+            raise RuntimeError("SMTP nedostupné")
+
+        job = jobs.submit("test", boom, label="Rozesílka", fields={"redirect_url": "/vlastnici"})
+        _wait(job.id)
+        resp = client.get(f"/ulohy/{job.id}/stav")
+        assert resp.status_code == 286
+        assert "SMTP nedostupné" in resp.text
+
+    def test_unknown_job_and_listing(self, client):
+        assert client.get("/ulohy/999999/stav").headers["HX-Redirect"] == "/ulohy"
+        job = jobs.submit("test", lambda job: None, label="Záloha databáze")
+        _wait(job.id)
+        resp = client.get("/ulohy")
+        assert resp.status_code == 200
+        assert "Záloha databáze" in resp.text
+        assert client.get(f"/ulohy/{job.id}").status_code == 200
+
+
+# ---------------------------------------------------------------------------
+# SSE proud průběhu
+# ---------------------------------------------------------------------------
+
+def _events(text):
+    import json
+    out = []
+    for block in text.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in lines:
+            out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+class TestStream:
+    def test_stream_pushes_changes_then_done(self, client):
+        step = threading.Event()
+
+        def work(job):
+            job.update(current=1, total=2, current_recipient="novak@svj.cz")
+            step.wait(5)
+            job.update(current=2)
+
+        job = jobs.submit("test", work, label="Rozesílka")
+        threading.Timer(0.6, step.set).start()
+        resp = client.get(f"/ulohy/{job.id}/proud")
+        assert resp.headers["content-type"].startswith("text/event-stream")
+
+        events = _events(resp.text)
+        assert events[-1] == ("done", {"status": "done"})
+        progress = [data for name, data in events if name == "progress"]
+        currents = [d["delta"]["current"] for d in progress if "current" in d["delta"]]
+        assert currents[-2:] == [1, 2]
+        assert any(d["delta"].get("current_recipient") == "novak@svj.cz" for d in progress)
+        # Beze změny průběhu se nic neposílá (jen obnova času max. 1× za STREAM_REFRESH)
+        assert len(progress) <= 6
+        assert "Rozesílka" in progress[0]["html"]
+
+    def test_stream_unknown_job(self, client):
+        assert _events(client.get("/ulohy/999999/proud").text) == [("done", {"missing": True})]
+
+    def test_progress_pages_offer_stream(self, client):
+        job = jobs.submit("test", lambda job: job.sleep(5), label="Záloha databáze")
+        resp = client.get(f"/ulohy/{job.id}")
+        assert f'data-job-stream="/ulohy/{job.id}/proud"' in resp.text
+        assert f'hx-get="/ulohy/{job.id}/stav"' in resp.text  # fallback polling
+        jobs.cancel(job.id)
@@ -0,0 +1,133 @@
+"""Tests for app/services/log_retention.py — policies, archive, compaction."""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import (
+    ActivityAction, ActivityFeedItem, ActivityLog, EmailBounce, EmailLog, EmailStatus,
+    LogRetentionPolicy,
+)
+from app.services import log_retention
+from app.services.log_retention import (
+    archive_expired_logs, compact_database, get_policies, preview_retention, query_archive,
+)
+
+NOW = datetime(2026, 1, 1)
+
+
+@pytest.fixture(autouse=True)
+def _archive_in_tmp(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_retention, "ARCHIVE_PATH", tmp_path / "logs_archive.db")
+    monkeypatch.setattr(log_retention, "REPORT_PATH", tmp_path / "retention_log.json")
+
+
+def _email(db, days_old, module="tax", **kw):
+    log = EmailLog(
+        recipient_email=kw.pop("recipient_email", "jan@example.cz"), subject=kw.pop("subject", "Podklady"),
+        body_preview="x" * 500, module=module, status=EmailStatus.SENT,
+        created_at=NOW - timedelta(days=days_old), **kw,
+    )
+    db.add(log)
+    db.flush()
+    return log
+
+
+def _set_days(db, log_type, days, module=""):
+    policy = db.query(LogRetentionPolicy).filter_by(log_type=log_type, module=module).first()
+    if policy is None:
+        policy = LogRetentionPolicy(log_type=log_type, module=module)
+        db.add(policy)
+    policy.keep_days = days
+    db.flush()
+
+
+class TestPolicies:
+    def test_defaults_are_seeded_once(self, db_session):
+        first = get_policies(db_session)
+        assert {(p.log_type, p.module) for p in first} == {
+            ("email_bounces", ""), ("email_logs", ""), ("activity_logs", ""),
+        }
+        assert len(get_policies(db_session)) == 3
+
+    def test_module_override_and_keep_forever(self, db_session):
+        get_policies(db_session)
+        _set_days(db_session, "email_logs", 30)
+        _set_days(db_session, "email_logs", 365, module="payment_notice")
+        _set_days(db_session, "activity_logs", None)
+        _email(db_session, 100)                              # default 30 → expired
+        _email(db_session, 100, module="payment_notice")     # override 365 → kept
+        _email(db_session, 400, module="payment_notice")     # override → expired
+        db_session.add(ActivityLog(action=ActivityAction.CREATED, entity_type="owner", module="vlastnici",
+                                   created_at=NOW - timedelta(days=5000)))
+        db_session.flush()
+
+        preview = {(r["log_type"], r["module"]): r["count"] for r in preview_retention(db_session, NOW)}
+        assert preview[("email_logs", "")] == 1
+        assert preview[("email_logs", "payment_notice")] == 1
+        assert ("activity_logs", "") not in preview
+
+
+class TestArchive:
+    def test_rows_move_to_compressed_archive(self, db_session, monkeypatch):
+        monkeypatch.setattr(log_retention, "CHUNK_SIZE", 2)
+        get_policies(db_session)
+        _set_days(db_session, "email_logs", 30)
+        old = [_email(db_session, 60, recipient_email=f"old{i}@example.cz") for i in range(5)]
+        fresh = _email(db_session, 1, recipient_email="fresh@example.cz")
+        bounce = EmailBounce(recipient_email="old0@example.cz", email_log_id=old[0].id,
+                             module="tax", created_at=NOW)
+        db_session.add(bounce)
+        db_session.flush()
+        old_ids = {log.id for log in old}
+
+        archived = archive_expired_logs(db_session, NOW)
+        assert archived == {"email_bounces": 0, "email_logs": 5, "activity_logs": 0}
+
+        db_session.expire_all()
+        assert [log.id for log in db_session.query(EmailLog).all()] == [fresh.id]
+        assert db_session.get(EmailBounce, bounce.id).email_log_id is None
+        # Activity feed follows deletes through its triggers
+        assert db_session.query(ActivityFeedItem).filter(ActivityFeedItem.source_id.in_(old_ids)).count() == 0
+
+        rows = query_archive("email_logs", q="old3")
+        assert len(rows) == 1
+        assert rows[0]["data"]["body_preview"] == "x" * 500
+        assert rows[0]["data"]["status"] == "sent"
+        assert len(query_archive()) == 5
+
+        # Second run has nothing left to move
+        assert sum(archive_expired_logs(db_session, NOW).values()) == 0
+
+
+class TestCompaction:
+    def test_switches_to_incremental_and_reclaims(self, tmp_path):
+        path = str(tmp_path / "main.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE t (x TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?)", [("y" * 1000,) for _ in range(2000)])
+        conn.commit()
+        conn.execute("DELETE FROM t")
+        conn.commit()
+        conn.close()
+
+        first = compact_database(path)
+        assert first["mode"] == "full"
+        assert first["reclaimed"] > 1_000_000
+
+        conn = sqlite3.connect(path)
+        conn.executemany("INSERT INTO t VALUES (?)", [("y" * 1000,) for _ in range(500)])
+        conn.commit()
+        conn.execute("DELETE FROM t")
+        conn.commit()
+        conn.close()
+        second = compact_database(path)
+        assert second["mode"] == "incremental"
+        assert second["reclaimed"] > 0
+
+
+def test_retention_page(client):
+    resp = client.get("/sprava/retence")
+    assert resp.status_code == 200
+    assert "Retence logů" in resp.text
+    assert client.get("/sprava/retence/archiv").status_code == 200
@@ -0,0 +1,133 @@
+"""Tests for find_duplicate_groups in app/services/owner_service.py — fuzzy clustering."""
+import time
+
+from app.models import Owner, OwnerUnit, Unit
+from app.services.owner_matcher import name_similarity
+from app.services.owner_service import _duplicate_pairs, find_duplicate_groups
+from app.utils import strip_diacritics
+
+
+def _owner(db, name, **kw):
+    owner = Owner(
+        first_name=name.split()[-1], last_name=name.split()[0], name_with_titles=name,
+        name_normalized=strip_diacritics(name), **kw,
+    )
+    db.add(owner)
+    db.flush()
+    return owner
+
+
+def _group_ids(groups):
+    return sorted(sorted(o.id for o in g["owners"]) for g in groups)
+
+
+# ---------------------------------------------------------------------------
+# Shlukování
+# ---------------------------------------------------------------------------
+
+class TestClustering:
+    def test_exact_title_and_identifier_variants(self, db_session):
+        db = db_session
+        a = _owner(db, "Novák Jan")
+        b = _owner(db, "Ing. Jan Novák")
+        c = _owner(db, "Svobodová Eva", birth_number="755101/1234")
+        d = _owner(db, "Svobodová Eva Ing.", birth_number="7551011234")
+        _owner(db, "Dvořák Jan")
+
+        groups = find_duplicate_groups(db)
+        assert _group_ids(groups) == [sorted([a.id, b.id]), sorted([c.id, d.id])]
+        assert all(g["certain"] for g in groups)
+        rc_group = next(g for g in groups if c in g["owners"])
+        assert rc_group["reasons"] == ["rc"]
+
+    def test_identifier_with_different_name_is_uncertain(self, db_session):
+        db = db_session
+        a = _owner(db, "Svobodová Eva", birth_number="755101/1234")
+        b = _owner(db, "Dvořáková Eva", birth_number="7551011234")  # po sňatku, stejné RČ
+        groups = find_duplicate_groups(db)
+        assert _group_ids(groups) == [sorted([a.id, b.id])]
+        assert groups[0]["certain"] is False
+        assert groups[0]["reasons"] == ["rc"]
+
+    def test_placeholder_identifiers_ignored(self):
+        rows = [
+            (1, "Dvořák Petr", "dvorak petr", "neuvedeno", None),
+            (2, "Svoboda Karel", "svoboda karel", "neuvedeno", None),
+            (3, "Černý Josef", "cerny josef", "------", "--------"),
+            (4, "Veselý Milan", "vesely milan", "------", "--------"),
+            (5, "Horák Pavel", "horak pavel", "850101", None),  # jen datum z importu
+            (6, "Král Martin", "kral martin", "850101", None),
+        ]
+        assert _duplicate_pairs(rows) == []
+
+    def test_typo_is_uncertain(self, db_session):
+        db = db_session
+        a = _owner(db, "Procházka Tomáš")
+        b = _owner(db, "Procházka Tomš")
+        groups = find_duplicate_groups(db)
+        assert _group_ids(groups) == [sorted([a.id, b.id])]
+        assert groups[0]["certain"] is False
+        assert 0.9 <= groups[0]["confidence"] < 1.0
+
+    def test_common_first_name_does_not_chain(self, db_session):
+        db = db_session
+        for surname in ("Novák", "Dvořák", "Černý", "Veselý", "Horák"):
+            _owner(db, f"{surname} Jan")
+        assert find_duplicate_groups(db) == []
+        assert name_similarity("novak jan", "dvorak jan") < 0.9
+
+    def test_recommended_target_has_units(self, db_session):
+        db = db_session
+        a = _owner(db, "Novák Jan")
+        b = _owner(db, "Novák Jan", email="jan@example.cz")
+        unit = Unit(unit_number=7)
+        db.add(unit)
+        db.flush()
+        db.add(OwnerUnit(owner_id=b.id, unit_id=unit.id))
+        db.flush()
+        group = find_duplicate_groups(db)[0]
+        assert group["recommended_id"] == b.id
+        assert [o.id for o in group["owners"]] == [a.id, b.id]
+
+    def test_blocking_scales(self):
+        surnames = [f"prijmeni{i:04d}" for i in range(2500)]
+        rows = [(i, f"{s} jan", f"{s} jan", None, None) for i, s in enumerate(surnames)]
+        rows += [(10000 + i, f"{s} petr", f"{s} petr", None, None) for i, s in enumerate(surnames)]
+        started = time.perf_counter()
+        pairs = _duplicate_pairs(rows)
+        assert time.perf_counter() - started < 1.0
+        assert pairs == []
+
+
+# ---------------------------------------------------------------------------
+# Sloučit vše — jen jisté skupiny
+# ---------------------------------------------------------------------------
+
+class TestMergeAll:
+    def test_merge_all_skips_uncertain_groups(self, client, db_session):
+        db = db_session
+        a = _owner(db, "Novák Jan")
+        b = _owner(db, "Ing. Jan Novák")
+        c = _owner(db, "Procházka Tomáš")
+        d = _owner(db, "Procházka Tomš")
+
+        page = client.get("/sprava/duplicity")
+        assert page.status_code == 200
+        assert "podobné jméno" in page.text
+        assert "Sloučit jisté (1)" in page.text
+
+        resp = client.post("/sprava/duplicity/sloucit-vse", follow_redirects=False)
+        assert resp.status_code in (302, 303)
+        db.expire_all()
+        assert sum(o.is_active for o in (a, b)) == 1
+        assert c.is_active and d.is_active
+
+    def test_merge_all_skips_identifier_only_groups(self, client, db_session):
+        db = db_session
+        a = _owner(db, "Dvořák Petr", birth_number="8501011234")
+        b = _owner(db, "Svoboda Karel", birth_number="850101/1234")
+
+        resp = client.post("/sprava/duplicity/sloucit-vse", follow_redirects=False)
+        assert resp.status_code in (302, 303)
+        db.expire_all()
+        assert a.is_active and b.is_active
@@ -0,0 +1,110 @@
+"""Tests for app/services/owner_resolver.py — in-memory owner matching for imports."""
+import pytest
+from openpyxl import Workbook
+from sqlalchemy import event
+
+from app.models import Owner, OwnerType, OwnerUnit, Unit
+from app.services.owner_resolver import OwnerResolver
+from app.services.space_import import preview_spaces_from_excel
+
+
+def _owner(db, last, first, **kw):
+    owner = Owner(
+        first_name=first, last_name=last, name_with_titles=f"{last} {first}",
+        name_normalized=f"{last} {first}".lower().replace("á", "a").replace("ř", "r"), **kw,
+    )
+    db.add(owner)
+    db.flush()
+    return owner
+
+
+@pytest.fixture()
+def owners(db_session):
+    db = db_session
+    return {
+        "novak": _owner(db, "Novak", "Jan", birth_number="850101/1234"),
+        "novakova": _owner(db, "Novakova", "Eva"),
+        "dvorak": _owner(db, "Dvořák", "Petr"),
+        "dvorak_dup": _owner(db, "Dvořák", "Petr"),
+        "firma": _owner(db, "Stavby", "s.r.o.", owner_type=OwnerType.LEGAL_ENTITY, company_id="123 45 678"),
+        "inactive": _owner(db, "Zeman", "Karel", is_active=False),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Indexy
+# ---------------------------------------------------------------------------
+
+class TestLookups:
+    def test_exact_prefix_and_identifier(self, db_session, owners):
+        resolver = OwnerResolver.load(db_session)
+        assert resolver.exact("novak jan") is owners["novak"]
+        assert resolver.exact("dvorak petr") is owners["dvorak"]  # duplicita → nejnižší id
+        # Prefix stejně jako LIKE 'novak%' — zahrnuje i Nováková
+        assert resolver.with_prefix("novak") == [owners["novak"], owners["novakova"]]
+        assert resolver.with_prefix("zeman") == []  # neaktivní vlastníci se nenačítají
+        assert resolver.by_identifier("8501011234") is owners["novak"]
+        assert resolver.by_identifier("12345678") is owners["firma"]
+        assert resolver.by_identifier(None) is None
+
+    def test_match_semantics(self, db_session, owners):
+        resolver = OwnerResolver.load(db_session)
+        assert resolver.match("Novák Jan") is owners["novak"]
+        # Dva různí vlastníci s prefixem „novak“ → nejednoznačné
+        assert resolver.match("Novák Josef") is None
+        # Dva záznamy se stejným jménem = duplicita jedné osoby → první
+        assert resolver.match("Dvořák") is owners["dvorak"]
+        assert resolver.match("Ko") is None
+        assert [c["id"] for c in resolver.candidates("Novák Josef")] == [owners["novak"].id, owners["novakova"].id]
+        assert [c["id"] for c in resolver.candidates("Dvořák Pavel")] == [owners["dvorak"].id]
+
+    def test_match_in_unit(self, db_session, owners):
+        unit = Unit(unit_number=4)
+        db_session.add(unit)
+        db_session.flush()
+        db_session.add_all([
+            OwnerUnit(owner_id=owners["novak"].id, unit_id=unit.id, ownership_type="SJM"),
+            OwnerUnit(owner_id=owners["novakova"].id, unit_id=unit.id, ownership_type="SJM"),
+        ])
+        db_session.flush()
+        resolver = OwnerResolver.load(db_session, with_units=True)
+        assert len(resolver.owner_units(unit.id)) == 2
+        assert resolver.match_in_unit("Novakova Eva", unit.id) is owners["novakova"]
+        assert resolver.match_in_unit("Novak J.", unit.id) is owners["novak"]
+        assert resolver.match_in_unit("SJM Novak a Novakova", unit.id) is owners["novak"]
+        assert resolver.match_in_unit("Cizí Člověk", unit.id) is None
+        assert resolver.match_in_unit("Novak Jan", 999) is None
+
+
+# ---------------------------------------------------------------------------
+# Import — konstantní počet dotazů
+# ---------------------------------------------------------------------------
+
+class TestImportQueries:
+    def test_space_preview_query_count_independent_of_rows(self, db_session, owners, tmp_path):
+        def run(rows):
+            wb = Workbook()
+            ws = wb.active
+            ws.append(["Číslo", "Nájemce"])
+            for i in range(rows):
+                ws.append([i + 1, "Novák Josef" if i % 2 else "Novák Jan"])
+            path = tmp_path / f"prostory_{rows}.xlsx"
+            wb.save(path)
+
+            statements = []
+            engine = db_session.get_bind().engine
+
+            def count(*args):
+                statements.append(args)
+
+            event.listen(engine, "before_cursor_execute", count)
+            try:
+                result = preview_spaces_from_excel(
+                    str(path), {"fields": {"space_number": 0, "tenant_name": 1}, "start_row": 2}, db_session,
+                )
+            finally:
+                event.remove(engine, "before_cursor_execute", count)
+            assert result["spaces_count"] == rows
+            return len(statements)
+
+        assert run(5) == run(200)
@@ -0,0 +1,111 @@
+"""Tests for app/services/ownership.py — owners as of date / period."""
+from datetime import date
+
+import pytest
+
+from app.models import (
+    BankStatement, Owner, OwnerUnit, Payment, PaymentDirection, PaymentMatchStatus,
+    Prescription, PrescriptionYear, Unit, VariableSymbolMapping, SymbolSource,
+)
+from app.services import ownership
+
+
+def _owner(db, surname, first="Jan"):
+    owner = Owner(
+        first_name=first, last_name=surname, name_with_titles=f"{surname} {first}",
+        name_normalized=f"{surname.lower()} {first.lower()}",
+    )
+    db.add(owner)
+    db.flush()
+    return owner
+
+
+@pytest.fixture()
+def sold_unit(db_session):
+    """Jednotka prodaná 1. 7. 2025: Starý → Nový (+ trvalý spoluvlastník jiné jednotky)."""
+    db = db_session
+    unit = Unit(unit_number=12)
+    other = Unit(unit_number=13)
+    db.add_all([unit, other])
+    db.flush()
+    old, new, third = _owner(db, "Stary"), _owner(db, "Novy"), _owner(db, "Treti")
+    db.add_all([
+        OwnerUnit(owner_id=old.id, unit_id=unit.id, valid_to=date(2025, 7, 1)),
+        OwnerUnit(owner_id=new.id, unit_id=unit.id, valid_from=date(2025, 7, 1)),
+        OwnerUnit(owner_id=third.id, unit_id=other.id),
+    ])
+    db.flush()
+    return {"unit": unit, "other": other, "old": old, "new": new, "third": third}
+
+
+# ---------------------------------------------------------------------------
+# Dotazy ke dni a období
+# ---------------------------------------------------------------------------
+
+class TestOwnershipIndex:
+    def test_owner_on_day_half_open(self, db_session, sold_unit):
+        uid = sold_unit["unit"].id
+        index = ownership.load(db_session, *ownership.year_bounds(2025))
+        assert index.owner_on(uid, date(2025, 6, 30)) == sold_unit["old"].id
+        # Den výměny patří novému vlastníkovi
+        assert index.owner_on(uid, date(2025, 7, 1)) == sold_unit["new"].id
+        assert [ou.owner_id for ou in index.owner_units(uid)] == [sold_unit["old"].id, sold_unit["new"].id]
+        assert index.latest_owner(uid) == sold_unit["new"].id
+
+    def test_period_filters(self, db_session, sold_unit):
+        uid = sold_unit["unit"].id
+        first_half = ownership.load(db_session, date(2025, 1, 1), date(2025, 6, 30), unit_ids=[uid])
+        assert [ou.owner_id for ou in first_half] == [sold_unit["old"].id]
+        assert first_half.unit_ids() == {uid}
+
+        later = ownership.load(db_session, *ownership.year_bounds(2026))
+        assert [ou.owner_id for ou in later.owner_units(uid)] == [sold_unit["new"].id]
+        assert later.owner_on(sold_unit["other"].id, date(2026, 3, 1)) == sold_unit["third"].id
+
+    def test_current_and_empty_unit_ids(self, db_session, sold_unit):
+        current = ownership.load(db_session)
+        assert {ou.owner_id for ou in current} == {sold_unit["new"].id, sold_unit["third"].id}
+        assert list(ownership.load(db_session, date(2025, 1, 1), unit_ids=[])) == []
+
+    def test_sql_clause_matches_index(self, db_session, sold_unit):
+        rows = db_session.query(OwnerUnit).filter(ownership.on_day(date(2025, 3, 1))).all()
+        assert {ou.owner_id for ou in rows} == {sold_unit["old"].id, sold_unit["third"].id}
+
+
+# ---------------------------------------------------------------------------
+# Použití — vyúčtování, párování plateb
+# ---------------------------------------------------------------------------
+
+class TestYearSpecificConsumers:
+    def test_settlement_owner_at_year_end(self, db_session, sold_unit):
+        from app.models import Settlement
+        from app.services.settlement_service import generate_settlements
+
+        py = PrescriptionYear(year=2025)
+        db_session.add(py)
+        db_session.flush()
+        db_session.add(Prescription(prescription_year_id=py.id, unit_id=sold_unit["unit"].id, monthly_total=1000))
+        db_session.flush()
+        generate_settlements(db_session, 2025)
+        settlement = db_session.query(Settlement).filter_by(unit_id=sold_unit["unit"].id).one()
+        assert settlement.owner_id == sold_unit["new"].id
+
+    def test_payment_owner_at_payment_date(self, db_session, sold_unit):
+        from app.services.payment_matching import match_payments
+
+        db = db_session
+        unit = sold_unit["unit"]
+        db.add(VariableSymbolMapping(unit_id=unit.id, variable_symbol="1200", source=SymbolSource.AUTO, is_active=True))
+        stmt = BankStatement(filename="v.csv", period_from=date(2025, 6, 1), period_to=date(2025, 7, 31))
+        db.add(stmt)
+        db.flush()
+        june = Payment(statement_id=stmt.id, date=date(2025, 6, 15), amount=1000, vs="1200",
+                       direction=PaymentDirection.INCOME, match_status=PaymentMatchStatus.UNMATCHED)
+        july = Payment(statement_id=stmt.id, date=date(2025, 7, 15), amount=1000, vs="1200",
+                       direction=PaymentDirection.INCOME, match_status=PaymentMatchStatus.UNMATCHED)
+        db.add_all([june, july])
+        db.flush()
+
+        match_payments(db, stmt.id, 2025)
+        assert june.owner_id == sold_unit["old"].id
+        assert july.owner_id == sold_unit["new"].id
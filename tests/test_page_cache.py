@@ -0,0 +1,92 @@
+"""Tests for app/services/page_cache.py — ETag, 304 and cached list pages."""
+import pytest
+
+from app.models import Unit
+from app.routers import units as units_router
+from app.services import page_cache
+
+
+@pytest.fixture()
+def filter_calls(monkeypatch):
+    calls = []
+    original = units_router._filter_units
+
+    def counting(*args, **kwargs):
+        calls.append(args[1:])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(units_router, "_filter_units", counting)
+    return calls
+
+
+@pytest.fixture()
+def unit(db_session):
+    unit = Unit(unit_number=101, building_number="A")
+    db_session.add(unit)
+    db_session.commit()
+    return unit
+
+
+# ---------------------------------------------------------------------------
+# ETag a 304
+# ---------------------------------------------------------------------------
+
+class TestConditionalGet:
+    def test_etag_and_not_modified(self, client, unit, filter_calls):
+        first = client.get("/jednotky")
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == page_cache.CACHE_CONTROL
+
+        resp = client.get("/jednotky", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+        assert resp.headers["etag"] == etag
+        assert len(filter_calls) == 1
+
+    def test_query_and_htmx_change_etag(self, client, unit):
+        full = client.get("/jednotky").headers["etag"]
+        partial = client.get("/jednotky", headers={"HX-Request": "true"}).headers["etag"]
+        filtered = client.get("/jednotky?q=101").headers["etag"]
+        assert len({full, partial, filtered}) == 3
+
+
+# ---------------------------------------------------------------------------
+# Cache vyrenderovaných stránek
+# ---------------------------------------------------------------------------
+
+class TestPageCache:
+    def test_cached_body_until_commit(self, client, db_session, unit, filter_calls):
+        first = client.get("/jednotky", headers={"HX-Request": "true"})
+        again = client.get("/jednotky", headers={"HX-Request": "true"})
+        assert again.text == first.text
+        assert again.headers["etag"] == first.headers["etag"]
+        assert len(filter_calls) == 1
+
+        unit.building_number = "ZZ-9"
+        db_session.commit()
+        changed = client.get("/jednotky", headers={"HX-Request": "true"})
+        assert changed.headers["etag"] != first.headers["etag"]
+        assert "ZZ-9" in changed.text
+        assert len(filter_calls) == 2
+
+    def test_pending_changes_bypass_cache(self, client, db_session, unit, filter_calls):
+        client.get("/jednotky")
+        unit.building_number = "NEULOZENO"
+        db_session.flush()
+        resp = client.get("/jednotky")
+        assert "etag" not in resp.headers
+        assert "NEULOZENO" in resp.text
+        assert len(filter_calls) == 2
+
+    def test_lru_evicts_by_size(self, monkeypatch):
+        monkeypatch.setattr(page_cache, "MAX_CACHE_BYTES", 40)
+        for key in "abcd":
+            page_cache._put(key, [], b"x" * 10)
+        assert page_cache._get("a") is not None  # a je teď nejnověji použitý
+        page_cache._put("e", [], b"x" * 10)
+        assert page_cache._get("b") is None
+        assert page_cache._get("a") is not None
+        # Stránka větší než čtvrtina limitu se neukládá
+        page_cache._put("f", [], b"x" * 11)
+        assert page_cache._get("f") is None
@@ -789,14 +789,14 @@ class TestFindNameMatches:
 
 
 # ===========================================================================
-# _build_suggest_map unit test
+# build_suggest_map unit test
 # ===========================================================================
 
 class TestBuildSuggestMap:
-    """Testy pro _build_suggest_map z routeru."""
+    """Testy pro build_suggest_map (view model detailu výpisu)."""
 
     def test_basic_suggest(self):
-        from app.routers.payments.statements import _build_suggest_map
+        from app.services.statement_view import build_suggest_map
 
         class FakePayment:
             def __init__(self, pid, name, status, direction):
@@ -817,20 +817,20 @@ class TestBuildSuggestMap:
             ({"dvorak"}, 200),  # unit_id 200
         ]
 
-        result = _build_suggest_map(payments, name_index)
+        result = build_suggest_map(payments, name_index)
 
         assert result.get(1) == 100  # Novák → unit 100
         assert result.get(2) == 200  # Dvořák → unit 200
         assert 3 not in result  # expense → no suggestion
 
     def test_empty_payments(self):
-        from app.routers.payments.statements import _build_suggest_map
-        result = _build_suggest_map([], [])
+        from app.services.statement_view import build_suggest_map
+        result = build_suggest_map([], [])
         assert result == {}
 
     def test_best_match_wins(self):
         """Při více shodách vyhrává ta s nejvíce společnými slovy."""
-        from app.routers.payments.statements import _build_suggest_map
+        from app.services.statement_view import build_suggest_map
 
         class FakePayment:
             def __init__(self):
@@ -847,7 +847,7 @@ class TestBuildSuggestMap:
             ({"novak", "jana"}, 200),       # 2 matches — winner
         ]
 
-        result = _build_suggest_map(payments, name_index)
+        result = build_suggest_map(payments, name_index)
         assert result.get(1) == 200
 
 
@@ -1030,8 +1030,8 @@ class TestDiacriticsMatching:
         )
 
     def test_suggest_map_with_diacritics(self):
-        """_build_suggest_map správně strip_diacritics z counterparty."""
-        from app.routers.payments.statements import _build_suggest_map
+        """build_suggest_map správně strip_diacritics z counterparty."""
+        from app.services.statement_view import build_suggest_map
 
         class FakePayment:
             def __init__(self):
@@ -1045,7 +1045,7 @@ class TestDiacriticsMatching:
         payments = [FakePayment()]
         name_index = [({"dvoracek"}, 42)]
 
-        result = _build_suggest_map(payments, name_index)
+        result = build_suggest_map(payments, name_index)
         assert result.get(1) == 42
 
     def test_clean_name_words_czech_chars(self):
@@ -179,6 +179,12 @@ class TestCheckAmountMatch:
         assert _check_amount_match(3000.005, 3000) is True
         assert _check_amount_match(3000.02, 3000) is False
 
+    def test_months_multiple(self):
+        from app.services.payment_matching import _months_multiple
+        assert _months_multiple(7501.5, 2500.5) == 3
+        assert _months_multiple(13 * 100, 100) is None  # víc než 12 měsíců
+        assert _months_multiple(0, 100) is None
+
 
 class TestExtractUnitFromVs:
     def test_standard_format(self):
@@ -247,6 +253,49 @@ class TestFindMultiUnitMatch:
         result = _find_multi_unit_match(3000, candidates)
         assert result is not None
 
+    def test_many_units_and_duplicate_entries(self):
+        from app.services.payment_matching import AmountIndex, _find_multi_unit_match
+        # Vlastník s bytem a 20 garážemi; byt je v lookupu dvakrát (předpis + evidence)
+        flat = {"owner_id": 1, "monthly": 3100.5, "unit_id": 1}
+        garages = [{"owner_id": 1, "monthly": 400 + i, "unit_id": 100 + i} for i in range(20)]
+        candidates = [flat, dict(flat), *garages]
+        index = AmountIndex(candidates)
+
+        # 3 měsíce × (byt + garáž 105 + garáž 119)
+        result = _find_multi_unit_match(3 * (3100.5 + 405 + 419), candidates, index)
+        assert sorted(e["unit_id"] for e in result) == [1, 105, 119]
+        # Kombinace mimo kandidáty platby se nenabízí
+        assert index.multi_unit(3100.5 + 405, garages) is None
+        assert index.multi_unit(3100.5 + 405, [flat, garages[5]]) == [flat, garages[5]]
+
+    def test_smaller_combination_wins_over_fewer_months(self):
+        from app.services.payment_matching import _find_multi_unit_match
+        # 6000 = (A + B) × 2 i (A + B + C) × 1 — vyhrává menší kombinace
+        candidates = [
+            {"owner_id": 1, "monthly": 2000, "unit_id": 10},
+            {"owner_id": 1, "monthly": 1000, "unit_id": 20},
+            {"owner_id": 1, "monthly": 3000, "unit_id": 30},
+        ]
+        result = _find_multi_unit_match(6000, candidates)
+        assert [e["unit_id"] for e in result] == [10, 20]
+
+    def test_owner_sums_built_lazily(self):
+        from app.services.payment_matching import AmountIndex
+        big = [{"owner_id": 1, "monthly": 1000 + 7 * i, "unit_id": i} for i in range(80)]
+        other = [
+            {"owner_id": 2, "monthly": 800, "unit_id": 200},
+            {"owner_id": 2, "monthly": 600, "unit_id": 201},
+        ]
+        index = AmountIndex(big + other)
+        assert index.multi_unit(1400, other) == other
+        # Vlastník mimo kandidáty platby nemá postavené součty
+        assert 1 not in index._pairs
+
+        # 4 jednotky z 80 → první kombinace v pořadí výčtu (indexy se součtem 85)
+        result = index.multi_unit(4000 + 7 * 85, big)
+        assert [e["unit_id"] for e in result] == [0, 1, 5, 79]
+        assert 1 in index._pairs
+
 
 # ===========================================================================
 # Integrační testy — match_payments s DB
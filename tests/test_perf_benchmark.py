@@ -0,0 +1,129 @@
+"""Tests for scripts/perf_dataset.py + scripts/perf_benchmark.py — synthetic dataset and baseline check."""
+import importlib.util
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from app.models import (
+    OwnerUnit, Payment, PaymentMatchStatus, Prescription, Unit, VotingItem, WaterMeterStats,
+)
+from app.services.bank_import import parse_fio_csv
+from app.services.csv_comparator import parse_sousede_csv
+from app.services.pdf_extractor import extract_owner_from_tax_pdf
+
+SCRIPTS = Path(__file__).resolve().parent.parent / "scripts"
+
+
+def _load(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+perf_dataset = _load("perf_dataset")
+perf_benchmark = _load("perf_benchmark")
+
+
+# ---------------------------------------------------------------------------
+# generate_dataset
+# ---------------------------------------------------------------------------
+
+class TestGenerateDataset:
+    @pytest.fixture
+    def dataset(self, db_session):
+        return perf_dataset.generate_dataset(db_session, units=24, year=2025, seed=3)
+
+    def test_units_owners_and_sjm(self, db_session, dataset):
+        assert db_session.query(Unit).count() == 24
+        assert dataset["counts"]["sjm_units"] > 0
+        sjm = db_session.query(OwnerUnit).filter_by(ownership_type="SJM").count()
+        assert sjm == 2 * dataset["counts"]["sjm_units"]
+        assert db_session.query(Prescription).count() == 24
+
+    def test_year_of_statements_imported_and_matched(self, db_session, dataset):
+        assert len(dataset["statement_ids"]) == 12
+        total = db_session.query(Payment).count()
+        assert total == dataset["counts"]["payments"]
+        auto = db_session.query(Payment).filter_by(match_status=PaymentMatchStatus.AUTO_MATCHED).count()
+        # Většina plateb má správný VS
+        assert auto > total * 0.7
+
+    def test_water_voting_and_sync_csv(self, db_session, dataset):
+        assert db_session.query(WaterMeterStats).count() == dataset["counts"]["water_meters"]
+        assert db_session.query(VotingItem).filter_by(voting_id=dataset["voting_id"]).count() == 4
+        records = parse_sousede_csv(dataset["sousede_csv"])
+        assert len(records) == 24
+
+
+# ---------------------------------------------------------------------------
+# Fio CSV + tax PDF
+# ---------------------------------------------------------------------------
+
+class TestSyntheticFiles:
+    def test_fio_csv_parses(self):
+        txs = [
+            {"operation_id": "1", "date": date(2025, 3, 10), "amount": 2450.0, "vs": "109800001",
+             "counter_account_name": "Novák Jan", "message": "Platba"},
+            {"operation_id": "2", "date": date(2025, 3, 12), "amount": -800.0,
+             "counter_account_name": "Dodavatel", "message": "Faktura"},
+        ]
+        result = parse_fio_csv(perf_dataset.fio_statement_csv(2025, 3, txs, 1000.0), "v.csv")
+        assert result["errors"] == []
+        assert result["metadata"]["period_from"] == date(2025, 3, 1)
+        assert result["metadata"]["period_to"] == date(2025, 3, 31)
+        assert result["metadata"]["closing_balance"] == 2650.0
+        assert [t["direction"] for t in result["transactions"]] == ["income", "expense"]
+        assert result["transactions"][0]["vs"] == "109800001"
+
+    def test_tax_pdf_extracts_owner_names(self, tmp_path):
+        path = tmp_path / "12.pdf"
+        path.write_bytes(perf_dataset.text_pdf([
+            "Vyuctovani sluzeb za rok 2025",
+            "SP 1 4040/4103391 Udaje o vlastnikovi:",
+            "SP 2 4040/4103391 Dvořák Jan",
+            "SP 3 4040/4103391 Dvořáková Jana",
+            "Vlastnik: Dvořák Jan, Dvořáková Jana",
+        ]))
+        extracted = extract_owner_from_tax_pdf(str(path))
+        assert extracted["owner_names"] == ["Dvorak Jan", "Dvorakova Jana"]
+
+
+# ---------------------------------------------------------------------------
+# Baseline comparison
+# ---------------------------------------------------------------------------
+
+class TestCompareToBaseline:
+    def _case(self, median):
+        return {"median": median, "min": median, "max": median, "runs": [median]}
+
+    def test_statuses(self):
+        baseline = {
+            "slow": self._case(1.0), "fast": self._case(1.0), "same": self._case(1.0),
+            "tiny": self._case(0.01), "gone": self._case(0.5),
+        }
+        cases = {
+            "slow": self._case(1.5), "fast": self._case(0.5), "same": self._case(1.1),
+            "tiny": self._case(0.03), "new": self._case(0.2),
+        }
+        rows = {r["case"]: r["status"] for r in perf_benchmark.compare_to_baseline(cases, baseline, 0.25, 0.05)}
+        assert rows == {
+            "slow": "REGRESSION", "fast": "IMPROVED", "same": "OK",
+            # +200 %, ale jen o 20 ms — pod min_delta je to šum
+            "tiny": "OK", "new": "NEW", "gone": "MISSING",
+        }
+
+    def test_time_case_excludes_setup(self):
+        calls = []
+        result = perf_benchmark.time_case(
+            lambda: calls.append("run"), 3,
+            setup=lambda: calls.append("setup"), teardown=lambda: calls.append("teardown"),
+        )
+        assert calls == ["setup", "run", "teardown"] * 3
+        assert len(result["runs"]) == 3
+        assert result["min"] <= result["median"] <= result["max"]
@@ -1,9 +1,17 @@
-"""Tests for app.services.prescription_import — pure parsing functions."""
+"""Tests for app.services.prescription_import — parsing and streaming DOCX import."""
 
+import io
 from datetime import date
 
+import pytest
+from docx import Document
+
+from app.models import Prescription, PrescriptionItem, PrescriptionYear, Unit, VariableSymbolMapping
 from app.models.payment import PrescriptionCategory
 from app.services.prescription_import import (
+    iter_docx_tables,
+    parse_prescription_docx,
+    save_prescriptions,
     _categorize_item,
     _parse_amount,
     _extract_vs,
@@ -223,3 +231,84 @@ class TestExtractValidFrom:
     def test_invalid_month(self):
         text = "EVIDENČNÍ LIST platný od 1. foobar 2026"
         assert _extract_valid_from(text) is None
+
+
+# ---------------------------------------------------------------------------
+# Proudové čtení DOCX
+# ---------------------------------------------------------------------------
+
+def _evidencni_list(doc, vs, space_number, owner, amounts):
+    table = doc.add_table(rows=25, cols=2)
+    header = table.cell(0, 0).merge(table.cell(0, 1))  # gridSpan
+    header.text = "EVIDENČNÍ LIST platný od 1. ledna 2026"
+    table.cell(1, 0).text = f"SVJ Test\nVariabilní symbol: {vs}"
+    table.cell(1, 1).text = "Ulice 1098"
+    table.cell(1, 1).add_paragraph(f"A {space_number}")
+    left = table.cell(2, 0).merge(table.cell(3, 0))  # vMerge
+    left.text = f"Číslo prostoru: {space_number}\nDruh jednotky: byt"
+    table.cell(3, 1).text = f"SJM\nÚdaje o vlastníkovi:\n{owner}"
+    table.cell(4, 0).text = "Předpis plateb:"
+    for i, (name, amount) in enumerate(amounts.items(), start=5):
+        table.cell(i, 0).text = name
+        table.cell(i, 1).text = amount
+    table.cell(22, 0).text = "CELKEM"
+    table.cell(22, 1).text = "1\xa0500"
+    note = table.cell(23, 0).merge(table.cell(23, 1))
+    note.text = "V případě dotazů kontaktujte správce"
+    table.cell(24, 0).text = "Datum zpracování: 1. 12. 2025"
+    table.cell(24, 1).text = "x"
+    return table
+
+
+@pytest.fixture()
+def predpis_docx():
+    doc = Document()
+    doc.add_paragraph("Úvod")
+    doc.add_table(rows=2, cols=2).cell(0, 0).text = "krátká tabulka"
+    _evidencni_list(doc, "1001", 1, "Novák Jan", {"Fond oprav": "1 200", "Vodné": "300"})
+    doc.add_page_break()
+    _evidencni_list(doc, "1002", 2, "Svobodová Eva\nSvoboda Petr", {"Správa domu": "264"})
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+class TestStreamingDocx:
+    def test_tables_match_python_docx(self, predpis_docx):
+        doc = Document(io.BytesIO(predpis_docx))
+        expected = [[[c.text for c in row.cells] for row in t.rows] for t in doc.tables]
+        assert list(iter_docx_tables(predpis_docx)) == expected
+
+    def test_parse_records(self, predpis_docx):
+        result = parse_prescription_docx(predpis_docx, 2026)
+        assert result["valid_from"] == date(2026, 1, 1)
+        first, second = result["prescriptions"]
+        assert first["variable_symbol"] == "1001"
+        assert (first["section"], first["unit_display"]) == ("A", "1")
+        assert first["space_number"] == 1
+        assert first["space_type"] == "byt"
+        assert first["monthly_total"] == 1500.0
+        assert [(i["name"], i["amount"], i["category"]) for i in first["items"]] == [
+            ("Fond oprav", 1200.0, "fond_oprav"), ("Vodné", 300.0, "sluzby"),
+        ]
+        assert second["owner_name"] == "Svobodová Eva, Svoboda Petr"
+
+    def test_save_in_batches(self, db_session, predpis_docx):
+        from app.services.prescription_import import iter_prescriptions
+
+        db = db_session
+        unit = Unit(unit_number=1)
+        db.add(unit)
+        py = PrescriptionYear(year=2026)
+        db.add(py)
+        db.flush()
+
+        stats = save_prescriptions(db, py, iter_prescriptions(predpis_docx), {1: unit}, batch_size=1)
+        assert stats == {"total": 2, "matched": 1, "vs_created": 1}
+        assert py.valid_from == date(2026, 1, 1)
+        assert py.total_monthly == 3000.0
+        rows = db.query(Prescription).filter_by(prescription_year_id=py.id).order_by(Prescription.id).all()
+        assert [p.unit_id for p in rows] == [unit.id, None]
+        assert db.query(PrescriptionItem).filter_by(prescription_id=rows[0].id).count() == 2
+        mapping = db.query(VariableSymbolMapping).filter_by(variable_symbol="1001").one()
+        assert mapping.unit_id == unit.id
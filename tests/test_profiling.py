@@ -0,0 +1,134 @@
+"""Tests for app/services/profiling.py — request/SQL measurement, N+1 detection, admin surface."""
+import pytest
+from sqlalchemy import text
+
+from app.models import Owner, OwnerType
+from app.services import profiling
+
+
+@pytest.fixture(autouse=True)
+def _fresh_stats(monkeypatch):
+    # Ve výchozím nastavení je měření vypnuté
+    monkeypatch.setattr(profiling.settings, "request_profiling", True)
+    profiling.reset()
+    yield
+    profiling.reset()
+
+
+def _owner(db, name):
+    owner = Owner(first_name=name, last_name="Test", name_with_titles=f"Test {name}",
+                  name_normalized=f"test {name.lower()}", owner_type=OwnerType.PHYSICAL)
+    db.add(owner)
+    db.flush()
+    return owner
+
+
+# ---------------------------------------------------------------------------
+# normalize_sql + RequestProfile
+# ---------------------------------------------------------------------------
+
+class TestNormalizeSql:
+    def test_in_lists_collapse(self):
+        a = profiling.normalize_sql("SELECT * FROM owners WHERE id IN (?, ?, ?)")
+        b = profiling.normalize_sql("SELECT *  FROM owners\n WHERE id IN (?)")
+        c = profiling.normalize_sql("SELECT * FROM owners WHERE id IN (?,?)")
+        assert a == c == "SELECT * FROM owners WHERE id IN (?…)"
+        # Jediný parametr zůstává — jiný tvar dotazu
+        assert b == "SELECT * FROM owners WHERE id IN (?)"
+
+
+class TestRequestRecording:
+    def test_queries_counted_only_inside_request(self, db_session):
+        db_session.execute(text("SELECT 1"))  # mimo request — nezapočítá se
+        profile, token = profiling.start_request("GET", "/x")
+        db_session.execute(text("SELECT 1"))
+        db_session.execute(text("SELECT 2"))
+        summary = profiling.finish_request(profile, token, "/x", 200)
+        db_session.execute(text("SELECT 3"))
+
+        assert summary["queries"] == 2
+        assert summary["distinct_queries"] == 2
+        assert summary["sql_ms"] >= 0
+        assert len(summary["slowest"]) == 2
+        assert profiling.recent_requests()[0]["path"] == "/x"
+
+    def test_n_plus_one_flagged(self, db_session):
+        owners = [_owner(db_session, f"N{i}") for i in range(profiling.N_PLUS_ONE_MIN)]
+        profile, token = profiling.start_request("GET", "/vlastnici")
+        for o in owners:
+            db_session.execute(text("SELECT first_name FROM owners WHERE id = :id"), {"id": o.id})
+        db_session.execute(text("SELECT count(*) FROM owners"))
+        summary = profiling.finish_request(profile, token, "/vlastnici", 200)
+
+        assert len(summary["n_plus_one"]) == 1
+        hit = summary["n_plus_one"][0]
+        assert hit["count"] == profiling.N_PLUS_ONE_MIN
+        assert "WHERE id = ?" in hit["sql"]
+        assert profiling.route_stats()[0]["n_plus_one"] == 1
+
+    def test_route_and_statement_aggregates(self, db_session):
+        for _ in range(3):
+            profile, token = profiling.start_request("GET", "/jednotky/5")
+            db_session.execute(text("SELECT 42"))
+            profiling.finish_request(profile, token, "/jednotky/{unit_id}", 200)
+
+        routes = profiling.route_stats()
+        assert routes[0]["route"] == "GET /jednotky/{unit_id}"
+        assert routes[0]["count"] == 3
+        assert routes[0]["queries_avg"] == 1
+        stmt = next(s for s in profiling.statement_stats() if s["sql"] == "SELECT 42")
+        assert stmt["count"] == 3
+        assert stmt["route"] == "GET /jednotky/{unit_id}"
+
+
+# ---------------------------------------------------------------------------
+# Middleware + admin endpoints
+# ---------------------------------------------------------------------------
+
+class TestEndpoints:
+    def test_middleware_records_route_template(self, client, db_session):
+        owner = _owner(db_session, "Jan")
+        resp = client.get(f"/vlastnici/{owner.id}")
+        assert resp.status_code == 200
+        recorded = next(r for r in profiling.recent_requests() if r["path"] == f"/vlastnici/{owner.id}")
+        assert recorded["route"] == "/vlastnici/{owner_id}"
+        assert recorded["queries"] > 0
+
+    def test_static_not_recorded(self, client):
+        client.get("/static/css/custom.css")
+        assert not [r for r in profiling.recent_requests() if r["path"].startswith("/static")]
+
+    def test_metrics_json(self, client):
+        client.get("/vlastnici")
+        data = client.get("/sprava/vykon/metriky").json()
+        assert data["requests"] >= 1
+        assert any(r["route"] == "GET /vlastnici/" for r in data["routes"])
+        assert {"statements", "n_plus_one", "since"} <= set(data)
+
+    def test_admin_page_and_reset(self, client):
+        client.get("/jednotky")
+        resp = client.get("/sprava/vykon")
+        assert resp.status_code == 200
+        assert "GET /jednotky/" in resp.text
+        resp = client.post("/sprava/vykon/reset", follow_redirects=False)
+        assert resp.status_code == 302
+        # Zůstane jen samotný reset request (zapíše se až po handleru)
+        assert [r["path"] for r in profiling.recent_requests()] == ["/sprava/vykon/reset"]
+
+    def test_profile_query_only_in_debug(self, client, monkeypatch):
+        resp = client.get("/vlastnici?_profile=1")
+        assert resp.headers["content-type"].startswith("text/html")
+        # Vypnuté měření nezaznamenává nic
+        monkeypatch.setattr(profiling.settings, "request_profiling", False)
+        profiling.reset()
+        client.get("/vlastnici")
+        assert profiling.recent_requests() == []
+
+    def test_profile_query_returns_cprofile_report(self, client, monkeypatch):
+        monkeypatch.setattr(profiling.settings, "debug", True)
+        resp = client.get("/vlastnici?_profile=1")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        assert "GET /vlastnici" in resp.text
+        assert "function calls" in resp.text
+        assert "cumulative" in resp.text
@@ -0,0 +1,114 @@
+"""Tests for app/services/reference_data.py — snapshots, write invalidation, per-session pending changes."""
+import pytest
+
+from app.models import CodeListItem, EmailTemplate, SvjInfo
+from app.models.smtp_profile import SmtpProfile
+from app.services import change_tracking, reference_data
+from app.services.code_list_service import get_all_code_lists
+from app.services.payment_matching import DEFAULT_VS_PREFIX, _get_vs_prefix
+
+
+def _profile(db, name, is_default=False):
+    profile = SmtpProfile(
+        name=name, smtp_host=f"smtp.{name}.cz", smtp_user=name, smtp_password_b64="",
+        smtp_from_email=f"{name}@svj.cz", is_default=is_default,
+    )
+    db.add(profile)
+    db.commit()
+    return profile
+
+
+# ---------------------------------------------------------------------------
+# Snímky a invalidace commitem
+# ---------------------------------------------------------------------------
+
+class TestSvjSettings:
+    def test_snapshot_is_cached_and_read_only(self, db_session):
+        db_session.add(SvjInfo(name="SVJ Test", total_shares=1000, vs_prefix="2024"))
+        db_session.commit()
+
+        first = reference_data.svj_settings(db_session)
+        assert first.name == "SVJ Test"
+        assert reference_data.svj_settings(db_session) is first
+        assert reference_data.declared_shares(db_session) == 1000
+        assert _get_vs_prefix(db_session) == "2024"
+        with pytest.raises(AttributeError):
+            first.total_shares = 5
+
+    def test_commit_invalidates(self, db_session):
+        info = SvjInfo(name="SVJ", total_shares=1000)
+        db_session.add(info)
+        db_session.commit()
+        assert reference_data.declared_shares(db_session) == 1000
+
+        info.total_shares = 1200
+        db_session.commit()
+        assert reference_data.declared_shares(db_session) == 1200
+
+    def test_uncommitted_flush_read_by_own_session_only(self, db_session):
+        info = SvjInfo(name="SVJ", vs_prefix="")
+        db_session.add(info)
+        db_session.commit()
+        assert _get_vs_prefix(db_session) == DEFAULT_VS_PREFIX
+
+        info.vs_prefix = "3333"
+        db_session.flush()
+        assert _get_vs_prefix(db_session) == "3333"
+        # Cache drží dál commitnutý stav
+        assert reference_data._cache[db_session.get_bind().engine][("svj_info", "row")][1].vs_prefix == ""
+
+        db_session.rollback()
+        assert not change_tracking.pending(db_session)
+        assert _get_vs_prefix(db_session) == DEFAULT_VS_PREFIX
+
+    def test_missing_row(self, db_session):
+        assert reference_data.svj_settings(db_session) is None
+        assert reference_data.declared_shares(db_session) == 0
+
+
+class TestCodeListsAndTemplates:
+    def test_code_lists_grouped_and_invalidated(self, db_session):
+        db_session.add(CodeListItem(category="section", value="B", order=2))
+        db_session.add(CodeListItem(category="section", value="A", order=1))
+        db_session.commit()
+
+        lists = get_all_code_lists(db_session)
+        assert [i.value for i in lists["section"]] == ["A", "B"]
+        lists["section"].clear()  # volající dostává kopii seznamu
+        assert len(get_all_code_lists(db_session)["section"]) == 2
+
+        db_session.add(CodeListItem(category="section", value="C", order=3))
+        db_session.commit()
+        assert [i.value for i in get_all_code_lists(db_session)["section"]] == ["A", "B", "C"]
+
+    def test_email_template_by_name(self, db_session):
+        db_session.add(EmailTemplate(name="Odečty vodoměrů", subject_template="S", body_template="B"))
+        db_session.commit()
+        assert reference_data.email_template(db_session, "Odečty vodoměrů").subject_template == "S"
+        assert reference_data.email_template(db_session, "Neexistuje") is None
+
+        tpl = db_session.query(EmailTemplate).filter_by(name="Odečty vodoměrů").first()
+        tpl.subject_template = "Nový"
+        db_session.commit()
+        assert reference_data.email_template(db_session, "Odečty vodoměrů").subject_template == "Nový"
+
+
+class TestSmtpProfiles:
+    def test_bulk_update_invalidates_default(self, db_session):
+        old = _profile(db_session, "stary", is_default=True)
+        new = _profile(db_session, "novy")
+        assert reference_data.default_smtp_profile(db_session).id == old.id
+
+        # Stejně jako settings_page při přepnutí výchozího profilu
+        db_session.query(SmtpProfile).update({"is_default": False})
+        new.is_default = True
+        db_session.commit()
+        assert reference_data.default_smtp_profile(db_session).id == new.id
+        assert reference_data.smtp_profile(old.id, db_session).smtp_host == "smtp.stary.cz"
+
+    def test_invalidate_reloads(self, db_session):
+        profile = _profile(db_session, "a")
+        first = reference_data.smtp_profile(profile.id, db_session)
+        assert reference_data.smtp_profile(profile.id, db_session) is first
+        reference_data.invalidate()
+        assert reference_data.smtp_profile(profile.id, db_session) is not first
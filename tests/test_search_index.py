@@ -0,0 +1,125 @@
+"""Tests for app/services/search_index.py — FTS5 index, triggers, list filters."""
+from app.models import Owner, OwnerType, OwnerUnit, Space, SpaceTenant, Tenant, Unit
+from app.services.search_index import fts_query, global_search
+
+
+def _owner(db, first, last, **kw):
+    owner = Owner(
+        first_name=first, last_name=last, name_with_titles=f"{last} {first}",
+        name_normalized=f"{last} {first}".lower(), owner_type=OwnerType.PHYSICAL,
+        is_active=True, **kw,
+    )
+    db.add(owner)
+    db.flush()
+    return owner
+
+
+def _hits(db, q):
+    return {(h["kind"], h["id"]) for h in global_search(db, q)}
+
+
+# ---------------------------------------------------------------------------
+# 1. Query building
+# ---------------------------------------------------------------------------
+
+class TestFtsQuery:
+    def test_words_become_prefix_terms(self):
+        assert fts_query("Novák 12") == '"Novák"* "12"*'
+
+    def test_operators_are_not_passed_through(self):
+        assert fts_query('a" OR *') == '"a"* "OR"*'
+        assert fts_query("  -- ") is None
+
+
+# ---------------------------------------------------------------------------
+# 2. Triggers keep the index in sync
+# ---------------------------------------------------------------------------
+
+class TestSearchIndexTriggers:
+    def test_owner_diacritics_prefix_phone_and_birth_number(self, db_session):
+        owner = _owner(db_session, "Jan", "Dvořák", phone="+420 777 123 456", birth_number="850101/1234")
+        assert ("owner", owner.id) in _hits(db_session, "dvor")
+        assert ("owner", owner.id) in _hits(db_session, "DVOŘÁK jan")
+        assert ("owner", owner.id) in _hits(db_session, "777123")
+        assert ("owner", owner.id) in _hits(db_session, "8501011234")
+
+        owner.last_name = "Svoboda"
+        owner.name_with_titles = "Svoboda Jan"
+        owner.name_normalized = "svoboda jan"
+        db_session.flush()
+        assert ("owner", owner.id) not in _hits(db_session, "dvorak")
+        assert ("owner", owner.id) in _hits(db_session, "svob")
+
+    def test_unit_numbers_follow_ownership(self, db_session):
+        owner = _owner(db_session, "Eva", "Malá")
+        unit = Unit(unit_number=1407)
+        db_session.add(unit)
+        db_session.flush()
+        ou = OwnerUnit(owner_id=owner.id, unit_id=unit.id, votes=10)
+        db_session.add(ou)
+        db_session.flush()
+        assert {("owner", owner.id), ("unit", unit.id)} <= _hits(db_session, "1407")
+        # Unit is found by its owner's name too
+        assert ("unit", unit.id) in _hits(db_session, "mala")
+
+        db_session.delete(ou)
+        db_session.flush()
+        assert ("owner", owner.id) not in _hits(db_session, "1407")
+
+    def test_linked_tenant_uses_owner_fields(self, db_session):
+        owner = _owner(db_session, "Petr", "Krátký", email="petr@example.cz")
+        tenant = Tenant(owner_id=owner.id, is_active=True)
+        space = Space(space_number=7, designation="Sklad u vchodu")
+        db_session.add_all([tenant, space])
+        db_session.flush()
+        db_session.add(SpaceTenant(space_id=space.id, tenant_id=tenant.id, monthly_rent=100, is_active=True))
+        db_session.flush()
+
+        assert ("tenant", tenant.id) in _hits(db_session, "petr@example")
+        assert ("tenant", tenant.id) in _hits(db_session, "sklad")
+        assert ("space", space.id) in _hits(db_session, "kratky")
+
+
+# ---------------------------------------------------------------------------
+# 3. List filters and global search endpoint
+# ---------------------------------------------------------------------------
+
+class TestSearchEndpoints:
+    def test_owner_list_filter(self, db_session, client):
+        _owner(db_session, "Jan", "Novák")
+        _owner(db_session, "Eva", "Svobodová")
+        resp = client.get("/vlastnici?q=nova")
+        assert resp.status_code == 200
+        assert "Novák" in resp.text and "Svobodová" not in resp.text
+
+    def test_global_search_partial(self, db_session, client):
+        owner = _owner(db_session, "Jan", "Novák")
+        resp = client.get("/hledat?q=nov")
+        assert resp.status_code == 200
+        assert f'href="/vlastnici/{owner.id}"' in resp.text
+        assert "Nic nenalezeno" in client.get("/hledat?q=zzzz").text
+
+
+# ---------------------------------------------------------------------------
+# 4. SQLite bez FTS5 — LIKE fallback
+# ---------------------------------------------------------------------------
+
+class TestWithoutFts:
+    def test_lists_fall_back_to_like(self, db_session, client, monkeypatch):
+        from app.services import search_index
+
+        monkeypatch.setattr(search_index, "_fts_enabled", False)
+        owner = _owner(db_session, "Jan", "Novák", phone="777123456")
+        unit = Unit(unit_number=412)
+        db_session.add(unit)
+        db_session.flush()
+        db_session.add(OwnerUnit(owner_id=owner.id, unit_id=unit.id))
+        db_session.add(Tenant(first_name="Eva", last_name="Malá", name_normalized="mala eva", email="eva@example.cz"))
+        db_session.flush()
+
+        resp = client.get("/vlastnici?q=Nov")
+        assert resp.status_code == 200 and "Novák" in resp.text
+        for url in ("/vlastnici?q=412", "/jednotky?q=412", "/najemci?q=example", "/prostory?q=x"):
+            assert client.get(url).status_code == 200, url
+        assert "Malá" in client.get("/najemci?q=example").text
+        assert global_search(db_session, "nov") == []
@@ -0,0 +1,128 @@
+"""Tests for app/services/statement_view.py — cached statement-detail view model."""
+from datetime import date
+
+import pytest
+
+from app.models import (
+    BankStatement, Owner, OwnerUnit, Payment, PaymentDirection, PaymentMatchStatus,
+    Prescription, PrescriptionYear, Unit,
+)
+from app.services import payment_discrepancy, statement_view
+
+
+@pytest.fixture()
+def statement(db_session):
+    """Výpis se třemi platbami (commitnutý — cache se v session s necommitnutými změnami obchází)."""
+    db = db_session
+    unit = Unit(unit_number=7)
+    owner = Owner(first_name="Jan", last_name="Dvořák", name_with_titles="Dvořák Jan", name_normalized="dvorak jan")
+    db.add_all([unit, owner])
+    db.flush()
+    db.add(OwnerUnit(owner_id=owner.id, unit_id=unit.id, votes=100))
+    py = PrescriptionYear(year=2026)
+    db.add(py)
+    db.flush()
+    db.add(Prescription(prescription_year_id=py.id, unit_id=unit.id, monthly_total=2500, variable_symbol="777"))
+    stmt = BankStatement(filename="leden.csv", period_from=date(2026, 1, 1), period_to=date(2026, 1, 31))
+    db.add(stmt)
+    db.flush()
+    db.add_all([
+        Payment(statement_id=stmt.id, date=date(2026, 1, 5), amount=2500, vs="777", unit_id=unit.id,
+                counter_account_name="Dvořák Jan", direction=PaymentDirection.INCOME,
+                match_status=PaymentMatchStatus.SUGGESTED, operation_id="A"),
+        Payment(statement_id=stmt.id, date=date(2026, 1, 9), amount=900, vs="",
+                counter_account_name="Elektrárny", message="Záloha", direction=PaymentDirection.EXPENSE,
+                match_status=PaymentMatchStatus.UNMATCHED, operation_id="B"),
+        Payment(statement_id=stmt.id, date=date(2026, 1, 12), amount=120, vs="555",
+                note="Neznámý plátce", direction=PaymentDirection.INCOME,
+                match_status=PaymentMatchStatus.UNMATCHED, operation_id="C"),
+    ])
+    db.commit()
+    return {"statement": stmt, "unit": unit, "owner": owner}
+
+
+@pytest.fixture()
+def detect_calls(monkeypatch):
+    calls = []
+    original = payment_discrepancy.detect_discrepancies
+
+    def counting(db, statement_id):
+        calls.append(statement_id)
+        return original(db, statement_id)
+
+    monkeypatch.setattr(payment_discrepancy, "detect_discrepancies", counting)
+    return calls
+
+
+# ---------------------------------------------------------------------------
+# Cache + revize
+# ---------------------------------------------------------------------------
+
+class TestViewCache:
+    def test_filters_reuse_view_until_revision_bump(self, client, statement, detect_calls):
+        stmt_id = statement["statement"].id
+        assert client.get(f"/platby/vypisy/{stmt_id}").status_code == 200
+        resp = client.get(f"/platby/vypisy/{stmt_id}?stav=unmatched&sort=castka&order=desc",
+                          headers={"HX-Request": "true"})
+        assert resp.status_code == 200
+        assert resp.text.index("Elektrárny") < resp.text.index("Neznámý plátce")
+        assert 'title="Dvořák Jan"' not in resp.text
+        assert len(detect_calls) == 1
+
+        client.post(f"/platby/vypisy/{stmt_id}/zamknout", data={}, follow_redirects=False)
+        client.get(f"/platby/vypisy/{stmt_id}")
+        assert len(detect_calls) == 2
+
+    def test_confirm_refreshes_counts(self, client, db_session, statement):
+        stmt = statement["statement"]
+        view, _, _ = statement_view.get_view(db_session, stmt)
+        assert view.bubble_counts[""]["suggested"] == 1
+
+        payment = db_session.query(Payment).filter_by(operation_id="A").one()
+        client.post(f"/platby/vypisy/{stmt.id}/potvrdit/{payment.id}", data={}, follow_redirects=False)
+        db_session.refresh(stmt)
+        assert stmt.revision == 1
+        view, _, _ = statement_view.get_view(db_session, stmt)
+        assert view.bubble_counts[""]["suggested"] == 0
+        assert view.bubble_counts[""]["manual"] == 1
+        assert view.typ_counts == {"vse": 3, "jednotky": 1, "prostory": 0}
+
+    def test_directory_shared_until_owner_change(self, db_session, statement):
+        first = statement_view.get_directory(db_session, 2026)
+        assert statement_view.get_directory(db_session, 2026) is first
+        assert first.unit_monthly[statement["unit"].id] == 2500
+        assert first.unit_owner_names[statement["unit"].id] == "Dvořák Jan"
+
+        statement["owner"].first_name = "Josef"
+        db_session.commit()
+        refreshed = statement_view.get_directory(db_session, 2026)
+        assert refreshed is not first
+        assert refreshed.unit_owner_names[statement["unit"].id] == "Dvořák Josef"
+
+
+# ---------------------------------------------------------------------------
+# Filtrování a řazení nad indexem
+# ---------------------------------------------------------------------------
+
+class TestFilter:
+    def test_sort_nulls_last_and_search(self, db_session, statement):
+        view, _, _ = statement_view.get_view(db_session, statement["statement"])
+
+        by_amount = [r.amount for r in view.filter(sort="castka", order="desc")]
+        assert by_amount == [2500, 900, 120]
+        # Platba bez protistrany je na konci v obou směrech (NULLS LAST)
+        assert view.filter(sort="protiucet", order="desc")[-1].vs == "555"
+        assert view.filter(sort="protiucet")[-1].vs == "555"
+        assert [r.vs for r in view.filter(sort="datum", order="desc")] == ["555", "", "777"]
+
+        assert [r.vs for r in view.filter(q="555")] == ["555"]
+        assert [r.vs for r in view.filter(q="platce")] == ["555"]
+        assert [r.counter_account_name for r in view.filter(q="zaloha")] == ["Elektrárny"]
+        assert [r.counter_account_name for r in view.filter(q="DVORAK")] == ["Dvořák Jan"]
+        assert len(view.filter(smer="prijem", typ="jednotky")) == 1
+
+    def test_export_matches_detail_order(self, client, statement):
+        stmt_id = statement["statement"].id
+        resp = client.get(f"/platby/vypisy/{stmt_id}/exportovat/csv?sort=castka&order=asc")
+        text = resp.content.decode("utf-8-sig")
+        assert text.index("Neznámý") < text.index("Elektrárny") < text.index("Dvořák Jan")
@@ -0,0 +1,65 @@
+"""Tests for app/services/static_assets.py — hashed URLs, precompressed variants, response gzip."""
+import gzip
+
+from app.services import static_assets
+
+
+# ---------------------------------------------------------------------------
+# Hash v URL + cache hlavičky
+# ---------------------------------------------------------------------------
+
+class TestAssetUrls:
+    def test_url_changes_with_content(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(static_assets, "STATIC_DIR", tmp_path)
+        (tmp_path / "a.css").write_text("body { color: red; }")
+        first = static_assets.asset_url("a.css")
+        assert first.startswith("/static/a.css?v=")
+
+        (tmp_path / "a.css").write_text("body { color: blue; }")
+        assert static_assets.asset_url("a.css") != first
+        assert static_assets.asset_url("chybi.css") == "/static/chybi.css"
+
+    def test_base_template_uses_hashed_urls(self, client):
+        resp = client.get("/")
+        assert static_assets.asset_url("js/app.js") in resp.text
+        assert "app.js?v=18" not in resp.text
+
+    def test_hashed_request_is_immutable(self, client):
+        url = static_assets.asset_url("js/app.js")
+        resp = client.get(url)
+        assert resp.headers["cache-control"] == static_assets.IMMUTABLE_CACHE
+        stale = client.get("/static/js/app.js?v=stary")
+        assert stale.headers["cache-control"] == static_assets.REVALIDATE_CACHE
+
+
+# ---------------------------------------------------------------------------
+# Komprese
+# ---------------------------------------------------------------------------
+
+class TestCompression:
+    def test_precompressed_static_variant(self, client):
+        resp = client.get("/static/js/htmx.min.js", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in resp.headers["vary"]
+        assert int(resp.headers["content-length"]) < len(resp.content)  # httpx rozbalí
+
+        plain = client.get("/static/js/htmx.min.js", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert plain.content == resp.content
+
+    def test_html_response_gzipped(self, client):
+        resp = client.get("/", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["content-encoding"] == "gzip"
+
+    def test_binary_export_not_gzipped(self, client):
+        resp = client.get("/najemci/exportovat/xlsx", headers={"Accept-Encoding": "gzip"})
+        assert resp.status_code == 200
+        assert "content-encoding" not in resp.headers
+        assert resp.content[:2] == b"PK"
+
+    def test_gzip_helper_output_is_deterministic(self, tmp_path):
+        path = tmp_path / "x.js"
+        path.write_text("var a = 1;\n" * 200)
+        asset = static_assets._load(path, path.stat())
+        assert gzip.decompress(asset.encoded["gzip"]) == path.read_bytes()
+        assert asset.encoded["gzip"] == static_assets._load(path, path.stat()).encoded["gzip"]
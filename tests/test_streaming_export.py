@@ -0,0 +1,96 @@
+"""Tests for app/services/streaming_export.py and the endpoints using it."""
+import io
+
+from openpyxl import load_workbook
+from openpyxl.styles import PatternFill
+
+from app.models import Owner, OwnerType, OwnerUnit, Unit
+from app.services.data_export import export_category_csv, export_category_xlsx
+from app.services.streaming_export import (
+    Styled, iter_csv, sampled_widths, write_xlsx,
+)
+
+
+# ---------------------------------------------------------------------------
+# 1. Writers
+# ---------------------------------------------------------------------------
+
+class TestWriters:
+    def test_sampled_widths_caps_and_pads(self):
+        widths = sampled_widths(["A", "Dlouhá hlavička"], [["x" * 100, None], [Styled("abc"), 1]], max_width=40)
+        assert widths == [40, len("Dlouhá hlavička") + 2]
+
+    def test_csv_has_bom_and_flushes_all_rows(self):
+        rows = ([i, Styled(f"r{i}")] for i in range(1200))
+        data = b"".join(iter_csv(["n", "text"], rows)).decode("utf-8")
+        assert data.startswith("\ufeffn;text")
+        lines = data.strip().splitlines()
+        assert len(lines) == 1201
+        assert lines[-1] == "1199;r1199"
+
+    def test_xlsx_preamble_header_rows_and_footer(self):
+        fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+        totals = {"sum": 0}
+
+        def _rows():
+            for i in range(1, 4):
+                totals["sum"] += i
+                yield [f"row{i}", Styled(i, fill=fill) if i == 2 else i]
+
+        buf = io.BytesIO()
+        count = write_xlsx(
+            buf, ["Name", "Value"], _rows(), sheet_title="Test",
+            preamble=[["Note"], []], merge_preamble=2,
+            footer=lambda: [[], ["Total", totals["sum"]]],
+        )
+        assert count == 3
+
+        ws = load_workbook(io.BytesIO(buf.getvalue())).active
+        assert ws.title == "Test"
+        assert ws["A3"].value == "Name" and ws["A3"].font.b
+        assert ws["B5"].value == 2 and ws["B5"].fill.start_color.rgb.endswith("FFC7CE")
+        assert [ws["A8"].value, ws["B8"].value] == ["Total", 6]
+        assert "A1:B1" in {str(r) for r in ws.merged_cells.ranges}
+
+
+# ---------------------------------------------------------------------------
+# 2. Endpoints
+# ---------------------------------------------------------------------------
+
+def _seed_owner(db, last_name, unit_number):
+    owner = Owner(
+        first_name="Jan", last_name=last_name, name_with_titles=f"{last_name} Jan",
+        name_normalized=f"{last_name.lower()} jan", owner_type=OwnerType.PHYSICAL, is_active=True,
+    )
+    unit = Unit(unit_number=unit_number)
+    db.add_all([owner, unit])
+    db.flush()
+    db.add(OwnerUnit(owner_id=owner.id, unit_id=unit.id, votes=100))
+    db.flush()
+    return owner
+
+
+class TestExportEndpoints:
+    def test_owner_export_csv_streams_rows(self, db_session, client):
+        _seed_owner(db_session, "Novák", 101)
+        _seed_owner(db_session, "Adam", 102)
+        resp = client.get("/vlastnici/exportovat/csv")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/csv")
+        text = resp.content.decode("utf-8-sig")
+        assert text.index("Adam") < text.index("Novák")
+
+    def test_owner_export_xlsx(self, db_session, client):
+        _seed_owner(db_session, "Novák", 101)
+        resp = client.get("/vlastnici/exportovat/xlsx")
+        assert resp.status_code == 200
+        ws = load_workbook(io.BytesIO(resp.content)).active
+        assert ws["A1"].value == "Vlastník"
+        assert ws.max_row == 2
+
+    def test_category_export_bytes(self, db_session):
+        _seed_owner(db_session, "Novák", 101)
+        ws = load_workbook(io.BytesIO(export_category_xlsx(db_session, "owners"))).active
+        assert ws.max_row == 2
+        assert ws["A2"].value == 101
+        assert "Novák" in export_category_csv(db_session, "owners").decode("utf-8-sig")
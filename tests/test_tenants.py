@@ -195,3 +195,73 @@ def test_tenant_create_no_xss_in_duplicate_warning(client, db_session):
     # Jinja2 autoescape musí escapovat
     assert "<script>alert(1)</script>" not in resp.text
     assert "&lt;script&gt;" in resp.text or "duplicit" in resp.text.lower()
+
+
+# ── SQL-resolved fields: filtrování, řazení, stránkování ───────────────
+
+
+def _mk_linked_and_standalone(db):
+    owner = Owner(
+        first_name="Adam", last_name="Zeman", title="Ing.",
+        name_with_titles="Ing. Zeman Adam", name_normalized="zeman adam",
+        owner_type=OwnerType.LEGAL_ENTITY, phone="111", is_active=True,
+    )
+    db.add(owner)
+    db.flush()
+    # Vlastní jméno/typ propojeného nájemce se ignorují — platí údaje vlastníka
+    linked = _mk_tenant(db, owner_id=owner.id, first_name="X", last_name="Aaa",
+                        name_normalized="aaa x", phone="999")
+    standalone = _mk_tenant(db, first_name="Petr", last_name="Brož",
+                            name_normalized="broz petr", phone="222")
+    _mk_rel(db, _mk_space(db, 5), standalone, rent=1000)
+    _mk_rel(db, _mk_space(db, 2), linked, rent=300)
+    _mk_rel(db, _mk_space(db, 9), linked, rent=400)
+    return linked, standalone
+
+
+def test_resolved_expressions_match_properties(db_session):
+    linked, standalone = _mk_linked_and_standalone(db_session)
+    rows = dict(
+        (r[0], r[1:]) for r in db_session.query(
+            Tenant.id, Tenant.display_name, Tenant.resolved_phone, Tenant.resolved_type,
+        )
+    )
+    for t in (linked, standalone):
+        assert rows[t.id] == (t.display_name, t.resolved_phone, t.resolved_type)
+    assert rows[linked.id][0] == "Ing. Zeman Adam"
+
+
+def test_sort_and_filter_in_sql(db_session):
+    from app.routers.tenants._helpers import _filter_tenants, _sorted_tenants
+    linked, standalone = _mk_linked_and_standalone(db_session)
+
+    def ids(sort, order="asc", **kw):
+        return [t.id for t in _sorted_tenants(_filter_tenants(db_session, **kw), sort, order)]
+
+    assert ids("name") == [standalone.id, linked.id]  # broz < zeman (ne "aaa")
+    assert ids("phone", "desc") == [standalone.id, linked.id]  # 222 > 111 (ne 999)
+    assert ids("space") == [linked.id, standalone.id]  # 2 < 5
+    assert ids("rent", "desc") == [standalone.id, linked.id]  # 1000 > 300 + 400
+    assert ids("type") == [linked.id, standalone.id]  # PO (vlastník) před FO
+    assert ids("name", typ="legal") == [linked.id]
+    assert ids("name", typ="physical") == [standalone.id]
+
+
+def test_tenant_list_keyset_pages(client, db_session, monkeypatch):
+    import app.routers.tenants.crud as crud
+    _mk_linked_and_standalone(db_session)
+    _mk_tenant(db_session, first_name="Eva", last_name="Malá", name_normalized="mala eva")
+    db_session.commit()
+    monkeypatch.setattr(crud, "TENANT_PAGE_SIZE", 2)
+
+    resp = client.get("/najemci?sort=name")
+    assert resp.status_code == 200
+    assert "Brož Petr" in resp.text and "Malá Eva" in resp.text
+    assert "Ing. Zeman Adam" not in resp.text
+    assert "Zobrazeno: 3 nájemců" in resp.text
+    assert 'hx-trigger="revealed"' in resp.text
+
+    next_url = resp.text.split('<tr hx-get="')[1].split('"')[0].replace("&amp;", "&")
+    page2 = client.get(next_url, headers={"HX-Request": "true"})
+    assert "Ing. Zeman Adam" in page2.text
+    assert "Malá Eva" not in page2.text and 'hx-trigger="revealed"' not in page2.text
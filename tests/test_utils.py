@@ -6,7 +6,8 @@ from types import SimpleNamespace
 from app.utils import (
     flash_from_params, strip_diacritics, fmt_num, is_valid_email,
     compute_eta, build_wizard_steps, build_import_wizard,
-    build_name_with_titles, render_email_template, is_safe_path,
+    build_name_with_titles, render_email_template, render_email_batch, is_safe_path,
+    compile_email_template,
     encode_smtp_password, decode_smtp_password,
 )
 
@@ -257,6 +258,16 @@ class TestRenderEmailTemplate:
         )
         assert "12 345" in result
 
+    def test_invalid_template_returns_raw_string(self):
+        assert render_email_template("{% if %}", {}) == "{% if %}"
+
+    def test_compiled_once_per_content(self):
+        assert compile_email_template("Dobrý den {{ jmeno }}") is compile_email_template("Dobrý den {{ jmeno }}")
+
+    def test_batch_render(self):
+        result = render_email_batch("{{ jmeno }}", [{"jmeno": "Jan"}, {"jmeno": "Eva"}, {}])
+        assert result == ["Jan", "Eva", ""]
+
 
 # ---------------------------------------------------------------------------
 # is_safe_path
@@ -15,8 +15,10 @@ from app.services.voting_import import (
     _check_comparisons,
     _match_vote,
     _parse_unit_number,
+    _compile_vote_matcher,
     _parse_value_list,
     execute_voting_import,
+    parse_vote_rows,
     preview_voting_import,
     validate_mapping,
 )
@@ -909,6 +911,52 @@ class TestExecuteVotingImport:
             assert bv.vote == VoteValue.ABSTAIN
 
 
+class TestParseCache:
+    def test_compiled_matcher_matches_match_vote(self):
+        for_v = _parse_value_list("1, ANO, >5")
+        against_v = _parse_value_list("0, NE, <0")
+        abstain_v = _parse_value_list("Z, 2")
+        match = _compile_vote_matcher(for_v, against_v, abstain_v)
+        for raw, num in [("ano", None), ("1", 1.0), ("0", 0.0), ("7", 7.0),
+                         ("-3", -3.0), ("z", None), ("2", 2.0), ("xyz", None), (None, None)]:
+            assert match(raw, num) == _match_vote(raw, num, for_v, against_v, abstain_v)
+
+    def test_execute_reuses_preview_parse(self, seed_voting, tmp_path, monkeypatch):
+        from app.services import parsed_upload
+        db = seed_voting["db"]
+        v = seed_voting["voting"]
+        items = seed_voting["items"]
+        b1 = seed_voting["ballots"][0]
+
+        path = _create_test_excel(tmp_path, [["Novák Jan", 101, 1, 0]], ["A", "B", "C", "D"])
+        mapping = {
+            "owner_col": 0, "unit_col": 1, "start_row": 2,
+            "for_values": "1", "against_values": "0",
+            "item_mappings": [
+                {"item_id": items[0].id, "for_col": 2},
+                {"item_id": items[1].id, "for_col": 3},
+            ],
+        }
+        preview_voting_import(path, mapping, v, db)
+
+        def _fail(*args, **kwargs):
+            raise AssertionError("workbook re-opened")
+        monkeypatch.setattr(parsed_upload, "load_workbook", _fail)
+
+        result = execute_voting_import(path, {**mapping, "clear_existing": True}, v, db)
+        assert result["processed_count"] == 1
+        assert b1.status == BallotStatus.PROCESSED
+
+    def test_discard_parsed_rows(self, tmp_path):
+        import app.services.voting_import as vi
+        path = _create_test_excel(tmp_path, [["X", 1, 1]], ["A", "B", "C"])
+        mapping = {"owner_col": 0, "unit_col": 1, "item_mappings": [{"item_id": 1, "for_col": 2}]}
+        rows = parse_vote_rows(path, mapping)
+        assert rows[0]["vote_choices"] == {1: "for"}
+        vi.discard_parsed_rows(path)
+        assert parse_vote_rows(path, mapping) is not rows
+
+
 # ---------------------------------------------------------------------------
 # 9. SJM pairing — preview with shared unit
 # ---------------------------------------------------------------------------
@@ -957,3 +1005,63 @@ class TestSjmImportPreview:
         assert b1.id in matched_ballot_ids
         assert b2.id in matched_ballot_ids
         assert len(result["matched"]) == 2
+
+
+# ---------------------------------------------------------------------------
+# 10. Ballot list — SQL sort + keyset pagination
+# ---------------------------------------------------------------------------
+
+class TestBallotList:
+    def test_sort_by_item_vote(self, seed_voting, client):
+        db = seed_voting["db"]
+        b1, b2 = seed_voting["ballots"]
+        item1 = seed_voting["items"][0]
+        # b2 votes FOR on item 1, b1 AGAINST → b2 first in ascending order
+        for bv in b1.votes:
+            if bv.voting_item_id == item1.id:
+                bv.vote = VoteValue.AGAINST
+        for bv in b2.votes:
+            if bv.voting_item_id == item1.id:
+                bv.vote = VoteValue.FOR
+        db.flush()
+
+        v = seed_voting["voting"]
+        resp = client.get(f"/hlasovani/{v.id}/listky?sort=bod_{item1.id}&order=asc")
+        assert resp.status_code == 200
+        assert resp.text.index(f'id="ballot-{b2.id}"') < resp.text.index(f'id="ballot-{b1.id}"')
+
+    def test_sort_by_units_desc(self, seed_voting, client):
+        b1, b2 = seed_voting["ballots"]
+        v = seed_voting["voting"]
+        resp = client.get(f"/hlasovani/{v.id}/listky?sort=units&order=desc")
+        assert resp.text.index(f'id="ballot-{b2.id}"') < resp.text.index(f'id="ballot-{b1.id}"')
+
+    def test_keyset_pagination(self, seed_voting, client, monkeypatch):
+        import re
+        import app.routers.voting.ballots as ballots_router
+        monkeypatch.setattr(ballots_router, "BALLOT_PAGE_SIZE", 1)
+        b1, b2 = seed_voting["ballots"]
+        v = seed_voting["voting"]
+
+        resp = client.get(f"/hlasovani/{v.id}/listky?sort=owner&order=asc")
+        assert f'id="ballot-{b1.id}"' in resp.text
+        assert f'id="ballot-{b2.id}"' not in resp.text
+        next_url = re.search(r'hx-get="([^"]*cursor=[^"]*)"', resp.text).group(1)
+
+        resp2 = client.get(next_url.replace("&amp;", "&"), headers={"HX-Request": "true"})
+        assert f'id="ballot-{b2.id}"' in resp2.text
+        assert f'id="ballot-{b1.id}"' not in resp2.text
+        assert "cursor=" not in resp2.text
+
+    def test_malformed_cursor_falls_back_to_first_page(self, seed_voting, client):
+        from app.utils import decode_cursor, encode_cursor
+
+        b1, b2 = seed_voting["ballots"]
+        v = seed_voting["voting"]
+        for bad in ([{"a": 1}, 1], [[1, 2], 1], ["novak", [1]]):
+            cursor = encode_cursor(bad)
+            assert decode_cursor(cursor) is None
+            resp = client.get(f"/hlasovani/{v.id}/listky?sort=owner&order=asc&cursor={cursor}")
+            assert resp.status_code == 200
+            assert f'id="ballot-{b1.id}"' in resp.text
+        assert decode_cursor(encode_cursor(["novak", None])) == ["novak", None]
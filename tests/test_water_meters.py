@@ -9,6 +9,9 @@ from app.routers.water_meters._helpers import (
     parse_unit_label,
     normalize_unit_label,
 )
+from app.models import MeterType, WaterMeter, WaterReading
+from app.services.water_meter_import import import_water_readings
+from app.services.water_meter_stats import compute_history, refresh_water_meter_stats
 
 
 # ---------------------------------------------------------------------------
@@ -161,6 +164,107 @@ class TestComputeDeviations:
         assert result[1]["deviation_pct"] is None
 
 
+# ---------------------------------------------------------------------------
+# Materialized stats — refresh_water_meter_stats
+# ---------------------------------------------------------------------------
+
+def _seed_meter(db, serial, readings, meter_type=MeterType.COLD):
+    meter = WaterMeter(meter_serial=serial, meter_type=meter_type, unit_number=1)
+    db.add(meter)
+    db.flush()
+    for d, v in readings:
+        db.add(WaterReading(meter_id=meter.id, reading_date=d, value=v))
+    return meter
+
+
+class TestWaterMeterStats:
+    def test_compute_history_last_three_months(self):
+        series = [
+            (date(2025, 1, 1), 10.0), (date(2025, 1, 31), 12.0),
+            (date(2025, 2, 1), 12.0), (date(2025, 2, 28), 15.5),
+            (date(2025, 3, 1), 15.5),  # single reading — skipped
+            (date(2025, 4, 1), 16.0), (date(2025, 4, 30), 17.0),
+            (date(2025, 5, 1), 17.0), (date(2025, 5, 31), 20.0),
+        ]
+        history = compute_history(series)
+        assert [h["date"] for h in history] == ["05/2025", "04/2025", "02/2025"]
+        assert history[0]["consumption"] == 3.0
+
+    def test_refresh_matches_in_memory_deviations(self, db_session):
+        m1 = _seed_meter(db_session, "S1", [(date(2025, 6, 1), 110.0), (date(2025, 1, 1), 100.0)])
+        m2 = _seed_meter(db_session, "S2", [(date(2025, 1, 1), 200.0), (date(2025, 6, 1), 230.0)])
+        m3 = _seed_meter(db_session, "S3", [])
+
+        assert refresh_water_meter_stats(db_session) == 3
+
+        assert m1.stats.reading_count == 2
+        assert m1.stats.last_date == date(2025, 6, 1)
+        assert m1.stats.last_value == 110.0
+        assert m1.stats.prev_value == 100.0
+        assert m1.stats.consumption == 10.0
+        assert m1.stats.type_avg == 20.0
+        assert m1.stats.deviation_pct == -50.0
+        assert m2.stats.deviation_pct == 50.0
+        assert m3.stats.reading_count == 0
+        assert m3.stats.deviation_pct is None
+
+    def test_overview_sorts_and_filters_on_stats(self, db_session, client):
+        _seed_meter(db_session, "LOW111", [(date(2025, 1, 1), 100.0), (date(2025, 6, 1), 101.0)])
+        _seed_meter(db_session, "MID222", [(date(2025, 1, 1), 100.0), (date(2025, 6, 1), 110.0)])
+        _seed_meter(db_session, "HIGH333", [(date(2025, 1, 1), 100.0), (date(2025, 6, 1), 130.0)])
+        refresh_water_meter_stats(db_session)
+
+        resp = client.get("/vodometry?sort=spotreba&order=desc")
+        assert resp.status_code == 200
+        assert resp.text.index("HIGH333") < resp.text.index("MID222") < resp.text.index("LOW111")
+
+        # avg = 41/3 ≈ 13.67 → LOW (-93 %) and HIGH (+120 %) exceed 50 %
+        resp = client.get("/vodometry?stav=vysoka_odchylka")
+        assert "HIGH333" in resp.text and "LOW111" in resp.text
+        assert "MID222" not in resp.text
+
+
+# ---------------------------------------------------------------------------
+# Bulk import — import_water_readings
+# ---------------------------------------------------------------------------
+
+def _import_row(serial, readings, label="A 111"):
+    return {
+        "unit_label": label, "unit_number": 111, "unit_letter": "A", "unit_suffix": "",
+        "meter_serial": serial, "meter_type": "cold", "location": "",
+        "readings": [{"date": d, "value": v} for d, v in readings],
+    }
+
+
+class TestImportWaterReadings:
+    def test_append_keeps_existing_dates(self, db_session):
+        meter = _seed_meter(db_session, "S1", [(date(2025, 1, 1), 100.0)])
+        rows = [
+            _import_row("S1", [(date(2025, 1, 1), 999.0), (date(2025, 2, 1), 105.0)]),
+            _import_row("NEW1", [(date(2025, 1, 1), 5.0)]),
+        ]
+        result = import_water_readings(db_session, rows, "append", import_batch="b1")
+
+        assert result["new_meters"] == 1
+        assert result["new_readings"] == 2
+        assert result["unmatched_units"] == 1
+        values = dict(db_session.query(WaterReading.reading_date, WaterReading.value)
+                      .filter_by(meter_id=meter.id).all())
+        assert values == {date(2025, 1, 1): 100.0, date(2025, 2, 1): 105.0}
+        assert meter.stats.consumption == 5.0
+
+    def test_overwrite_replaces_readings(self, db_session):
+        meter = _seed_meter(db_session, "S1", [(date(2024, 12, 1), 90.0), (date(2025, 1, 1), 100.0)])
+        rows = [_import_row("S1", [(date(2025, 1, 1), 101.0), (date(2025, 1, 1), 102.0)])]
+        result = import_water_readings(db_session, rows, "overwrite", import_batch="b2")
+
+        assert result["deleted_readings"] == 2
+        assert result["new_readings"] == 1
+        readings = db_session.query(WaterReading).filter_by(meter_id=meter.id).all()
+        assert [(r.reading_date, r.value) for r in readings] == [(date(2025, 1, 1), 102.0)]
+        assert meter.stats.reading_count == 1
+
+
 # ---------------------------------------------------------------------------
 # Smoke tests
 # ---------------------------------------------------------------------------